@@ -0,0 +1,411 @@
+# app/analise_consultas.py
+"""
+Análise de Consultas - Catálogo dos SQLs da aplicação e verificação dos planos
+
+Cada entrada do catálogo é uma consulta que a aplicação executa (com parâmetros
+de exemplo). analisar_consultas() roda EXPLAIN QUERY PLAN em todas e aponta:
+- SCAN de tabela sem índice (varredura completa)
+- USE TEMP B-TREE (ordenação/agrupamento em árvore temporária)
+
+Uso (a partir de app/):
+    python analise_consultas.py [--analyze] [--todas] [--estatisticas]
+"""
+
+import json
+import sqlite3
+
+from database import (
+    conectar, montar_filtros_chamados, montar_pagina_chamados, montar_busca_texto,
+    SQL_TEMPO_ATUAL, COLUNAS_RESUMO, SQL_LIMITES_FEED, COLUNAS_FEED
+)
+from utils import agora_epoch
+
+# ========== CATÁLOGO ==========
+
+def _pagina_chamados(perfil, status=None, ordenacao="recentes", cursor_pagina=None, filtro_usuario=None):
+    """SQL de uma página da lista de chamados (o mesmo montado por buscar_chamados)."""
+    where, params = montar_filtros_chamados("cliente", perfil, status, None, filtro_usuario)
+    sql, params, _ = montar_pagina_chamados(where, params, ordenacao, cursor_pagina, 50)
+    return sql, params
+
+def _total_chamados(perfil, status=None):
+    where, params = montar_filtros_chamados("cliente", perfil, status)
+    return f"SELECT COUNT(*) as total FROM chamados {where}", params
+
+def _busca_texto(perfil, status=None):
+    """SQL da busca de texto (o mesmo montado por buscar_texto_chamados)."""
+    where, params = montar_filtros_chamados("cliente", perfil, status)
+    return montar_busca_texto('"erro" AND ("sistema" OR "sistemas")', where, params)
+
+def catalogo_consultas():
+    """
+    Lista de consultas da aplicação: {nome, origem, sql, params, aceitos}.
+    'aceitos' são trechos do plano conhecidos e tolerados: tabelas pequenas
+    por natureza (usuários, resumos), varreduras na ordem do índice que param
+    no LIMIT e ordenações de poucas linhas já filtradas.
+    """
+    agora = agora_epoch()
+    ids = json.dumps([1, 2, 3])
+    atualizacao = (1735700400, 100)
+
+    consultas = [
+        # Usuários
+        ("usuarios_lista", "database.buscar_usuarios",
+         "SELECT * FROM usuarios ORDER BY usuario", (), ["SCAN usuarios"]),
+        ("usuario_por_login", "database.buscar_usuario / auth.py",
+         "SELECT * FROM usuarios WHERE usuario = ?", ("admin",), []),
+        ("usuario_por_id", "auth.py",
+         "SELECT * FROM usuarios WHERE id = ?", (1,), []),
+
+        # Lista de chamados (todas as combinações de filtro/ordenação da tela)
+        ("chamados_total_admin", "database.buscar_chamados", *_total_chamados("admin"), []),
+        ("chamados_total_cliente", "database.buscar_chamados", *_total_chamados("cliente"), []),
+        ("chamados_total_status", "database.buscar_chamados", *_total_chamados("admin", "Novo"), []),
+        ("chamados_total_cliente_status", "database.buscar_chamados", *_total_chamados("cliente", "Novo"), []),
+        # Sem filtro: percorre a tabela na ordem do id e para no LIMIT
+        ("chamados_pagina_admin", "database.buscar_chamados", *_pagina_chamados("admin"), ["SCAN chamados"]),
+        ("chamados_pagina_admin_antigos", "database.buscar_chamados",
+         *_pagina_chamados("admin", ordenacao="antigos", cursor_pagina=(100,)), []),
+        ("chamados_pagina_admin_atualizacao", "database.buscar_chamados",
+         *_pagina_chamados("admin", ordenacao="atualizacao", cursor_pagina=atualizacao), []),
+        ("chamados_pagina_admin_status", "database.buscar_chamados",
+         *_pagina_chamados("admin", status="Novo"), []),
+        ("chamados_pagina_admin_status_atualizacao", "database.buscar_chamados",
+         *_pagina_chamados("admin", status="Novo", ordenacao="atualizacao", cursor_pagina=atualizacao), []),
+        ("chamados_pagina_admin_filtro_usuario", "database.buscar_chamados",
+         *_pagina_chamados("admin", filtro_usuario="cli"), ["SCAN usuarios", "USE TEMP B-TREE FOR ORDER BY"]),
+        ("chamados_pagina_cliente", "database.buscar_chamados", *_pagina_chamados("cliente"), []),
+        ("chamados_pagina_cliente_atualizacao", "database.buscar_chamados",
+         *_pagina_chamados("cliente", ordenacao="atualizacao", cursor_pagina=atualizacao), []),
+        ("chamados_pagina_cliente_status", "database.buscar_chamados",
+         *_pagina_chamados("cliente", status="Novo"), []),
+        ("chamados_pagina_cliente_status_atualizacao", "database.buscar_chamados",
+         *_pagina_chamados("cliente", status="Novo", ordenacao="atualizacao", cursor_pagina=atualizacao), []),
+
+        # Busca de texto (FTS5): agrupa as ocorrências (CTE 'melhores' = b) e ordena por relevância
+        ("busca_texto_admin", "database.buscar_texto_chamados", *_busca_texto("admin"),
+         ["SCAN b", "USE TEMP B-TREE"]),
+        ("busca_texto_cliente_status", "database.buscar_texto_chamados", *_busca_texto("cliente", "Novo"),
+         ["SCAN b", "USE TEMP B-TREE"]),
+
+        # Chamado
+        ("chamado_por_id", "database.buscar_chamado_por_id",
+         f"SELECT *, {SQL_TEMPO_ATUAL} as tempo_atual FROM chamados WHERE id = ?", (agora, 1), []),
+        ("chamado_com_cliente", "services.chamados_service",
+         """SELECT c.*, u.email as email_cliente, u.empresa
+            FROM chamados c JOIN usuarios u ON c.usuario = u.usuario
+            WHERE c.id = ?""", (1,), ["SCAN u"]),
+        ("ultimos_chamados_cliente", "dashboard.py",
+         """SELECT id, assunto, status, prioridade, data_abertura
+            FROM chamados WHERE usuario = ? ORDER BY id DESC LIMIT 5""", ("cliente",), []),
+
+        # Detalhes do chamado
+        ("interacoes_chamado", "database.buscar_interacoes_chamado",
+         "SELECT * FROM interacoes WHERE chamado_id = ? ORDER BY data_epoch ASC, id ASC", (1,), []),
+        ("anexos_interacao", "database.buscar_anexos_interacao",
+         "SELECT * FROM anexos_interacao WHERE interacao_id = ?", (1,), []),
+        ("anexos_chamado", "database.buscar_anexos_chamado",
+         "SELECT * FROM anexos WHERE chamado_id = ?", (1,), []),
+        ("mensagem_conclusao", "database.buscar_mensagem_conclusao",
+         """SELECT m.*,
+                   (SELECT GROUP_CONCAT(a.nome_arquivo)
+                    FROM anexos_conclusao a
+                    WHERE a.mensagem_id = m.id) as arquivos
+            FROM mensagens_conclusao m
+            WHERE m.chamado_id = ?
+            ORDER BY m.data_envio_epoch DESC, m.id DESC
+            LIMIT 1""", (1,), []),
+
+        # Carga em lote dos detalhes (carregar_detalhes_chamados)
+        ("lote_descricoes", "database.carregar_detalhes_chamados",
+         "SELECT id, descricao FROM chamados WHERE id IN (SELECT value FROM json_each(?))", (ids,), []),
+        ("lote_interacoes", "database.carregar_detalhes_chamados",
+         """SELECT * FROM interacoes
+            WHERE chamado_id IN (SELECT value FROM json_each(?))
+            ORDER BY chamado_id, data_epoch ASC, id ASC""", (ids,), []),
+        ("lote_anexos_interacao", "database.carregar_detalhes_chamados",
+         """SELECT ai.* FROM anexos_interacao ai
+            JOIN interacoes i ON i.id = ai.interacao_id
+            WHERE i.chamado_id IN (SELECT value FROM json_each(?))
+            ORDER BY ai.id""", (ids,), ["USE TEMP B-TREE FOR ORDER BY"]),
+        ("lote_anexos", "database.carregar_detalhes_chamados",
+         """SELECT * FROM anexos
+            WHERE chamado_id IN (SELECT value FROM json_each(?))
+            ORDER BY id""", (ids,), ["USE TEMP B-TREE FOR ORDER BY"]),
+        ("lote_mensagens_conclusao", "database.carregar_detalhes_chamados",
+         """SELECT m.id, m.chamado_id, m.mensagem, m.atendente, m.data_envio,
+                   (SELECT GROUP_CONCAT(a.nome_arquivo)
+                    FROM anexos_conclusao a
+                    WHERE a.mensagem_id = m.id) as arquivos
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY chamado_id ORDER BY data_envio_epoch DESC, id DESC
+                ) as ordem
+                FROM mensagens_conclusao
+                WHERE chamado_id IN (SELECT value FROM json_each(?))
+            ) m
+            WHERE m.ordem = 1""", (ids,), ["USE TEMP B-TREE FOR RIGHT PART OF ORDER BY"]),
+
+        # Estatísticas e resumos
+        ("contadores_status", "database.buscar_contadores_status",
+         "SELECT status, SUM(total) as total FROM resumo_chamados_usuario GROUP BY status", (),
+         ["SCAN resumo_chamados_usuario", "USE TEMP B-TREE FOR GROUP BY"]),
+        ("contadores_status_usuario", "database.buscar_contadores_status",
+         "SELECT status, SUM(total) as total FROM resumo_chamados_usuario WHERE usuario = ? GROUP BY status",
+         ("cliente",), []),
+        ("contadores_status_sem_resumo", "database.buscar_contadores_status",
+         "SELECT status, COUNT(*) as total FROM chamados WHERE usuario = ? GROUP BY status", ("cliente",), []),
+        ("resumo_por_empresa", "database.buscar_resumo_por_empresa",
+         f"""SELECT r.empresa, {COLUNAS_RESUMO}
+            FROM resumo_chamados_empresa r
+            GROUP BY r.empresa HAVING SUM(r.total) > 0 ORDER BY SUM(r.total) DESC""", (),
+         ["SCAN r", "USE TEMP B-TREE FOR ORDER BY"]),
+        ("resumo_por_usuario", "database.buscar_resumo_por_usuario",
+         f"""SELECT r.usuario, u.nome_completo, u.empresa, {COLUNAS_RESUMO}
+            FROM resumo_chamados_usuario r
+            LEFT JOIN usuarios u ON u.usuario = r.usuario
+            GROUP BY r.usuario HAVING SUM(r.total) > 0 ORDER BY SUM(r.total) DESC""", (),
+         ["SCAN r", "SCAN u", "USE TEMP B-TREE FOR ORDER BY"]),
+        ("ranking_tempo", "database.buscar_ranking_tempo_atendimento",
+         f"""SELECT id, assunto, usuario, atendente, status, status_atendimento,
+                   tempo_atendimento_segundos, retornos, data_abertura, data_fim_atendimento,
+                   {SQL_TEMPO_ATUAL} as tempo_atual
+            FROM chamados
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id FROM chamados
+                    WHERE tempo_atendimento_segundos > 0
+                    ORDER BY tempo_atendimento_segundos DESC
+                    LIMIT ?
+                )
+                UNION
+                SELECT id FROM chamados WHERE status_atendimento = 'em_andamento'
+            )
+            AND tempo_atual > 0
+            ORDER BY tempo_atual DESC
+            LIMIT ?""", (agora, 20, 20), ["USE TEMP B-TREE FOR ORDER BY"]),
+
+        # Logs, downloads e e-mails
+        ("logs_sistema", "database.buscar_logs_sistema",
+         "SELECT * FROM logs_sistema ORDER BY data_hora_epoch DESC LIMIT ?", (100,), []),
+        ("logs_usuario", "database.buscar_logs_sistema",
+         "SELECT * FROM logs_sistema WHERE usuario = ? ORDER BY data_hora_epoch DESC LIMIT ?", ("admin", 100), []),
+        ("limpar_logs", "database.limpar_logs_antigos",
+         "DELETE FROM logs_sistema WHERE data_hora_epoch < ?", (agora - 30 * 86400,), []),
+        ("downloads_usuario", "database.buscar_downloads_usuario",
+         "SELECT * FROM downloads WHERE usuario = ? ORDER BY data_download_epoch DESC LIMIT ?", ("cliente", 50), []),
+        ("emails_enviados", "dashboard.buscar_emails_enviados",
+         """SELECT e.id, e.data_envio, e.destinatario, e.assunto, e.tipo, e.chamado_id,
+                   e.sucesso, e.erro, c.usuario as usuario_chamado
+            FROM emails_enviados e
+            LEFT JOIN chamados c ON e.chamado_id = c.id
+            ORDER BY e.data_envio_epoch DESC
+            LIMIT ?""", (100,), []),
+
+        # Cache de consultas (tabela pequena: uma linha por tabela versionada)
+        ("versoes_tabelas", "db_cache.VigiaVersoes",
+         "SELECT tabela, versao FROM versoes_tabelas", (), ["SCAN versoes_tabelas"]),
+
+        # Feed de alterações (sqlite_sequence: uma linha por tabela AUTOINCREMENT)
+        ("feed_limites", "database.buscar_alteracoes", SQL_LIMITES_FEED, (), ["SCAN sqlite_sequence"]),
+        ("feed_admin", "database.buscar_alteracoes",
+         f"""SELECT {COLUNAS_FEED} FROM feed_alteracoes
+             WHERE seq > ? AND seq <= ? ORDER BY seq LIMIT ?""", (100, 200, 501), []),
+        ("feed_cliente", "database.buscar_alteracoes",
+         f"""SELECT {COLUNAS_FEED} FROM feed_alteracoes
+             WHERE usuario = ? AND seq > ? AND seq <= ? ORDER BY seq LIMIT ?""", ("cliente", 100, 200, 501), []),
+        # Poda: percorre na ordem do seq e para na primeira alteração recente
+        ("feed_poda", "database.podar_feed_alteracoes",
+         """DELETE FROM feed_alteracoes WHERE seq < COALESCE(
+                (SELECT seq FROM feed_alteracoes WHERE data_epoch >= ? ORDER BY seq LIMIT 1),
+                (SELECT MAX(seq) + 1 FROM feed_alteracoes))""", (agora - 7 * 86400,), ["SCAN feed_alteracoes"]),
+
+        # Fila de e-mails (reserva, espera e profundidade pelo índice de status)
+        ("fila_emails_proximo", "database.proximo_envio_fila",
+         "SELECT MIN(proxima_tentativa_epoch) FROM fila_emails WHERE status = 'pendente'", (), []),
+        ("fila_emails_reservar", "database.reservar_emails_fila",
+         """UPDATE fila_emails SET status = 'enviando', tentativas = tentativas + 1, reservado_em = ?, reservado_por = ?
+            WHERE id IN (SELECT id FROM fila_emails
+                         WHERE status = 'pendente' AND proxima_tentativa_epoch <= ?
+                         ORDER BY proxima_tentativa_epoch LIMIT ?)""", (agora, "host:1", agora, 10), []),
+        ("fila_emails_reservar_grupos", "database.reservar_emails_fila",
+         """UPDATE fila_emails SET status = 'enviando', tentativas = tentativas + 1, reservado_em = ?, reservado_por = ?
+            WHERE status = 'pendente' AND grupo IN (SELECT value FROM json_each(?))""", (agora, "host:1", '["admin@exemplo.com.br#1"]'), []),
+        ("fila_emails_liberar_presos", "database.liberar_emails_presos",
+         """UPDATE fila_emails SET status = 'pendente', reservado_em = NULL, reservado_por = NULL
+            WHERE status = 'enviando' AND COALESCE(reservado_em, 0) < ?""", (agora - 900,), []),
+        ("fila_emails_janela_grupo", "database.inserir_email_fila",
+         """SELECT MIN(proxima_tentativa_epoch) FROM fila_emails
+            WHERE grupo = ? AND status = 'pendente'""", ("admin@exemplo.com.br#1",), []),
+        ("fila_emails_antecipar_grupo", "database.inserir_email_fila",
+         """UPDATE fila_emails SET proxima_tentativa_epoch = ?
+            WHERE grupo = ? AND status = 'pendente' AND proxima_tentativa_epoch > ?""", (agora, "admin@exemplo.com.br#1", agora), []),
+        ("fila_emails_contagem", "database.contar_fila_emails",
+         "SELECT status, COUNT(*) FROM fila_emails GROUP BY status", (), []),
+        ("fila_emails_falhos", "database.buscar_emails_falhos",
+         """SELECT id, destinatario, assunto, chamado_id, tipo, tentativas, ultimo_erro, data_criacao
+            FROM fila_emails WHERE status = 'falhou'
+            ORDER BY proxima_tentativa_epoch DESC LIMIT ?""", (50,), []),
+        ("fila_emails_poda", "database.podar_fila_emails_db",
+         "DELETE FROM fila_emails WHERE status = 'enviado' AND proxima_tentativa_epoch < ?", (agora - 7 * 86400,), []),
+
+        # Consultas lentas (instrumentação)
+        ("consultas_lentas", "database.buscar_consultas_lentas",
+         """SELECT id, impressao, sql, duracao_ms, linhas, chamador, data_hora
+            FROM consultas_lentas
+            ORDER BY data_hora_epoch DESC, id DESC
+            LIMIT ?""", (100,), []),
+        ("consultas_lentas_retencao", "db_instrumentacao.descarregar_consultas_lentas",
+         "DELETE FROM consultas_lentas WHERE data_hora_epoch < ?", (agora - 7 * 86400,), []),
+    ]
+
+    return [
+        {"nome": nome, "origem": origem, "sql": sql, "params": tuple(params), "aceitos": aceitos}
+        for nome, origem, sql, params, aceitos in consultas
+    ]
+
+# ========== ANÁLISE DOS PLANOS ==========
+
+def alertas_plano(plano, aceitos=()):
+    """
+    Aponta varreduras completas e árvores temporárias em um plano
+    (lista de textos do EXPLAIN QUERY PLAN).
+    """
+    # Subconsultas/CTEs materializadas aparecem como "SCAN <apelido>": não são tabelas
+    subconsultas = {
+        linha.split()[-1] for linha in plano
+        if linha.startswith(("CO-ROUTINE", "MATERIALIZE"))
+    }
+
+    alertas = []
+    for linha in plano:
+        if any(linha.startswith(aceito) for aceito in aceitos):
+            continue
+
+        if linha.startswith("USE TEMP B-TREE"):
+            alertas.append(linha)
+        elif linha.startswith("SCAN ") and " USING " not in linha and "VIRTUAL TABLE" not in linha:
+            partes = linha.split()
+            if partes[1] not in subconsultas and partes[1] != "CONSTANT":
+                alertas.append(linha)
+
+    return alertas
+
+def plano_consulta(cursor, sql, params=()):
+    """Executa EXPLAIN QUERY PLAN e retorna as linhas do plano (texto)."""
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return [row[3] for row in cursor.fetchall()]
+
+def copiar_esquema(conn):
+    """
+    Cria um banco em memória só com tabelas e índices (sem dados e sem
+    sqlite_stat1). Lá o planejador decide apenas pelos índices existentes,
+    como faria com as tabelas grandes - em um banco pequeno, varrer tudo é o
+    plano mais barato e esconderia um índice faltando.
+    """
+    memoria = sqlite3.connect(":memory:")
+    objetos = conn.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE type IN ('table', 'index') AND sql IS NOT NULL
+          AND name NOT LIKE 'sqlite_%'
+        ORDER BY rowid
+    """).fetchall()
+
+    for (sql,) in objetos:
+        try:
+            memoria.execute(sql)
+        except sqlite3.OperationalError:
+            # Tabelas internas do FTS5 já criadas pelo CREATE VIRTUAL TABLE
+            pass
+
+    return memoria
+
+def analisar_consultas(conn=None, usar_estatisticas=False):
+    """
+    Roda EXPLAIN QUERY PLAN em todo o catálogo.
+    Por padrão analisa uma cópia do esquema (índices, sem depender do volume
+    de dados); com usar_estatisticas=True usa o banco real e as estatísticas
+    atuais do ANALYZE.
+    Retorna lista de {nome, origem, plano, alertas} (ou 'erro').
+    """
+    propria = conn is None
+    if propria:
+        conn = conectar()
+
+    if not usar_estatisticas:
+        esquema = copiar_esquema(conn)
+        if propria:
+            conn.close()
+        conn, propria = esquema, True
+
+    resultados = []
+    try:
+        cursor = conn.cursor()
+        for consulta in catalogo_consultas():
+            resultado = {"nome": consulta["nome"], "origem": consulta["origem"]}
+            try:
+                plano = plano_consulta(cursor, consulta["sql"], consulta["params"])
+                resultado["plano"] = plano
+                resultado["alertas"] = alertas_plano(plano, consulta["aceitos"])
+            except Exception as e:
+                resultado["plano"] = []
+                resultado["alertas"] = []
+                resultado["erro"] = str(e)
+            resultados.append(resultado)
+    finally:
+        if propria:
+            conn.close()
+
+    return resultados
+
+def atualizar_estatisticas(conn=None):
+    """Roda ANALYZE para o planejador escolher os índices com estatísticas atuais."""
+    propria = conn is None
+    if propria:
+        conn = conectar()
+
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+        return True, "Estatísticas do planejador atualizadas"
+    except Exception as e:
+        return False, f"Erro ao atualizar estatísticas: {e}"
+    finally:
+        if propria:
+            conn.close()
+
+# ========== LINHA DE COMANDO ==========
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verifica os planos das consultas da aplicação")
+    parser.add_argument("--analyze", action="store_true", help="Roda ANALYZE antes da verificação")
+    parser.add_argument("--todas", action="store_true", help="Mostra o plano de todas as consultas")
+    parser.add_argument("--estatisticas", action="store_true",
+                        help="Usa o banco real e as estatísticas do ANALYZE (em vez de só o esquema)")
+    args = parser.parse_args()
+
+    if args.analyze:
+        print(atualizar_estatisticas()[1])
+
+    resultados = analisar_consultas(usar_estatisticas=args.estatisticas)
+    com_alerta = [r for r in resultados if r["alertas"] or r.get("erro")]
+
+    for resultado in resultados:
+        if not args.todas and resultado not in com_alerta:
+            continue
+
+        marca = "⚠️ " if resultado in com_alerta else "✅"
+        print(f"\n{marca} {resultado['nome']}  ({resultado['origem']})")
+        if resultado.get("erro"):
+            print(f"    erro: {resultado['erro']}")
+        for linha in resultado["plano"]:
+            sinal = "  <==" if linha in resultado["alertas"] else ""
+            print(f"    {linha}{sinal}")
+
+    print(f"\n{len(resultados)} consultas analisadas, {len(com_alerta)} com alerta.")
+    return 1 if com_alerta else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+# app/auditoria.py
+"""
+Auditoria - Gravação dos logs do sistema (logs_sistema)
+
+Dois modos:
+- Dentro de uma operação (cursor informado): o log entra na MESMA transação
+  da operação, sem commit extra.
+- Fora de uma operação: o log vai para uma fila em memória que um escritor em
+  segundo plano grava em lote (executemany) ao atingir AUDITORIA_LOTE linhas
+  ou a cada AUDITORIA_INTERVALO segundos. A fila é descarregada no encerramento.
+  O lote é gravado pela thread escritora do banco (escritor.py).
+"""
+
+import threading
+import atexit
+import time
+
+from config.email_config import get_config_value
+from escritor import executar_escrita
+from utils import agora_brasilia_str
+
+# Quantidade de logs que dispara a gravação imediata do lote
+AUDITORIA_LOTE = int(get_config_value("AUDITORIA_LOTE", "200"))
+
+# Tempo máximo (segundos) que um log fica na fila antes de ser gravado
+AUDITORIA_INTERVALO = float(get_config_value("AUDITORIA_INTERVALO", "1.0"))
+
+_SQL_INSERIR_LOG = """
+    INSERT INTO logs_sistema (acao, usuario, detalhes, ip_address, data_hora)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+_pendentes = []
+_condicao = threading.Condition()
+_escrita_lock = threading.Lock()
+_escritor_lock = threading.Lock()
+_escritor = None
+_encerrando = False
+
+# Estatísticas do escritor (diagnóstico e benchmark)
+estatisticas = {"enfileirados": 0, "gravados": 0, "lotes": 0, "erros": 0}
+
+def registrar_log(acao, usuario, detalhes="", ip_address=None, cursor=None):
+    """
+    Registra ação no log do sistema.
+    Com cursor: grava na transação do chamador (o commit é dele).
+    Sem cursor: enfileira para gravação em lote.
+    """
+    linha = (acao, usuario, detalhes, ip_address, agora_brasilia_str())
+
+    if cursor is not None:
+        cursor.execute(_SQL_INSERIR_LOG, linha)
+        return True
+
+    with _condicao:
+        _pendentes.append(linha)
+        estatisticas["enfileirados"] += 1
+        if len(_pendentes) >= AUDITORIA_LOTE:
+            _condicao.notify()
+
+    _iniciar_escritor()
+    return True
+
+def descarregar_logs():
+    """Grava imediatamente todos os logs pendentes. Retorna a quantidade gravada."""
+    with _escrita_lock:
+        with _condicao:
+            lote = _pendentes[:]
+            _pendentes.clear()
+
+        if not lote:
+            return 0
+
+        try:
+            executar_escrita(lambda cursor: cursor.executemany(_SQL_INSERIR_LOG, lote))
+
+            estatisticas["gravados"] += len(lote)
+            estatisticas["lotes"] += 1
+            return len(lote)
+        except Exception as e:
+            # Logs não podem derrubar a aplicação (mesmo comportamento de antes)
+            estatisticas["erros"] += 1
+            print(f"Erro ao gravar logs de auditoria: {e}")
+            return 0
+
+def logs_pendentes():
+    """Quantidade de logs aguardando gravação."""
+    with _condicao:
+        return len(_pendentes)
+
+def _loop_escritor():
+    while True:
+        inicio = time.monotonic()
+        with _condicao:
+            _condicao.wait_for(
+                lambda: _encerrando or len(_pendentes) >= AUDITORIA_LOTE,
+                timeout=AUDITORIA_INTERVALO
+            )
+            encerrar = _encerrando
+
+        descarregar_logs()
+
+        if encerrar:
+            return
+
+        # Evita laço apertado se o lote encher mais rápido do que grava
+        if time.monotonic() - inicio < 0.01:
+            time.sleep(0.01)
+
+def _iniciar_escritor():
+    global _escritor
+    if _escritor is not None and _escritor.is_alive():
+        return
+
+    with _escritor_lock:
+        if _escritor is None or not _escritor.is_alive():
+            _escritor = threading.Thread(target=_loop_escritor, name="auditoria-escritor", daemon=True)
+            _escritor.start()
+
+def encerrar_auditoria():
+    """Para o escritor e grava o que restou na fila (chamado no encerramento)."""
+    global _encerrando
+    with _condicao:
+        _encerrando = True
+        _condicao.notify_all()
+
+    if _escritor is not None and _escritor.is_alive():
+        _escritor.join(timeout=5)
+
+    descarregar_logs()
+
+atexit.register(encerrar_auditoria)
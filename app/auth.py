@@ -10,10 +10,11 @@ from database import (
     listar_usuarios, 
     buscar_usuario_por_id,
     atualizar_usuario,
+    atualizar_senha_usuario,
     excluir_usuario,
     registrar_log
 )
-from utils import verificar_senha, hash_senha, validar_email, validar_senha_forte
+from utils import verificar_senha, validar_email, validar_senha_forte
 
 def login():
     """Tela de login."""
@@ -303,19 +304,7 @@ def tela_cadastro_usuario():
                                 
                                 # Atualizar senha se fornecida
                                 if nova_senha_edit and sucesso:
-                                    try:
-                                        senha_hash, salt = hash_senha(nova_senha_edit)
-                                        conn = conectar()
-                                        cursor = conn.cursor()
-                                        cursor.execute("""
-                                            UPDATE usuarios
-                                            SET senha_hash = ?, salt = ?
-                                            WHERE id = ?
-                                        """, (senha_hash, salt, user_id))
-                                        conn.commit()
-                                        conn.close()
-                                    except:
-                                        pass
+                                    sucesso = atualizar_senha_usuario(user_id, nova_senha_edit)
                                 
                                 if sucesso:
                                     st.success("✅ Usuário atualizado com sucesso!")
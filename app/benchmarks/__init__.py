@@ -0,0 +1,5 @@
+# app/benchmarks/__init__.py
+"""
+Benchmarks da camada de dados do Sistema Helpdesk
+Executar a partir da pasta app/, ex: python -m benchmarks.bench_conexoes
+"""
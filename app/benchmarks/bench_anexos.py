@@ -0,0 +1,137 @@
+# app/benchmarks/bench_anexos.py
+"""
+Benchmark: pico de memória (RSS) de uma sessão que abre um chamado com anexos,
+lendo todos os arquivos a cada rerun (comportamento antigo) vs download sob demanda
+com cache LRU compartilhado (services/anexos_service.py).
+
+Cada modo roda em um processo separado para que o pico de RSS seja independente.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_anexos [--arquivos 20] [--tamanho-mb 5] [--reruns 30]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.comum import APP_DIR, imprimir_tabela
+
+def criar_arquivos(pasta, quantidade, tamanho_mb):
+    """Cria os arquivos de anexo usados pelo benchmark."""
+    bloco = os.urandom(1024 * 1024)
+    anexos = []
+    for i in range(quantidade):
+        caminho = os.path.join(pasta, f"anexo_{i}.pdf")
+        with open(caminho, "wb") as f:
+            for _ in range(tamanho_mb):
+                f.write(bloco)
+        anexos.append({
+            'id': i,
+            'nome_arquivo': f"anexo_{i}.pdf",
+            'caminho_arquivo': caminho,
+            'tamanho_bytes': tamanho_mb * 1024 * 1024
+        })
+    return anexos
+
+def rerun_antigo(anexos, sorteado):
+    """Antes: cada rerun abria e lia todos os anexos para o st.download_button."""
+    payloads = []
+    for anexo in anexos:
+        if os.path.exists(anexo['caminho_arquivo']):
+            with open(anexo['caminho_arquivo'], 'rb') as f:
+                payloads.append(f.read())
+    return sum(len(p) for p in payloads)
+
+def rerun_novo(anexos, sorteado):
+    """Depois: só metadados; o usuário baixa um arquivo por rerun (via cache)."""
+    from services.anexos_service import metadados_anexo, ler_anexo
+
+    total = sum(metadados_anexo(anexo)['tamanho'] for anexo in anexos)
+    dados, _ = ler_anexo(anexos[sorteado]['caminho_arquivo'])
+    return total + len(dados)
+
+def executar_modo(modo, anexos, reruns):
+    """Executado no processo filho: simula os reruns e mede memória."""
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+
+    # Importa antes da medição para que os dois modos partam da mesma base
+    import services.anexos_service  # noqa: F401
+
+    rss_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    funcao = rerun_antigo if modo == "antigo" else rerun_novo
+    sorteio = random.Random(42)
+
+    tracemalloc.start()
+    for _ in range(reruns):
+        funcao(anexos, sorteio.randrange(len(anexos)))
+    _, pico_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    from services.anexos_service import estatisticas_cache_anexos
+    return {
+        "rss_base_mb": round(rss_base / 1024, 1),
+        "rss_pico_mb": round(rss_pico / 1024, 1),
+        "pico_alocado_mb": round(pico_python / (1024 * 1024), 1),
+        "cache": estatisticas_cache_anexos()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória dos anexos")
+    parser.add_argument("--arquivos", type=int, default=20)
+    parser.add_argument("--tamanho-mb", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=30)
+    parser.add_argument("--modo", choices=["antigo", "novo"], help=argparse.SUPPRESS)
+    parser.add_argument("--anexos-json", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Processo filho
+    if args.modo:
+        with open(args.anexos_json) as f:
+            anexos = json.load(f)
+        print(json.dumps(executar_modo(args.modo, anexos, args.reruns)))
+        return
+
+    pasta = tempfile.mkdtemp(prefix="helpdesk_bench_anexos_")
+    try:
+        anexos = criar_arquivos(pasta, args.arquivos, args.tamanho_mb)
+        arquivo_json = os.path.join(pasta, "anexos.json")
+        with open(arquivo_json, "w") as f:
+            json.dump(anexos, f)
+
+        linhas = []
+        for modo in ("antigo", "novo"):
+            saida = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_anexos",
+                 "--modo", modo, "--anexos-json", arquivo_json, "--reruns", str(args.reruns)],
+                cwd=APP_DIR, capture_output=True, text=True, check=True
+            )
+            resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+            linhas.append({
+                "modo": "antes (lê tudo)" if modo == "antigo" else "sob demanda + LRU",
+                "RSS base (MB)": resultado["rss_base_mb"],
+                "RSS pico (MB)": resultado["rss_pico_mb"],
+                "acréscimo (MB)": round(resultado["rss_pico_mb"] - resultado["rss_base_mb"], 1),
+                "pico alocado (MB)": resultado["pico_alocado_mb"],
+                "cache (MB)": round(resultado["cache"]["bytes_usados"] / (1024 * 1024), 1)
+            })
+
+        imprimir_tabela(
+            f"Memória por sessão: {args.arquivos} anexos de {args.tamanho_mb} MB, {args.reruns} reruns",
+            linhas,
+            ["modo", "RSS base (MB)", "RSS pico (MB)", "acréscimo (MB)", "pico alocado (MB)", "cache (MB)"]
+        )
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
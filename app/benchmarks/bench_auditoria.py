@@ -0,0 +1,146 @@
+# app/benchmarks/bench_auditoria.py
+"""
+Benchmark: COMMITs por ação do usuário e latência, com o log gravado em
+conexão/commit próprios após cada operação (comportamento antigo) vs log
+na transação da operação + fila gravada em lote (auditoria.py).
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_auditoria [--acoes 300]
+"""
+
+import argparse
+import time
+
+from benchmarks.comum import configurar_banco, imprimir_tabela
+
+class ContadorCommits:
+    """Conta COMMITs de todas as conexões abertas pelo pool (via trace callback)."""
+
+    def __init__(self):
+        self.commits = 0
+
+    def instalar(self, pool):
+        abrir_original = pool._abrir
+
+        def abrir_com_trace():
+            conn = abrir_original()
+            conn.set_trace_callback(self._rastrear)
+            return conn
+
+        pool._abrir = abrir_com_trace
+
+    def _rastrear(self, sql):
+        if sql.strip().upper().startswith("COMMIT"):
+            self.commits += 1
+
+def log_legado(acao, usuario, detalhes="", ip_address=None):
+    """Reproduz o registrar_log antigo: conexão, INSERT e commit a cada log."""
+    import database
+    conn = database.conectar()
+    conn.execute("""
+        INSERT INTO logs_sistema (acao, usuario, detalhes, ip_address, data_hora)
+        VALUES (?, ?, ?, ?, ?)
+    """, (acao, usuario, detalhes, ip_address, database.agora_brasilia_str()))
+    conn.commit()
+    conn.close()
+    return True
+
+_logs_apos_commit = []
+
+def log_db_legado(cursor, acao, usuario, detalhes="", ip_address=None):
+    """Antes as operações davam commit e DEPOIS chamavam registrar_log (commit extra)."""
+    _logs_apos_commit.append((acao, usuario, detalhes, ip_address))
+
+def gravar_logs_apos_commit():
+    while _logs_apos_commit:
+        log_legado(*_logs_apos_commit.pop(0))
+
+def acoes_usuario(database, indice):
+    """Ações típicas de um usuário: lista de (nome, função)."""
+    estado = {}
+
+    def abrir():
+        estado['id'] = database.criar_chamado(f"Assunto {indice}", "Média", "Descrição", "cliente_bench")
+
+    return [
+        ("criar_chamado", abrir),
+        ("adicionar_interacao", lambda: database.adicionar_interacao_chamado(estado['id'], "cliente", "Mensagem")),
+        ("iniciar_atendimento", lambda: database.iniciar_atendimento_admin(estado['id'], "admin")),
+        ("pausar_atendimento", lambda: database.pausar_atendimento(estado['id'])),
+        ("retomar_atendimento", lambda: database.retomar_atendimento(estado['id'])),
+        ("login (só log)", lambda: database.registrar_log("LOGIN", "cliente_bench", "Login bem-sucedido")),
+    ]
+
+def executar(database, auditoria, contador, quantidade):
+    """Executa as ações N vezes; retorna {ação: (commits, segundos)}."""
+    resultados = {}
+    for indice in range(quantidade):
+        for nome, acao in acoes_usuario(database, indice):
+            antes = contador.commits
+            inicio = time.perf_counter()
+            acao()
+            gravar_logs_apos_commit()
+            duracao = time.perf_counter() - inicio
+            commits, total = resultados.get(nome, (0, 0.0))
+            resultados[nome] = (commits + contador.commits - antes, total + duracao)
+
+    # Lotes pendentes contam para o total (rateados entre as ações)
+    antes = contador.commits
+    auditoria.descarregar_logs()
+    return resultados, contador.commits - antes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da gravação de logs de auditoria")
+    parser.add_argument("--acoes", type=int, default=300, help="Repetições de cada ação")
+    args = parser.parse_args()
+
+    configurar_banco()
+
+    import auditoria
+    import database
+
+    contador = ContadorCommits()
+    contador.instalar(database.obter_pool())
+    database.criar_tabelas()
+
+    # Antes: log com conexão e commit próprios
+    registrar_log_db, registrar_log = database.registrar_log_db, database.registrar_log
+    database.registrar_log_db, database.registrar_log = log_db_legado, log_legado
+    antes, _ = executar(database, auditoria, contador, args.acoes)
+
+    # Depois: log na transação da operação / fila em lote
+    database.registrar_log_db, database.registrar_log = registrar_log_db, registrar_log
+    lotes_inicio = auditoria.estatisticas["lotes"]
+    depois, commits_lotes = executar(database, auditoria, contador, args.acoes)
+    lotes = auditoria.estatisticas["lotes"] - lotes_inicio
+
+    total_acoes = args.acoes * len(antes)
+    linhas = []
+    for nome in antes:
+        c_antes, t_antes = antes[nome]
+        c_depois, t_depois = depois[nome]
+        linhas.append({
+            "ação": nome,
+            "commits antes": round(c_antes / args.acoes, 2),
+            "commits depois": round(c_depois / args.acoes, 2),
+            "antes (µs)": round(t_antes / args.acoes * 1_000_000, 1),
+            "depois (µs)": round(t_depois / args.acoes * 1_000_000, 1),
+        })
+
+    total_antes = sum(c for c, _ in antes.values())
+    total_depois = sum(c for c, _ in depois.values()) + commits_lotes
+    linhas.append({
+        "ação": "TOTAL por ação (c/ lotes)",
+        "commits antes": round(total_antes / total_acoes, 2),
+        "commits depois": round(total_depois / total_acoes, 2),
+    })
+
+    imprimir_tabela(
+        f"COMMITs e latência por ação ({args.acoes} repetições de cada)",
+        linhas,
+        ["ação", "commits antes", "commits depois", "antes (µs)", "depois (µs)"]
+    )
+    print(f"\nLotes de auditoria gravados pelo escritor: {lotes} (gravados no total: {auditoria.estatisticas['gravados']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# app/benchmarks/bench_busca.py
+"""
+Benchmark: busca de texto em chamados e interações com LIKE '%termo%'
+(varredura completa) vs índice FTS5 (buscar_texto_chamados).
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_busca [--mensagens 1000000] [--chamados 50000] [--repeticoes 20]
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.comum import configurar_banco, medir, imprimir_tabela
+
+PALAVRAS = (
+    "erro sistema acesso senha usuário impressora rede lentidão relatório nota fiscal "
+    "cadastro cliente pedido estoque financeiro boleto integração servidor backup "
+    "atualização versão tela botão mensagem e-mail configuração permissão arquivo "
+    "planilha exportação importação banco dados conexão internet certificado"
+).split()
+
+# Termos procurados: comum, raro e prefixo
+TERMOS = {
+    "comum (impressora)": "impressora",
+    "raro (sefaz)": "sefaz",
+    "prefixo (certif*)": "certif*",
+    "duas palavras (nota fiscal)": "nota fiscal",
+}
+
+def frase(sorteio, tamanho):
+    return " ".join(sorteio.choice(PALAVRAS) for _ in range(tamanho))
+
+def popular(conn, chamados, mensagens):
+    """Insere chamados e interações diretamente (os triggers alimentam o índice)."""
+    sorteio = random.Random(42)
+    agora = "2025-01-01 10:00:00"
+
+    conn.executemany("""
+        INSERT INTO chamados (assunto, prioridade, descricao, status, usuario, data_abertura, data_ultima_atualizacao)
+        VALUES (?, 'Média', ?, 'Novo', ?, ?, ?)
+    """, (
+        (frase(sorteio, 5), frase(sorteio, 30), f"cliente{i % 200}", agora, agora)
+        for i in range(chamados)
+    ))
+
+    def mensagem(i):
+        texto = frase(sorteio, 20)
+        if i % 5000 == 0:
+            texto += " rejeição sefaz"
+        return texto
+
+    conn.executemany("""
+        INSERT INTO interacoes (chamado_id, autor, mensagem, tipo, data)
+        VALUES (?, 'cliente', ?, 'mensagem', ?)
+    """, (
+        (sorteio.randint(1, chamados), mensagem(i), agora)
+        for i in range(mensagens)
+    ))
+    conn.commit()
+
+def buscar_like(database, termo):
+    """Antes: sem índice de texto, a única opção seria LIKE nas quatro colunas."""
+    conn = database.conectar()
+    padrao = f"%{termo.rstrip('*')}%"
+    linhas = conn.execute("""
+        SELECT id FROM chamados
+        WHERE assunto LIKE ? OR descricao LIKE ?
+           OR id IN (SELECT chamado_id FROM interacoes WHERE mensagem LIKE ?)
+           OR id IN (SELECT chamado_id FROM mensagens_conclusao WHERE mensagem LIKE ?)
+        ORDER BY id DESC
+        LIMIT 50
+    """, (padrao, padrao, padrao, padrao)).fetchall()
+    conn.close()
+    return linhas
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da busca de texto")
+    parser.add_argument("--mensagens", type=int, default=1_000_000)
+    parser.add_argument("--chamados", type=int, default=50_000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--db", default=None, help="Arquivo de banco (padrão: temporário)")
+    args = parser.parse_args()
+
+    configurar_banco(args.db)
+
+    import database
+
+    database.criar_tabelas()
+
+    inicio = time.perf_counter()
+    conn = database.conectar()
+    popular(conn, args.chamados, args.mensagens)
+    conn.close()
+    print(f"Carga de {args.chamados} chamados e {args.mensagens} interações: {time.perf_counter() - inicio:.1f}s")
+
+    linhas = []
+    for nome, termo in TERMOS.items():
+        resultado = database.buscar_texto_chamados(termo, "admin", "admin")
+        like = medir(lambda: buscar_like(database, termo), repeticoes=max(1, args.repeticoes // 5), aquecimento=1)
+        fts = medir(lambda: database.buscar_texto_chamados(termo, "admin", "admin"),
+                    repeticoes=args.repeticoes, aquecimento=2)
+        linhas.append({
+            "termo": nome,
+            "chamados": resultado["total"],
+            "LIKE p50 (ms)": round(like["p50_us"] / 1000, 1),
+            "FTS5 p50 (ms)": round(fts["p50_us"] / 1000, 1),
+            "FTS5 p95 (ms)": round(fts["p95_us"] / 1000, 1),
+        })
+
+    imprimir_tabela(
+        f"Busca de texto: {args.chamados} chamados, {args.mensagens} interações (top 50)",
+        linhas,
+        ["termo", "chamados", "LIKE p50 (ms)", "FTS5 p50 (ms)", "FTS5 p95 (ms)"]
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# app/benchmarks/bench_cache.py
+"""
+Benchmark: reruns de sessões do Streamlit relendo lista de usuários, página
+de chamados e agregados do dashboard, sem cache vs com o cache de consultas
+compartilhado (db_cache.py), com uma escrita a cada N reruns.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_cache [--chamados 20000] [--reruns 500] [--escrita-a-cada 10]
+"""
+
+import argparse
+
+from benchmarks.comum import configurar_banco, medir, imprimir_tabela
+
+def popular(conn, chamados):
+    """Chamados distribuídos entre 200 clientes e 4 status."""
+    status = ["Novo", "Em atendimento", "Aguardando Finalização", "Finalizado"]
+    agora = "2025-01-01 10:00:00"
+    conn.executemany("""
+        INSERT INTO usuarios (usuario, senha_hash, salt, perfil, nome_completo, empresa, email, data_cadastro)
+        VALUES (?, 'x', 'x', 'cliente', ?, ?, ?, ?)
+    """, ((f"cliente{i}", f"Cliente {i}", f"Empresa {i % 20}", f"cliente{i}@exemplo.com", agora)
+          for i in range(200)))
+    conn.executemany("""
+        INSERT INTO chamados (assunto, prioridade, descricao, status, usuario, data_abertura, data_ultima_atualizacao)
+        VALUES (?, 'Média', 'Descrição', ?, ?, ?, ?)
+    """, ((f"Chamado {i}", status[i % 4], f"cliente{i % 200}", agora, agora) for i in range(chamados)))
+    conn.commit()
+
+def rerun(database, dashboard):
+    """Leituras de um rerun de admin: chamados + dashboard."""
+    database.listar_usuarios()
+    database.buscar_chamados("admin", "admin")
+    database.buscar_chamados("admin", "admin", status="Novo")
+    database.buscar_estatisticas_usuario("admin", "admin")
+    database.buscar_resumo_por_empresa()
+    database.buscar_resumo_por_usuario()
+    database.buscar_ranking_tempo_atendimento(20)
+    dashboard.buscar_emails_enviados(100)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cache de consultas")
+    parser.add_argument("--chamados", type=int, default=20_000)
+    parser.add_argument("--reruns", type=int, default=500)
+    parser.add_argument("--escrita-a-cada", type=int, default=10, help="Uma nova interação a cada N reruns")
+    args = parser.parse_args()
+
+    configurar_banco()
+
+    import database
+    import dashboard
+    import db_cache
+
+    database.criar_tabelas()
+    conn = database.conectar()
+    popular(conn, args.chamados)
+    conn.close()
+
+    # Funções com cache (a versão sem cache fica em .sem_cache)
+    com_cache = {
+        (modulo, nome): getattr(modulo, nome)
+        for modulo, nomes in (
+            (database, ["listar_usuarios", "buscar_chamados", "buscar_contadores_status",
+                        "buscar_resumo_por_empresa", "buscar_resumo_por_usuario",
+                        "buscar_ranking_tempo_atendimento"]),
+            (dashboard, ["buscar_emails_enviados"]),
+        )
+        for nome in nomes
+    }
+
+    def alternar_cache(ativo):
+        for (modulo, nome), funcao in com_cache.items():
+            setattr(modulo, nome, funcao if ativo else funcao.sem_cache)
+
+    contador = {"reruns": 0}
+
+    def sessao():
+        contador["reruns"] += 1
+        if contador["reruns"] % args.escrita_a_cada == 0:
+            database.adicionar_interacao_chamado(1, "cliente0", "Nova mensagem")
+        rerun(database, dashboard)
+
+    linhas = []
+    for nome, ativo in (("sem cache", False), ("com cache", True)):
+        alternar_cache(ativo)
+        db_cache.limpar_cache()
+        antes = db_cache.estatisticas_cache()
+        resultado = medir(sessao, repeticoes=args.reruns, aquecimento=2)
+        depois = db_cache.estatisticas_cache()
+        acertos = depois["acertos"] - antes["acertos"]
+        falhas = depois["falhas"] - antes["falhas"]
+        linhas.append({
+            "modo": nome,
+            "rerun p50 (ms)": round(resultado["p50_us"] / 1000, 2),
+            "rerun p95 (ms)": round(resultado["p95_us"] / 1000, 2),
+            "média (ms)": round(resultado["media_us"] / 1000, 2),
+            "acertos": f"{acertos / (acertos + falhas):.1%}" if acertos + falhas else "-",
+        })
+
+    imprimir_tabela(
+        f"{args.reruns} reruns de admin, {args.chamados} chamados, 1 escrita a cada {args.escrita_a_cada} reruns",
+        linhas,
+        ["modo", "rerun p50 (ms)", "rerun p95 (ms)", "média (ms)", "acertos"]
+    )
+    estatisticas = db_cache.estatisticas_cache()
+    print(f"\nCache: {estatisticas['entradas']} entradas, {estatisticas['bytes_usados'] / 1024:.0f} KB, "
+          f"{estatisticas['invalidados']} invalidadas, {estatisticas['despejos']} despejos")
+
+if __name__ == "__main__":
+    main()
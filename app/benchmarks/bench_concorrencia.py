@@ -0,0 +1,137 @@
+# app/benchmarks/bench_concorrencia.py
+"""
+Benchmark: escritas concorrentes de várias sessões, cada escrita na própria
+conexão e transação (comportamento antigo) vs fila da thread escritora única
+com group commit (escritor.py).
+
+Cada sessão simulada é uma thread que alterna entre: nova interação, registro
+de e-mail enviado, último acesso e novo chamado. Mede vazão, taxa de falha
+(funções que devolveram False/None) e latência.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_concorrencia [--sessoes 50] [--operacoes 40] [--timeout-legado 5]
+
+--timeout-legado 0 simula conexões sem espera de lock ("database is locked" imediato).
+"""
+
+import argparse
+import random
+import sqlite3
+import threading
+import time
+
+from benchmarks.comum import configurar_banco, imprimir_tabela
+
+def escrita_direta(caminho, timeout):
+    """Reproduz o caminho antigo: conexão, transação e commit próprios por escrita."""
+    def executar_escrita(tarefa, *args, **kwargs):
+        conn = sqlite3.connect(caminho, timeout=timeout)
+        conn.row_factory = sqlite3.Row
+        try:
+            resultado = tarefa(conn.cursor(), *args, **kwargs)
+            conn.commit()
+            return resultado
+        finally:
+            conn.close()
+    return executar_escrita
+
+def operacoes_sessao(database, sessao, chamados):
+    """Escritas típicas de uma sessão (nome, função)."""
+    sorteio = random.Random(sessao)
+    usuario = f"cliente{sessao}"
+
+    return [
+        ("interação", lambda: database.adicionar_interacao_chamado(
+            sorteio.choice(chamados), usuario, "Mensagem da sessão")),
+        ("e-mail", lambda: database.registrar_email_enviado(
+            f"{usuario}@exemplo.com", "Assunto", "Corpo", sorteio.choice(chamados), "novo_chamado_cliente", True)),
+        ("último acesso", lambda: database.atualizar_ultimo_acesso(usuario)),
+        ("novo chamado", lambda: database.criar_chamado("Assunto", "Média", "Descrição", usuario)),
+    ]
+
+def sucesso(retorno):
+    if isinstance(retorno, tuple):
+        return bool(retorno[0])
+    return bool(retorno)
+
+def executar(database, sessoes, operacoes, chamados):
+    """Dispara as sessões ao mesmo tempo. Retorna (ok, falhas, segundos, latências)."""
+    barreira = threading.Barrier(sessoes)
+    resultados = []
+    lock = threading.Lock()
+
+    def sessao(indice):
+        acoes = operacoes_sessao(database, indice, chamados)
+        locais = []
+        barreira.wait()
+        for i in range(operacoes):
+            _, acao = acoes[i % len(acoes)]
+            inicio = time.perf_counter()
+            try:
+                ok = sucesso(acao())
+            except Exception:
+                ok = False
+            locais.append((ok, time.perf_counter() - inicio))
+        with lock:
+            resultados.extend(locais)
+
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(sessoes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias = sorted(l for _, l in resultados)
+    ok = sum(1 for r, _ in resultados if r)
+    return ok, len(resultados) - ok, duracao, latencias
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escritas concorrentes")
+    parser.add_argument("--sessoes", type=int, default=50)
+    parser.add_argument("--operacoes", type=int, default=40, help="Escritas por sessão")
+    parser.add_argument("--timeout-legado", type=float, default=5.0,
+                        help="Timeout (s) de lock das conexões do modo antigo (padrão do sqlite3)")
+    args = parser.parse_args()
+
+    caminho = configurar_banco()
+
+    import database
+    import escritor
+
+    database.criar_tabelas()
+    chamados = [database.criar_chamado(f"Base {i}", "Média", "Descrição", "cliente_bench") for i in range(20)]
+
+    executar_escrita = database.executar_escrita
+
+    linhas = []
+    for nome, executor in (
+        ("conexão por escrita (antes)", escrita_direta(caminho, args.timeout_legado)),
+        ("escritor único (depois)", executar_escrita),
+    ):
+        database.executar_escrita = executor
+        transacoes_inicio = escritor.estatisticas["transacoes"]
+        ok, falhas, duracao, latencias = executar(database, args.sessoes, args.operacoes, chamados)
+        total = ok + falhas
+        linhas.append({
+            "modo": nome,
+            "escritas": total,
+            "falhas": f"{falhas} ({falhas / total:.1%})",
+            "escritas/s": round(total / duracao),
+            "p50 (ms)": round(latencias[len(latencias) // 2] * 1000, 1),
+            "p95 (ms)": round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 1),
+            "transações": escritor.estatisticas["transacoes"] - transacoes_inicio if executor is executar_escrita else total,
+        })
+
+    database.executar_escrita = executar_escrita
+
+    imprimir_tabela(
+        f"{args.sessoes} sessões simultâneas x {args.operacoes} escritas",
+        linhas,
+        ["modo", "escritas", "falhas", "escritas/s", "p50 (ms)", "p95 (ms)", "transações"]
+    )
+    print(f"\nMaior lote numa transação: {escritor.estatisticas['maior_lote']} tarefas")
+
+if __name__ == "__main__":
+    main()
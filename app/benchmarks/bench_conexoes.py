@@ -0,0 +1,83 @@
+# app/benchmarks/bench_conexoes.py
+"""
+Benchmark: latência por chamada das funções de database.py
+com conexão nova a cada chamada (comportamento antigo) vs pool de conexões.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_conexoes [--repeticoes 2000] [--chamados 500]
+"""
+
+import argparse
+import sqlite3
+
+from benchmarks.comum import configurar_banco, medir, imprimir_tabela
+
+def conectar_legado():
+    """Reproduz o conectar() antigo: abre conexão e reaplica PRAGMAs a cada chamada."""
+    import database
+    conn = sqlite3.connect(database.obter_pool().caminho, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+def popular(database, quantidade):
+    """Cria chamados e interações de exemplo."""
+    ids = []
+    for i in range(quantidade):
+        chamado_id = database.criar_chamado(f"Assunto {i}", "Média", f"Descrição do chamado {i}", "cliente_bench")
+        database.adicionar_interacao_chamado(chamado_id, "cliente", f"Mensagem {i}")
+        ids.append(chamado_id)
+    return ids
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pool de conexões")
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--chamados", type=int, default=500)
+    parser.add_argument("--db", default=None, help="Arquivo de banco (padrão: temporário)")
+    args = parser.parse_args()
+
+    caminho = configurar_banco(args.db)
+
+    import database
+
+    database.criar_tabelas()
+    ids = popular(database, args.chamados)
+    alvo = ids[len(ids) // 2]
+
+    operacoes = {
+        "buscar_chamado_por_id": lambda: database.buscar_chamado_por_id(alvo),
+        "buscar_interacoes_chamado": lambda: database.buscar_interacoes_chamado(alvo),
+        "obter_tempo_atendimento": lambda: database.obter_tempo_atendimento(alvo),
+        "buscar_anexos": lambda: database.buscar_anexos(alvo),
+        "registrar_log": lambda: database.registrar_log("BENCH", "bench", "latência"),
+    }
+
+    conectar_pool = database.conectar
+    linhas = []
+
+    for nome, operacao in operacoes.items():
+        database.conectar = conectar_legado
+        antes = medir(operacao, args.repeticoes)
+
+        database.conectar = conectar_pool
+        depois = medir(operacao, args.repeticoes)
+
+        linhas.append({
+            "função": nome,
+            "antes média (µs)": antes["media_us"],
+            "antes p95 (µs)": antes["p95_us"],
+            "pool média (µs)": depois["media_us"],
+            "pool p95 (µs)": depois["p95_us"],
+            "ganho": f"{antes['media_us'] / depois['media_us']:.1f}x"
+        })
+
+    imprimir_tabela(
+        f"Latência por chamada ({args.repeticoes} chamadas, banco: {caminho})",
+        linhas,
+        ["função", "antes média (µs)", "antes p95 (µs)", "pool média (µs)", "pool p95 (µs)", "ganho"]
+    )
+    print(f"\nConexões abertas pelo pool: {database.obter_pool().conexoes_abertas}")
+
+if __name__ == "__main__":
+    main()
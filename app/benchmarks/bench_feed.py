@@ -0,0 +1,101 @@
+# app/benchmarks/bench_feed.py
+"""
+Benchmark: verificação periódica de novidades na lista de chamados.
+
+Compara, para bases de tamanhos diferentes, o custo de uma verificação:
+- recarregar a página da lista (o que um rerun de tela_chamados faz, sem cache);
+- buscar_alteracoes sem novidades (leitura de sqlite_sequence);
+- buscar_alteracoes com algumas alterações novas (faixa no índice do feed).
+
+O custo do feed não deve crescer com a quantidade de chamados nem com o
+tamanho do feed.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_feed [--tamanhos 10000,200000] [--repeticoes 500]
+"""
+
+import argparse
+
+from benchmarks.comum import configurar_banco, medir, imprimir_tabela
+
+def popular(conn, chamados, inicio=0):
+    """Chamados de 200 clientes, cada um com uma interação (duas linhas no feed por chamado)."""
+    agora = "2025-01-01 10:00:00"
+    conn.executemany("""
+        INSERT INTO chamados (assunto, prioridade, descricao, status, usuario, data_abertura, data_ultima_atualizacao)
+        VALUES (?, 'Média', 'Descrição', 'Novo', ?, ?, ?)
+    """, ((f"Chamado {i}", f"cliente{i % 200}", agora, agora) for i in range(inicio, inicio + chamados)))
+    conn.execute("""
+        INSERT INTO interacoes (chamado_id, autor, mensagem, tipo, data)
+        SELECT id, usuario, 'Mensagem', 'mensagem', data_abertura FROM chamados WHERE id > ?
+    """, (inicio,))
+    conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do feed de alterações")
+    parser.add_argument("--tamanhos", default="10000,200000", help="Quantidades de chamados (separadas por vírgula)")
+    parser.add_argument("--repeticoes", type=int, default=500)
+    parser.add_argument("--novidades", type=int, default=5, help="Alterações novas por verificação")
+    args = parser.parse_args()
+
+    configurar_banco()
+
+    import database
+
+    database.criar_tabelas()
+    buscar_chamados = database.buscar_chamados.sem_cache
+
+    linhas = []
+    total = 0
+    for tamanho in sorted(int(t) for t in args.tamanhos.split(",")):
+        conn = database.conectar()
+        popular(conn, tamanho - total, total)
+        conn.close()
+        total = tamanho
+
+        seq = database.ultimo_seq_alteracoes()
+        chamado_cliente = database.buscar_chamados("cliente7", "cliente", limite=1)["chamados"][0]["id"]
+
+        medicoes = [
+            ("recarregar página (admin)", lambda: buscar_chamados("admin", "admin", limite=25)),
+            ("recarregar página (cliente)", lambda: buscar_chamados("cliente7", "cliente", limite=25)),
+            ("feed sem novidades (admin)", lambda: database.buscar_alteracoes(seq, "admin", "admin")),
+            ("feed sem novidades (cliente)", lambda: database.buscar_alteracoes(seq, "cliente7", "cliente")),
+        ]
+        for nome, funcao in medicoes:
+            resultado = medir(funcao, repeticoes=args.repeticoes, aquecimento=5)
+            linhas.append({
+                "chamados": tamanho,
+                "verificação": nome,
+                "p50 (µs)": resultado["p50_us"],
+                "p95 (µs)": resultado["p95_us"],
+            })
+
+        # Com novidades: mede só a leitura do feed (as escritas ficam fora do tempo)
+        for perfil, usuario in (("admin", "admin"), ("cliente", "cliente7")):
+            estado = {"seq": database.ultimo_seq_alteracoes()}
+            tempos = []
+            for _ in range(max(1, args.repeticoes // 10)):
+                for _ in range(args.novidades):
+                    database.adicionar_interacao_chamado(chamado_cliente, "admin", "Resposta")
+                resultado = medir(
+                    lambda: estado.update(seq=database.buscar_alteracoes(estado["seq"], usuario, perfil)["seq"]),
+                    repeticoes=1, aquecimento=0
+                )
+                tempos.append(resultado["p50_us"])
+            tempos.sort()
+            linhas.append({
+                "chamados": tamanho,
+                "verificação": f"feed com {args.novidades} novidades ({perfil})",
+                "p50 (µs)": tempos[len(tempos) // 2],
+                "p95 (µs)": tempos[int(len(tempos) * 0.95) - 1],
+            })
+
+    imprimir_tabela(
+        f"Verificação de novidades: página da lista vs feed de alterações ({args.repeticoes} repetições)",
+        linhas,
+        ["chamados", "verificação", "p50 (µs)", "p95 (µs)"]
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# app/benchmarks/bench_instrumentacao.py
+"""
+Benchmark: custo da instrumentação das consultas.
+
+Executa as mesmas consultas em duas conexões ao mesmo banco, uma comum
+(sqlite3.Connection) e uma ConexaoInstrumentada, e mostra o acréscimo por
+execução. O custo é fixo por consulta (relógio, impressão digital em cache,
+chamador e histograma), então pesa mais nas consultas mais rápidas.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_instrumentacao [--chamados 20000] [--repeticoes 2000] [--rodadas 3]
+"""
+
+import argparse
+import sqlite3
+
+from benchmarks.comum import configurar_banco, medir, imprimir_tabela
+
+def consultas(conn):
+    """(nome, função) das consultas medidas, no estilo de database.py."""
+    def por_id():
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM chamados WHERE id = ?", (1234,))
+        return cursor.fetchone()
+
+    def contagem():
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM chamados WHERE status = ?", ("Novo",))
+        return cursor.fetchone()[0]
+
+    def pagina():
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM chamados
+            ORDER BY data_ultima_atualizacao_epoch DESC, id DESC
+            LIMIT ?
+        """, (25,))
+        return cursor.fetchall()
+
+    def update():
+        conn.execute("UPDATE chamados SET prioridade = ? WHERE id = ?", ("Alta", 1234))
+        conn.rollback()
+
+    return [
+        ("chamado por id", por_id),
+        ("contagem por status", contagem),
+        ("página de 25", pagina),
+        ("update (rollback)", update),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da instrumentação de consultas")
+    parser.add_argument("--chamados", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--rodadas", type=int, default=3)
+    args = parser.parse_args()
+
+    caminho = configurar_banco()
+
+    import database
+    from db_instrumentacao import ConexaoInstrumentada
+
+    database.criar_tabelas()
+
+    conn = database.conectar()
+    agora = "2025-01-01 10:00:00"
+    conn.executemany("""
+        INSERT INTO chamados (assunto, prioridade, descricao, status, usuario, data_abertura, data_ultima_atualizacao)
+        VALUES (?, 'Média', 'Descrição', 'Novo', ?, ?, ?)
+    """, ((f"Chamado {i}", f"cliente{i % 200}", agora, agora) for i in range(args.chamados)))
+    conn.commit()
+    conn.close()
+
+    conexoes = {}
+    for nome, fabrica in (("comum", sqlite3.Connection), ("instrumentada", ConexaoInstrumentada)):
+        conexoes[nome] = sqlite3.connect(caminho, factory=fabrica)
+        conexoes[nome].row_factory = sqlite3.Row
+
+    linhas = []
+    medidas = {nome: consultas(conn) for nome, conn in conexoes.items()}
+    for indice, (consulta, _) in enumerate(medidas["comum"]):
+        # Rodadas alternadas, menor p50 de cada: tira o efeito da ordem e do cache de páginas
+        p50 = {nome: [] for nome in medidas}
+        for _ in range(args.rodadas):
+            for nome, funcoes in medidas.items():
+                p50[nome].append(medir(funcoes[indice][1], repeticoes=args.repeticoes, aquecimento=50)["p50_us"])
+        comum, instrumentada = min(p50["comum"]), min(p50["instrumentada"])
+        linhas.append({
+            "consulta": consulta,
+            "comum p50 (µs)": comum,
+            "instrumentada p50 (µs)": instrumentada,
+            "acréscimo (µs)": round(instrumentada - comum, 1),
+            "acréscimo (%)": f"{(instrumentada - comum) / comum:.0%}" if comum else "-",
+        })
+
+    for conn in conexoes.values():
+        conn.close()
+
+    imprimir_tabela(
+        f"Instrumentação de consultas: conexão comum vs instrumentada ({args.chamados} chamados, {args.repeticoes} repetições)",
+        linhas,
+        ["consulta", "comum p50 (µs)", "instrumentada p50 (µs)", "acréscimo (µs)", "acréscimo (%)"]
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# app/benchmarks/bench_resumos.py
+"""
+Benchmark: e-mails enviados por 1.000 notificações, sem e com resumos.
+
+Gera um dia de notificações (chamados abertos ao longo do expediente, cada
+um com uma conversa de tamanho variável entre cliente e atendente, conclusão
+e finalização; uma parte com prioridade Urgente) e as passa pela fila real
+(inserir_email_fila, reservar_emails_fila, agrupar_resumos, concluir_email_fila)
+com um relógio simulado que avança no intervalo de verificação dos workers.
+Não envia nada: conta as mensagens que sairiam e quanto cada notificação esperou.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_resumos [--eventos 1000] [--horas 8] [--urgentes 0.1]
+"""
+
+import argparse
+import random
+
+from benchmarks.comum import configurar_banco, imprimir_tabela
+
+# (janela em segundos, modo); janela 0 = sem agrupamento (como era)
+CENARIOS = [
+    (0, "chamado"),
+    (60, "chamado"),
+    (120, "chamado"),
+    (300, "chamado"),
+    (120, "destinatario"),
+    (300, "destinatario"),
+]
+
+ADMIN = "admin@exemplo.com.br"
+
+def gerar_eventos(quantidade, horas, urgentes, clientes=40, semente=42):
+    """Notificações (instante, destinatário, chamado_id, tipo, prioridade) em ordem de tempo."""
+    aleatorio = random.Random(semente)
+    eventos = []
+    chamado_id = 0
+
+    while len(eventos) < quantidade:
+        chamado_id += 1
+        instante = aleatorio.uniform(0, horas * 3600)
+        cliente = f"cliente{aleatorio.randrange(clientes)}@exemplo.com.br"
+        prioridade = "Urgente" if aleatorio.random() < urgentes else aleatorio.choice(["Baixa", "Média", "Alta"])
+
+        def evento(destinatario, tipo):
+            eventos.append((instante, destinatario, chamado_id, tipo, prioridade))
+
+        evento(ADMIN, "novo_chamado_admin")
+        evento(cliente, "novo_chamado_cliente")
+
+        # Conversa: mensagens alternadas, poucos minutos entre elas
+        for turno in range(1 + int(aleatorio.expovariate(1 / 6))):
+            instante += aleatorio.expovariate(1 / 240)
+            if turno % 2 == 0:
+                evento(cliente, "interacao_atendente")
+            else:
+                evento(ADMIN, "interacao_cliente")
+
+        instante += aleatorio.expovariate(1 / 600)
+        evento(cliente, "chamado_concluido")
+        instante += aleatorio.expovariate(1 / 1800)
+        evento(ADMIN, "chamado_finalizado")
+
+    eventos.sort(key=lambda e: e[0])
+    return eventos[:quantidade]
+
+def simular(eventos, janela, modo):
+    """Passa as notificações pela fila com o relógio simulado. Retorna as métricas do cenário."""
+    from config.email_config import EMAIL_FILA_INTERVALO, EMAIL_LOTE, EMAIL_RESUMO_IMEDIATO
+    from database import inserir_email_fila, reservar_emails_fila, concluir_email_fila
+    from escritor import executar_escrita
+    from email_system.fila_emails import grupo_resumo, agrupar_resumos
+
+    executar_escrita(lambda cursor: cursor.execute("DELETE FROM fila_emails"))
+
+    inicio = 1_700_000_000
+    criado_em = {}
+    urgente = {}
+    esperas, esperas_urgentes = [], []
+    mensagens = resumos = 0
+    proximo_evento = 0
+    passo = int(EMAIL_FILA_INTERVALO) or 1
+    fim = inicio + int(eventos[-1][0]) + janela + passo
+
+    for agora in range(inicio, fim + passo, passo):
+        # Notificações que aconteceram até agora
+        novos = []
+        while proximo_evento < len(eventos) and inicio + eventos[proximo_evento][0] <= agora:
+            novos.append(eventos[proximo_evento])
+            proximo_evento += 1
+
+        def gravar(cursor):
+            ids = []
+            for instante, destinatario, chamado_id, tipo, prioridade in novos:
+                imediato = prioridade in EMAIL_RESUMO_IMEDIATO
+                email_id = inserir_email_fila(
+                    cursor, destinatario, f"[Chamado #{chamado_id}] {tipo}", "<p>corpo</p>", chamado_id, tipo,
+                    grupo=grupo_resumo(destinatario, chamado_id, modo=modo, janela=janela),
+                    janela=0 if imediato else janela, resumo=tipo, agora=inicio + int(instante)
+                )
+                ids.append((email_id, inicio + instante, imediato))
+            return ids
+
+        if novos:
+            for email_id, instante, imediato in executar_escrita(gravar):
+                criado_em[email_id] = instante
+                urgente[email_id] = imediato
+
+        # Workers: esvaziam o que venceu
+        while True:
+            emails = reservar_emails_fila(EMAIL_LOTE, agora=agora)
+            if not emails:
+                break
+            for envio in agrupar_resumos(emails):
+                mensagens += 1
+                resumos += 1 if envio.get('membros') else 0
+                for email in envio.get('membros') or [envio]:
+                    espera = agora - criado_em[email['id']]
+                    (esperas_urgentes if urgente[email['id']] else esperas).append(espera)
+                concluir_email_fila(envio, True)
+
+    return {
+        "mensagens": mensagens,
+        "resumos": resumos,
+        "espera média (s)": round(sum(esperas) / len(esperas), 1) if esperas else 0,
+        "espera máx (s)": round(max(esperas), 1) if esperas else 0,
+        "urgentes: espera máx (s)": round(max(esperas_urgentes), 1) if esperas_urgentes else "-",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos resumos de notificações")
+    parser.add_argument("--eventos", type=int, default=1000)
+    parser.add_argument("--horas", type=float, default=8)
+    parser.add_argument("--urgentes", type=float, default=0.1, help="Fração dos chamados com prioridade Urgente")
+    args = parser.parse_args()
+
+    configurar_banco()
+
+    import database
+    database.criar_tabelas()
+
+    eventos = gerar_eventos(args.eventos, args.horas, args.urgentes)
+
+    # Chamados das notificações (emails_enviados referencia chamados)
+    conn = database.conectar()
+    agora = "2025-01-01 10:00:00"
+    conn.executemany("""
+        INSERT INTO chamados (id, assunto, prioridade, descricao, status, usuario, data_abertura, data_ultima_atualizacao)
+        VALUES (?, ?, 'Média', 'Descrição', 'Novo', 'cliente', ?, ?)
+    """, ((i, f"Chamado {i}", agora, agora) for i in range(1, max(e[2] for e in eventos) + 1)))
+    conn.commit()
+    conn.close()
+
+    linhas = []
+    base = None
+    for janela, modo in CENARIOS:
+        resultado = simular(eventos, janela, modo)
+        base = base or resultado["mensagens"]
+        linhas.append({
+            "janela (s)": janela or "sem resumo",
+            "modo": modo if janela else "-",
+            "por 1.000 eventos": round(resultado["mensagens"] * 1000 / len(eventos)),
+            "redução": f"{1 - resultado['mensagens'] / base:.0%}",
+            **resultado,
+        })
+
+    imprimir_tabela(
+        f"Resumos: e-mails enviados para {len(eventos)} notificações em {args.horas:g} h "
+        f"({args.urgentes:.0%} dos chamados urgentes)",
+        linhas,
+        ["janela (s)", "modo", "mensagens", "por 1.000 eventos", "redução", "resumos",
+         "espera média (s)", "espera máx (s)", "urgentes: espera máx (s)"]
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# app/benchmarks/bench_smtp.py
+"""
+Benchmark: mensagens/segundo com e sem o pool de sessões SMTP.
+
+Sobe um servidor SMTP local de mentira (EHLO, STARTTLS com certificado
+autoassinado, AUTH, MAIL/RCPT/DATA, NOOP, QUIT) com atraso opcional em cada
+resposta para simular a distância até o provedor, e compara:
+- uma conexão por e-mail (como era: TCP + EHLO + STARTTLS + EHLO + AUTH + QUIT a cada envio);
+- pool, um e-mail por chamada (enviar_email_uma_vez, como o teste do Force Fix);
+- pool, lotes de EMAIL_LOTE e-mails por sessão (enviar_lote, como os workers da fila).
+
+Requer o comando openssl para gerar o certificado do STARTTLS.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_smtp [--mensagens 200] [--latencias 0,20]
+"""
+
+import argparse
+import os
+import socketserver
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+from benchmarks.comum import configurar_banco, imprimir_tabela
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    """SMTP mínimo: aceita tudo, conta as mensagens recebidas."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, contexto_tls):
+        super().__init__(("127.0.0.1", 0), TratadorSMTP)
+        self.contexto_tls = contexto_tls
+        self.latencia = 0.0
+        self.mensagens = 0
+        self.conexoes = 0
+        self.lock = threading.Lock()
+
+class TratadorSMTP(socketserver.StreamRequestHandler):
+
+    def responder(self, *linhas):
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+        texto = "".join(
+            f"{linha[:3]}{'-' if i < len(linhas) - 1 else ' '}{linha[4:]}\r\n"
+            for i, linha in enumerate(linhas)
+        )
+        self.wfile.write(texto.encode())
+        self.wfile.flush()
+
+    def handle(self):
+        with self.server.lock:
+            self.server.conexoes += 1
+
+        tls = False
+        self.responder("220 localhost ESMTP")
+
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            verbo = linha.decode(errors="replace").strip().split(" ")[0].upper()
+
+            if verbo in ("EHLO", "HELO"):
+                recursos = ["250 localhost", "250 AUTH PLAIN", "250 8BITMIME"]
+                if not tls:
+                    recursos.append("250 STARTTLS")
+                self.responder(*recursos)
+            elif verbo == "STARTTLS":
+                self.responder("220 pronto para TLS")
+                self.connection = self.server.contexto_tls.wrap_socket(self.connection, server_side=True)
+                self.rfile = self.connection.makefile("rb")
+                self.wfile = self.connection.makefile("wb")
+                tls = True
+            elif verbo == "AUTH":
+                self.responder("235 autenticado")
+            elif verbo in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.responder("250 OK")
+            elif verbo == "DATA":
+                self.responder("354 termine com .")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.mensagens += 1
+                self.responder("250 recebida")
+            elif verbo == "QUIT":
+                self.responder("221 tchau")
+                return
+            else:
+                self.responder("500 comando desconhecido")
+
+def criar_contexto_tls(pasta):
+    """Certificado autoassinado (openssl) para o STARTTLS do servidor local."""
+    chave, certificado = os.path.join(pasta, "chave.pem"), os.path.join(pasta, "cert.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", chave, "-out", certificado],
+        check=True, capture_output=True
+    )
+    contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    contexto.load_cert_chain(certificado, chave)
+    return contexto
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pool de sessões SMTP")
+    parser.add_argument("--mensagens", type=int, default=200)
+    parser.add_argument("--latencias", default="0,20", help="Atraso por resposta do servidor, em ms (separados por vírgula)")
+    args = parser.parse_args()
+
+    configurar_banco()
+
+    try:
+        contexto = criar_contexto_tls(tempfile.mkdtemp(prefix="helpdesk_smtp_"))
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Não foi possível gerar o certificado com openssl: {e}")
+        return
+
+    servidor = ServidorSMTP(contexto)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    # A configuração de e-mail é lida no import: apontar para o servidor local antes
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(servidor.server_address[1]), "SMTP_USE_TLS": "true",
+        "SMTP_USER": "bench", "SMTP_PASSWORD": "bench", "EMAIL_FROM_ADDRESS": "helpdesk@exemplo.com.br",
+    })
+
+    from config.email_config import EMAIL_FROM_ADDRESS, EMAIL_LOTE
+    from email_system.email_service import montar_mensagem, enviar_email_uma_vez, enviar_lote
+    from email_system.sessoes_smtp import conectar_smtp, obter_pool_smtp
+
+    corpo = "<html><body><p>Chamado atualizado.</p></body></html>"
+    destinatarios = [f"cliente{i}@exemplo.com.br" for i in range(args.mensagens)]
+    pool = obter_pool_smtp()
+
+    def conexao_por_email():
+        for destinatario in destinatarios:
+            texto = montar_mensagem(destinatario, "Assunto", corpo).as_string()
+            conexao = conectar_smtp()
+            conexao.sendmail(EMAIL_FROM_ADDRESS, destinatario, texto)
+            conexao.quit()
+
+    def pool_um_por_chamada():
+        for destinatario in destinatarios:
+            enviar_email_uma_vez(destinatario, "Assunto", corpo)
+
+    def pool_em_lotes():
+        for inicio in range(0, len(destinatarios), EMAIL_LOTE):
+            lote = destinatarios[inicio:inicio + EMAIL_LOTE]
+            erros = enviar_lote([(destinatario, "Assunto", corpo, None) for destinatario in lote])
+            assert not any(erros), erros
+
+    modos = [
+        ("conexão por e-mail (antes)", conexao_por_email),
+        ("pool, 1 e-mail por chamada", pool_um_por_chamada),
+        (f"pool, lotes de {EMAIL_LOTE}", pool_em_lotes),
+    ]
+
+    linhas = []
+    for latencia in (float(l) for l in args.latencias.split(",")):
+        servidor.latencia = latencia / 1000
+        for nome, funcao in modos:
+            pool.fechar_todas()
+            conexoes, mensagens = servidor.conexoes, servidor.mensagens
+
+            inicio = time.perf_counter()
+            funcao()
+            duracao = time.perf_counter() - inicio
+
+            recebidas = servidor.mensagens - mensagens
+            linhas.append({
+                "latência (ms)": latencia,
+                "modo": nome,
+                "mensagens/s": round(recebidas / duracao, 1),
+                "ms/mensagem": round(duracao / recebidas * 1000, 2),
+                "conexões": servidor.conexoes - conexoes,
+            })
+
+    pool.fechar_todas()
+    servidor.shutdown()
+
+    imprimir_tabela(
+        f"Envio SMTP: conexão por e-mail vs pool de sessões ({args.mensagens} mensagens, STARTTLS local)",
+        linhas,
+        ["latência (ms)", "modo", "mensagens/s", "ms/mensagem", "conexões"]
+    )
+
+if __name__ == "__main__":
+    main()
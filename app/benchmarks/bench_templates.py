@@ -0,0 +1,109 @@
+# app/benchmarks/bench_templates.py
+"""
+Benchmark: renderização dos templates de e-mail.
+
+Compara, para cada template de e-mail (mesmos valores):
+- formatar o texto inteiro a cada chamada (str.format_map sobre HTML base +
+  CSS + conteúdo, o equivalente às f-strings de antes);
+- template pré-compilado (partes fixas prontas, só os campos intercalados);
+- pré-compilado com CSS minificado e HTML sem indentação.
+E mede os lotes: um resumo de 20 eventos e 100 e-mails com emails_em_lote.
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_templates [--repeticoes 20000]
+"""
+
+import argparse
+import string
+
+from benchmarks.comum import configurar_banco, medir, imprimir_tabela
+
+def valores_exemplo(texto):
+    """Um valor de exemplo para cada campo do template."""
+    return {
+        campo: f"valor de {campo}"
+        for _, campo, _, _ in string.Formatter().parse(texto)
+        if campo is not None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos templates de e-mail")
+    parser.add_argument("--repeticoes", type=int, default=20000)
+    args = parser.parse_args()
+
+    configurar_banco()
+
+    from email_system.email_templates import (
+        TEMPLATES, CSS_EMAIL, TemplateEmail, texto_template, minificar_css,
+        email_resumo, email_chamado_finalizado, emails_em_lote
+    )
+
+    modos = {
+        "formatar a cada chamada (antes)": lambda nome: (
+            lambda valores, texto=texto_template(nome): texto.format_map({**valores, 'estilo': CSS_EMAIL})
+        ),
+        "pré-compilado": lambda nome: TemplateEmail(
+            nome, texto_template(nome), fixos={'estilo': CSS_EMAIL}, minificar=False
+        ).renderizar,
+        "pré-compilado + minificado": lambda nome: TemplateEmail(
+            nome, texto_template(nome), fixos={'estilo': minificar_css(CSS_EMAIL)}, minificar=True
+        ).renderizar,
+    }
+
+    linhas = []
+    for modo, compilar in modos.items():
+        tempos, tamanhos = [], []
+        for nome in TEMPLATES:
+            texto = texto_template(nome)
+            valores = valores_exemplo(texto)
+            valores.pop('estilo', None)
+            renderizar = compilar(nome)
+
+            tamanhos.append(len(renderizar(valores).encode()))
+            tempos.append(medir(lambda: renderizar(valores), repeticoes=args.repeticoes, aquecimento=100)["media_us"])
+
+        media_us = sum(tempos) / len(tempos)
+        linhas.append({
+            "modo": modo,
+            "renders/s": f"{1_000_000 / media_us:,.0f}",
+            "µs/render": round(media_us, 2),
+            "bytes/e-mail": round(sum(tamanhos) / len(tamanhos)),
+        })
+
+    imprimir_tabela(
+        f"Templates de e-mail: média dos {len(TEMPLATES)} templates ({args.repeticoes} renderizações cada)",
+        linhas,
+        ["modo", "renders/s", "µs/render", "bytes/e-mail"]
+    )
+
+    # Lotes (configuração atual: EMAIL_MINIFICAR_HTML)
+    eventos = [
+        {'chamado_id': i % 4 + 1, 'tipo': 'interacao_cliente', 'assunto': 'Nova mensagem',
+         'resumo': f"Mensagem {i}", 'data_criacao': "2025-01-01 10:00:00"}
+        for i in range(20)
+    ]
+    chamados = [
+        {'id': i, 'assunto': f"Chamado {i}", 'usuario': f"cliente{i}", 'empresa': "Empresa",
+         'tempo_formatado': "1h 20min"}
+        for i in range(100)
+    ]
+
+    lotes = []
+    for nome, funcao, quantidade in (
+        ("resumo de 20 eventos", lambda: email_resumo(eventos), 1),
+        ("emails_em_lote, 100 chamados", lambda: emails_em_lote(email_chamado_finalizado, chamados), len(chamados)),
+    ):
+        resultado = medir(funcao, repeticoes=max(1, args.repeticoes // 20), aquecimento=10)
+        html = funcao()
+        tamanho = len(html.encode()) if isinstance(html, str) else sum(len(h.encode()) for h in html) / len(html)
+        lotes.append({
+            "lote": nome,
+            "µs/chamada": resultado["media_us"],
+            "e-mails/s": f"{quantidade * 1_000_000 / resultado['media_us']:,.0f}",
+            "bytes/e-mail": round(tamanho),
+        })
+
+    imprimir_tabela("Renderização em lote", lotes, ["lote", "µs/chamada", "e-mails/s", "bytes/e-mail"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# app/benchmarks/bench_timestamps.py
+"""
+Benchmark: datas em texto vs colunas epoch (inteiros gerados, migração 9).
+
+- Filtro por período: datetime(coluna) >= ? (não usa índice) vs faixa no
+  índice de coluna_epoch.
+- Ordenação: ORDER BY do texto sem índice vs índice de coluna_epoch.
+- Tempo decorrido: julianday(agora) - julianday(coluna) vs subtração de inteiros
+  (lidos do índice; a coluna VIRTUAL é recalculada quando lida da tabela).
+- Formatação: strptime + strftime (antes) vs formatar_data_br (recorte do texto).
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_timestamps [--logs 500000] [--repeticoes 50]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.comum import configurar_banco, medir, imprimir_tabela
+
+def popular(conn, quantidade):
+    """Insere logs espalhados pelos últimos 365 dias."""
+    sorteio = random.Random(42)
+    inicio = datetime(2025, 1, 1)
+    conn.executemany("""
+        INSERT INTO logs_sistema (acao, usuario, detalhes, data_hora)
+        VALUES ('LOGIN', ?, 'Login bem-sucedido', ?)
+    """, (
+        (f"cliente{i % 200}",
+         (inicio + timedelta(seconds=sorteio.randint(0, 365 * 86400))).strftime("%Y-%m-%d %H:%M:%S"))
+        for i in range(quantidade)
+    ))
+    conn.commit()
+
+def formatar_legado(data_str):
+    """formatar_data_br antigo (chamados.py/dashboard.py): strptime + strftime."""
+    try:
+        if isinstance(data_str, str):
+            data = datetime.strptime(data_str.split('.')[0], "%Y-%m-%d %H:%M:%S")
+            return data.strftime("%d/%m/%Y %H:%M")
+        return str(data_str)
+    except:
+        return str(data_str)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de datas em texto vs epoch")
+    parser.add_argument("--logs", type=int, default=500_000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--db", default=None, help="Arquivo de banco (padrão: temporário)")
+    args = parser.parse_args()
+
+    configurar_banco(args.db)
+
+    import database
+    from utils import formatar_data_br
+
+    database.criar_tabelas()
+
+    inicio = time.perf_counter()
+    conn = database.conectar()
+    popular(conn, args.logs)
+    print(f"Carga de {args.logs} logs: {time.perf_counter() - inicio:.1f}s")
+
+    # Última semana do período gerado
+    limite_texto = "2025-12-24 00:00:00"
+    limite_epoch = conn.execute(
+        "SELECT CAST(strftime('%s', ?, '+3 hours') AS INTEGER)", (limite_texto,)
+    ).fetchone()[0]
+    agora_texto = "2026-01-01 00:00:00"
+    agora_epoch = limite_epoch + 8 * 86400
+
+    def consulta(sql, params=()):
+        return lambda: conn.execute(sql, params).fetchall()
+
+    comparacoes = [
+        ("período (última semana)",
+         consulta("SELECT COUNT(*) FROM logs_sistema WHERE datetime(data_hora) >= ?", (limite_texto,)),
+         consulta("SELECT COUNT(*) FROM logs_sistema WHERE data_hora_epoch >= ?", (limite_epoch,))),
+        ("ORDER BY data DESC LIMIT 100",
+         consulta("SELECT * FROM logs_sistema ORDER BY data_hora DESC LIMIT 100"),
+         consulta("SELECT * FROM logs_sistema ORDER BY data_hora_epoch DESC LIMIT 100")),
+        ("tempo decorrido (última semana)",
+         consulta("""SELECT SUM(CAST(ROUND((julianday(?) - julianday(data_hora)) * 86400) AS INTEGER))
+                     FROM logs_sistema WHERE datetime(data_hora) >= ?""", (agora_texto, limite_texto)),
+         consulta("SELECT SUM(? - data_hora_epoch) FROM logs_sistema WHERE data_hora_epoch >= ?",
+                  (agora_epoch, limite_epoch))),
+    ]
+
+    linhas = []
+    for nome, antes, depois in comparacoes:
+        t_antes = medir(antes, repeticoes=args.repeticoes, aquecimento=1)
+        t_depois = medir(depois, repeticoes=args.repeticoes, aquecimento=1)
+        linhas.append({
+            "operação": nome,
+            "texto p50 (ms)": round(t_antes["p50_us"] / 1000, 2),
+            "epoch p50 (ms)": round(t_depois["p50_us"] / 1000, 2),
+            "ganho": f"{t_antes['p50_us'] / max(t_depois['p50_us'], 0.1):.1f}x",
+        })
+
+    datas = [linha[0] for linha in conn.execute("SELECT data_hora FROM logs_sistema LIMIT 10000")]
+    conn.close()
+
+    t_antes = medir(lambda: [formatar_legado(d) for d in datas], repeticoes=args.repeticoes, aquecimento=1)
+    t_depois = medir(lambda: [formatar_data_br(d) for d in datas], repeticoes=args.repeticoes, aquecimento=1)
+    linhas.append({
+        "operação": f"formatar {len(datas)} datas",
+        "texto p50 (ms)": round(t_antes["p50_us"] / 1000, 2),
+        "epoch p50 (ms)": round(t_depois["p50_us"] / 1000, 2),
+        "ganho": f"{t_antes['p50_us'] / max(t_depois['p50_us'], 0.1):.1f}x",
+    })
+
+    imprimir_tabela(
+        f"Datas em texto vs epoch: {args.logs} logs (formatação: strptime vs recorte)",
+        linhas,
+        ["operação", "texto p50 (ms)", "epoch p50 (ms)", "ganho"]
+    )
+
+if __name__ == "__main__":
+    main()
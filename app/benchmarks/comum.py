@@ -0,0 +1,58 @@
+# app/benchmarks/comum.py
+"""
+Funções comuns aos benchmarks
+"""
+
+import os
+import sys
+import time
+import tempfile
+import statistics
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def configurar_banco(caminho=None):
+    """
+    Aponta DB_PATH para um banco separado (temporário por padrão).
+    Deve ser chamado ANTES de importar database/config.
+    """
+    if caminho is None:
+        caminho = os.path.join(tempfile.mkdtemp(prefix="helpdesk_bench_"), "database.db")
+
+    os.environ["DB_PATH"] = caminho
+
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+
+    return caminho
+
+def medir(funcao, repeticoes=1000, aquecimento=10):
+    """Executa a função N vezes e retorna estatísticas de latência em microssegundos."""
+    for _ in range(aquecimento):
+        funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1_000_000)
+
+    tempos.sort()
+    return {
+        "chamadas": repeticoes,
+        "media_us": round(statistics.fmean(tempos), 1),
+        "p50_us": round(tempos[len(tempos) // 2], 1),
+        "p95_us": round(tempos[int(len(tempos) * 0.95) - 1], 1),
+        "total_s": round(sum(tempos) / 1_000_000, 3)
+    }
+
+def imprimir_tabela(titulo, linhas, colunas):
+    """Imprime resultados em formato de tabela simples."""
+    print(f"\n{'='*70}")
+    print(titulo)
+    print(f"{'='*70}")
+    larguras = [max(len(str(c)), *(len(str(l.get(c, ''))) for l in linhas)) for c in colunas]
+    print("  ".join(str(c).ljust(w) for c, w in zip(colunas, larguras)))
+    print("  ".join("-" * w for w in larguras))
+    for linha in linhas:
+        print("  ".join(str(linha.get(c, '')).ljust(w) for c, w in zip(colunas, larguras)))
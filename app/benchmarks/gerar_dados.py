@@ -0,0 +1,364 @@
+# app/benchmarks/gerar_dados.py
+"""
+Gerador de dados sintéticos para medir a aplicação em volumes reais.
+
+Cria (ou completa) um banco SEPARADO com o schema da aplicação e:
+usuários clientes e atendentes distribuídos entre empresas, chamados em todos
+os status (com atendente, cronômetro e conclusão coerentes com o status),
+interações, anexos (só metadados), mensagens de conclusão, logs, e-mails
+enviados e downloads. As inserções passam pelos triggers (resumos, busca de
+texto, versões, feed), como nas escritas da aplicação.
+
+As quantidades são alvos: rodar de novo com números maiores completa o banco
+existente até eles. Sem quantidades explícitas, tudo é proporcional a --chamados.
+
+Uso (a partir de app/):
+    python -m benchmarks.gerar_dados --db data/benchmark.db --chamados 1000000
+    python -m benchmarks.gerar_dados --db data/benchmark.db --chamados 50000 --logs 2000000
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.comum import APP_DIR, configurar_banco
+
+LOTE = 10_000
+
+# Proporções por chamado (quando a quantidade não é informada)
+PROPORCOES = {
+    "usuarios": 0.1,
+    "interacoes": 4,
+    "anexos": 0.3,
+    "logs": 5,
+    "emails": 2,
+    "downloads": 0.2,
+}
+
+# Status e peso na base (chamados antigos tendem a estar finalizados)
+PESOS_STATUS = {
+    "Novo": 15,
+    "Em atendimento": 20,
+    "Aguardando Cliente": 10,
+    "Aguardando Finalização": 10,
+    "Finalizado": 45,
+}
+
+# Alvo -> tabela, quando o nome difere
+TABELAS = {"emails": "emails_enviados", "logs": "logs_sistema"}
+
+PRIORIDADES = ["Baixa", "Média", "Média", "Alta", "Urgente"]
+
+ASSUNTOS = [
+    "Erro ao emitir nota fiscal", "Impressora não imprime", "Certificado digital vencido",
+    "Sistema lento no fechamento do caixa", "Não consigo acessar o e-mail", "Backup não foi executado",
+    "Erro de conexão com o servidor", "Relatório de vendas com valores errados",
+    "Senha bloqueada", "Instalação de programa", "Atualização do sistema falhou",
+    "Leitor de código de barras sem resposta", "Rede Wi-Fi caindo", "Integração bancária com erro",
+]
+
+FRASES = [
+    "O problema começou hoje pela manhã.", "Já reiniciei o computador e continua igual.",
+    "Aparece a mensagem de erro na tela ao confirmar.", "Acontece em todas as máquinas do setor.",
+    "Segue o print em anexo.", "Preciso disso resolvido com urgência para o fechamento.",
+    "Verifiquei os cabos e estão conectados.", "Funcionava normalmente até ontem.",
+]
+
+MENSAGENS = [
+    "Olá, estamos verificando.", "Pode testar novamente, por favor?", "Testei e continua com erro.",
+    "Reinstalamos o driver, confirme se resolveu.", "Resolvido, obrigado!", "Enviei o print solicitado.",
+    "Acesso remoto agendado para hoje à tarde.", "O certificado foi renovado.",
+]
+
+ACOES_LOG = ["LOGIN", "LOGIN", "LOGIN", "LOGOUT", "NOVA_INTERACAO", "DOWNLOAD", "CRIAR_CHAMADO"]
+
+TIPOS_EMAIL = ["novo_chamado_cliente", "novo_chamado_admin", "atendimento_iniciado", "chamado_concluido", "nova_interacao"]
+
+EXTENSOES = [("pdf", "application/pdf"), ("png", "image/png"), ("jpg", "image/jpeg"),
+             ("xlsx", "application/vnd.ms-excel"), ("txt", "text/plain")]
+
+def proporcoes(chamados, **informados):
+    """Alvos de cada tabela: os informados (não None) ou proporcionais aos chamados."""
+    alvos = {"chamados": chamados}
+    for tabela, fator in PROPORCOES.items():
+        valor = informados.get(tabela)
+        alvos[tabela] = int(valor) if valor is not None else int(chamados * fator)
+    alvos["usuarios"] = max(alvos["usuarios"], 10)
+    alvos["empresas"] = informados.get("empresas") or max(3, alvos["usuarios"] // 5)
+    return alvos
+
+def contar(conn, tabela, where=""):
+    return conn.execute(f"SELECT COUNT(*) FROM {tabela} {where}").fetchone()[0]
+
+def inserir_em_lotes(conn, sql, linhas, total, nome, progresso):
+    """executemany em lotes de LOTE linhas, um commit por lote."""
+    inseridas = 0
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == LOTE:
+            conn.executemany(sql, lote)
+            conn.commit()
+            inseridas += len(lote)
+            lote = []
+            if progresso and inseridas % (LOTE * 10) == 0:
+                progresso(f"  {nome}: {inseridas}/{total}")
+    if lote:
+        conn.executemany(sql, lote)
+        conn.commit()
+        inseridas += len(lote)
+    return inseridas
+
+class Relogio:
+    """Datas em texto (horário de Brasília) espalhadas pelos últimos N dias."""
+
+    def __init__(self, sorteio, dias):
+        self.sorteio = sorteio
+        self.fim = datetime.now().replace(microsecond=0)
+        self.inicio = self.fim - timedelta(days=dias)
+        self.segundos = dias * 86400
+
+    def data(self):
+        return self.inicio + timedelta(seconds=self.sorteio.randint(0, self.segundos))
+
+    def depois(self, data, ate_horas=72):
+        return min(self.fim, data + timedelta(seconds=self.sorteio.randint(60, ate_horas * 3600)))
+
+    @staticmethod
+    def texto(data):
+        return data.strftime("%Y-%m-%d %H:%M:%S")
+
+def gerar_usuarios(conn, alvos, sorteio, relogio, progresso):
+    """Clientes (com empresa) e atendentes de suporte (1 para cada 50 clientes)."""
+    from utils import hash_senha
+
+    existentes = contar(conn, "usuarios", "WHERE usuario LIKE 'cliente%' OR usuario LIKE 'suporte%'")
+    faltam = alvos["usuarios"] - existentes
+    if faltam <= 0:
+        return 0
+
+    senha_hash, salt = hash_senha("senha123", "bench")  # um hash para todos: pbkdf2 é caro de propósito
+    atendentes = contar(conn, "usuarios", "WHERE usuario LIKE 'suporte%'")
+    clientes = existentes - atendentes
+
+    def linhas():
+        nonlocal atendentes, clientes
+        for i in range(faltam):
+            if (existentes + i) % 50 == 0:
+                usuario, perfil, empresa = f"suporte{atendentes}", "suporte", "MP Solutions"
+                atendentes += 1
+            else:
+                usuario, perfil = f"cliente{clientes}", "cliente"
+                empresa = f"Empresa {sorteio.randrange(alvos['empresas']):05d}"
+                clientes += 1
+            cadastro = relogio.data()
+            yield (usuario, senha_hash, salt, perfil, f"Usuário {usuario.title()}", empresa,
+                   f"{usuario}@exemplo.com.br", relogio.texto(cadastro), relogio.texto(relogio.depois(cadastro, 24 * 30)))
+
+    return inserir_em_lotes(conn, """
+        INSERT INTO usuarios (usuario, senha_hash, salt, perfil, nome_completo, empresa, email, data_cadastro, ultimo_acesso)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, linhas(), faltam, "usuários", progresso)
+
+def gerar_chamados(conn, alvos, sorteio, relogio, progresso):
+    """Chamados com campos coerentes com o status (atendente, cronômetro, conclusão)."""
+    faltam = alvos["chamados"] - contar(conn, "chamados")
+    if faltam <= 0:
+        return 0
+
+    clientes = [linha[0] for linha in conn.execute("SELECT usuario FROM usuarios WHERE perfil = 'cliente'")]
+    atendentes = [linha[0] for linha in conn.execute("SELECT usuario FROM usuarios WHERE perfil IN ('suporte', 'admin')")]
+    status = list(PESOS_STATUS)
+    pesos = list(PESOS_STATUS.values())
+
+    def linhas():
+        for _ in range(faltam):
+            st = sorteio.choices(status, pesos)[0]
+            abertura = relogio.data()
+            atendente = inicio = fim = retomada = None
+            situacao, tempo, retornos = "nao_iniciado", 0, 0
+            atualizacao = abertura
+
+            if st != "Novo":
+                atendente = sorteio.choice(atendentes)
+                inicio = relogio.depois(abertura, 48)
+                tempo = sorteio.randint(300, 6 * 3600)
+                atualizacao = relogio.depois(inicio, 120)
+                retornos = 1 if sorteio.random() < 0.1 else 0
+                if st == "Em atendimento" and sorteio.random() < 0.5:
+                    situacao, retomada = "em_andamento", atualizacao
+                elif st in ("Em atendimento", "Aguardando Cliente"):
+                    situacao = "pausado"
+                else:
+                    situacao, fim = "concluido", atualizacao
+
+            descricao = " ".join(sorteio.sample(FRASES, 3))
+            yield (sorteio.choice(ASSUNTOS), sorteio.choice(PRIORIDADES), descricao, st, sorteio.choice(clientes),
+                   relogio.texto(abertura), atendente, inicio and relogio.texto(inicio), fim and relogio.texto(fim),
+                   tempo, situacao, retomada and relogio.texto(retomada), retornos, relogio.texto(atualizacao))
+
+    return inserir_em_lotes(conn, """
+        INSERT INTO chamados (assunto, prioridade, descricao, status, usuario, data_abertura, atendente,
+                              data_inicio_atendimento, data_fim_atendimento, tempo_atendimento_segundos,
+                              status_atendimento, ultima_retomada, retornos, data_ultima_atualizacao)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, linhas(), faltam, "chamados", progresso)
+
+def gerar_conclusoes(conn, progresso):
+    """Mensagem de conclusão para os chamados concluídos que ainda não têm."""
+    conn.execute("""
+        INSERT INTO mensagens_conclusao (chamado_id, mensagem, atendente, data_envio)
+        SELECT c.id, 'Atendimento concluído. Qualquer dúvida, estamos à disposição.', c.atendente, c.data_fim_atendimento
+        FROM chamados c
+        WHERE c.data_fim_atendimento IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM mensagens_conclusao m WHERE m.chamado_id = c.id)
+    """)
+    conn.commit()
+    if progresso:
+        progresso(f"  mensagens de conclusão: {contar(conn, 'mensagens_conclusao')}")
+
+def dados_chamados(conn):
+    """(id, dono, atendente, data_abertura) de todos os chamados: base das tabelas filhas."""
+    return conn.execute("SELECT id, usuario, atendente, data_abertura FROM chamados").fetchall()
+
+def gerar_filhos(conn, tabela, alvos, chamados, sorteio, relogio, progresso):
+    """Interações, anexos, e-mails e downloads ligados a chamados sorteados."""
+    faltam = alvos[tabela] - contar(conn, TABELAS.get(tabela, tabela))
+    if faltam <= 0 or not chamados:
+        return 0
+
+    def sortear():
+        chamado_id, dono, atendente, abertura = sorteio.choice(chamados)
+        data = relogio.depois(datetime.strptime(abertura, "%Y-%m-%d %H:%M:%S"), 24 * 15)
+        return chamado_id, dono, atendente, relogio.texto(data)
+
+    if tabela == "interacoes":
+        sql = """INSERT INTO interacoes (chamado_id, autor, mensagem, tipo, data, enviar_email, email_enviado)
+                 VALUES (?, ?, ?, 'mensagem', ?, 1, 1)"""
+        def linha():
+            chamado_id, dono, atendente, data = sortear()
+            autor = atendente if atendente and sorteio.random() < 0.5 else dono
+            return chamado_id, autor, sorteio.choice(MENSAGENS), data
+    elif tabela == "anexos":
+        sql = """INSERT INTO anexos (chamado_id, nome_arquivo, caminho_arquivo, tamanho_bytes, tipo_arquivo, data_upload)
+                 VALUES (?, ?, ?, ?, ?, ?)"""
+        def linha():
+            chamado_id, _, _, data = sortear()
+            extensao, tipo = sorteio.choice(EXTENSOES)
+            nome = f"arquivo_{chamado_id}_{sorteio.randrange(10**6)}.{extensao}"
+            return chamado_id, nome, f"uploads/bench/{nome}", sorteio.randint(1024, 5 * 1024 * 1024), tipo, data
+    elif tabela == "emails":
+        sql = """INSERT INTO emails_enviados (destinatario, assunto, corpo, chamado_id, tipo, sucesso, erro, data_envio)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+        def linha():
+            chamado_id, dono, _, data = sortear()
+            sucesso = sorteio.random() < 0.97
+            return (f"{dono}@exemplo.com.br", f"Chamado #{chamado_id}", "Corpo do e-mail", chamado_id,
+                    sorteio.choice(TIPOS_EMAIL), 1 if sucesso else 0, None if sucesso else "Timeout SMTP", data)
+    else:
+        sql = """INSERT INTO downloads (usuario, arquivo_nome, arquivo_caminho, chamado_id, data_download)
+                 VALUES (?, ?, ?, ?, ?)"""
+        def linha():
+            chamado_id, dono, atendente, data = sortear()
+            usuario = atendente if atendente and sorteio.random() < 0.3 else dono
+            return usuario, "arquivo.pdf", "uploads/bench/arquivo.pdf", chamado_id, data
+
+    return inserir_em_lotes(conn, sql, (linha() for _ in range(faltam)), faltam, tabela, progresso)
+
+def gerar_logs(conn, alvos, sorteio, relogio, progresso):
+    """Logs de ações de usuários sorteados."""
+    faltam = alvos["logs"] - contar(conn, "logs_sistema")
+    if faltam <= 0:
+        return 0
+
+    usuarios = [linha[0] for linha in conn.execute("SELECT usuario FROM usuarios")]
+
+    def linhas():
+        for _ in range(faltam):
+            acao = sorteio.choice(ACOES_LOG)
+            yield (acao, sorteio.choice(usuarios), f"{acao.lower()} (dados sintéticos)",
+                   f"10.0.{sorteio.randrange(256)}.{sorteio.randrange(256)}", relogio.texto(relogio.data()))
+
+    return inserir_em_lotes(conn, """
+        INSERT INTO logs_sistema (acao, usuario, detalhes, ip_address, data_hora)
+        VALUES (?, ?, ?, ?, ?)
+    """, linhas(), faltam, "logs", progresso)
+
+def gerar(conn, alvos, dias=365, semente=42, progresso=print):
+    """
+    Completa o banco até os alvos ({tabela: quantidade}, ver proporcoes()).
+    Retorna {tabela: linhas inseridas}.
+    """
+    # Semente combinada com o tamanho atual: completar um banco não repete as mesmas linhas
+    sorteio = random.Random(semente * 1_000_003 + contar(conn, "chamados"))
+    relogio = Relogio(sorteio, dias)
+
+    inseridas = {
+        "usuarios": gerar_usuarios(conn, alvos, sorteio, relogio, progresso),
+        "chamados": gerar_chamados(conn, alvos, sorteio, relogio, progresso),
+    }
+    gerar_conclusoes(conn, progresso)
+
+    chamados = dados_chamados(conn)
+    for tabela in ("interacoes", "anexos", "emails", "downloads"):
+        inseridas[tabela] = gerar_filhos(conn, tabela, alvos, chamados, sorteio, relogio, progresso)
+    inseridas["logs"] = gerar_logs(conn, alvos, sorteio, relogio, progresso)
+
+    # Estatísticas do planejador refeitas: as antigas descrevem o banco antes da carga
+    conn.execute("ANALYZE")
+    conn.commit()
+    return inseridas
+
+def contagens(conn):
+    """Linhas por tabela gerada (para registrar junto dos resultados)."""
+    tabelas = ["usuarios", "chamados", "interacoes", "anexos", "mensagens_conclusao",
+               "logs_sistema", "emails_enviados", "downloads", "feed_alteracoes"]
+    return {tabela: contar(conn, tabela) for tabela in tabelas}
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de dados sintéticos do helpdesk")
+    parser.add_argument("--db", default="data/benchmark.db", help="Arquivo de banco a criar/completar")
+    parser.add_argument("--chamados", type=int, default=100_000)
+    parser.add_argument("--usuarios", type=int, help=f"Padrão: {PROPORCOES['usuarios']} por chamado")
+    parser.add_argument("--empresas", type=int, help="Padrão: 1 para cada 5 usuários")
+    parser.add_argument("--interacoes", type=int, help=f"Padrão: {PROPORCOES['interacoes']} por chamado")
+    parser.add_argument("--anexos", type=int, help=f"Padrão: {PROPORCOES['anexos']} por chamado")
+    parser.add_argument("--logs", type=int, help=f"Padrão: {PROPORCOES['logs']} por chamado")
+    parser.add_argument("--emails", type=int, help=f"Padrão: {PROPORCOES['emails']} por chamado")
+    parser.add_argument("--downloads", type=int, help=f"Padrão: {PROPORCOES['downloads']} por chamado")
+    parser.add_argument("--dias", type=int, default=365, help="Período coberto pelas datas")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    caminho = os.path.abspath(args.db)
+    if caminho == os.path.join(APP_DIR, "data", "database.db"):
+        parser.error("use um arquivo separado: este é o banco da aplicação")
+
+    configurar_banco(caminho)
+
+    import database
+
+    database.criar_tabelas()
+
+    alvos = proporcoes(
+        args.chamados, usuarios=args.usuarios, empresas=args.empresas, interacoes=args.interacoes,
+        anexos=args.anexos, logs=args.logs, emails=args.emails, downloads=args.downloads
+    )
+    print(f"Banco: {caminho}")
+    print("Alvos: " + ", ".join(f"{tabela}={quantidade}" for tabela, quantidade in alvos.items()))
+
+    inicio = time.perf_counter()
+    conn = database.conectar()
+    inseridas = gerar(conn, alvos, dias=args.dias, semente=args.semente)
+    total = contagens(conn)
+    conn.close()
+
+    print(f"\nInseridas em {time.perf_counter() - inicio:.1f}s: " +
+          ", ".join(f"{tabela}={quantidade}" for tabela, quantidade in inseridas.items()))
+    print("Total no banco: " + ", ".join(f"{tabela}={quantidade}" for tabela, quantidade in total.items()))
+    print(f"Tamanho: {os.path.getsize(caminho) / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
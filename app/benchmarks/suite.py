@@ -0,0 +1,364 @@
+# app/benchmarks/suite.py
+"""
+Suíte de benchmarks da camada de dados.
+
+Para cada tamanho de base (quantidade de chamados), completa um banco de dados
+sintéticos (gerar_dados.py) e mede:
+- cada função pública de database.py (leituras e escritas);
+- as consultas do dashboard;
+- o caminho da lista de chamados (página, chamado aberto, feed de novidades).
+
+O cache de consultas fica desligado por padrão (mede o banco, não o cache).
+O resultado é gravado em JSON para comparar execuções ao longo do tempo.
+
+Uso (a partir de app/):
+    python -m benchmarks.suite [--tamanhos 1000,10000,100000] [--repeticoes 50]
+    python -m benchmarks.suite --saida resultado.json --comparar anterior.json
+    python -m benchmarks.suite --filtro buscar_chamados --tamanhos 1000000 --db data/benchmark.db
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.comum import APP_DIR, configurar_banco, medir, imprimir_tabela
+
+VERSAO_FORMATO = 1
+
+def sequencia(funcao, argumentos):
+    """Chamável que usa um item novo de argumentos a cada chamada (escritas sem repetir o alvo)."""
+    itens = iter(argumentos)
+    return lambda: funcao(*next(itens))
+
+def amostra(conn):
+    """Ids e usuários reais da base, usados como argumentos das medições."""
+    def valor(sql, params=()):
+        linha = conn.execute(sql, params).fetchone()
+        return linha[0] if linha else None
+
+    maior_id = valor("SELECT MAX(id) FROM chamados")
+    dono = valor("SELECT usuario FROM chamados WHERE id = ?", (maior_id // 2,))
+    finalizado = valor("SELECT id FROM chamados WHERE status = 'Finalizado' ORDER BY id DESC LIMIT 1")
+    return {
+        "chamado": maior_id // 2,
+        "finalizado": finalizado,
+        "cliente": dono,
+        "cliente_id": valor("SELECT id FROM usuarios WHERE usuario = ?", (dono,)),
+        "interacao": valor("SELECT MAX(id) FROM interacoes") // 2,
+        "ids_pagina": [linha[0] for linha in conn.execute("SELECT id FROM chamados ORDER BY id DESC LIMIT 25")],
+        "cursor_pagina": (maior_id - 50,),
+        "seq": valor("SELECT seq FROM sqlite_sequence WHERE name = 'feed_alteracoes'") or 0,
+    }
+
+def medicoes_leitura(database, a):
+    """(grupo, nome, função) das leituras de database.py."""
+    ch = a["chamado"]
+    cliente = a["cliente"]
+    return [
+        ("usuarios", "listar_usuarios", lambda: database.listar_usuarios()),
+        ("usuarios", "buscar_usuario_por_id", lambda: database.buscar_usuario_por_id(a["cliente_id"])),
+        ("usuarios", "buscar_usuario_por_nome", lambda: database.buscar_usuario_por_nome(cliente)),
+
+        ("chamados", "buscar_chamados (admin)", lambda: database.buscar_chamados("admin", "admin", limite=25)),
+        ("chamados", "buscar_chamados (admin, página 3)",
+         lambda: database.buscar_chamados("admin", "admin", cursor_pagina=a["cursor_pagina"], limite=25)),
+        ("chamados", "buscar_chamados (admin, status)",
+         lambda: database.buscar_chamados("admin", "admin", status="Novo", limite=25)),
+        ("chamados", "buscar_chamados (admin, atualização)",
+         lambda: database.buscar_chamados("admin", "admin", ordenacao="atualizacao", limite=25)),
+        ("chamados", "buscar_chamados (admin, filtro usuário)",
+         lambda: database.buscar_chamados("admin", "admin", filtro_usuario="cliente1", limite=25)),
+        ("chamados", "buscar_chamados (cliente)", lambda: database.buscar_chamados(cliente, "cliente", limite=25)),
+        ("chamados", "buscar_texto_chamados (admin)",
+         lambda: database.buscar_texto_chamados("erro sistema", "admin", "admin", limite=25)),
+        ("chamados", "buscar_texto_chamados (admin, prefixo)",
+         lambda: database.buscar_texto_chamados("certif*", "admin", "admin", limite=25)),
+        ("chamados", "buscar_texto_chamados (cliente)",
+         lambda: database.buscar_texto_chamados("impressora", cliente, "cliente", limite=25)),
+        ("chamados", "buscar_chamado_por_id", lambda: database.buscar_chamado_por_id(ch)),
+        ("chamados", "buscar_descricao_chamado", lambda: database.buscar_descricao_chamado(ch)),
+        ("chamados", "obter_tempo_atendimento", lambda: database.obter_tempo_atendimento(ch)),
+        ("chamados", "buscar_ranking_tempo_atendimento", lambda: database.buscar_ranking_tempo_atendimento(20)),
+
+        ("detalhes", "buscar_interacoes_chamado", lambda: database.buscar_interacoes_chamado(ch)),
+        ("detalhes", "buscar_anexos_interacao", lambda: database.buscar_anexos_interacao(a["interacao"])),
+        ("detalhes", "buscar_anexos", lambda: database.buscar_anexos(ch)),
+        ("detalhes", "buscar_mensagem_conclusao", lambda: database.buscar_mensagem_conclusao(a["finalizado"])),
+        ("detalhes", "carregar_detalhes_chamados (1)", lambda: database.carregar_detalhes_chamados([ch])),
+        ("detalhes", "carregar_detalhes_chamados (25)", lambda: database.carregar_detalhes_chamados(a["ids_pagina"])),
+
+        ("estatisticas", "buscar_contadores_status", lambda: database.buscar_contadores_status()),
+        ("estatisticas", "buscar_contadores_status (cliente)", lambda: database.buscar_contadores_status(cliente)),
+        ("estatisticas", "buscar_contadores_status (sem contadores)",
+         lambda: database.buscar_contadores_status(usar_contadores=False)),
+        ("estatisticas", "buscar_estatisticas_usuario (admin)", lambda: database.buscar_estatisticas_usuario("admin", "admin")),
+        ("estatisticas", "buscar_estatisticas_usuario (cliente)",
+         lambda: database.buscar_estatisticas_usuario(cliente, "cliente")),
+        ("estatisticas", "buscar_resumo_por_empresa", lambda: database.buscar_resumo_por_empresa()),
+        ("estatisticas", "buscar_resumo_por_usuario", lambda: database.buscar_resumo_por_usuario()),
+
+        ("logs", "buscar_logs_sistema", lambda: database.buscar_logs_sistema(100)),
+        ("logs", "buscar_logs_sistema (usuário)", lambda: database.buscar_logs_sistema(100, cliente)),
+        ("logs", "buscar_downloads_usuario", lambda: database.buscar_downloads_usuario(cliente)),
+
+        ("feed", "ultimo_seq_alteracoes", lambda: database.ultimo_seq_alteracoes()),
+        ("feed", "buscar_alteracoes (admin)", lambda: database.buscar_alteracoes(a["seq"], "admin", "admin")),
+        ("feed", "buscar_alteracoes (cliente)", lambda: database.buscar_alteracoes(a["seq"], cliente, "cliente")),
+    ]
+
+def medicoes_escrita(database, a, chamadas):
+    """
+    (grupo, nome, função) das escritas. As transições precisam de chamados no
+    status certo: cada medição usa chamados novos, criados antes de medir.
+    """
+    cliente = a["cliente"]
+    marca = int(time.time() * 1000)
+
+    novos = [database.criar_chamado("Chamado da suíte", "Média", "Descrição", cliente) for _ in range(chamadas)]
+    com_atendente = [(chamado_id, "admin") for chamado_id in novos]
+    com_dono = [(chamado_id, cliente) for chamado_id in novos]
+    anexos = []
+
+    def excluir_anexo():
+        if not anexos:
+            # Primeira chamada (aquecimento): os anexos gravados na medição de salvar_anexo
+            anexos.extend(anexo['id'] for chamado_id in novos for anexo in database.buscar_anexos(chamado_id))
+        database.excluir_anexo(anexos.pop())
+
+    return [
+        ("escrita", "registrar_log", lambda: database.registrar_log("BENCH", cliente, "Suíte")),
+        ("escrita", "registrar_download",
+         lambda: database.registrar_download(cliente, "arquivo.pdf", "uploads/bench/arquivo.pdf", a["chamado"])),
+        ("escrita", "registrar_email_enviado",
+         lambda: database.registrar_email_enviado(f"{cliente}@exemplo.com.br", "Assunto", "Corpo", a["chamado"], "nova_interacao", True)),
+        ("escrita", "atualizar_ultimo_acesso", lambda: database.atualizar_ultimo_acesso(cliente)),
+        ("escrita", "atualizar_usuario", lambda: database.atualizar_usuario(a["cliente_id"], {
+            "nome_completo": "Usuário da suíte", "empresa": "Empresa 00001",
+            "email": f"{cliente}@exemplo.com.br", "perfil": "cliente"})),
+        ("escrita", "criar_chamado", lambda: database.criar_chamado("Assunto", "Média", "Descrição", cliente)),
+        ("escrita", "adicionar_interacao_chamado",
+         lambda: database.adicionar_interacao_chamado(a["chamado"], "admin", "Mensagem da suíte")),
+        ("escrita", "salvar_anexo", sequencia(database.salvar_anexo, [
+            (chamado_id, "arquivo.pdf", "uploads/bench/arquivo.pdf", 1024) for chamado_id in novos])),
+        ("escrita", "excluir_anexo", excluir_anexo),
+        ("escrita", "atualizar_status_chamado", lambda: database.atualizar_status_chamado(a["chamado"], "Em atendimento")),
+
+        # Ciclo de atendimento, na ordem: cada transição encontra o chamado no status esperado
+        ("transicoes", "iniciar_atendimento_admin", sequencia(database.iniciar_atendimento_admin, com_atendente)),
+        ("transicoes", "pausar_atendimento", sequencia(database.pausar_atendimento, com_atendente)),
+        ("transicoes", "retomar_atendimento", sequencia(database.retomar_atendimento, com_atendente)),
+        ("transicoes", "retornar_chamado_admin",
+         sequencia(database.retornar_chamado_admin, [(c, "admin", "Retorno") for c in novos])),
+        ("transicoes", "retomar_atendimento_aguardando",
+         sequencia(database.retomar_atendimento_aguardando, com_atendente)),
+        ("transicoes", "concluir_atendimento_admin",
+         sequencia(database.concluir_atendimento_admin, [(c, "Concluído") for c in novos])),
+        ("transicoes", "retornar_chamado", sequencia(database.retornar_chamado, [(c, cliente, "Voltou") for c in novos])),
+        ("transicoes", "cliente_concluir_chamado", sequencia(database.cliente_concluir_chamado, com_dono)),
+
+        # pbkdf2 (100 mil iterações) domina: poucas repetições
+        ("usuarios_senha", "cadastrar_usuario_completo", sequencia(database.cadastrar_usuario_completo, [
+            (f"suite{marca}_{i}", "senha123", "cliente", "Suíte", "Empresa 00001", f"suite{marca}_{i}@exemplo.com.br")
+            for i in range(chamadas)])),
+        ("usuarios_senha", "atualizar_senha_usuario", lambda: database.atualizar_senha_usuario(a["cliente_id"], "senha123")),
+    ]
+
+def medicoes_manutencao(database):
+    """Operações pesadas de manutenção (Force Fix), só com --manutencao."""
+    return [
+        ("manutencao", "reconstruir_resumos", lambda: database.reconstruir_resumos()),
+        ("manutencao", "reconstruir_busca", lambda: database.reconstruir_busca()),
+        ("manutencao", "limpar_logs_antigos", lambda: database.limpar_logs_antigos(3650)),
+        ("manutencao", "podar_feed_alteracoes", lambda: database.podar_feed_alteracoes()),
+    ]
+
+def medicoes_telas(database, dashboard, a):
+    """Caminhos completos das telas: as leituras que um rerun faz, na ordem."""
+    cliente = a["cliente"]
+    ch = a["chamado"]
+
+    def lista(usuario, perfil):
+        # lista_chamados (chamados.py): seq, página e o chamado aberto com os detalhes
+        database.ultimo_seq_alteracoes()
+        database.buscar_chamados(usuario, perfil, limite=25)
+        database.buscar_chamado_por_id(ch)
+        database.carregar_detalhes_chamados([ch])
+
+    def verificacao(usuario, perfil):
+        # Rerun só do fragmento, sem novidades
+        database.buscar_alteracoes(a["seq"], usuario, perfil)
+
+    def painel(usuario, perfil):
+        # renderizar_dashboard (admin): tudo num snapshot de leitura
+        with database.snapshot_relatorio():
+            database.buscar_estatisticas_usuario(usuario, perfil)
+            if perfil == "admin":
+                database.buscar_resumo_por_empresa()
+                database.buscar_resumo_por_usuario()
+                database.buscar_ranking_tempo_atendimento(20)
+                dashboard.buscar_emails_enviados(100)
+
+    return [
+        ("dashboard", "buscar_emails_enviados", lambda: dashboard.buscar_emails_enviados(100)),
+        ("dashboard", "tela_dashboard (admin)", lambda: painel("admin", "admin")),
+        ("dashboard", "tela_dashboard (cliente)", lambda: painel(cliente, "cliente")),
+        ("lista_chamados", "tela_chamados (admin)", lambda: lista("admin", "admin")),
+        ("lista_chamados", "tela_chamados (cliente)", lambda: lista(cliente, "cliente")),
+        ("lista_chamados", "verificação de novidades (admin)", lambda: verificacao("admin", "admin")),
+        ("lista_chamados", "verificação de novidades (cliente)", lambda: verificacao(cliente, "cliente")),
+    ]
+
+# Repetições relativas por grupo (escritas de senha e manutenção são caras)
+REPETICOES_GRUPO = {"usuarios_senha": 0.1, "manutencao": 0.02}
+
+def medir_tamanho(database, dashboard, conn, repeticoes, filtro=None, manutencao=False):
+    """Mede todas as operações na base atual. Retorna {nome: resultado}."""
+    a = amostra(conn)
+    aquecimento = 2
+
+    medicoes = medicoes_leitura(database, a) + medicoes_telas(database, dashboard, a)
+    # Chamados para as transições: uma sequência por medição (repetições + aquecimento)
+    medicoes += medicoes_escrita(database, a, repeticoes + aquecimento)
+    if manutencao:
+        medicoes += medicoes_manutencao(database)
+
+    resultados = {}
+    for grupo, nome, funcao in medicoes:
+        if filtro and filtro not in nome:
+            continue
+        vezes = max(1, int(repeticoes * REPETICOES_GRUPO.get(grupo, 1)))
+        resultado = medir(funcao, repeticoes=vezes, aquecimento=min(aquecimento, vezes))
+        resultado["grupo"] = grupo
+        resultados[nome] = resultado
+        print(f"  {nome}: p50 {resultado['p50_us'] / 1000:.3f} ms")
+    return resultados
+
+def ambiente():
+    """Dados do ambiente gravados junto dos resultados."""
+    from config.db_config import DB_PERFIL
+    import db_cache
+
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "perfil_banco": DB_PERFIL,
+        "cache_consultas": db_cache.CACHE_CONSULTAS_ATIVO,
+    }
+
+def comparar(atual, anterior):
+    """Tabela de p50 por operação e tamanho presentes nas duas execuções."""
+    antes = {
+        (tamanho["chamados"], nome): resultado["p50_us"]
+        for tamanho in anterior["tamanhos"]
+        for nome, resultado in tamanho["resultados"].items()
+    }
+    linhas = []
+    for tamanho in atual["tamanhos"]:
+        for nome, resultado in tamanho["resultados"].items():
+            chave = (tamanho["chamados"], nome)
+            if chave not in antes:
+                continue
+            variacao = resultado["p50_us"] / max(antes[chave], 0.1) - 1
+            linhas.append({
+                "chamados": tamanho["chamados"],
+                "operação": nome,
+                "antes p50 (ms)": round(antes[chave] / 1000, 3),
+                "agora p50 (ms)": round(resultado["p50_us"] / 1000, 3),
+                "variação": f"{variacao:+.0%}" + (" ⚠️" if variacao > 0.2 else ""),
+            })
+    imprimir_tabela(
+        f"Comparação com {anterior.get('inicio', 'execução anterior')}",
+        linhas,
+        ["chamados", "operação", "antes p50 (ms)", "agora p50 (ms)", "variação"]
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks da camada de dados")
+    parser.add_argument("--tamanhos", default="1000,10000,100000", help="Quantidades de chamados (separadas por vírgula)")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--db", default=None, help="Banco a completar (padrão: temporário, descartável)")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON (padrão: benchmarks/resultados/suite_<data>.json)")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--filtro", default=None, help="Só as operações cujo nome contém este texto")
+    parser.add_argument("--manutencao", action="store_true", help="Inclui reconstruções e limpezas (lentas)")
+    parser.add_argument("--com-cache", action="store_true", help="Mantém o cache de consultas ligado")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.db and os.path.abspath(args.db) == os.path.join(APP_DIR, "data", "database.db"):
+        parser.error("use um arquivo separado: este é o banco da aplicação")
+
+    caminho = configurar_banco(args.db and os.path.abspath(args.db))
+
+    import database
+    import dashboard
+    import db_cache
+    from benchmarks import gerar_dados
+
+    db_cache.CACHE_CONSULTAS_ATIVO = args.com_cache
+    database.criar_tabelas()
+
+    execucao = {
+        "versao_formato": VERSAO_FORMATO,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "comando": " ".join(sys.argv[1:]),
+        "ambiente": ambiente(),
+        "parametros": {"repeticoes": args.repeticoes, "filtro": args.filtro, "semente": args.semente,
+                       "manutencao": args.manutencao},
+        "tamanhos": [],
+    }
+
+    for tamanho in sorted(int(t) for t in args.tamanhos.split(",")):
+        print(f"\n=== {tamanho} chamados ===")
+        conn = database.conectar()
+
+        inicio = time.perf_counter()
+        gerar_dados.gerar(conn, gerar_dados.proporcoes(tamanho), semente=args.semente, progresso=None)
+        geracao = time.perf_counter() - inicio
+        linhas = gerar_dados.contagens(conn)
+        print(f"Base pronta em {geracao:.1f}s: {linhas}")
+
+        resultados = medir_tamanho(database, dashboard, conn, args.repeticoes, args.filtro, args.manutencao)
+        conn.close()
+
+        execucao["tamanhos"].append({
+            "chamados": tamanho,
+            "linhas": linhas,
+            "tamanho_banco_bytes": os.path.getsize(caminho),
+            "geracao_s": round(geracao, 2),
+            "resultados": resultados,
+        })
+
+    saida = args.saida or os.path.join(
+        APP_DIR, "benchmarks", "resultados", f"suite_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(execucao, f, ensure_ascii=False, indent=2)
+
+    imprimir_tabela(
+        "Suíte da camada de dados - p50 (ms) por tamanho de base",
+        [
+            {"operação": nome, **{
+                str(t["chamados"]): round(t["resultados"][nome]["p50_us"] / 1000, 3)
+                for t in execucao["tamanhos"] if nome in t["resultados"]
+            }}
+            for nome in execucao["tamanhos"][-1]["resultados"]
+        ],
+        ["operação"] + [str(t["chamados"]) for t in execucao["tamanhos"]]
+    )
+    print(f"\nResultados gravados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(execucao, json.load(f))
+
+if __name__ == "__main__":
+    main()
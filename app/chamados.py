@@ -5,53 +5,58 @@ Tela de Gerenciamento de Chamados
 
 import streamlit as st
 import os
-from datetime import datetime
+import math
 
 from database import (
-    conectar, 
     buscar_chamados,
-    buscar_descricao_chamado,
+    buscar_texto_chamados,
+    buscar_chamado_por_id,
+    carregar_detalhes_chamados,
     iniciar_atendimento_admin,
     pausar_atendimento,
     retomar_atendimento,
+    retomar_atendimento_aguardando,
     concluir_atendimento_admin,
     cliente_concluir_chamado,
-    obter_tempo_atendimento,
+    calcular_tempo_atendimento,
     salvar_anexo,
-    buscar_anexos,
     excluir_anexo,
     retornar_chamado,
-    buscar_interacoes_chamado,
     adicionar_interacao_chamado,
     finalizar_chamado_cliente,
-    buscar_mensagem_conclusao,
-    buscar_anexos_interacao,
     retornar_chamado_admin,
     criar_chamado,
-    registrar_download
+    registrar_download,
+    ajustar_tempo_atual,
+    ultimo_seq_alteracoes,
+    buscar_alteracoes
 )
 
-from utils import formatar_tempo, badge_status, badge_prioridade, agora_brasilia_str
+from utils import formatar_tempo, formatar_data_br, badge_status, badge_prioridade, agora_epoch
+from config.db_config import FEED_INTERVALO
+from services.anexos_service import metadados_anexo, ler_anexo, formatar_tamanho
 
-def formatar_data_br(data):
-    """Formata data para padrão brasileiro DD/MM/YYYY HH:MM"""
-    if data is None:
-        return "N/A"
-    
-    if isinstance(data, str):
-        try:
-            data = datetime.fromisoformat(data.replace('Z', '+00:00'))
-        except:
-            try:
-                data = datetime.strptime(data.split('.')[0], "%Y-%m-%d %H:%M:%S")
-            except:
-                return data
-    
-    if isinstance(data, datetime):
-        return data.strftime('%d/%m/%Y %H:%M')
-    
-    return str(data)
+# Rótulo exibido -> chave de ordenação de buscar_chamados
+OPCOES_ORDENACAO = {
+    "Mais recentes": "recentes",
+    "Mais antigos": "antigos",
+    "Última atualização": "atualizacao",
+}
 
+# Onde o texto buscado foi encontrado (origem de buscar_texto_chamados)
+ROTULOS_ORIGEM_BUSCA = {
+    "chamado": "Chamado",
+    "interacao": "Interação",
+    "conclusao": "Conclusão",
+}
+
+# Aviso (toast) por alteração vinda do feed: (entidade, tipo) -> texto
+AVISOS_ALTERACAO = {
+    ("chamado", "novo"): "🆕 Novo chamado #{id}",
+    ("chamado", "status"): "🔄 Chamado #{id} mudou de status",
+    ("interacao", "novo"): "💬 Nova interação no chamado #{id}",
+    ("anexo", "novo"): "📎 Novo anexo no chamado #{id}",
+}
 
 def is_admin_or_suporte(perfil):
     """Verifica se o usuário é admin ou suporte."""
@@ -92,7 +97,12 @@ def tela_chamados(usuario, perfil):
                         descricao_limpa = sanitizar_texto(descricao)
                         
                         try:
-                            chamado_id = criar_chamado(assunto_limpo, prioridade, descricao_limpa, usuario)
+                            # Notificações gravadas na fila na mesma transação do chamado
+                            from services.chamados_service import notificar_novo_chamado, criar_interacao
+                            chamado_id = criar_chamado(
+                                assunto_limpo, prioridade, descricao_limpa, usuario,
+                                notificar=lambda cursor, novo_id: notificar_novo_chamado(novo_id, cursor=cursor)
+                            )
                             
                             if chamado_id:
                                 if arquivo is not None:
@@ -110,13 +120,10 @@ def tela_chamados(usuario, perfil):
                                         salvar_anexo(chamado_id, arquivo.name, caminho, arquivo.size)
                                         st.success(f"✅ Arquivo anexado!")
                                 
-                                # Enviar notificações por e-mail
                                 try:
-                                    from services.chamados_service import notificar_novo_chamado, criar_interacao
                                     criar_interacao(chamado_id, 'cliente', descricao_limpa, 'abertura')
-                                    notificar_novo_chamado(chamado_id)
                                 except Exception as e:
-                                    print(f"Erro ao enviar e-mail: {e}")
+                                    print(f"Erro ao registrar abertura: {e}")
                                 
                                 st.success(f"✅ Chamado #{chamado_id} aberto com sucesso!")
                                 st.balloons()
@@ -130,7 +137,14 @@ def tela_chamados(usuario, perfil):
         st.divider()
     
     # ========== FILTROS ==========
-    col_f1, col_f2, col_f3 = st.columns(3)
+    busca_texto = st.text_input(
+        "🔍 Buscar",
+        key="busca_texto_chamados",
+        placeholder="Assunto, descrição, interações ou mensagem de conclusão",
+        help="Todas as palavras precisam aparecer. Use * no fim para buscar pelo início da palavra (ex: certif*)."
+    ).strip()
+    
+    col_f1, col_f2, col_f3, col_f4 = st.columns(4)
     
     with col_f1:
         filtro_status = st.selectbox(
@@ -152,361 +166,574 @@ def tela_chamados(usuario, perfil):
         else:
             filtro_usuario = None
     
-    # ========== LISTA DE CHAMADOS ==========
+    with col_f4:
+        ordenacao = st.selectbox(
+            "Ordenar por",
+            list(OPCOES_ORDENACAO.keys()),
+            key="ordenacao_chamados"
+        )
+    
+    por_pagina = st.session_state.get("por_pagina_chamados", 25)
+    
+    # Filtros mudaram: voltar para a primeira página
+    filtros_atuais = (busca_texto, filtro_status, filtro_prioridade, filtro_usuario, ordenacao, por_pagina)
+    if st.session_state.get("chamados_filtros") != filtros_atuais:
+        st.session_state.chamados_filtros = filtros_atuais
+        st.session_state.chamados_cursores = [None]  # cursor de início de cada página visitada
+    
+    selecionado = st.session_state.get("chamado_selecionado")
+    
     try:
+        # ========== DETALHE DO CHAMADO SELECIONADO ==========
+        # Apenas o chamado aberto carrega interações, anexos e ações
+        if selecionado:
+            renderizar_detalhe_chamado(selecionado, usuario, eh_atendente)
+            st.divider()
+        
+        # ========== LISTA DE CHAMADOS ==========
+        # Filtros, ordenação e paginação são feitos no banco.
         # Para admin/suporte, busca todos. Para cliente, só os dele.
-        if eh_atendente:
-            chamados = buscar_chamados(usuario, "admin")
+        filtros = dict(
+            status=None if filtro_status == "Todos" else filtro_status,
+            prioridade=None if filtro_prioridade == "Todas" else filtro_prioridade,
+            filtro_usuario=filtro_usuario or None
+        )
+        perfil_busca = "admin" if eh_atendente else perfil
+        
+        # Rerun da tela: a lista é recarregada; entre reruns, só o feed é consultado
+        st.session_state.chamados_lista = None
+        lista_chamados(usuario, perfil_busca, busca_texto, filtros, ordenacao, por_pagina, selecionado)
+    
+    except Exception as e:
+        st.error(f"❌ Erro: {str(e)}")
+        import traceback
+        st.code(traceback.format_exc())
+
+
+def carregar_lista_chamados(usuario, perfil_busca, busca_texto, filtros, ordenacao, por_pagina):
+    """Página atual da lista (ou os mais relevantes da busca de texto)."""
+    if busca_texto:
+        # Busca de texto: os mais relevantes, sem paginação
+        return buscar_texto_chamados(busca_texto, usuario, perfil_busca, limite=por_pagina, **filtros)
+    
+    return buscar_chamados(
+        usuario,
+        perfil_busca,
+        ordenacao=OPCOES_ORDENACAO[ordenacao],
+        cursor_pagina=st.session_state.chamados_cursores[-1],
+        limite=por_pagina,
+        **filtros
+    )
+
+
+@st.fragment(run_every=FEED_INTERVALO or None)
+def lista_chamados(usuario, perfil_busca, busca_texto, filtros, ordenacao, por_pagina, selecionado):
+    """
+    Lista de chamados com verificação periódica de novidades.
+    
+    A cada FEED_INTERVALO segundos só este trecho roda: consulta o feed de
+    alterações desde a última verificação e recarrega a página apenas se mudou
+    algum chamado do escopo do usuário. O chamado aberto no painel de detalhes
+    não é recarregado sozinho (pode haver resposta sendo digitada): aparece um
+    aviso com o botão para atualizar.
+    """
+    # "Por página" mudou num rerun só deste trecho: a tela toda recalcula os filtros
+    if st.session_state.get("por_pagina_chamados", 25) != por_pagina:
+        st.rerun()
+    
+    estado = st.session_state.get("chamados_lista")
+    
+    if estado is None:
+        # Seq lido antes da página: o que mudar durante a carga aparece na próxima verificação
+        seq = ultimo_seq_alteracoes()
+        pagina = carregar_lista_chamados(usuario, perfil_busca, busca_texto, filtros, ordenacao, por_pagina)
+        estado = {"pagina": pagina, "seq": seq, "carregada_em": agora_epoch(), "detalhe_alterado": False}
+        st.session_state.chamados_lista = estado
+    else:
+        feed = buscar_alteracoes(estado["seq"], usuario, perfil_busca)
+        estado["seq"] = feed["seq"]
+        
+        if feed["alteracoes"] or feed["recarregar"]:
+            if selecionado in feed["chamados"] or feed["recarregar"]:
+                estado["detalhe_alterado"] = bool(selecionado)
+            
+            avisos = []
+            for alteracao in feed["alteracoes"]:
+                aviso = AVISOS_ALTERACAO.get((alteracao['entidade'], alteracao['tipo']))
+                if aviso and alteracao['chamado_id'] != selecionado:
+                    aviso = aviso.format(id=alteracao['chamado_id'])
+                    if aviso not in avisos:
+                        avisos.append(aviso)
+            for aviso in avisos[-3:]:
+                st.toast(aviso)
+            
+            estado["pagina"] = carregar_lista_chamados(usuario, perfil_busca, busca_texto, filtros, ordenacao, por_pagina)
+            estado["carregada_em"] = agora_epoch()
+    
+    pagina = estado["pagina"]
+    
+    if estado["detalhe_alterado"]:
+        col_aviso, col_atualizar = st.columns([4, 1])
+        with col_aviso:
+            st.warning(f"🔔 O chamado #{selecionado} teve novidades desde que foi aberto")
+        with col_atualizar:
+            if st.button("🔄 Atualizar", key="btn_atualizar_detalhe", use_container_width=True):
+                st.rerun()
+    
+    # Cronômetros em andamento avançam sem reler o banco
+    chamados = ajustar_tempo_atual(
+        [dict(ch) for ch in pagina['chamados']],
+        agora_epoch() - estado["carregada_em"]
+    )
+    
+    if not chamados:
+        st.info("📭 Nenhum chamado encontrado")
+    else:
+        if busca_texto:
+            mais = "mais de " if pagina['limitado'] else ""
+            st.caption(f"📊 {mais}{pagina['total']} chamado(s) encontrado(s) - exibindo os {len(chamados)} mais relevantes")
+            if pagina['limitado']:
+                st.caption("💡 Termo muito comum: considerados só os registros mais recentes. Refine a busca ou use os filtros.")
+        else:
+            st.caption(f"📊 Total: {pagina['total']} chamado(s)")
+        
+        for ch in chamados:
+            renderizar_linha_chamado(ch, ch['id'] == selecionado)
+    
+    # ========== PAGINAÇÃO ==========
+    if pagina['total'] > 0 and not busca_texto:
+        renderizar_paginacao(pagina, st.session_state.chamados_cursores, por_pagina)
+
+
+def renderizar_paginacao(pagina, cursores, por_pagina):
+    """Controles de paginação (Anterior / Próxima) da lista de chamados."""
+    st.divider()
+    
+    total_paginas = max(1, math.ceil(pagina['total'] / por_pagina))
+    col_p1, col_p2, col_p3, col_p4 = st.columns([1, 2, 1, 1])
+    
+    with col_p1:
+        if st.button("⬅️ Anterior", key="btn_pagina_anterior", disabled=len(cursores) == 1, use_container_width=True):
+            cursores.pop()
+            st.rerun()
+    
+    with col_p2:
+        st.caption(f"Página {len(cursores)} de {total_paginas}")
+    
+    with col_p3:
+        if st.button("Próxima ➡️", key="btn_pagina_proxima", disabled=not pagina['proximo_cursor'], use_container_width=True):
+            cursores.append(pagina['proximo_cursor'])
+            st.rerun()
+    
+    with col_p4:
+        st.selectbox(
+            "Por página",
+            [10, 25, 50, 100],
+            index=[10, 25, 50, 100].index(por_pagina),
+            key="por_pagina_chamados",
+            label_visibility="collapsed"
+        )
+
+def renderizar_linha_chamado(ch, selecionado):
+    """Linha resumida da lista de chamados (sem consultas extras)."""
+    col1, col2, col3, col4 = st.columns([6, 2, 2, 1])
+    
+    with col1:
+        assunto = f"{ch['assunto'][:60]}{'...' if len(ch['assunto']) > 60 else ''}"
+        st.markdown(f"{badge_status(ch['status'])} {badge_prioridade(ch['prioridade'])} **#{ch['id']}** - {assunto}")
+        if ch.get('trecho'):
+            st.caption(f"🔍 {ROTULOS_ORIGEM_BUSCA.get(ch['origem'], '')}: {ch['trecho']}")
+    
+    with col2:
+        st.caption(f"👤 {ch['usuario']}")
+        if ch.get('tempo_atual'):
+            em_andamento = ch.get('status_atendimento') == 'em_andamento'
+            st.caption(f"{'⏱️' if em_andamento else '⏸️'} {formatar_tempo(ch['tempo_atual'])}")
+    
+    with col3:
+        st.caption(f"🕐 {formatar_data_br(ch.get('data_ultima_atualizacao') or ch['data_abertura'])}")
+    
+    with col4:
+        if selecionado:
+            if st.button("✖️", key=f"btn_fechar_{ch['id']}", help="Fechar detalhes", type="primary"):
+                st.session_state.chamado_selecionado = None
+                st.rerun()
         else:
-            chamados = buscar_chamados(usuario, perfil)
+            if st.button("🔎", key=f"btn_abrir_{ch['id']}", help="Abrir detalhes"):
+                st.session_state.chamado_selecionado = ch['id']
+                st.rerun()
+
+def renderizar_download_anexo(anexo, chave, usuario, chamado_id, rotulo="⬇️ Baixar"):
+    """
+    Download sob demanda: na tela aparecem só os metadados do arquivo.
+    O conteúdo é lido (via cache LRU compartilhado) apenas após o pedido do usuário.
+    """
+    meta = metadados_anexo(anexo)
+    if not meta['existe']:
+        st.caption("⚠️ Arquivo indisponível")
+        return
+    
+    chave_pronto = f"dl_pronto_{chave}"
+    
+    if not st.session_state.get(chave_pronto):
+        if st.button(f"{rotulo} ({formatar_tamanho(meta['tamanho'])})", key=f"btn_prep_{chave}"):
+            st.session_state[chave_pronto] = True
+            st.rerun()
+        return
+    
+    dados, erro = ler_anexo(meta['caminho'])
+    if erro:
+        st.session_state.pop(chave_pronto, None)
+        st.error(erro)
+        return
+    
+    def concluir_download():
+        # Libera a referência aos bytes nesta sessão e registra o download
+        st.session_state.pop(chave_pronto, None)
+        registrar_download(usuario, meta['nome'], meta['caminho'], chamado_id)
+    
+    st.download_button(
+        label=f"💾 Salvar {meta['nome']}",
+        data=dados,
+        file_name=meta['nome'],
+        key=f"dl_{chave}",
+        on_click=concluir_download,
+        type="primary"
+    )
+
+
+def renderizar_detalhe_chamado(chamado_id, usuario, eh_atendente):
+    """
+    Painel de detalhes do chamado selecionado.
+    Descrição, interações, anexos e ações só são carregados aqui,
+    para um único chamado, independente do tamanho da lista.
+    """
+    ch = buscar_chamado_por_id(chamado_id)
+    
+    # Cliente só pode abrir os próprios chamados
+    if not ch or (not eh_atendente and ch['usuario'] != usuario):
+        st.session_state.chamado_selecionado = None
+        return
+    
+    detalhes = carregar_detalhes_chamados([chamado_id]).get(chamado_id, {})
+    
+    with st.container(border=True):
+        col_titulo, col_fechar = st.columns([10, 1])
         
-        # Aplicar filtros
-        if filtro_status != "Todos":
-            chamados = [ch for ch in chamados if ch['status'] == filtro_status]
+        with col_titulo:
+            st.markdown(f"### {badge_status(ch['status'])} {badge_prioridade(ch['prioridade'])} #{ch['id']} - {ch['assunto']}")
         
-        if filtro_prioridade != "Todas":
-            chamados = [ch for ch in chamados if ch['prioridade'] == filtro_prioridade]
+        with col_fechar:
+            if st.button("✖️ Fechar", key="btn_fechar_detalhe"):
+                st.session_state.chamado_selecionado = None
+                st.rerun()
         
-        if filtro_usuario:
-            chamados = [ch for ch in chamados if filtro_usuario.lower() in ch['usuario'].lower()]
+        # Info do chamado
+        col1, col2, col3 = st.columns(3)
         
-        if not chamados:
-            st.info("📭 Nenhum chamado encontrado")
-        else:
-            st.caption(f"📊 Total: {len(chamados)} chamado(s)")
+        with col1:
+            st.write(f"**ID:** #{ch['id']}")
+            st.write(f"**Status:** {ch['status']}")
+            st.write(f"**Prioridade:** {ch['prioridade']}")
+        
+        with col2:
+            st.write(f"**Usuário:** {ch['usuario']}")
+            st.write(f"**Atendente:** {ch.get('atendente') or 'N/A'}")
+            st.write(f"**Retornos:** {ch.get('retornos', 0)}")
+        
+        with col3:
+            st.write(f"**Abertura:** {formatar_data_br(ch['data_abertura'])}")
+            tempo = calcular_tempo_atendimento(ch)
+            st.write(f"**Tempo:** {formatar_tempo(tempo)}")
+            if ch.get('data_fim_atendimento'):
+                st.write(f"**Conclusão:** {formatar_data_br(ch['data_fim_atendimento'])}")
+        
+        st.divider()
+        
+        # Descrição
+        st.write("**📝 Descrição:**")
+        descricao = detalhes.get('descricao')
+        st.info(descricao if descricao else "Sem descrição")
+        
+        # ========== AÇÕES DO ADMIN/SUPORTE ==========
+        if eh_atendente:
+            st.divider()
+            st.write("**🔧 Ações do Atendente:**")
             
-            for idx, ch in enumerate(chamados):
-                status_badge = badge_status(ch['status'])
-                prioridade_badge = badge_prioridade(ch['prioridade'])
+            col_a1, col_a2, col_a3, col_a4 = st.columns(4)
+            
+            # BOTÃO INICIAR - Status: Novo
+            if ch['status'] == 'Novo':
+                with col_a1:
+                    if st.button("▶️ Iniciar Atendimento", key=f"btn_iniciar_{ch['id']}", use_container_width=True, type="primary"):
+                        from services.chamados_service import notificar_atendimento_iniciado
+                        sucesso, msg = iniciar_atendimento_admin(
+                            ch['id'], usuario,
+                            notificar=lambda cursor, chamado: notificar_atendimento_iniciado(
+                                chamado['id'], usuario, cursor=cursor, interacao_id=chamado['efeitos']
+                            )
+                        )
+                        if sucesso:
+                            st.success(msg)
+                            st.rerun()
+                        else:
+                            st.error(msg)
+            
+            # BOTÕES PAUSAR/RETOMAR/CONCLUIR/RETORNAR - Status: Em atendimento
+            if ch['status'] == 'Em atendimento':
+                status_atend = ch.get('status_atendimento', 'em_andamento')
                 
-                titulo = f"{status_badge} {prioridade_badge} **#{ch['id']}** - {ch['assunto'][:50]}{'...' if len(ch['assunto']) > 50 else ''}"
+                # Pausar ou Retomar
+                with col_a1:
+                    if status_atend == 'em_andamento':
+                        if st.button("⏸️ Pausar", key=f"btn_pausar_{ch['id']}", use_container_width=True):
+                            sucesso, msg = pausar_atendimento(ch['id'], usuario)
+                            if sucesso:
+                                st.success(msg)
+                                st.rerun()
+                            else:
+                                st.error(msg)
+                    else:
+                        if st.button("▶️ Retomar", key=f"btn_retomar_{ch['id']}", use_container_width=True, type="primary"):
+                            sucesso, msg = retomar_atendimento(ch['id'], usuario)
+                            if sucesso:
+                                st.success(msg)
+                                st.rerun()
+                            else:
+                                st.error(msg)
                 
-                with st.expander(titulo, expanded=False):
-                    # Info do chamado
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.write(f"**ID:** #{ch['id']}")
-                        st.write(f"**Status:** {ch['status']}")
-                        st.write(f"**Prioridade:** {ch['prioridade']}")
-                    
-                    with col2:
-                        st.write(f"**Usuário:** {ch['usuario']}")
-                        st.write(f"**Atendente:** {ch.get('atendente') or 'N/A'}")
-                        st.write(f"**Retornos:** {ch.get('retornos', 0)}")
-                    
-                    with col3:
-                        st.write(f"**Abertura:** {formatar_data_br(ch['data_abertura'])}")
-                        tempo = obter_tempo_atendimento(ch['id'])
-                        st.write(f"**Tempo:** {formatar_tempo(tempo)}")
-                        if ch.get('data_fim_atendimento'):
-                            st.write(f"**Conclusão:** {formatar_data_br(ch['data_fim_atendimento'])}")
-                    
-                    st.divider()
-                    
-                    # Descrição
-                    st.write("**📝 Descrição:**")
-                    descricao = buscar_descricao_chamado(ch['id'])
-                    st.info(descricao if descricao else "Sem descrição")
-                    
-                    # ========== AÇÕES DO ADMIN/SUPORTE ==========
-                    if eh_atendente:
-                        st.divider()
-                        st.write("**🔧 Ações do Atendente:**")
-                        
-                        col_a1, col_a2, col_a3, col_a4 = st.columns(4)
-                        
-                        # BOTÃO INICIAR - Status: Novo
-                        if ch['status'] == 'Novo':
-                            with col_a1:
-                                if st.button("▶️ Iniciar Atendimento", key=f"btn_iniciar_{ch['id']}_{idx}", use_container_width=True, type="primary"):
-                                    sucesso, msg = iniciar_atendimento_admin(ch['id'], usuario)
-                                    if sucesso:
-                                        st.success(msg)
-                                        try:
-                                            from services.chamados_service import criar_interacao
-                                            criar_interacao(ch['id'], 'atendente', f'Atendimento iniciado por {usuario}', 'inicio')
-                                        except:
-                                            pass
-                                        st.rerun()
-                                    else:
-                                        st.error(msg)
+                # Concluir
+                with col_a2:
+                    with st.popover("✅ Concluir", use_container_width=True):
+                        st.write("**Mensagem de conclusão:**")
+                        msg_conclusao = st.text_area(
+                            "Descreva o que foi feito",
+                            placeholder="Descreva o que foi feito para resolver o problema...",
+                            key=f"txt_conclusao_{ch['id']}",
+                            height=100
+                        )
                         
-                        # BOTÕES PAUSAR/RETOMAR/CONCLUIR/RETORNAR - Status: Em atendimento
-                        if ch['status'] == 'Em atendimento':
-                            status_atend = ch.get('status_atendimento', 'em_andamento')
-                            
-                            # Pausar ou Retomar
-                            with col_a1:
-                                if status_atend == 'em_andamento':
-                                    if st.button("⏸️ Pausar", key=f"btn_pausar_{ch['id']}_{idx}", use_container_width=True):
-                                        sucesso, msg = pausar_atendimento(ch['id'])
-                                        if sucesso:
-                                            st.success(msg)
-                                            st.rerun()
-                                        else:
-                                            st.error(msg)
-                                else:
-                                    if st.button("▶️ Retomar", key=f"btn_retomar_{ch['id']}_{idx}", use_container_width=True, type="primary"):
-                                        sucesso, msg = retomar_atendimento(ch['id'])
-                                        if sucesso:
-                                            st.success(msg)
-                                            st.rerun()
-                                        else:
-                                            st.error(msg)
-                            
-                            # Concluir
-                            with col_a2:
-                                with st.popover("✅ Concluir", use_container_width=True):
-                                    st.write("**Mensagem de conclusão:**")
-                                    msg_conclusao = st.text_area(
-                                        "Descreva o que foi feito",
-                                        placeholder="Descreva o que foi feito para resolver o problema...",
-                                        key=f"txt_conclusao_{ch['id']}_{idx}",
-                                        height=100
-                                    )
-                                    
-                                    arquivo_conclusao = st.file_uploader(
-                                        "Anexar arquivo (opcional)",
-                                        key=f"file_conclusao_{ch['id']}_{idx}",
-                                        type=['pdf', 'doc', 'docx', 'txt', 'xlsx', 'xls', 'jpg', 'jpeg', 'png']
-                                    )
-                                    
-                                    if st.button("✅ Confirmar Conclusão", key=f"btn_confirmar_conclusao_{ch['id']}_{idx}", type="primary"):
-                                        arquivos_conclusao = None
-                                        if arquivo_conclusao:
-                                            from utils import gerar_nome_arquivo_seguro
-                                            if not os.path.exists("uploads"):
-                                                os.makedirs("uploads")
-                                            nome_seguro = gerar_nome_arquivo_seguro(arquivo_conclusao.name)
-                                            caminho = os.path.join("uploads", nome_seguro)
-                                            with open(caminho, "wb") as f:
-                                                f.write(arquivo_conclusao.getbuffer())
-                                            arquivos_conclusao = [{'nome': arquivo_conclusao.name, 'caminho': caminho}]
-                                        
-                                        sucesso, msg = concluir_atendimento_admin(ch['id'], msg_conclusao, arquivos_conclusao)
-                                        if sucesso:
-                                            st.success(msg)
-                                            try:
-                                                from services.chamados_service import notificar_chamado_concluido
-                                                notificar_chamado_concluido(ch['id'], msg_conclusao)
-                                            except:
-                                                pass
-                                            st.rerun()
-                                        else:
-                                            st.error(msg)
-                            
-                            # Retornar ao cliente
-                            with col_a3:
-                                with st.popover("🔄 Devolver", use_container_width=True):
-                                    st.write("**Devolver ao cliente:**")
-                                    msg_retorno = st.text_area(
-                                        "Informe o que precisa",
-                                        placeholder="Informe o que precisa do cliente...",
-                                        key=f"txt_retorno_{ch['id']}_{idx}",
-                                        height=100
-                                    )
-                                    
-                                    arquivo_retorno = st.file_uploader(
-                                        "Anexar arquivo (opcional)",
-                                        key=f"file_retorno_{ch['id']}_{idx}",
-                                        type=['pdf', 'doc', 'docx', 'txt', 'xlsx', 'xls', 'jpg', 'jpeg', 'png']
-                                    )
-                                    
-                                    if st.button("🔄 Enviar para Cliente", key=f"btn_enviar_retorno_{ch['id']}_{idx}"):
-                                        if not msg_retorno:
-                                            st.error("Informe o motivo")
-                                        else:
-                                            arquivos = None
-                                            if arquivo_retorno:
-                                                from utils import gerar_nome_arquivo_seguro
-                                                if not os.path.exists("uploads"):
-                                                    os.makedirs("uploads")
-                                                nome_seguro = gerar_nome_arquivo_seguro(arquivo_retorno.name)
-                                                caminho = os.path.join("uploads", nome_seguro)
-                                                with open(caminho, "wb") as f:
-                                                    f.write(arquivo_retorno.getbuffer())
-                                                arquivos = [{'nome': arquivo_retorno.name, 'caminho': caminho}]
-                                            
-                                            sucesso, msg = retornar_chamado_admin(ch['id'], usuario, msg_retorno, arquivos)
-                                            if sucesso:
-                                                st.success(msg)
-                                                try:
-                                                    from services.chamados_service import notificar_retorno_admin
-                                                    notificar_retorno_admin(ch['id'], msg_retorno)
-                                                except:
-                                                    pass
-                                                st.rerun()
-                                            else:
-                                                st.error(msg)
+                        arquivo_conclusao = st.file_uploader(
+                            "Anexar arquivo (opcional)",
+                            key=f"file_conclusao_{ch['id']}",
+                            type=['pdf', 'doc', 'docx', 'txt', 'xlsx', 'xls', 'jpg', 'jpeg', 'png']
+                        )
                         
-                        # Status: Aguardando Cliente - pode reiniciar atendimento
-                        if ch['status'] == 'Aguardando Cliente':
-                            with col_a1:
-                                if st.button("▶️ Retomar Atendimento", key=f"btn_retomar_aguard_{ch['id']}_{idx}", use_container_width=True, type="primary"):
-                                    # Volta para Em atendimento
-                                    conn = conectar()
-                                    cursor = conn.cursor()
-                                    cursor.execute("""
-                                        UPDATE chamados 
-                                        SET status = 'Em atendimento', 
-                                            status_atendimento = 'em_andamento',
-                                            ultima_retomada = ?
-                                        WHERE id = ?
-                                    """, (agora_brasilia_str(), ch['id']))
-                                    conn.commit()
-                                    conn.close()
-                                    st.success("▶️ Atendimento retomado!")
-                                    st.rerun()
-                    
-                    # ========== INTERAÇÕES ==========
-                    st.divider()
-                    st.write("**💬 Histórico de Interações:**")
-                    
-                    interacoes = buscar_interacoes_chamado(ch['id'])
-                    
-                    if interacoes:
-                        for inter_idx, inter in enumerate(interacoes):
-                            autor_icon = "👤" if inter['autor'] == 'cliente' else "🛠️"
-                            autor_nome = "Cliente" if inter['autor'] == 'cliente' else "Atendente"
-                            cor_fundo = "#e3f2fd" if inter['autor'] != 'cliente' else "#f5f5f5"
-                            cor_borda = "#1976d2" if inter['autor'] != 'cliente' else "#9e9e9e"
+                        if st.button("✅ Confirmar Conclusão", key=f"btn_confirmar_conclusao_{ch['id']}", type="primary"):
+                            arquivos_conclusao = None
+                            if arquivo_conclusao:
+                                from utils import gerar_nome_arquivo_seguro
+                                if not os.path.exists("uploads"):
+                                    os.makedirs("uploads")
+                                nome_seguro = gerar_nome_arquivo_seguro(arquivo_conclusao.name)
+                                caminho = os.path.join("uploads", nome_seguro)
+                                with open(caminho, "wb") as f:
+                                    f.write(arquivo_conclusao.getbuffer())
+                                arquivos_conclusao = [{'nome': arquivo_conclusao.name, 'caminho': caminho}]
                             
-                            st.markdown(f"""
-                            <div style='background: {cor_fundo}; 
-                                        padding: 10px; margin: 5px 0; border-radius: 8px;
-                                        border-left: 3px solid {cor_borda};'>
-                                <strong>{autor_icon} {autor_nome}</strong> - <small>{formatar_data_br(inter['data'])}</small>
-                                <p style='margin: 5px 0 0 0;'>{inter['mensagem']}</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            anexos_inter = buscar_anexos_interacao(inter['id'])
-                            if anexos_inter:
-                                for anx_idx, anexo in enumerate(anexos_inter):
-                                    if os.path.exists(anexo['caminho_arquivo']):
-                                        with open(anexo['caminho_arquivo'], 'rb') as f:
-                                            st.download_button(
-                                                f"📎 {anexo['nome_arquivo']}",
-                                                f.read(),
-                                                anexo['nome_arquivo'],
-                                                key=f"dl_inter_{ch['id']}_{inter['id']}_{anx_idx}_{idx}"
-                                            )
-                    else:
-                        st.info("Sem interações registradas")
-                    
-                    # Nova mensagem
-                    if ch['status'] not in ['Finalizado', 'Cancelado']:
-                        st.write("**✉️ Enviar Mensagem:**")
-                        with st.form(key=f"form_msg_{ch['id']}_{idx}"):
-                            nova_mensagem = st.text_area(
-                                "Mensagem",
-                                placeholder="Digite sua mensagem...",
-                                key=f"nova_msg_{ch['id']}_{idx}",
-                                label_visibility="collapsed"
+                            from services.chamados_service import notificar_chamado_concluido
+                            sucesso, msg = concluir_atendimento_admin(
+                                ch['id'], msg_conclusao, arquivos_conclusao,
+                                notificar=lambda cursor, chamado: notificar_chamado_concluido(
+                                    chamado['id'], msg_conclusao, cursor=cursor
+                                )
                             )
-                            
-                            if st.form_submit_button("📤 Enviar", type="primary"):
-                                if nova_mensagem:
-                                    autor_tipo = 'atendente' if eh_atendente else 'cliente'
-                                    sucesso, msg = adicionar_interacao_chamado(ch['id'], autor_tipo, nova_mensagem)
-                                    
-                                    if sucesso:
-                                        st.success("✅ Mensagem enviada!")
-                                        st.rerun()
-                                    else:
-                                        st.error(msg)
-                                else:
-                                    st.warning("Digite uma mensagem")
-                    
-                    # ========== AÇÕES DO CLIENTE ==========
-                    if ch['status'] == 'Aguardando Finalização' and ch['usuario'] == usuario and not eh_atendente:
-                        st.divider()
-                        
-                        msg_conclusao_dados = buscar_mensagem_conclusao(ch['id'])
-                        if msg_conclusao_dados:
-                            st.info(f"**💬 Mensagem do Atendente:** {msg_conclusao_dados.get('mensagem', '')}")
+                            if sucesso:
+                                st.success(msg)
+                                st.rerun()
+                            else:
+                                st.error(msg)
+                
+                # Retornar ao cliente
+                with col_a3:
+                    with st.popover("🔄 Devolver", use_container_width=True):
+                        st.write("**Devolver ao cliente:**")
+                        msg_retorno = st.text_area(
+                            "Informe o que precisa",
+                            placeholder="Informe o que precisa do cliente...",
+                            key=f"txt_retorno_{ch['id']}",
+                            height=100
+                        )
                         
-                        col_btn1, col_btn2 = st.columns(2)
+                        arquivo_retorno = st.file_uploader(
+                            "Anexar arquivo (opcional)",
+                            key=f"file_retorno_{ch['id']}",
+                            type=['pdf', 'doc', 'docx', 'txt', 'xlsx', 'xls', 'jpg', 'jpeg', 'png']
+                        )
                         
-                        with col_btn1:
-                            st.write("**🔄 Retornar Chamado**")
-                            with st.form(key=f"form_retorno_cli_{ch['id']}_{idx}"):
-                                st.warning("Use se o problema NÃO foi resolvido.")
-                                mensagem_retorno = st.text_area(
-                                    "Motivo do retorno",
-                                    placeholder="Explique o motivo...",
-                                    height=100,
-                                    key=f"txt_retorno_cli_{ch['id']}_{idx}"
-                                )
+                        if st.button("🔄 Enviar para Cliente", key=f"btn_enviar_retorno_{ch['id']}"):
+                            if not msg_retorno:
+                                st.error("Informe o motivo")
+                            else:
+                                arquivos = None
+                                if arquivo_retorno:
+                                    from utils import gerar_nome_arquivo_seguro
+                                    if not os.path.exists("uploads"):
+                                        os.makedirs("uploads")
+                                    nome_seguro = gerar_nome_arquivo_seguro(arquivo_retorno.name)
+                                    caminho = os.path.join("uploads", nome_seguro)
+                                    with open(caminho, "wb") as f:
+                                        f.write(arquivo_retorno.getbuffer())
+                                    arquivos = [{'nome': arquivo_retorno.name, 'caminho': caminho}]
                                 
-                                if st.form_submit_button("🔙 Retornar", type="secondary", use_container_width=True):
-                                    if not mensagem_retorno:
-                                        st.error("Explique o motivo do retorno")
-                                    else:
-                                        sucesso, msg = retornar_chamado(ch['id'], usuario, mensagem_retorno)
-                                        if sucesso:
-                                            st.success(msg)
-                                            try:
-                                                from services.chamados_service import notificar_chamado_retornado
-                                                notificar_chamado_retornado(ch['id'], mensagem_retorno)
-                                            except:
-                                                pass
-                                            st.rerun()
-                                        else:
-                                            st.error(msg)
+                                from services.chamados_service import notificar_retorno_admin
+                                sucesso, msg = retornar_chamado_admin(
+                                    ch['id'], usuario, msg_retorno, arquivos,
+                                    notificar=lambda cursor, chamado: notificar_retorno_admin(
+                                        chamado['id'], msg_retorno, cursor=cursor, interacao_id=chamado['efeitos']
+                                    )
+                                )
+                                if sucesso:
+                                    st.success(msg)
+                                    st.rerun()
+                                else:
+                                    st.error(msg)
+            
+            # Status: Aguardando Cliente - pode reiniciar atendimento
+            if ch['status'] == 'Aguardando Cliente':
+                with col_a1:
+                    if st.button("▶️ Retomar Atendimento", key=f"btn_retomar_aguard_{ch['id']}", use_container_width=True, type="primary"):
+                        sucesso, msg = retomar_atendimento_aguardando(ch['id'], usuario)
+                        if sucesso:
+                            st.success(msg)
+                            st.rerun()
+                        else:
+                            st.error(msg)
+        
+        # ========== INTERAÇÕES ==========
+        st.divider()
+        st.write("**💬 Histórico de Interações:**")
+        
+        interacoes = detalhes.get('interacoes', [])
+        
+        if interacoes:
+            for inter_idx, inter in enumerate(interacoes):
+                autor_icon = "👤" if inter['autor'] == 'cliente' else "🛠️"
+                autor_nome = "Cliente" if inter['autor'] == 'cliente' else "Atendente"
+                cor_fundo = "#e3f2fd" if inter['autor'] != 'cliente' else "#f5f5f5"
+                cor_borda = "#1976d2" if inter['autor'] != 'cliente' else "#9e9e9e"
+                
+                st.markdown(f"""
+                <div style='background: {cor_fundo}; 
+                            padding: 10px; margin: 5px 0; border-radius: 8px;
+                            border-left: 3px solid {cor_borda};'>
+                    <strong>{autor_icon} {autor_nome}</strong> - <small>{formatar_data_br(inter['data'])}</small>
+                    <p style='margin: 5px 0 0 0;'>{inter['mensagem']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                anexos_inter = inter.get('anexos', [])
+                if anexos_inter:
+                    for anexo in anexos_inter:
+                        renderizar_download_anexo(
+                            anexo,
+                            f"inter_{ch['id']}_{anexo['id']}",
+                            usuario,
+                            ch['id'],
+                            rotulo=f"📎 {anexo['nome_arquivo']}"
+                        )
+        else:
+            st.info("Sem interações registradas")
+        
+        # Nova mensagem
+        if ch['status'] not in ['Finalizado', 'Cancelado']:
+            st.write("**✉️ Enviar Mensagem:**")
+            with st.form(key=f"form_msg_{ch['id']}"):
+                nova_mensagem = st.text_area(
+                    "Mensagem",
+                    placeholder="Digite sua mensagem...",
+                    key=f"nova_msg_{ch['id']}",
+                    label_visibility="collapsed"
+                )
+                
+                if st.form_submit_button("📤 Enviar", type="primary"):
+                    if nova_mensagem:
+                        autor_tipo = 'atendente' if eh_atendente else 'cliente'
+                        sucesso, msg = adicionar_interacao_chamado(ch['id'], autor_tipo, nova_mensagem)
                         
-                        with col_btn2:
-                            st.write("**✅ Finalizar Chamado**")
-                            with st.form(key=f"form_finalizar_cli_{ch['id']}_{idx}"):
-                                st.success("Use se o problema FOI resolvido.")
-                                confirmar = st.checkbox("✅ Confirmo que foi resolvido", key=f"chk_confirm_{ch['id']}_{idx}")
-                                
-                                if st.form_submit_button("✅ Finalizar", type="primary", use_container_width=True):
-                                    if not confirmar:
-                                        st.error("⚠️ Confirme que o problema foi resolvido!")
-                                    else:
-                                        sucesso, msg = finalizar_chamado_cliente(ch['id'], usuario)
-                                        if sucesso:
-                                            st.success(msg)
-                                            try:
-                                                from services.chamados_service import notificar_chamado_finalizado
-                                                notificar_chamado_finalizado(ch['id'])
-                                            except:
-                                                pass
-                                            st.balloons()
-                                            st.rerun()
-                                        else:
-                                            st.error(msg)
-                    
-                    # ========== ANEXOS ==========
-                    st.divider()
-                    st.write("**📎 Anexos:**")
+                        if sucesso:
+                            st.success("✅ Mensagem enviada!")
+                            st.rerun()
+                        else:
+                            st.error(msg)
+                    else:
+                        st.warning("Digite uma mensagem")
+        
+        # ========== AÇÕES DO CLIENTE ==========
+        if ch['status'] == 'Aguardando Finalização' and ch['usuario'] == usuario and not eh_atendente:
+            st.divider()
+            
+            msg_conclusao_dados = detalhes.get('mensagem_conclusao')
+            if msg_conclusao_dados:
+                st.info(f"**💬 Mensagem do Atendente:** {msg_conclusao_dados.get('mensagem', '')}")
+            
+            col_btn1, col_btn2 = st.columns(2)
+            
+            with col_btn1:
+                st.write("**🔄 Retornar Chamado**")
+                with st.form(key=f"form_retorno_cli_{ch['id']}"):
+                    st.warning("Use se o problema NÃO foi resolvido.")
+                    mensagem_retorno = st.text_area(
+                        "Motivo do retorno",
+                        placeholder="Explique o motivo...",
+                        height=100,
+                        key=f"txt_retorno_cli_{ch['id']}"
+                    )
                     
-                    anexos = buscar_anexos(ch['id'])
+                    if st.form_submit_button("🔙 Retornar", type="secondary", use_container_width=True):
+                        if not mensagem_retorno:
+                            st.error("Explique o motivo do retorno")
+                        else:
+                            from services.chamados_service import notificar_chamado_retornado
+                            sucesso, msg = retornar_chamado(
+                                ch['id'], usuario, mensagem_retorno,
+                                notificar=lambda cursor, chamado: notificar_chamado_retornado(
+                                    chamado['id'], mensagem_retorno, cursor=cursor
+                                )
+                            )
+                            if sucesso:
+                                st.success(msg)
+                                st.rerun()
+                            else:
+                                st.error(msg)
+            
+            with col_btn2:
+                st.write("**✅ Finalizar Chamado**")
+                with st.form(key=f"form_finalizar_cli_{ch['id']}"):
+                    st.success("Use se o problema FOI resolvido.")
+                    confirmar = st.checkbox("✅ Confirmo que foi resolvido", key=f"chk_confirm_{ch['id']}")
                     
-                    if anexos:
-                        for anx_idx, anexo in enumerate(anexos):
-                            col_anx1, col_anx2 = st.columns([3, 1])
-                            
-                            with col_anx1:
-                                st.write(f"📄 {anexo['nome_arquivo']}")
-                                st.caption(f"Enviado: {formatar_data_br(anexo['data_upload'])}")
-                            
-                            with col_anx2:
-                                if os.path.exists(anexo['caminho_arquivo']):
-                                    with open(anexo['caminho_arquivo'], 'rb') as f:
-                                        dados = f.read()
-                                        st.download_button(
-                                            label="⬇️ Baixar",
-                                            data=dados,
-                                            file_name=anexo['nome_arquivo'],
-                                            key=f"dl_anexo_{ch['id']}_{anexo['id']}_{idx}_{anx_idx}"
-                                        )
-                    else:
-                        st.info("Sem anexos")
-    
-    except Exception as e:
-        st.error(f"❌ Erro: {str(e)}")
-        import traceback
-        st.code(traceback.format_exc())
+                    if st.form_submit_button("✅ Finalizar", type="primary", use_container_width=True):
+                        if not confirmar:
+                            st.error("⚠️ Confirme que o problema foi resolvido!")
+                        else:
+                            from services.chamados_service import notificar_chamado_finalizado
+                            sucesso, msg = finalizar_chamado_cliente(
+                                ch['id'], usuario,
+                                notificar=lambda cursor, chamado: notificar_chamado_finalizado(chamado['id'], cursor=cursor)
+                            )
+                            if sucesso:
+                                st.success(msg)
+                                st.balloons()
+                                st.rerun()
+                            else:
+                                st.error(msg)
+        
+        # ========== ANEXOS ==========
+        st.divider()
+        st.write("**📎 Anexos:**")
+        
+        anexos = detalhes.get('anexos', [])
+        
+        if anexos:
+            for anexo in anexos:
+                col_anx1, col_anx2 = st.columns([3, 1])
+                
+                with col_anx1:
+                    st.write(f"📄 {anexo['nome_arquivo']}")
+                    st.caption(f"Enviado: {formatar_data_br(anexo['data_upload'])}")
+                
+                with col_anx2:
+                    renderizar_download_anexo(anexo, f"anexo_{ch['id']}_{anexo['id']}", usuario, ch['id'])
+        else:
+            st.info("Sem anexos")
@@ -10,11 +10,17 @@ from .email_config import (
     EMAIL_ENABLED, EMAIL_LOG_ENVIOS, BASE_URL,
     verificar_configuracao_email, get_email_status
 )
+from .db_config import (
+    DB_PATH, DB_POOL_TAMANHO, DB_CACHE_STATEMENTS, DB_PERFIL,
+    PERFIS_PERFORMANCE, obter_perfil_performance
+)
 
 __all__ = [
     'SMTP_HOST', 'SMTP_PORT', 'SMTP_USER', 'SMTP_PASSWORD', 'SMTP_USE_TLS',
     'EMAIL_FROM', 'EMAIL_FROM_NAME', 'EMAIL_FROM_ADDRESS',
     'EMAIL_ADMIN', 'EMAIL_MAX_RETRIES', 'EMAIL_RETRY_DELAY',
     'EMAIL_ENABLED', 'EMAIL_LOG_ENVIOS', 'BASE_URL',
-    'verificar_configuracao_email', 'get_email_status'
+    'verificar_configuracao_email', 'get_email_status',
+    'DB_PATH', 'DB_POOL_TAMANHO', 'DB_CACHE_STATEMENTS', 'DB_PERFIL',
+    'PERFIS_PERFORMANCE', 'obter_perfil_performance'
 ]
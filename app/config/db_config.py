@@ -0,0 +1,117 @@
+# app/config/db_config.py
+"""
+Configurações do banco de dados SQLite
+Valores podem ser sobrescritos via Streamlit Secrets ou variáveis de ambiente
+"""
+
+from .email_config import get_config_value
+
+# ========== ARQUIVO DO BANCO ==========
+DB_PATH = get_config_value("DB_PATH", "data/database.db")
+
+# ========== POOL DE CONEXÕES ==========
+# Quantidade máxima de conexões ociosas mantidas abertas no pool.
+# Se todas estiverem em uso, uma conexão extra é aberta e descartada ao devolver.
+DB_POOL_TAMANHO = int(get_config_value("DB_POOL_TAMANHO", "8"))
+
+# Quantidade de statements preparados mantidos em cache por conexão
+DB_CACHE_STATEMENTS = int(get_config_value("DB_CACHE_STATEMENTS", "256"))
+
+# Intervalo (segundos) entre PRAGMA optimize em cada conexão do pool.
+# Reanalisa só as tabelas cujas estatísticas ficaram desatualizadas.
+DB_OTIMIZAR_INTERVALO = float(get_config_value("DB_OTIMIZAR_INTERVALO", "3600"))
+
+# ========== CACHE DE CONSULTAS ==========
+# Cache de resultados de leitura compartilhado por todas as sessões (db_cache.py)
+CACHE_CONSULTAS_ATIVO = str(get_config_value("CACHE_CONSULTAS_ATIVO", "1")).lower() in ("1", "true", "sim")
+
+# Limites do cache: quantidade de resultados e total de bytes (serializados)
+CACHE_CONSULTAS_MAX_ENTRADAS = int(get_config_value("CACHE_CONSULTAS_MAX_ENTRADAS", "2000"))
+CACHE_CONSULTAS_MAX_BYTES = int(get_config_value("CACHE_CONSULTAS_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# ========== ESCRITOR ÚNICO ==========
+# Máximo de tarefas de escrita gravadas na mesma transação (group commit)
+ESCRITOR_LOTE = int(get_config_value("ESCRITOR_LOTE", "100"))
+
+# Tempo máximo (segundos) que uma escrita aguarda na fila; não iniciada até
+# lá, ela é cancelada (nunca gravada) e a sessão recebe TimeoutError
+ESCRITOR_TIMEOUT = float(get_config_value("ESCRITOR_TIMEOUT", "30"))
+
+# ========== WAL ==========
+# Páginas no -wal que disparam o checkpoint automático (padrão do SQLite: 1000)
+DB_WAL_AUTOCHECKPOINT = int(get_config_value("DB_WAL_AUTOCHECKPOINT", "1000"))
+
+# Tamanho (bytes) a partir do qual o -wal é truncado após o checkpoint.
+# Leitores longos (relatórios) seguram o WAL; acima disso um checkpoint é forçado.
+DB_WAL_LIMITE_BYTES = int(get_config_value("DB_WAL_LIMITE_BYTES", str(64 * 1024 * 1024)))
+
+# ========== FEED DE ALTERAÇÕES ==========
+# Intervalo (segundos) da verificação de novidades na lista de chamados (0 desliga)
+FEED_INTERVALO = float(get_config_value("FEED_INTERVALO", "10"))
+
+# Máximo de alterações lidas por verificação; acima disso a lista é recarregada inteira
+FEED_LIMITE = int(get_config_value("FEED_LIMITE", "500"))
+
+# Dias mantidos no feed (a poda roda no máximo uma vez por FEED_PODA_INTERVALO segundos)
+FEED_RETENCAO_DIAS = int(get_config_value("FEED_RETENCAO_DIAS", "7"))
+FEED_PODA_INTERVALO = float(get_config_value("FEED_PODA_INTERVALO", "3600"))
+
+# ========== INSTRUMENTAÇÃO DE CONSULTAS ==========
+# Mede tempo, linhas e origem de cada SQL (aba "Consultas" do Force Fix)
+INSTRUMENTACAO_ATIVA = str(get_config_value("INSTRUMENTACAO_ATIVA", "1")).lower() in ("1", "true", "sim")
+
+# Execuções a partir deste tempo (ms) são gravadas em consultas_lentas
+CONSULTA_LENTA_MS = float(get_config_value("CONSULTA_LENTA_MS", "100"))
+CONSULTAS_LENTAS_RETENCAO_DIAS = int(get_config_value("CONSULTAS_LENTAS_RETENCAO_DIAS", "7"))
+
+# ========== BUSCA DE TEXTO ==========
+# Máximo de ocorrências (as mais recentes) lidas de cada índice por busca.
+# Termos raros são ranqueados por completo; termos muito comuns, só entre os
+# mais recentes - o custo da busca não cresce com o tamanho da base.
+BUSCA_MAX_OCORRENCIAS = int(get_config_value("BUSCA_MAX_OCORRENCIAS", "1000"))
+
+# Palavra com * no fim vira um OR dos termos mais frequentes com esse início
+BUSCA_MAX_TERMOS_PREFIXO = int(get_config_value("BUSCA_MAX_TERMOS_PREFIXO", "20"))
+
+# ========== PERFIL DE PERFORMANCE ==========
+# Perfis prontos de PRAGMAs. "equilibrado" é seguro com WAL (synchronous=NORMAL
+# não perde integridade, apenas as últimas transações em caso de queda de energia).
+PERFIS_PERFORMANCE = {
+    "seguro": {
+        "synchronous": "FULL",
+        "cache_size": -8000,         # ~8 MB (valor negativo = KiB)
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,        # ms
+    },
+    "equilibrado": {
+        "synchronous": "NORMAL",
+        "cache_size": -32000,        # ~32 MB
+        "mmap_size": 134217728,      # 128 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "rapido": {
+        "synchronous": "OFF",
+        "cache_size": -64000,        # ~64 MB
+        "mmap_size": 268435456,      # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+DB_PERFIL = get_config_value("DB_PERFIL", "equilibrado")
+
+def obter_perfil_performance(nome=None):
+    """
+    Retorna os PRAGMAs do perfil escolhido.
+    Cada PRAGMA pode ser sobrescrito individualmente (ex: DB_SYNCHRONOUS, DB_CACHE_SIZE).
+    """
+    perfil = dict(PERFIS_PERFORMANCE.get(nome or DB_PERFIL, PERFIS_PERFORMANCE["equilibrado"]))
+
+    for pragma in perfil:
+        valor = get_config_value(f"DB_{pragma.upper()}")
+        if valor is not None:
+            perfil[pragma] = valor
+
+    return perfil
@@ -49,6 +49,71 @@ EMAIL_ADMIN = get_config_value("EMAIL_ADMIN", "")  # Configurar via secrets
 EMAIL_MAX_RETRIES = int(get_config_value("EMAIL_MAX_RETRIES", "3"))
 EMAIL_RETRY_DELAY = int(get_config_value("EMAIL_RETRY_DELAY", "5"))
 
+# ========== SESSÕES SMTP (email_system/sessoes_smtp.py) ==========
+# Sessões autenticadas mantidas abertas entre envios
+EMAIL_SMTP_SESSOES = int(get_config_value("EMAIL_SMTP_SESSOES", "2"))
+
+# Sessão parada há mais que isso (s) é testada com NOOP antes de ser usada
+EMAIL_SMTP_VERIFICAR_APOS = float(get_config_value("EMAIL_SMTP_VERIFICAR_APOS", "10"))
+
+# Sessão parada há mais que isso (s) é encerrada (QUIT)
+EMAIL_SMTP_OCIOSO = float(get_config_value("EMAIL_SMTP_OCIOSO", "60"))
+
+# Mensagens por sessão antes de renová-la (provedores limitam por conexão)
+EMAIL_SMTP_MAX_MENSAGENS = int(get_config_value("EMAIL_SMTP_MAX_MENSAGENS", "100"))
+
+# ========== LIMITE DE ENVIO E DISJUNTOR (email_system/limite_envio.py) ==========
+# Mensagens por minuto aceitas pelo provedor (Office 365: 30 por caixa; 0 desliga o limite)
+EMAIL_TAXA_POR_MINUTO = float(get_config_value("EMAIL_TAXA_POR_MINUTO", "30"))
+
+# Mensagens que podem sair de uma vez, antes de o ritmo valer
+EMAIL_TAXA_RAJADA = int(get_config_value("EMAIL_TAXA_RAJADA", "5"))
+
+# Falhas seguidas do servidor (conexão, timeout, autenticação, 4xx) que abrem o disjuntor
+EMAIL_DISJUNTOR_FALHAS = int(get_config_value("EMAIL_DISJUNTOR_FALHAS", "5"))
+
+# Segundos com o disjuntor aberto até a primeira sonda; dobra a cada sonda que falha
+EMAIL_DISJUNTOR_ESPERA = float(get_config_value("EMAIL_DISJUNTOR_ESPERA", "30"))
+EMAIL_DISJUNTOR_ESPERA_MAX = float(get_config_value("EMAIL_DISJUNTOR_ESPERA_MAX", "600"))
+
+# ========== FILA DE ENVIO (tabela fila_emails) ==========
+# Threads que enviam os e-mails da fila (envios simultâneos no máximo)
+EMAIL_WORKERS = int(get_config_value("EMAIL_WORKERS", "2"))
+
+# Tentativas por e-mail antes de ir para "falhou"; o intervalo entre elas
+# dobra a cada falha (EMAIL_RETRY_DELAY, 2x, 4x...) até EMAIL_BACKOFF_MAX, com jitter
+EMAIL_FILA_MAX_TENTATIVAS = int(get_config_value("EMAIL_FILA_MAX_TENTATIVAS", "8"))
+EMAIL_BACKOFF_MAX = int(get_config_value("EMAIL_BACKOFF_MAX", "900"))
+
+# E-mails reservados de uma vez por worker (enviados na mesma sessão SMTP)
+EMAIL_LOTE = int(get_config_value("EMAIL_LOTE", "10"))
+
+# Segundos que vale a reserva de um e-mail ('enviando'); vencida, ele volta para
+# a fila (o worker parou no meio do envio). Precisa cobrir o envio de um lote
+EMAIL_RESERVA_PRAZO = int(get_config_value("EMAIL_RESERVA_PRAZO", "900"))
+
+# Segundos entre verificações da fila quando não há aviso de e-mail novo
+EMAIL_FILA_INTERVALO = float(get_config_value("EMAIL_FILA_INTERVALO", "5"))
+
+# Dias mantidos na fila para e-mails já enviados
+EMAIL_FILA_RETENCAO_DIAS = int(get_config_value("EMAIL_FILA_RETENCAO_DIAS", "7"))
+
+# ========== RESUMOS (notificações agrupadas por destinatário) ==========
+# Segundos que as notificações de um destinatário esperam na fila para saírem
+# juntas num só e-mail de resumo, contados da primeira (0 desliga o agrupamento)
+EMAIL_RESUMO_JANELA = int(get_config_value("EMAIL_RESUMO_JANELA", "120"))
+
+# "chamado": um resumo por destinatário e chamado
+# "destinatario": um resumo por destinatário com todos os chamados
+EMAIL_RESUMO_MODO = get_config_value("EMAIL_RESUMO_MODO", "chamado")
+
+# Prioridades de chamado enviadas na hora, sem esperar a janela (separadas por vírgula)
+EMAIL_RESUMO_IMEDIATO = [p.strip() for p in get_config_value("EMAIL_RESUMO_IMEDIATO", "Urgente").split(",") if p.strip()]
+
+# ========== TEMPLATES (email_system/email_templates.py) ==========
+# Minificar o CSS e tirar a indentação do HTML dos templates (e-mails menores)
+EMAIL_MINIFICAR_HTML = str(get_config_value("EMAIL_MINIFICAR_HTML", "true")).lower() == "true"
+
 # ========== HABILITAR/DESABILITAR ENVIO ==========
 # IMPORTANTE: Defina como "true" em produção quando configurar o SMTP
 EMAIL_ENABLED = str(get_config_value("EMAIL_ENABLED", "false")).lower() == "true"
@@ -5,48 +5,41 @@ Dashboard do Sistema Helpdesk
 
 import streamlit as st
 import pandas as pd
-from database import conectar, buscar_estatisticas_usuario
-from utils import formatar_tempo, badge_status, badge_prioridade
-
-def formatar_data_br(data):
-    """Formata data para padrão brasileiro."""
-    if not data:
-        return "N/A"
-    try:
-        from datetime import datetime
-        if isinstance(data, str):
-            data = datetime.strptime(data.split('.')[0], "%Y-%m-%d %H:%M:%S")
-        return data.strftime('%d/%m/%Y %H:%M')
-    except:
-        return str(data)
+from database import (
+    conectar_relatorio,
+    snapshot_relatorio,
+    buscar_estatisticas_usuario,
+    buscar_resumo_por_empresa,
+    buscar_resumo_por_usuario,
+    buscar_ranking_tempo_atendimento
+)
+from db_cache import em_cache
+from utils import formatar_tempo, formatar_data_br, formatar_data_hora_br, badge_status, badge_prioridade
 
+@em_cache("emails_enviados", "chamados", em_erro=[])
 def buscar_emails_enviados(limite=100):
     """Busca histórico de e-mails enviados."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                e.id,
-                e.data_envio,
-                e.destinatario,
-                e.assunto,
-                e.tipo,
-                e.chamado_id,
-                e.sucesso,
-                e.erro,
-                c.usuario as usuario_chamado
-            FROM emails_enviados e
-            LEFT JOIN chamados c ON e.chamado_id = c.id
-            ORDER BY e.data_envio DESC
-            LIMIT ?
-        """, (limite,))
-        emails = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return emails
-    except Exception as e:
-        print(f"Erro ao buscar emails: {e}")
-        return []
+    conn = conectar_relatorio()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 
+            e.id,
+            e.data_envio,
+            e.destinatario,
+            e.assunto,
+            e.tipo,
+            e.chamado_id,
+            e.sucesso,
+            e.erro,
+            c.usuario as usuario_chamado
+        FROM emails_enviados e
+        LEFT JOIN chamados c ON e.chamado_id = c.id
+        ORDER BY e.data_envio_epoch DESC
+        LIMIT ?
+    """, (limite,))
+    emails = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return emails
 
 def tela_dashboard():
     """Tela de Dashboard com estatísticas."""
@@ -59,6 +52,13 @@ def tela_dashboard():
         st.error("Usuário não autenticado")
         return
     
+    # Cards e abas leem do MESMO snapshot do banco (conexão somente leitura):
+    # os números da página são de um único instante e não disputam com escritas
+    with snapshot_relatorio():
+        renderizar_dashboard(usuario, perfil)
+
+def renderizar_dashboard(usuario, perfil):
+    """Conteúdo do dashboard (executado dentro de snapshot_relatorio)."""
     # Verificar se é admin/suporte
     eh_admin = perfil in ['admin', 'suporte', 'Admin', 'Suporte', 'ADMIN', 'SUPORTE']
     
@@ -73,29 +73,8 @@ def tela_dashboard():
     col1.metric("📋 Total", estatisticas["total"])
     col2.metric("🆕 Novos", estatisticas["novos"])
     col3.metric("🔄 Em Atendimento", estatisticas["em_atendimento"])
-    
-    # Contar aguardando finalização e finalizados
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        if eh_admin:
-            cursor.execute("SELECT COUNT(*) as aguardando FROM chamados WHERE status = 'Aguardando Finalização'")
-            aguardando = cursor.fetchone()['aguardando']
-            cursor.execute("SELECT COUNT(*) as finalizados FROM chamados WHERE status = 'Finalizado'")
-            finalizados = cursor.fetchone()['finalizados']
-        else:
-            cursor.execute("SELECT COUNT(*) as aguardando FROM chamados WHERE usuario = ? AND status = 'Aguardando Finalização'", (usuario,))
-            aguardando = cursor.fetchone()['aguardando']
-            cursor.execute("SELECT COUNT(*) as finalizados FROM chamados WHERE usuario = ? AND status = 'Finalizado'", (usuario,))
-            finalizados = cursor.fetchone()['finalizados']
-        conn.close()
-        
-        col4.metric("⏳ Aguardando", aguardando)
-        col5.metric("✅ Finalizados", finalizados)
-    except Exception as e:
-        col4.metric("⏳ Aguardando", 0)
-        col5.metric("✅ Finalizados", 0)
-        print(f"Erro ao buscar contadores: {e}")
+    col4.metric("⏳ Aguardando", estatisticas["aguardando"])
+    col5.metric("✅ Finalizados", estatisticas["finalizados"])
     
     st.markdown("---")
     
@@ -117,27 +96,7 @@ def tela_dashboard():
         # ========== TAB: POR EMPRESA ==========
         with tab_empresa:
             try:
-                conn = conectar()
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    SELECT 
-                        COALESCE(u.empresa, 'Sem empresa') as empresa,
-                        COUNT(DISTINCT c.id) as total,
-                        COUNT(DISTINCT CASE WHEN c.status = 'Novo' THEN c.id END) as novos,
-                        COUNT(DISTINCT CASE WHEN c.status = 'Em atendimento' THEN c.id END) as em_atendimento,
-                        COUNT(DISTINCT CASE WHEN c.status = 'Aguardando Finalização' THEN c.id END) as aguardando,
-                        COUNT(DISTINCT CASE WHEN c.status = 'Finalizado' THEN c.id END) as finalizados,
-                        AVG(CASE WHEN c.tempo_atendimento_segundos > 0 THEN c.tempo_atendimento_segundos END) as tempo_medio
-                    FROM usuarios u
-                    LEFT JOIN chamados c ON u.usuario = c.usuario
-                    GROUP BY u.empresa
-                    HAVING total > 0
-                    ORDER BY total DESC
-                """)
-                
-                empresas = [dict(row) for row in cursor.fetchall()]
-                conn.close()
+                empresas = buscar_resumo_por_empresa()
                 
                 if empresas:
                     df_empresas = pd.DataFrame([
@@ -148,7 +107,9 @@ def tela_dashboard():
                             'Em Atend.': emp['em_atendimento'],
                             'Aguardando': emp['aguardando'],
                             'Finalizados': emp['finalizados'],
-                            'Tempo Médio': formatar_tempo(int(emp['tempo_medio'])) if emp['tempo_medio'] else 'N/A'
+                            'Tempo Total': formatar_tempo(int(emp['soma_tempo'])) if emp['soma_tempo'] else 'N/A',
+                            'Tempo Médio': formatar_tempo(int(emp['tempo_medio'])) if emp['tempo_medio'] else 'N/A',
+                            'Retornos': emp['retornos']
                         }
                         for emp in empresas
                     ])
@@ -166,26 +127,7 @@ def tela_dashboard():
         # ========== TAB: POR USUÁRIO ==========
         with tab_usuario:
             try:
-                conn = conectar()
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    SELECT 
-                        c.usuario,
-                        u.nome_completo,
-                        u.empresa,
-                        COUNT(c.id) as total,
-                        COUNT(CASE WHEN c.status = 'Novo' THEN 1 END) as novos,
-                        COUNT(CASE WHEN c.status = 'Em atendimento' THEN 1 END) as em_atendimento,
-                        COUNT(CASE WHEN c.status = 'Finalizado' THEN 1 END) as finalizados
-                    FROM chamados c
-                    LEFT JOIN usuarios u ON c.usuario = u.usuario
-                    GROUP BY c.usuario
-                    ORDER BY total DESC
-                """)
-                
-                usuarios_stats = [dict(row) for row in cursor.fetchall()]
-                conn.close()
+                usuarios_stats = buscar_resumo_por_usuario()
                 
                 if usuarios_stats:
                     df_usuarios = pd.DataFrame([
@@ -196,7 +138,10 @@ def tela_dashboard():
                             'Total': u['total'],
                             'Novos': u['novos'],
                             'Em Atend.': u['em_atendimento'],
-                            'Finalizados': u['finalizados']
+                            'Aguardando': u['aguardando'],
+                            'Finalizados': u['finalizados'],
+                            'Tempo Médio': formatar_tempo(int(u['tempo_medio'])) if u['tempo_medio'] else 'N/A',
+                            'Retornos': u['retornos']
                         }
                         for u in usuarios_stats
                     ])
@@ -211,22 +156,7 @@ def tela_dashboard():
         # ========== TAB: TEMPO DE ATENDIMENTO ==========
         with tab_tempo:
             try:
-                conn = conectar()
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    SELECT 
-                        id, assunto, usuario, atendente, status,
-                        tempo_atendimento_segundos, retornos,
-                        data_abertura, data_fim_atendimento
-                    FROM chamados
-                    WHERE tempo_atendimento_segundos > 0
-                    ORDER BY tempo_atendimento_segundos DESC
-                    LIMIT 20
-                """)
-                
-                chamados_tempo = [dict(row) for row in cursor.fetchall()]
-                conn.close()
+                chamados_tempo = buscar_ranking_tempo_atendimento(20)
                 
                 if chamados_tempo:
                     df_tempo = pd.DataFrame([
@@ -235,8 +165,8 @@ def tela_dashboard():
                             'Assunto': ch['assunto'][:30] + '...' if len(ch['assunto']) > 30 else ch['assunto'],
                             'Usuário': ch['usuario'],
                             'Atendente': ch.get('atendente') or 'N/A',
-                            'Status': ch['status'],
-                            'Tempo': formatar_tempo(ch['tempo_atendimento_segundos']),
+                            'Status': ch['status'] + (' ⏱️' if ch['status_atendimento'] == 'em_andamento' else ''),
+                            'Tempo': formatar_tempo(ch['tempo_atual']),
                             'Retornos': ch.get('retornos', 0)
                         }
                         for ch in chamados_tempo
@@ -245,7 +175,7 @@ def tela_dashboard():
                     st.dataframe(df_tempo, use_container_width=True, hide_index=True)
                     
                     # Estatísticas de tempo
-                    tempos = [ch['tempo_atendimento_segundos'] for ch in chamados_tempo if ch['tempo_atendimento_segundos']]
+                    tempos = [ch['tempo_atual'] for ch in chamados_tempo if ch['tempo_atual']]
                     if tempos:
                         col1, col2, col3 = st.columns(3)
                         col1.metric("⏱️ Tempo Médio", formatar_tempo(int(sum(tempos) / len(tempos))))
@@ -281,7 +211,7 @@ def tela_dashboard():
                 # Criar DataFrame com as colunas solicitadas
                 df_emails = pd.DataFrame([
                     {
-                        'Data': formatar_data_br(e['data_envio']),
+                        'Data': formatar_data_br(e['data_envio']) or "N/A",
                         'Hora': e['data_envio'].split(' ')[1][:8] if ' ' in str(e['data_envio']) else 'N/A',
                         'Usuário': e.get('usuario_chamado') or e['destinatario'].split('@')[0],
                         'Destinatário': e['destinatario'],
@@ -328,7 +258,7 @@ def tela_dashboard():
                 if logs:
                     df_logs = pd.DataFrame([
                         {
-                            'Data/Hora': l['data_hora'],
+                            'Data/Hora': formatar_data_hora_br(l['data_hora']),
                             'Ação': l['acao'],
                             'Usuário': l.get('usuario') or 'N/A',
                             'Detalhes': (l.get('detalhes', '')[:50] + '...') if l.get('detalhes') and len(l.get('detalhes', '')) > 50 else (l.get('detalhes') or '')
@@ -353,8 +283,8 @@ def tela_dashboard():
                 'Quantidade': [
                     estatisticas["novos"], 
                     estatisticas["em_atendimento"], 
-                    aguardando,
-                    finalizados
+                    estatisticas["aguardando"],
+                    estatisticas["finalizados"]
                 ]
             })
             
@@ -364,7 +294,7 @@ def tela_dashboard():
             st.subheader("📋 Seus Últimos Chamados")
             
             try:
-                conn = conectar()
+                conn = conectar_relatorio()
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, assunto, status, prioridade, data_abertura
@@ -13,212 +13,72 @@ TODAS as informações são persistidas aqui:
 
 import sqlite3
 import os
+import json
+import unicodedata
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from utils import hash_senha, formatar_tempo, parse_datetime_safe, agora_brasilia_str
+from utils import hash_senha, formatar_tempo, agora_brasilia, agora_brasilia_str, agora_epoch
+from db_pool import obter_pool, conectar_leitura, snapshot_leitura
+from escritor import executar_escrita, enviar_escrita
+from db_cache import em_cache, versoes_do_snapshot
+from config.db_config import (
+    BUSCA_MAX_OCORRENCIAS, BUSCA_MAX_TERMOS_PREFIXO,
+    FEED_LIMITE, FEED_RETENCAO_DIAS, FEED_PODA_INTERVALO
+)
+import auditoria
+import db_instrumentacao
+from migracoes import (
+    aplicar_migracoes, versao_schema, reconstruir_resumos_chamados,
+    reconstruir_indices_busca, SCHEMA_VERSAO
+)
 
 # ========== CONEXÃO ==========
 
 def conectar():
-    """Conecta ao banco de dados SQLite."""
-    if not os.path.exists("data"):
-        os.makedirs("data")
-    
-    conn = sqlite3.connect("data/database.db", check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("PRAGMA journal_mode = WAL")  # Melhor para concorrência
-    return conn
+    """
+    Obtém uma conexão do pool do banco de dados SQLite.
+    Os PRAGMAs já vêm aplicados; conn.close() devolve a conexão ao pool.
+    """
+    return obter_pool().obter()
+
+def conectar_relatorio():
+    """
+    Conexão somente leitura para dashboard e relatórios (mode=ro, query_only).
+    Dentro de snapshot_relatorio() é a conexão do snapshot; close() a mantém.
+    """
+    return conectar_leitura()
+
+@contextmanager
+def snapshot_relatorio():
+    """
+    Uma transação de leitura para uma tela inteira de relatórios: todas as
+    consultas com conectar_relatorio() no bloco veem o mesmo instante do banco.
+    Os logs na fila da auditoria são gravados antes, para entrar no snapshot.
+    """
+    auditoria.descarregar_logs()
+    with snapshot_leitura() as conn:
+        with versoes_do_snapshot(conn):
+            yield conn
 
 # ========== CRIAÇÃO DE TABELAS ==========
 
-def criar_tabelas():
-    """Cria TODAS as tabelas necessárias para persistência completa."""
+def criar_tabelas(forcar=False):
+    """
+    Cria/atualiza TODAS as tabelas aplicando as migrações pendentes.
+    Com forcar=True reaplica todas as migrações (reparo pelo Force Fix).
+    """
     conn = conectar()
-    cursor = conn.cursor()
     
     try:
-        # ========== TABELA DE USUÁRIOS ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario TEXT UNIQUE NOT NULL,
-                senha_hash TEXT NOT NULL,
-                salt TEXT NOT NULL,
-                perfil TEXT NOT NULL,
-                nome_completo TEXT,
-                empresa TEXT,
-                email TEXT UNIQUE,
-                data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ultimo_acesso TIMESTAMP,
-                ativo INTEGER DEFAULT 1
-            )
-        """)
-        
-        # ========== TABELA DE CHAMADOS ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS chamados (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                assunto TEXT NOT NULL,
-                prioridade TEXT NOT NULL,
-                descricao TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'Novo',
-                usuario TEXT NOT NULL,
-                data_abertura TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                atendente TEXT,
-                data_inicio_atendimento TIMESTAMP,
-                data_fim_atendimento TIMESTAMP,
-                tempo_atendimento_segundos INTEGER DEFAULT 0,
-                status_atendimento TEXT DEFAULT 'nao_iniciado',
-                ultima_retomada TIMESTAMP,
-                retornos INTEGER DEFAULT 0,
-                data_ultima_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # ========== TABELA DE ANEXOS (arquivos enviados na abertura) ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS anexos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chamado_id INTEGER NOT NULL,
-                nome_arquivo TEXT NOT NULL,
-                caminho_arquivo TEXT NOT NULL,
-                tamanho_bytes INTEGER,
-                tipo_arquivo TEXT,
-                data_upload TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # ========== TABELA DE INTERAÇÕES (conversas no chamado) ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS interacoes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chamado_id INTEGER NOT NULL,
-                autor TEXT NOT NULL,
-                mensagem TEXT NOT NULL,
-                tipo TEXT DEFAULT 'mensagem',
-                data TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                enviar_email INTEGER DEFAULT 1,
-                email_enviado INTEGER DEFAULT 0,
-                FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # ========== TABELA DE ANEXOS DE INTERAÇÃO ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS anexos_interacao (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                interacao_id INTEGER NOT NULL,
-                nome_arquivo TEXT NOT NULL,
-                caminho_arquivo TEXT NOT NULL,
-                tamanho_bytes INTEGER,
-                tipo_arquivo TEXT,
-                data_upload TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (interacao_id) REFERENCES interacoes(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # ========== TABELA DE MENSAGENS DE CONCLUSÃO ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mensagens_conclusao (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chamado_id INTEGER NOT NULL,
-                mensagem TEXT NOT NULL,
-                atendente TEXT NOT NULL,
-                data_envio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # ========== TABELA DE ANEXOS DE CONCLUSÃO ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS anexos_conclusao (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                mensagem_id INTEGER NOT NULL,
-                nome_arquivo TEXT NOT NULL,
-                caminho_arquivo TEXT NOT NULL,
-                tamanho_bytes INTEGER,
-                FOREIGN KEY (mensagem_id) REFERENCES mensagens_conclusao(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # ========== TABELA DE LOGS DO SISTEMA ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS logs_sistema (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                acao TEXT NOT NULL,
-                usuario TEXT,
-                detalhes TEXT,
-                ip_address TEXT,
-                data_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # ========== TABELA DE DOWNLOADS ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS downloads (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario TEXT NOT NULL,
-                arquivo_nome TEXT NOT NULL,
-                arquivo_caminho TEXT NOT NULL,
-                chamado_id INTEGER,
-                data_download TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE SET NULL
-            )
-        """)
-        
-        # ========== TABELA DE SESSÕES ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sessoes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario TEXT NOT NULL,
-                token TEXT UNIQUE NOT NULL,
-                data_inicio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                data_ultimo_acesso TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ip_address TEXT,
-                ativo INTEGER DEFAULT 1
-            )
-        """)
-        
-        # ========== TABELA DE EMAILS ENVIADOS ==========
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS emails_enviados (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                destinatario TEXT NOT NULL,
-                assunto TEXT NOT NULL,
-                corpo TEXT,
-                chamado_id INTEGER,
-                tipo TEXT,
-                sucesso INTEGER DEFAULT 0,
-                erro TEXT,
-                data_envio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE SET NULL
-            )
-        """)
-        
-        # ========== CRIAR ÍNDICES PARA PERFORMANCE ==========
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chamados_usuario ON chamados(usuario)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chamados_status ON chamados(status)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_interacoes_chamado ON interacoes(chamado_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_anexos_chamado ON anexos(chamado_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_usuario ON logs_sistema(usuario)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_data ON logs_sistema(data_hora)")
-        
-        # ========== CRIAR USUÁRIO ADMIN PADRÃO ==========
-        cursor.execute("SELECT COUNT(*) FROM usuarios WHERE usuario = 'admin'")
-        if cursor.fetchone()[0] == 0:
-            senha_hash, salt = hash_senha("admin123")
-            cursor.execute("""
-                INSERT INTO usuarios 
-                (usuario, senha_hash, salt, perfil, nome_completo, empresa, email, data_cadastro)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, ("admin", senha_hash, salt, "admin", "Administrador", "MP Solutions", "admin@mp.com", agora_brasilia_str()))
-        
-        conn.commit()
+        aplicadas = aplicar_migracoes(conn, forcar=forcar)
         
-        # Registrar criação das tabelas
-        registrar_log_db(cursor, "SISTEMA", "admin", "Tabelas criadas/verificadas com sucesso")
-        conn.commit()
+        if aplicadas:
+            # Registrar migrações aplicadas
+            cursor = conn.cursor()
+            versoes = ", ".join(f"v{versao} ({descricao})" for versao, descricao, _ in aplicadas)
+            registrar_log_db(cursor, "SISTEMA", "admin", f"Migrações aplicadas: {versoes}")
+            conn.commit()
         
         return True
     except Exception as e:
@@ -228,61 +88,67 @@ def criar_tabelas():
     finally:
         conn.close()
 
-def registrar_log_db(cursor, acao, usuario, detalhes=""):
-    """Registra log no banco (usar dentro de transação existente)."""
+def garantir_schema():
+    """
+    Garante que o schema está na versão atual.
+    Em regime normal custa apenas a leitura de PRAGMA user_version;
+    as migrações só rodam quando a versão do banco está desatualizada
+    (primeiro acesso, atualização do sistema ou backup antigo restaurado).
+    """
+    conn = conectar()
+    try:
+        atualizado = versao_schema(conn) >= SCHEMA_VERSAO
+    finally:
+        conn.close()
+    
+    return True if atualizado else criar_tabelas()
+
+def registrar_log_db(cursor, acao, usuario, detalhes="", ip_address=None):
+    """Registra log no banco (usar dentro de transação existente - sem commit extra)."""
     try:
-        cursor.execute("""
-            INSERT INTO logs_sistema (acao, usuario, detalhes, data_hora)
-            VALUES (?, ?, ?, ?)
-        """, (acao, usuario, detalhes, agora_brasilia_str()))
+        auditoria.registrar_log(acao, usuario, detalhes, ip_address, cursor=cursor)
     except:
         pass
 
 # ========== FUNÇÕES DE LOG ==========
 
 def registrar_log(acao, usuario, detalhes="", ip_address=None):
-    """Registra ação no log do sistema."""
+    """
+    Registra ação no log do sistema fora de uma transação.
+    O log é enfileirado e gravado em lote pelo escritor de auditoria.
+    """
     try:
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO logs_sistema (acao, usuario, detalhes, ip_address, data_hora)
-            VALUES (?, ?, ?, ?, ?)
-        """, (acao, usuario, detalhes, ip_address, agora_brasilia_str()))
-        conn.commit()
-        conn.close()
-        return True
+        return auditoria.registrar_log(acao, usuario, detalhes, ip_address)
     except:
         return False
 
 def registrar_download(usuario, arquivo_nome, arquivo_caminho, chamado_id=None):
     """Registra download de arquivo."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def gravar(cursor):
         cursor.execute("""
             INSERT INTO downloads (usuario, arquivo_nome, arquivo_caminho, chamado_id, data_download)
             VALUES (?, ?, ?, ?, ?)
         """, (usuario, arquivo_nome, arquivo_caminho, chamado_id, agora_brasilia_str()))
-        conn.commit()
-        conn.close()
-        registrar_log("DOWNLOAD", usuario, f"Baixou: {arquivo_nome}")
+        registrar_log_db(cursor, "DOWNLOAD", usuario, f"Baixou: {arquivo_nome}")
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except:
         return False
 
+def registrar_email_db(cursor, destinatario, assunto, corpo, chamado_id, tipo, sucesso, erro=None):
+    """Registra email enviado (usar dentro de transação existente)."""
+    cursor.execute("""
+        INSERT INTO emails_enviados (destinatario, assunto, corpo, chamado_id, tipo, sucesso, erro, data_envio)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (destinatario, assunto, corpo[:500] if corpo else None, chamado_id, tipo, 1 if sucesso else 0, erro, agora_brasilia_str()))
+    return True
+
 def registrar_email_enviado(destinatario, assunto, corpo, chamado_id, tipo, sucesso, erro=None):
     """Registra email enviado no banco."""
     try:
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO emails_enviados (destinatario, assunto, corpo, chamado_id, tipo, sucesso, erro, data_envio)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (destinatario, assunto, corpo[:500] if corpo else None, chamado_id, tipo, 1 if sucesso else 0, erro, agora_brasilia_str()))
-        conn.commit()
-        conn.close()
-        return True
+        return executar_escrita(registrar_email_db, destinatario, assunto, corpo, chamado_id, tipo, sucesso, erro)
     except:
         return False
 
@@ -290,37 +156,34 @@ def registrar_email_enviado(destinatario, assunto, corpo, chamado_id, tipo, suce
 
 def cadastrar_usuario_completo(usuario, senha, perfil, nome_completo, empresa, email):
     """Cadastra novo usuário."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        senha_hash, salt = hash_senha(senha)
-        
+    # Hash fora da tarefa: a thread escritora só executa SQL
+    senha_hash, salt = hash_senha(senha)
+    
+    def gravar(cursor):
         cursor.execute("""
             INSERT INTO usuarios 
             (usuario, senha_hash, salt, perfil, nome_completo, empresa, email, data_cadastro)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (usuario, senha_hash, salt, perfil, nome_completo, empresa, email, agora_brasilia_str()))
         
-        conn.commit()
-        registrar_log("CADASTRO_USUARIO", usuario, f"Novo usuário: {usuario} ({perfil})")
-        conn.close()
+        registrar_log_db(cursor, "CADASTRO_USUARIO", usuario, f"Novo usuário: {usuario} ({perfil})")
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except Exception as e:
         print(f"Erro ao cadastrar usuário: {e}")
         return False
 
+@em_cache("usuarios", "usuarios_acesso", em_erro=[])
 def listar_usuarios():
     """Lista todos os usuários."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM usuarios ORDER BY usuario")
-        usuarios = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return usuarios
-    except:
-        return []
+    conn = conectar()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM usuarios ORDER BY usuario")
+    usuarios = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return usuarios
 
 def buscar_usuario_por_id(user_id):
     """Busca usuário por ID."""
@@ -348,56 +211,71 @@ def buscar_usuario_por_nome(usuario):
 
 def atualizar_usuario(user_id, dados):
     """Atualiza dados de usuário."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def gravar(cursor):
         cursor.execute("""
             UPDATE usuarios
             SET nome_completo = ?, empresa = ?, email = ?, perfil = ?
             WHERE id = ?
         """, (dados['nome_completo'], dados['empresa'], dados['email'], dados['perfil'], user_id))
-        conn.commit()
-        registrar_log("ATUALIZAR_USUARIO", dados.get('usuario', 'admin'), f"Usuário ID {user_id} atualizado")
-        conn.close()
+        registrar_log_db(cursor, "ATUALIZAR_USUARIO", dados.get('usuario', 'admin'), f"Usuário ID {user_id} atualizado")
+        return True
+    
+    try:
+        return executar_escrita(gravar)
+    except:
+        return False
+
+def atualizar_senha_usuario(user_id, nova_senha):
+    """Troca a senha de um usuário."""
+    senha_hash, salt = hash_senha(nova_senha)
+    
+    def gravar(cursor):
+        cursor.execute("""
+            UPDATE usuarios
+            SET senha_hash = ?, salt = ?
+            WHERE id = ?
+        """, (senha_hash, salt, user_id))
+        registrar_log_db(cursor, "ALTERAR_SENHA", "admin", f"Senha do usuário ID {user_id} alterada")
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except:
         return False
 
 def excluir_usuario(user_id):
     """Desativa usuário (não exclui para manter histórico)."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def gravar(cursor):
         cursor.execute("UPDATE usuarios SET ativo = 0 WHERE id = ?", (user_id,))
-        conn.commit()
-        registrar_log("DESATIVAR_USUARIO", "admin", f"Usuário ID {user_id} desativado")
-        conn.close()
+        registrar_log_db(cursor, "DESATIVAR_USUARIO", "admin", f"Usuário ID {user_id} desativado")
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except:
         return False
 
 def atualizar_ultimo_acesso(usuario):
     """Atualiza último acesso do usuário."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def gravar(cursor):
         cursor.execute("""
             UPDATE usuarios SET ultimo_acesso = ? WHERE usuario = ?
         """, (agora_brasilia_str(), usuario))
-        conn.commit()
-        conn.close()
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except:
         return False
 
 # ========== CHAMADOS ==========
 
-def criar_chamado(assunto, prioridade, descricao, usuario):
-    """Cria novo chamado."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
+def criar_chamado(assunto, prioridade, descricao, usuario, notificar=None):
+    """
+    Cria novo chamado.
+    notificar(cursor, chamado_id) roda na mesma transação (e-mails para a fila).
+    """
+    def gravar(cursor):
         agora = agora_brasilia_str()
         
         cursor.execute("""
@@ -407,40 +285,309 @@ def criar_chamado(assunto, prioridade, descricao, usuario):
         """, (assunto, prioridade, descricao, usuario, agora, agora))
         
         chamado_id = cursor.lastrowid
-        conn.commit()
+        registrar_log_db(cursor, "NOVO_CHAMADO", usuario, f"Chamado #{chamado_id} criado: {assunto}")
         
-        registrar_log("NOVO_CHAMADO", usuario, f"Chamado #{chamado_id} criado: {assunto}")
-        conn.close()
+        if notificar:
+            notificar(cursor, chamado_id)
         
         return chamado_id
+    
+    try:
+        return executar_escrita(gravar)
     except Exception as e:
         print(f"Erro ao criar chamado: {e}")
         return None
 
-def buscar_chamados(usuario, perfil):
-    """Busca chamados baseado no perfil."""
+# Colunas da listagem (sem a descrição, carregada só nos detalhes)
+COLUNAS_LISTA_CHAMADOS = """
+    id, assunto, prioridade, status, usuario, data_abertura, atendente,
+    data_inicio_atendimento, data_fim_atendimento, tempo_atendimento_segundos,
+    status_atendimento, ultima_retomada, retornos, data_ultima_atualizacao,
+    data_ultima_atualizacao_epoch
+"""
+
+# Ordenações disponíveis: chave -> (coluna, direção). O desempate é sempre pelo id.
+ORDENACOES_CHAMADOS = {
+    "recentes": ("id", "DESC"),
+    "antigos": ("id", "ASC"),
+    "atualizacao": ("data_ultima_atualizacao_epoch", "DESC"),
+}
+
+def escapar_like(texto):
+    """Escapa curingas do LIKE (usar com ESCAPE '\\')."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def montar_filtros_chamados(usuario, perfil, status=None, prioridade=None, filtro_usuario=None):
+    """Monta a cláusula WHERE (e parâmetros) dos filtros da lista de chamados."""
+    condicoes = []
+    params = []
+    
+    if perfil != "admin":
+        condicoes.append("usuario = ?")
+        params.append(usuario)
+    
+    if status:
+        condicoes.append("status = ?")
+        params.append(status)
+    
+    if prioridade:
+        condicoes.append("prioridade = ?")
+        params.append(prioridade)
+    
+    if filtro_usuario:
+        # Casa primeiro na tabela de usuários (pequena) e usa o índice de chamados.usuario
+        condicoes.append("usuario IN (SELECT usuario FROM usuarios WHERE usuario LIKE ? ESCAPE '\\')")
+        params.append(f"%{escapar_like(filtro_usuario.strip())}%")
+    
+    where = ("WHERE " + " AND ".join(condicoes)) if condicoes else ""
+    return where, params
+
+def montar_pagina_chamados(where, params, ordenacao="recentes", cursor_pagina=None, limite=50):
+    """
+    Monta o SELECT de uma página da lista de chamados (paginação por chave).
+    Retorna (sql, params, coluna_ordenacao); o primeiro parâmetro é o 'agora'
+    do cronômetro.
+    """
+    coluna, direcao = ORDENACOES_CHAMADOS.get(ordenacao, ORDENACOES_CHAMADOS["recentes"])
+    comparador = "<" if direcao == "DESC" else ">"
+    
+    condicao_cursor = ""
+    params_pagina = list(params)
+    if cursor_pagina:
+        if coluna == "id":
+            condicao_cursor = f"id {comparador} ?"
+            params_pagina.append(cursor_pagina[-1])
+        else:
+            condicao_cursor = f"({coluna}, id) {comparador} (?, ?)"
+            params_pagina.extend(cursor_pagina)
+        condicao_cursor = (" AND " if where else "WHERE ") + condicao_cursor
+    
+    ordem = "id " + direcao if coluna == "id" else f"{coluna} {direcao}, id {direcao}"
+    
+    sql = f"""
+        SELECT {COLUNAS_LISTA_CHAMADOS}, {SQL_TEMPO_ATUAL} as tempo_atual
+        FROM chamados
+        {where}{condicao_cursor}
+        ORDER BY {ordem}
+        LIMIT ?
+    """
+    return sql, [agora_epoch()] + params_pagina + [limite + 1], coluna
+
+def ajustar_tempo_atual(chamados, segundos):
+    """
+    Resultado vindo do cache: soma ao tempo_atual dos cronômetros em andamento
+    os segundos decorridos desde o cálculo.
+    """
+    if segundos > 0:
+        for chamado in chamados:
+            if chamado.get('status_atendimento') == 'em_andamento':
+                chamado['tempo_atual'] = (chamado.get('tempo_atual') or 0) + segundos
+    return chamados
+
+def ajustar_pagina_chamados(pagina, segundos):
+    """ajustar_tempo_atual para o resultado de buscar_chamados."""
+    ajustar_tempo_atual(pagina['chamados'], segundos)
+    return pagina
+
+@em_cache("chamados", "usuarios", ajustar=ajustar_pagina_chamados, em_erro={"chamados": [], "total": 0, "proximo_cursor": None})
+def buscar_chamados(usuario, perfil, status=None, prioridade=None, filtro_usuario=None,
+                    ordenacao="recentes", cursor_pagina=None, limite=50):
+    """
+    Busca uma página de chamados com filtros e ordenação feitos no SQL.
+    
+    Paginação por chave (keyset): passe em cursor_pagina o 'proximo_cursor'
+    da página anterior. O custo de cada página não depende da posição nem
+    do tamanho da tabela.
+    
+    Retorna {'chamados': [...], 'total': int, 'proximo_cursor': tuple ou None}.
+    """
+    conn = conectar()
+    cursor = conn.cursor()
+    
+    where, params = montar_filtros_chamados(usuario, perfil, status, prioridade, filtro_usuario)
+    
+    cursor.execute(f"SELECT COUNT(*) as total FROM chamados {where}", params)
+    total = cursor.fetchone()['total']
+    
+    sql, params_pagina, coluna = montar_pagina_chamados(where, params, ordenacao, cursor_pagina, limite)
+    cursor.execute(sql, params_pagina)
+    
+    chamados = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    
+    # Uma linha a mais indica que existe próxima página
+    proximo_cursor = None
+    if len(chamados) > limite:
+        chamados = chamados[:limite]
+        ultimo = chamados[-1]
+        proximo_cursor = (ultimo['id'],) if coluna == "id" else (ultimo[coluna], ultimo['id'])
+    
+    return {"chamados": chamados, "total": total, "proximo_cursor": proximo_cursor}
+
+# ========== BUSCA DE TEXTO ==========
+
+# Trecho do resultado por origem: (tabela FTS, rótulo)
+ORIGENS_BUSCA = {
+    "chamado": "busca_chamados",
+    "interacao": "busca_interacoes",
+    "conclusao": "busca_conclusoes",
+}
+
+# Ocorrências nos três índices, agrupadas por chamado (a de menor bm25 vence:
+# no SQLite as colunas soltas de um MIN() vêm da mesma linha do mínimo).
+# Cada índice contribui com no máximo BUSCA_MAX_OCORRENCIAS ocorrências, as
+# mais recentes (ORDER BY rowid DESC é lido em ordem pelo FTS5, sem ranquear
+# todas). O assunto pesa mais que a descrição.
+SQL_BUSCA_TEXTO = """
+    WITH ocorrencias AS (
+        SELECT * FROM (
+            SELECT rowid as chamado_id, bm25(busca_chamados, 3.0, 1.0) as relevancia,
+                   'chamado' as origem, rowid as fonte_id
+            FROM busca_chamados WHERE busca_chamados MATCH ?
+            ORDER BY rowid DESC LIMIT ?
+        )
+        UNION ALL
+        SELECT i.chamado_id, f.rank, 'interacao', f.rowid
+        FROM (
+            SELECT rowid, rank FROM busca_interacoes WHERE busca_interacoes MATCH ?
+            ORDER BY rowid DESC LIMIT ?
+        ) f CROSS JOIN interacoes i ON i.id = f.rowid
+        UNION ALL
+        SELECT m.chamado_id, f.rank, 'conclusao', f.rowid
+        FROM (
+            SELECT rowid, rank FROM busca_conclusoes WHERE busca_conclusoes MATCH ?
+            ORDER BY rowid DESC LIMIT ?
+        ) f CROSS JOIN mensagens_conclusao m ON m.id = f.rowid
+    ),
+    melhores AS (
+        SELECT chamado_id, MIN(relevancia) as relevancia, origem, fonte_id
+        FROM ocorrencias
+        GROUP BY chamado_id
+    )
+"""
+
+def normalizar_termo(termo):
+    """Minúsculas e sem acentos, como o tokenizador dos índices de busca."""
+    decomposto = unicodedata.normalize("NFKD", termo.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+def termos_com_prefixo(cursor, prefixo):
+    """Termos dos índices de busca que começam com o prefixo (os mais frequentes primeiro)."""
+    inicio = normalizar_termo(prefixo)
+    vocabularios = " UNION ALL ".join(
+        f"SELECT term, doc FROM {tabela_fts}_vocab WHERE term >= ? AND term < ?"
+        for tabela_fts in ORIGENS_BUSCA.values()
+    )
+    cursor.execute(f"""
+        SELECT term FROM ({vocabularios})
+        GROUP BY term
+        ORDER BY SUM(doc) DESC
+        LIMIT ?
+    """, [inicio, inicio + "\uffff"] * len(ORIGENS_BUSCA) + [BUSCA_MAX_TERMOS_PREFIXO])
+    return [row['term'] for row in cursor.fetchall()]
+
+def montar_consulta_fts(texto, expandir_prefixo=None):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira
+    um termo entre aspas (sem operadores) e todas precisam aparecer.
+    Palavra terminada em * casa pelo início (ex: certif*). Com expandir_prefixo
+    (prefixo -> termos), o prefixo vira um OR dos termos existentes, bem mais
+    barato para o FTS5 do que a consulta por prefixo.
+    Retorna None se não houver palavras.
+    """
+    partes = []
+    for palavra in (texto or "").split():
+        prefixo = palavra.endswith("*")
+        palavra = palavra.replace('"', '').replace("*", "")
+        if not palavra:
+            continue
+        
+        if prefixo and expandir_prefixo:
+            termos = expandir_prefixo(palavra)
+            partes.append("(" + " OR ".join(f'"{termo}"' for termo in termos) + ")" if termos else f'"{palavra}"')
+        elif prefixo:
+            partes.append(f'"{palavra}"*')
+        else:
+            partes.append(f'"{palavra}"')
+    
+    return " AND ".join(partes) or None
+
+def montar_busca_texto(consulta, where, params, limite=50):
+    """Monta o SELECT da busca de texto com os filtros da lista. Retorna (sql, params)."""
+    sql = f"""
+        {SQL_BUSCA_TEXTO}
+        SELECT {COLUNAS_LISTA_CHAMADOS}, {SQL_TEMPO_ATUAL} as tempo_atual,
+               b.relevancia, b.origem, b.fonte_id,
+               COUNT(*) OVER () as total_busca,
+               (SELECT MAX(qtd) FROM (
+                   SELECT COUNT(*) as qtd FROM ocorrencias GROUP BY origem
+               )) >= ? as limitado
+        FROM melhores b
+        CROSS JOIN chamados ON chamados.id = b.chamado_id
+        {where}
+        ORDER BY b.relevancia, id DESC
+        LIMIT ?
+    """
+    por_indice = [consulta, BUSCA_MAX_OCORRENCIAS]
+    return sql, por_indice * 3 + [agora_epoch(), BUSCA_MAX_OCORRENCIAS] + list(params) + [limite]
+
+def buscar_texto_chamados(texto, usuario, perfil, status=None, prioridade=None,
+                          filtro_usuario=None, limite=50):
+    """
+    Busca de texto em assunto, descrição, interações e mensagens de conclusão,
+    combinada com os mesmos filtros da lista de chamados, em uma consulta.
+    
+    Retorna {'chamados': [...], 'total': int, 'limitado': bool}, ordenados por
+    relevância; cada chamado traz 'relevancia', 'origem' e 'trecho' (com os
+    termos em negrito). 'limitado' indica que o termo é tão comum que só as
+    ocorrências mais recentes foram consideradas (total é um mínimo).
+    """
+    if not montar_consulta_fts(texto):
+        return {"chamados": [], "total": 0, "limitado": False}
+    
     try:
         conn = conectar()
         cursor = conn.cursor()
         
-        if perfil == "admin":
-            cursor.execute("SELECT * FROM chamados ORDER BY id DESC")
-        else:
-            cursor.execute("SELECT * FROM chamados WHERE usuario = ? ORDER BY id DESC", (usuario,))
+        consulta = montar_consulta_fts(texto, lambda prefixo: termos_com_prefixo(cursor, prefixo))
+        where, params = montar_filtros_chamados(usuario, perfil, status, prioridade, filtro_usuario)
+        
+        cursor.execute(*montar_busca_texto(consulta, where, params, limite))
         
         chamados = [dict(row) for row in cursor.fetchall()]
+        total = chamados[0]['total_busca'] if chamados else 0
+        limitado = any(ch['limitado'] for ch in chamados[:1])
+        
+        # Trechos só das linhas exibidas (snippet é caro para todas as ocorrências)
+        for origem, tabela_fts in ORIGENS_BUSCA.items():
+            fontes = [ch['fonte_id'] for ch in chamados if ch['origem'] == origem]
+            if not fontes:
+                continue
+            cursor.execute(f"""
+                SELECT rowid, snippet({tabela_fts}, -1, '**', '**', '…', 16) as trecho
+                FROM {tabela_fts}
+                WHERE {tabela_fts} MATCH ? AND rowid IN (SELECT value FROM json_each(?))
+            """, (consulta, json.dumps(fontes)))
+            trechos = {row['rowid']: row['trecho'] for row in cursor.fetchall()}
+            for ch in chamados:
+                if ch['origem'] == origem:
+                    ch['trecho'] = trechos.get(ch['fonte_id'], "")
+        
         conn.close()
-        return chamados
+        return {"chamados": chamados, "total": total, "limitado": limitado}
     except Exception as e:
-        print(f"Erro buscar chamados: {e}")
-        return []
+        print(f"Erro na busca de texto: {e}")
+        return {"chamados": [], "total": 0, "limitado": False}
 
 def buscar_chamado_por_id(chamado_id):
     """Busca chamado por ID."""
     try:
         conn = conectar()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM chamados WHERE id = ?", (chamado_id,))
+        cursor.execute(f"""
+            SELECT *, {SQL_TEMPO_ATUAL} as tempo_atual
+            FROM chamados WHERE id = ?
+        """, (agora_epoch(), chamado_id))
         chamado = cursor.fetchone()
         conn.close()
         return dict(chamado) if chamado else None
@@ -461,372 +608,436 @@ def buscar_descricao_chamado(chamado_id):
 
 def atualizar_status_chamado(chamado_id, novo_status):
     """Atualiza status do chamado."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def gravar(cursor):
         cursor.execute("""
             UPDATE chamados 
             SET status = ?, data_ultima_atualizacao = ?
             WHERE id = ?
         """, (novo_status, agora_brasilia_str(), chamado_id))
-        conn.commit()
-        registrar_log("ATUALIZAR_STATUS", "sistema", f"Chamado #{chamado_id} -> {novo_status}")
-        conn.close()
+        registrar_log_db(cursor, "ATUALIZAR_STATUS", "sistema", f"Chamado #{chamado_id} -> {novo_status}")
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except:
         return False
 
-# ========== ATENDIMENTO ==========
+# ========== MÁQUINA DE ESTADOS DO CHAMADO ==========
 
-def iniciar_atendimento_admin(chamado_id, atendente):
-    """Admin inicia atendimento."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        agora = agora_brasilia_str()
-        
-        cursor.execute("""
-            UPDATE chamados
-            SET status = 'Em atendimento',
-                atendente = ?,
-                data_inicio_atendimento = ?,
-                status_atendimento = 'em_andamento',
-                ultima_retomada = ?,
-                tempo_atendimento_segundos = 0,
-                data_ultima_atualizacao = ?
-            WHERE id = ? AND status = 'Novo'
-        """, (atendente, agora, agora, agora, chamado_id))
-        
-        if cursor.rowcount > 0:
-            conn.commit()
-            registrar_log("INICIAR_ATENDIMENTO", atendente, f"Chamado #{chamado_id}")
-            conn.close()
-            return True, "✅ Atendimento iniciado!"
-        else:
-            conn.close()
-            return False, "❌ Erro ao iniciar"
-    except Exception as e:
-        return False, f"Erro: {e}"
+# Segundos desde a última retomada (0 quando o cronômetro está parado).
+# {agora} é o parâmetro com o instante atual em epoch (":agora_epoch" ou "?"):
+# subtração de inteiros com a coluna gerada ultima_retomada_epoch.
+SQL_TEMPO_DECORRIDO = """COALESCE(CASE
+    WHEN status_atendimento = 'em_andamento' AND ultima_retomada_epoch IS NOT NULL
+    THEN MAX(0, {agora} - ultima_retomada_epoch)
+END, 0)"""
 
-def pausar_atendimento(chamado_id):
-    """Pausa o cronômetro."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT tempo_atendimento_segundos, ultima_retomada
-            FROM chamados
-            WHERE id = ? AND status_atendimento = 'em_andamento'
-        """, (chamado_id,))
+# Tempo de atendimento "ao vivo" como coluna calculada (consome UM parâmetro ? com agora_epoch())
+SQL_TEMPO_ATUAL = f"(COALESCE(tempo_atendimento_segundos, 0) + {SQL_TEMPO_DECORRIDO.format(agora='?')})"
+
+SQL_ACUMULAR_TEMPO = f"tempo_atendimento_segundos = COALESCE(tempo_atendimento_segundos, 0) + {SQL_TEMPO_DECORRIDO.format(agora=':agora_epoch')}"
+
+# Transições declaradas do ciclo de vida do chamado:
+#   de        - status de origem aceitos (guarda do UPDATE)
+#   para      - novo status (None mantém o atual)
+#   condicao  - guarda adicional no WHERE
+#   so_dono   - só o dono do chamado (:usuario) pode executar
+#   set       - colunas alteradas (podem usar :agora, :ator e o tempo decorrido)
+#   log       - ação registrada em logs_sistema (log_sufixo completa o texto,
+#               com_tempo inclui o tempo acumulado)
+#   erro      - mensagem quando a guarda não é satisfeita
+TRANSICOES_CHAMADO = {
+    "iniciar": {
+        "de": ("Novo",),
+        "para": "Em atendimento",
+        "set": """atendente = :ator,
+                  data_inicio_atendimento = :agora,
+                  status_atendimento = 'em_andamento',
+                  ultima_retomada = :agora,
+                  tempo_atendimento_segundos = 0""",
+        "log": "INICIAR_ATENDIMENTO",
+        "erro": "❌ Erro ao iniciar",
+    },
+    "pausar": {
+        "de": ("Em atendimento",),
+        "para": None,
+        "condicao": "status_atendimento = 'em_andamento'",
+        "set": f"""{SQL_ACUMULAR_TEMPO},
+                   status_atendimento = 'pausado',
+                   ultima_retomada = NULL""",
+        "log": "PAUSAR_ATENDIMENTO",
+        "com_tempo": True,
+        "erro": "Não está em andamento",
+    },
+    "retomar": {
+        "de": ("Em atendimento",),
+        "para": None,
+        "condicao": "status_atendimento = 'pausado'",
+        "set": """status_atendimento = 'em_andamento',
+                  ultima_retomada = :agora""",
+        "log": "RETOMAR_ATENDIMENTO",
+        "erro": "Não está pausado",
+    },
+    "concluir": {
+        "de": ("Em atendimento",),
+        "para": "Aguardando Finalização",
+        "set": f"""{SQL_ACUMULAR_TEMPO},
+                   data_fim_atendimento = :agora,
+                   status_atendimento = 'concluido',
+                   ultima_retomada = NULL""",
+        "log": "CONCLUIR_ATENDIMENTO",
+        "com_tempo": True,
+        "erro": "Não está em atendimento",
+    },
+    "devolver": {
+        # Aguardando o cliente o cronômetro fica pausado (o tempo já corrido é acumulado)
+        "de": ("Em atendimento",),
+        "para": "Aguardando Cliente",
+        "set": f"""{SQL_ACUMULAR_TEMPO},
+                   status_atendimento = 'pausado',
+                   ultima_retomada = NULL""",
+        "log": "RETORNO_ADMIN",
+        "log_sufixo": " retornado ao cliente",
+        "erro": "❌ O chamado não está em atendimento",
+    },
+    "retomar_aguardando": {
+        "de": ("Aguardando Cliente",),
+        "para": "Em atendimento",
+        "set": f"""{SQL_ACUMULAR_TEMPO},
+                   status_atendimento = 'em_andamento',
+                   ultima_retomada = :agora""",
+        "log": "RETOMAR_ATENDIMENTO",
+        "erro": "❌ O chamado não está aguardando o cliente",
+    },
+    "cliente_concluir": {
+        "de": ("Em atendimento", "Aguardando Cliente", "Aguardando Finalização"),
+        "para": "Concluído",
+        "so_dono": True,
+        "set": f"""{SQL_ACUMULAR_TEMPO},
+                   data_fim_atendimento = :agora,
+                   status_atendimento = 'concluido',
+                   ultima_retomada = NULL""",
+        "log": "CLIENTE_CONCLUIR",
+        "erro": "Erro",
+    },
+    "finalizar": {
+        "de": ("Aguardando Finalização",),
+        "para": "Finalizado",
+        "so_dono": True,
+        "log": "FINALIZAR_CHAMADO",
+        "log_sufixo": " finalizado pelo cliente",
+        "erro": "❌ Não foi possível finalizar",
+    },
+    "retornar": {
+        "de": ("Aguardando Finalização",),
+        "para": "Em atendimento",
+        "so_dono": True,
+        "set": """status_atendimento = 'em_andamento',
+                  ultima_retomada = :agora,
+                  retornos = COALESCE(retornos, 0) + 1""",
+        "log": "RETORNAR_CHAMADO",
+        "log_sufixo": " retornado",
+        "erro": "❌ Não foi possível retornar",
+    },
+}
+
+def montar_sql_transicao(transicao):
+    """Monta o UPDATE ... RETURNING de uma transição. Retorna (sql, parametros_fixos)."""
+    parametros = {}
+    
+    origens = []
+    for i, status in enumerate(transicao['de']):
+        parametros[f"de_{i}"] = status
+        origens.append(f":de_{i}")
+    
+    sets = []
+    if transicao.get('para'):
+        parametros['para'] = transicao['para']
+        sets.append("status = :para")
+    if transicao.get('set'):
+        sets.append(transicao['set'])
+    sets.append("data_ultima_atualizacao = :agora")
+    
+    condicoes = ["id = :id", f"status IN ({', '.join(origens)})"]
+    if transicao.get('condicao'):
+        condicoes.append(f"({transicao['condicao']})")
+    if transicao.get('so_dono'):
+        condicoes.append("usuario = :usuario")
+    
+    sql = f"""
+        UPDATE chamados
+        SET {', '.join(sets)}
+        WHERE {' AND '.join(condicoes)}
+        RETURNING *
+    """
+    return sql, parametros
+
+def executar_transicao(chamado_id, acao, ator=None, usuario=None, efeitos=None, notificar=None):
+    """
+    Executa uma transição do chamado em UMA transação:
+    UPDATE ... WHERE status IN (...) RETURNING * (guarda e cronômetro no próprio SQL),
+    efeitos (interações, conclusão) e log.
+    
+    efeitos(cursor, chamado, agora) roda dentro da transação com a linha já atualizada;
+    notificar(cursor, chamado) em seguida, com chamado['efeitos'] (e-mails para a fila).
+    Cliques simultâneos no mesmo chamado não geram atualização perdida: só o primeiro
+    UPDATE encontra o status de origem; os demais recebem a mensagem de erro.
+    
+    Retorna (True, chamado_atualizado) ou (False, mensagem).
+    """
+    transicao = TRANSICOES_CHAMADO.get(acao)
+    if not transicao:
+        return False, f"Transição desconhecida: {acao}"
+    
+    sql, parametros = montar_sql_transicao(transicao)
+    instante = agora_brasilia()
+    agora = instante.strftime("%Y-%m-%d %H:%M:%S")
+    parametros.update({
+        "id": chamado_id, "agora": agora, "agora_epoch": int(instante.timestamp()),
+        "ator": ator, "usuario": usuario
+    })
+    
+    def gravar(cursor):
+        cursor.execute(sql, parametros)
+        linhas = cursor.fetchall()
         
-        dados = cursor.fetchone()
+        if not linhas:
+            return False, transicao['erro']
         
-        if not dados:
-            conn.close()
-            return False, "Não está em andamento"
+        chamado = dict(linhas[0])
         
-        tempo_atual = dados['tempo_atendimento_segundos'] or 0
+        if efeitos:
+            chamado['efeitos'] = efeitos(cursor, chamado, agora)
         
-        if dados['ultima_retomada']:
-            ultima_retomada = parse_datetime_safe(dados['ultima_retomada'])
-            if ultima_retomada:
-                from utils import agora_brasilia
-                tempo_decorrido = int((agora_brasilia().replace(tzinfo=None) - ultima_retomada).total_seconds())
-                tempo_atual += tempo_decorrido
+        if notificar:
+            notificar(cursor, chamado)
         
-        cursor.execute("""
-            UPDATE chamados
-            SET status_atendimento = 'pausado',
-                tempo_atendimento_segundos = ?,
-                ultima_retomada = NULL,
-                data_ultima_atualizacao = ?
-            WHERE id = ?
-        """, (tempo_atual, agora_brasilia_str(), chamado_id))
+        detalhes = f"Chamado #{chamado_id}{transicao.get('log_sufixo', '')}"
+        if transicao.get('com_tempo'):
+            detalhes += f" - Tempo: {formatar_tempo(chamado['tempo_atendimento_segundos'] or 0)}"
+        registrar_log_db(cursor, transicao['log'], ator or chamado.get('atendente') or "sistema", detalhes)
         
-        conn.commit()
-        registrar_log("PAUSAR_ATENDIMENTO", "admin", f"Chamado #{chamado_id} - Tempo: {formatar_tempo(tempo_atual)}")
-        conn.close()
-        return True, f"⏸️ Pausado. Tempo: {formatar_tempo(tempo_atual)}"
+        return True, chamado
+    
+    try:
+        return executar_escrita(gravar)
     except Exception as e:
         return False, f"Erro: {e}"
 
-def retomar_atendimento(chamado_id):
-    """Retoma o cronômetro."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        agora = agora_brasilia_str()
-        
+def inserir_interacao(cursor, chamado_id, autor, mensagem, tipo, agora, arquivos=None):
+    """Insere interação (e anexos) na transação do chamador. Retorna o id da interação."""
+    cursor.execute("""
+        INSERT INTO interacoes (chamado_id, autor, mensagem, tipo, data, enviar_email)
+        VALUES (?, ?, ?, ?, ?, 1)
+    """, (chamado_id, autor, mensagem, tipo, agora))
+    
+    interacao_id = cursor.lastrowid
+    
+    for arquivo_info in arquivos or []:
         cursor.execute("""
-            UPDATE chamados
-            SET status_atendimento = 'em_andamento',
-                ultima_retomada = ?,
-                data_ultima_atualizacao = ?
-            WHERE id = ? AND status_atendimento = 'pausado'
-        """, (agora, agora, chamado_id))
-        
-        if cursor.rowcount > 0:
-            conn.commit()
-            registrar_log("RETOMAR_ATENDIMENTO", "admin", f"Chamado #{chamado_id}")
-            conn.close()
-            return True, "▶️ Retomado!"
-        else:
-            conn.close()
-            return False, "Não está pausado"
-    except Exception as e:
-        return False, f"Erro: {e}"
+            INSERT INTO anexos_interacao (interacao_id, nome_arquivo, caminho_arquivo, tamanho_bytes, data_upload)
+            VALUES (?, ?, ?, ?, ?)
+        """, (interacao_id, arquivo_info['nome'], arquivo_info['caminho'], arquivo_info.get('tamanho', 0), agora))
+    
+    return interacao_id
+
+# ========== ATENDIMENTO ==========
+
+def iniciar_atendimento_admin(chamado_id, atendente, notificar=None):
+    """Admin inicia atendimento (registra a interação de início na mesma transação)."""
+    def efeitos(cursor, chamado, agora):
+        return inserir_interacao(cursor, chamado_id, 'atendente', f"Atendimento iniciado por {atendente}", 'inicio', agora)
+    
+    sucesso, resultado = executar_transicao(chamado_id, "iniciar", atendente, efeitos=efeitos, notificar=notificar)
+    if not sucesso:
+        return False, resultado
+    return True, "✅ Atendimento iniciado!"
+
+def pausar_atendimento(chamado_id, atendente="admin"):
+    """Pausa o cronômetro (tempo acumulado calculado no UPDATE)."""
+    sucesso, resultado = executar_transicao(chamado_id, "pausar", atendente)
+    if not sucesso:
+        return False, resultado
+    return True, f"⏸️ Pausado. Tempo: {formatar_tempo(resultado['tempo_atendimento_segundos'] or 0)}"
+
+def retomar_atendimento(chamado_id, atendente="admin"):
+    """Retoma o cronômetro."""
+    sucesso, resultado = executar_transicao(chamado_id, "retomar", atendente)
+    if not sucesso:
+        return False, resultado
+    return True, "▶️ Retomado!"
 
-def concluir_atendimento_admin(chamado_id, mensagem_conclusao=None, arquivos_conclusao=None):
+def retomar_atendimento_aguardando(chamado_id, atendente):
+    """Volta para atendimento um chamado que estava aguardando o cliente."""
+    sucesso, resultado = executar_transicao(chamado_id, "retomar_aguardando", atendente)
+    if not sucesso:
+        return False, resultado
+    return True, "▶️ Atendimento retomado!"
+
+def concluir_atendimento_admin(chamado_id, mensagem_conclusao=None, arquivos_conclusao=None, notificar=None):
     """Admin conclui o atendimento com mensagem opcional."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def efeitos(cursor, chamado, agora):
+        if not mensagem_conclusao:
+            return None
         
         cursor.execute("""
-            SELECT tempo_atendimento_segundos, ultima_retomada, status_atendimento, atendente
-            FROM chamados
-            WHERE id = ? AND status = 'Em atendimento'
-        """, (chamado_id,))
-        
-        dados = cursor.fetchone()
-        
-        if not dados:
-            conn.close()
-            return False, "Não está em atendimento"
-        
-        tempo_final = dados['tempo_atendimento_segundos'] or 0
-        
-        if dados['status_atendimento'] == 'em_andamento' and dados['ultima_retomada']:
-            ultima_retomada = parse_datetime_safe(dados['ultima_retomada'])
-            if ultima_retomada:
-                from utils import agora_brasilia
-                tempo_decorrido = int((agora_brasilia().replace(tzinfo=None) - ultima_retomada).total_seconds())
-                tempo_final += tempo_decorrido
-        
-        agora = agora_brasilia_str()
+            INSERT INTO mensagens_conclusao (chamado_id, mensagem, atendente, data_envio)
+            VALUES (?, ?, ?, ?)
+        """, (chamado_id, mensagem_conclusao, chamado['atendente'], agora))
         
-        cursor.execute("""
-            UPDATE chamados
-            SET status = 'Aguardando Finalização',
-                data_fim_atendimento = ?,
-                tempo_atendimento_segundos = ?,
-                status_atendimento = 'concluido',
-                data_ultima_atualizacao = ?
-            WHERE id = ?
-        """, (agora, tempo_final, agora, chamado_id))
+        mensagem_id = cursor.lastrowid
         
-        if mensagem_conclusao:
+        for arquivo_info in arquivos_conclusao or []:
             cursor.execute("""
-                INSERT INTO mensagens_conclusao (chamado_id, mensagem, atendente, data_envio)
-                VALUES (?, ?, ?, ?)
-            """, (chamado_id, mensagem_conclusao, dados['atendente'], agora))
-            
-            mensagem_id = cursor.lastrowid
-            
-            if arquivos_conclusao:
-                for arquivo_info in arquivos_conclusao:
-                    cursor.execute("""
-                        INSERT INTO anexos_conclusao (mensagem_id, nome_arquivo, caminho_arquivo)
-                        VALUES (?, ?, ?)
-                    """, (mensagem_id, arquivo_info['nome'], arquivo_info['caminho']))
-        
-        conn.commit()
-        registrar_log("CONCLUIR_ATENDIMENTO", dados['atendente'], f"Chamado #{chamado_id} - Tempo: {formatar_tempo(tempo_final)}")
-        conn.close()
+                INSERT INTO anexos_conclusao (mensagem_id, nome_arquivo, caminho_arquivo)
+                VALUES (?, ?, ?)
+            """, (mensagem_id, arquivo_info['nome'], arquivo_info['caminho']))
         
-        return True, f"✅ Atendimento concluído! Tempo: {formatar_tempo(tempo_final)}"
-    except Exception as e:
-        return False, f"Erro: {e}"
+        return mensagem_id
+    
+    sucesso, resultado = executar_transicao(chamado_id, "concluir", efeitos=efeitos, notificar=notificar)
+    if not sucesso:
+        return False, resultado
+    return True, f"✅ Atendimento concluído! Tempo: {formatar_tempo(resultado['tempo_atendimento_segundos'] or 0)}"
 
 def cliente_concluir_chamado(chamado_id, usuario):
     """Cliente marca como concluído."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        agora = agora_brasilia_str()
-        
-        cursor.execute("""
-            UPDATE chamados
-            SET status = 'Concluído',
-                data_fim_atendimento = ?,
-                data_ultima_atualizacao = ?
-            WHERE id = ? AND usuario = ?
-        """, (agora, agora, chamado_id, usuario))
-        
-        if cursor.rowcount > 0:
-            conn.commit()
-            registrar_log("CLIENTE_CONCLUIR", usuario, f"Chamado #{chamado_id}")
-            conn.close()
-            return True, "✅ Marcado como concluído!"
-        else:
-            conn.close()
-            return False, "Erro"
-    except Exception as e:
-        return False, f"Erro: {e}"
+    sucesso, resultado = executar_transicao(chamado_id, "cliente_concluir", usuario, usuario=usuario)
+    if not sucesso:
+        return False, resultado
+    return True, "✅ Marcado como concluído!"
 
-def finalizar_chamado_cliente(chamado_id, usuario):
+def finalizar_chamado_cliente(chamado_id, usuario, notificar=None):
     """Cliente finaliza definitivamente o chamado."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        agora = agora_brasilia_str()
-        
-        cursor.execute("""
-            UPDATE chamados
-            SET status = 'Finalizado',
-                data_ultima_atualizacao = ?
-            WHERE id = ? AND usuario = ? AND status = 'Aguardando Finalização'
-        """, (agora, chamado_id, usuario))
-        
-        if cursor.rowcount > 0:
-            conn.commit()
-            registrar_log("FINALIZAR_CHAMADO", usuario, f"Chamado #{chamado_id} finalizado pelo cliente")
-            conn.close()
-            return True, "✅ Chamado finalizado com sucesso!"
-        else:
-            conn.close()
-            return False, "❌ Não foi possível finalizar"
-    except Exception as e:
-        return False, f"Erro: {e}"
+    sucesso, resultado = executar_transicao(chamado_id, "finalizar", usuario, usuario=usuario, notificar=notificar)
+    if not sucesso:
+        return False, resultado
+    return True, "✅ Chamado finalizado com sucesso!"
 
-def retornar_chamado(chamado_id, usuario, mensagem_retorno):
+def retornar_chamado(chamado_id, usuario, mensagem_retorno, notificar=None):
     """Cliente retorna chamado para atendimento."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        agora = agora_brasilia_str()
-        
-        # Incrementar contador de retornos
-        cursor.execute("""
-            UPDATE chamados
-            SET status = 'Em atendimento',
-                status_atendimento = 'em_andamento',
-                ultima_retomada = ?,
-                retornos = retornos + 1,
-                data_ultima_atualizacao = ?
-            WHERE id = ? AND usuario = ? AND status = 'Aguardando Finalização'
-        """, (agora, agora, chamado_id, usuario))
-        
-        if cursor.rowcount > 0:
-            # Registrar interação de retorno
-            cursor.execute("""
-                INSERT INTO interacoes (chamado_id, autor, mensagem, tipo, data)
-                VALUES (?, 'cliente', ?, 'retorno', ?)
-            """, (chamado_id, mensagem_retorno, agora))
-            
-            conn.commit()
-            registrar_log("RETORNAR_CHAMADO", usuario, f"Chamado #{chamado_id} retornado")
-            conn.close()
-            return True, "🔄 Chamado retornado para atendimento!"
-        else:
-            conn.close()
-            return False, "❌ Não foi possível retornar"
-    except Exception as e:
-        return False, f"Erro: {e}"
+    def efeitos(cursor, chamado, agora):
+        return inserir_interacao(cursor, chamado_id, 'cliente', mensagem_retorno, 'retorno', agora)
+    
+    sucesso, resultado = executar_transicao(chamado_id, "retornar", usuario, usuario=usuario, efeitos=efeitos, notificar=notificar)
+    if not sucesso:
+        return False, resultado
+    return True, "🔄 Chamado retornado para atendimento!"
 
-def retornar_chamado_admin(chamado_id, atendente, mensagem_retorno, arquivos=None):
+def retornar_chamado_admin(chamado_id, atendente, mensagem_retorno, arquivos=None, notificar=None):
     """Admin retorna chamado para o cliente com anexos opcionais."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        agora = agora_brasilia_str()
-        
-        cursor.execute("""
-            UPDATE chamados
-            SET status = 'Aguardando Cliente',
-                data_ultima_atualizacao = ?
-            WHERE id = ?
-        """, (agora, chamado_id))
-        
-        # Registrar interação
-        cursor.execute("""
-            INSERT INTO interacoes (chamado_id, autor, mensagem, tipo, data, enviar_email)
-            VALUES (?, 'atendente', ?, 'retorno_admin', ?, 1)
-        """, (chamado_id, mensagem_retorno, agora))
-        
-        interacao_id = cursor.lastrowid
-        
-        # Salvar anexos se houver
-        if arquivos:
-            for arquivo_info in arquivos:
-                cursor.execute("""
-                    INSERT INTO anexos_interacao (interacao_id, nome_arquivo, caminho_arquivo, tamanho_bytes, data_upload)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (interacao_id, arquivo_info['nome'], arquivo_info['caminho'], arquivo_info.get('tamanho', 0), agora))
-        
-        conn.commit()
-        registrar_log("RETORNO_ADMIN", atendente, f"Chamado #{chamado_id} retornado ao cliente")
-        conn.close()
-        
-        return True, "✅ Chamado retornado ao cliente!"
-    except Exception as e:
-        return False, f"Erro: {e}"
+    def efeitos(cursor, chamado, agora):
+        return inserir_interacao(cursor, chamado_id, 'atendente', mensagem_retorno, 'retorno_admin', agora, arquivos)
+    
+    sucesso, resultado = executar_transicao(chamado_id, "devolver", atendente, efeitos=efeitos, notificar=notificar)
+    if not sucesso:
+        return False, resultado
+    return True, "✅ Chamado retornado ao cliente!"
+
+def calcular_tempo_atendimento(chamado):
+    """
+    Tempo atual de atendimento de uma linha já carregada.
+    Usa a coluna calculada tempo_atual (buscar_chamados / buscar_chamado_por_id);
+    linhas sem ela são calculadas em Python.
+    """
+    if 'tempo_atual' in chamado.keys():
+        return chamado['tempo_atual'] or 0
+    
+    tempo_atual = chamado['tempo_atendimento_segundos'] or 0
+    
+    if chamado['status_atendimento'] == 'em_andamento' and chamado['ultima_retomada_epoch']:
+        tempo_atual += max(0, agora_epoch() - chamado['ultima_retomada_epoch'])
+    
+    return tempo_atual
 
 def obter_tempo_atendimento(chamado_id):
-    """Obtém tempo atual de atendimento."""
+    """Obtém tempo atual de atendimento (calculado no SQL)."""
     try:
         conn = conectar()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT tempo_atendimento_segundos, ultima_retomada, status_atendimento
+        cursor.execute(f"""
+            SELECT {SQL_TEMPO_ATUAL} as tempo_atual
             FROM chamados
             WHERE id = ?
-        """, (chamado_id,))
+        """, (agora_epoch(), chamado_id))
         
         dados = cursor.fetchone()
         conn.close()
         
-        if not dados:
-            return 0
-        
-        tempo_atual = dados['tempo_atendimento_segundos'] or 0
-        
-        if dados['status_atendimento'] == 'em_andamento' and dados['ultima_retomada']:
-            ultima_retomada = parse_datetime_safe(dados['ultima_retomada'])
-            if ultima_retomada:
-                from utils import agora_brasilia
-                tempo_decorrido = int((agora_brasilia().replace(tzinfo=None) - ultima_retomada).total_seconds())
-                tempo_atual += tempo_decorrido
-        
-        return tempo_atual
+        return dados['tempo_atual'] if dados else 0
     except:
         return 0
 
+def ajustar_ranking(chamados, segundos):
+    """ajustar_tempo_atual e reordena (o ranking é pelo tempo atual)."""
+    ajustar_tempo_atual(chamados, segundos)
+    chamados.sort(key=lambda ch: ch['tempo_atual'] or 0, reverse=True)
+    return chamados
+
+@em_cache("chamados", ajustar=ajustar_ranking, em_erro=[])
+def buscar_ranking_tempo_atendimento(limite=20):
+    """
+    Chamados com maior tempo de atendimento, incluindo os que estão com o
+    cronômetro rodando (tempo calculado no SQL).
+    Como o tempo atual nunca é menor que o acumulado, os candidatos são os
+    N maiores acumulados mais os em andamento - ambos lidos por índice.
+    """
+    conn = conectar_relatorio()
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        SELECT 
+            id, assunto, usuario, atendente, status, status_atendimento,
+            tempo_atendimento_segundos, retornos,
+            data_abertura, data_fim_atendimento,
+            {SQL_TEMPO_ATUAL} as tempo_atual
+        FROM chamados
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id FROM chamados
+                WHERE tempo_atendimento_segundos > 0
+                ORDER BY tempo_atendimento_segundos DESC
+                LIMIT ?
+            )
+            UNION
+            SELECT id FROM chamados WHERE status_atendimento = 'em_andamento'
+        )
+        AND tempo_atual > 0
+        ORDER BY tempo_atual DESC
+        LIMIT ?
+    """, (agora_epoch(), limite, limite))
+    
+    chamados = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return chamados
+
 # ========== INTERAÇÕES ==========
 
-def adicionar_interacao_chamado(chamado_id, autor, mensagem, tipo='mensagem'):
-    """Adiciona interação ao chamado."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
+def adicionar_interacao_chamado(chamado_id, autor, mensagem, tipo='mensagem', notificar=None):
+    """
+    Adiciona interação ao chamado.
+    notificar(cursor, interacao_id) roda na mesma transação (e-mails para a fila).
+    """
+    def gravar(cursor):
         agora = agora_brasilia_str()
         
-        cursor.execute("""
-            INSERT INTO interacoes (chamado_id, autor, mensagem, tipo, data, enviar_email)
-            VALUES (?, ?, ?, ?, ?, 1)
-        """, (chamado_id, autor, mensagem, tipo, agora))
-        
-        interacao_id = cursor.lastrowid
+        interacao_id = inserir_interacao(cursor, chamado_id, autor, mensagem, tipo, agora)
         
         # Atualizar data do chamado
         cursor.execute("""
             UPDATE chamados SET data_ultima_atualizacao = ? WHERE id = ?
         """, (agora, chamado_id))
         
-        conn.commit()
-        registrar_log("NOVA_INTERACAO", autor, f"Chamado #{chamado_id}")
-        conn.close()
+        registrar_log_db(cursor, "NOVA_INTERACAO", autor, f"Chamado #{chamado_id}")
+        
+        if notificar:
+            notificar(cursor, interacao_id)
         
         return True, interacao_id
+    
+    try:
+        return executar_escrita(gravar)
     except Exception as e:
         return False, f"Erro: {e}"
 
@@ -838,7 +1049,7 @@ def buscar_interacoes_chamado(chamado_id):
         cursor.execute("""
             SELECT * FROM interacoes 
             WHERE chamado_id = ? 
-            ORDER BY data ASC
+            ORDER BY data_epoch ASC, id ASC
         """, (chamado_id,))
         interacoes = [dict(row) for row in cursor.fetchall()]
         conn.close()
@@ -865,17 +1076,16 @@ def buscar_anexos_interacao(interacao_id):
 
 def salvar_anexo(chamado_id, nome_arquivo, caminho_arquivo, tamanho=None, tipo=None):
     """Salva anexo no banco."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def gravar(cursor):
         cursor.execute("""
             INSERT INTO anexos (chamado_id, nome_arquivo, caminho_arquivo, tamanho_bytes, tipo_arquivo, data_upload)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (chamado_id, nome_arquivo, caminho_arquivo, tamanho, tipo, agora_brasilia_str()))
-        conn.commit()
-        registrar_log("ANEXO_ADICIONADO", "sistema", f"Chamado #{chamado_id}: {nome_arquivo}")
-        conn.close()
+        registrar_log_db(cursor, "ANEXO_ADICIONADO", "sistema", f"Chamado #{chamado_id}: {nome_arquivo}")
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except:
         return False
 
@@ -893,9 +1103,7 @@ def buscar_anexos(chamado_id):
 
 def excluir_anexo(anexo_id):
     """Exclui um anexo."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
+    def gravar(cursor):
         cursor.execute("SELECT caminho_arquivo FROM anexos WHERE id = ?", (anexo_id,))
         resultado = cursor.fetchone()
         
@@ -903,10 +1111,11 @@ def excluir_anexo(anexo_id):
             os.remove(resultado['caminho_arquivo'])
         
         cursor.execute("DELETE FROM anexos WHERE id = ?", (anexo_id,))
-        conn.commit()
-        registrar_log("ANEXO_EXCLUIDO", "admin", f"Anexo ID {anexo_id}")
-        conn.close()
+        registrar_log_db(cursor, "ANEXO_EXCLUIDO", "admin", f"Anexo ID {anexo_id}")
         return True
+    
+    try:
+        return executar_escrita(gravar)
     except:
         return False
 
@@ -918,13 +1127,15 @@ def buscar_mensagem_conclusao(chamado_id):
         conn = conectar()
         cursor = conn.cursor()
         
+        # Mais recente pelo índice (chamado_id, data_envio_epoch, id); arquivos só dela
         cursor.execute("""
-            SELECT m.*, GROUP_CONCAT(a.nome_arquivo) as arquivos
+            SELECT m.*,
+                   (SELECT GROUP_CONCAT(a.nome_arquivo)
+                    FROM anexos_conclusao a
+                    WHERE a.mensagem_id = m.id) as arquivos
             FROM mensagens_conclusao m
-            LEFT JOIN anexos_conclusao a ON m.id = a.mensagem_id
             WHERE m.chamado_id = ?
-            GROUP BY m.id
-            ORDER BY m.data_envio DESC
+            ORDER BY m.data_envio_epoch DESC, m.id DESC
             LIMIT 1
         """, (chamado_id,))
         
@@ -935,70 +1146,662 @@ def buscar_mensagem_conclusao(chamado_id):
     except:
         return None
 
-# ========== ESTATÍSTICAS ==========
+# ========== FEED DE ALTERAÇÕES ==========
 
-def buscar_estatisticas_usuario(usuario, perfil):
-    """Busca estatísticas."""
+# Último seq gravado (AUTOINCREMENT: vale mesmo com o feed podado) e o mais antigo mantido
+SQL_LIMITES_FEED = """
+    SELECT (SELECT seq FROM sqlite_sequence WHERE name = 'feed_alteracoes') as ultimo,
+           (SELECT MIN(seq) FROM feed_alteracoes) as primeiro
+"""
+
+COLUNAS_FEED = "seq, entidade, entidade_id, chamado_id, tipo, data_epoch"
+
+_ultima_poda_feed = 0.0
+
+def ultimo_seq_alteracoes():
+    """Seq da alteração mais recente (ponto de partida de buscar_alteracoes)."""
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+        cursor.execute(SQL_LIMITES_FEED)
+        ultimo = cursor.fetchone()['ultimo']
+        conn.close()
+        return ultimo or 0
+    except:
+        return 0
+
+def buscar_alteracoes(desde_seq, usuario, perfil, limite=FEED_LIMITE):
+    """
+    Alterações em chamados, interações e anexos com seq > desde_seq, em ordem.
+    Mesmo escopo da lista: perfil "admin" vê todas, os demais só as dos
+    próprios chamados. Sem novidades, o custo é uma leitura de sqlite_sequence.
+    
+    Retorna {'seq': int, 'alteracoes': [...], 'chamados': set de ids, 'recarregar': bool}.
+    Passe 'seq' na próxima chamada. recarregar=True indica alterações que não
+    podem ser lidas (já podadas do feed ou acima do limite): recarregue tudo.
+    """
+    resultado = {"seq": desde_seq, "alteracoes": [], "chamados": set(), "recarregar": False}
+    podar_feed_periodicamente()
+    
     try:
         conn = conectar()
         cursor = conn.cursor()
         
-        if perfil == "admin":
-            cursor.execute("SELECT COUNT(*) as total FROM chamados")
-            total = cursor.fetchone()['total']
-            cursor.execute("SELECT COUNT(*) as novos FROM chamados WHERE status = 'Novo'")
-            novos = cursor.fetchone()['novos']
-            cursor.execute("SELECT COUNT(*) as em_atendimento FROM chamados WHERE status = 'Em atendimento'")
-            em_atendimento = cursor.fetchone()['em_atendimento']
-            cursor.execute("SELECT COUNT(*) as concluidos FROM chamados WHERE status = 'Finalizado'")
-            concluidos = cursor.fetchone()['concluidos']
+        cursor.execute(SQL_LIMITES_FEED)
+        limites = cursor.fetchone()
+        ultimo = limites['ultimo'] or 0
+        
+        if ultimo <= desde_seq:
+            conn.close()
+            return resultado
+        
+        # Lidas só até 'ultimo': alterações gravadas depois ficam para a próxima chamada
+        if perfil != "admin":
+            cursor.execute(f"""
+                SELECT {COLUNAS_FEED} FROM feed_alteracoes
+                WHERE usuario = ? AND seq > ? AND seq <= ?
+                ORDER BY seq
+                LIMIT ?
+            """, (usuario, desde_seq, ultimo, limite + 1))
         else:
-            cursor.execute("SELECT COUNT(*) as total FROM chamados WHERE usuario = ?", (usuario,))
-            total = cursor.fetchone()['total']
-            cursor.execute("SELECT COUNT(*) as novos FROM chamados WHERE usuario = ? AND status = 'Novo'", (usuario,))
-            novos = cursor.fetchone()['novos']
-            cursor.execute("SELECT COUNT(*) as em_atendimento FROM chamados WHERE usuario = ? AND status = 'Em atendimento'", (usuario,))
-            em_atendimento = cursor.fetchone()['em_atendimento']
-            cursor.execute("SELECT COUNT(*) as concluidos FROM chamados WHERE usuario = ? AND status = 'Finalizado'", (usuario,))
-            concluidos = cursor.fetchone()['concluidos']
+            cursor.execute(f"""
+                SELECT {COLUNAS_FEED} FROM feed_alteracoes
+                WHERE seq > ? AND seq <= ?
+                ORDER BY seq
+                LIMIT ?
+            """, (desde_seq, ultimo, limite + 1))
         
+        alteracoes = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return {
-            "total": total,
-            "novos": novos,
-            "em_atendimento": em_atendimento,
-            "concluidos": concluidos
-        }
-    except:
-        return {"total": 0, "novos": 0, "em_atendimento": 0, "concluidos": 0}
+        # seq não tem lacunas: se o primeiro mantido passou de desde_seq + 1, houve poda
+        podadas = limites['primeiro'] is None or limites['primeiro'] > desde_seq + 1
+        
+        resultado["seq"] = ultimo
+        resultado["recarregar"] = podadas or len(alteracoes) > limite
+        resultado["alteracoes"] = alteracoes[:limite]
+        resultado["chamados"] = {a['chamado_id'] for a in resultado["alteracoes"]}
+        return resultado
+    except Exception as e:
+        print(f"Erro ao buscar alterações: {e}")
+        return resultado
 
-def buscar_logs_sistema(limite=100, usuario=None):
-    """Busca logs do sistema."""
+def podar_feed_db(cursor, dias):
+    """Remove do feed as alterações com mais de N dias (dentro de uma escrita)."""
+    # seq cresce com o tempo: apaga a faixa inicial, até a primeira alteração recente
+    cursor.execute("""
+        DELETE FROM feed_alteracoes WHERE seq < COALESCE(
+            (SELECT seq FROM feed_alteracoes WHERE data_epoch >= ? ORDER BY seq LIMIT 1),
+            (SELECT MAX(seq) + 1 FROM feed_alteracoes)
+        )
+    """, (agora_epoch() - dias * 86400,))
+    return cursor.rowcount
+
+def podar_feed_alteracoes(dias=FEED_RETENCAO_DIAS):
+    """Remove do feed as alterações com mais de N dias. Retorna a quantidade."""
+    try:
+        return executar_escrita(podar_feed_db, dias)
+    except Exception as e:
+        print(f"Erro ao podar feed: {e}")
+        return 0
+
+def podar_feed_periodicamente():
+    """Agenda a poda do feed, sem aguardar, no máximo uma vez por FEED_PODA_INTERVALO."""
+    global _ultima_poda_feed
+    
+    agora = time.monotonic()
+    if _ultima_poda_feed and agora - _ultima_poda_feed < FEED_PODA_INTERVALO:
+        return
+    _ultima_poda_feed = agora
+    
+    try:
+        enviar_escrita(podar_feed_db, FEED_RETENCAO_DIAS)
+    except Exception as e:
+        print(f"Erro ao agendar poda do feed: {e}")
+
+# ========== FILA DE E-MAILS ==========
+
+def inserir_email_fila(cursor, destinatario, assunto, corpo, chamado_id=None, tipo=None, interacao_id=None,
+                       grupo=None, janela=0, resumo=None, agora=None):
+    """
+    Grava um e-mail na fila, na transação do chamador. Retorna o id.
+    
+    Com grupo e janela, o e-mail espera até o fim da janela aberta pelo
+    primeiro pendente do grupo (os que chegarem até lá saem no mesmo resumo).
+    Com grupo e sem janela (urgente), sai na hora e antecipa os pendentes do grupo.
+    agora: instante de referência em epoch (padrão: o atual).
+    """
+    agora = agora_epoch() if agora is None else agora
+    proxima = agora
+    
+    if grupo is not None and janela:
+        cursor.execute("""
+            SELECT MIN(proxima_tentativa_epoch) FROM fila_emails
+            WHERE grupo = ? AND status = 'pendente'
+        """, (grupo,))
+        aberta = cursor.fetchone()[0]
+        proxima = min(aberta, agora + janela) if aberta is not None else agora + janela
+    elif grupo is not None:
+        cursor.execute("""
+            UPDATE fila_emails SET proxima_tentativa_epoch = ?
+            WHERE grupo = ? AND status = 'pendente' AND proxima_tentativa_epoch > ?
+        """, (agora, grupo, agora))
+    
+    cursor.execute("""
+        INSERT INTO fila_emails
+        (destinatario, assunto, corpo, chamado_id, interacao_id, tipo, grupo, resumo, proxima_tentativa_epoch, data_criacao)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (destinatario, assunto, corpo, chamado_id, interacao_id, tipo, grupo, resumo, proxima, agora_brasilia_str()))
+    return cursor.lastrowid
+
+def proximo_envio_fila():
+    """Epoch do próximo e-mail pendente (None com a fila vazia). Só leitura, pelo índice."""
     try:
         conn = conectar()
         cursor = conn.cursor()
         
-        if usuario:
-            cursor.execute("""
-                SELECT * FROM logs_sistema 
-                WHERE usuario = ?
-                ORDER BY data_hora DESC 
+        cursor.execute("SELECT MIN(proxima_tentativa_epoch) FROM fila_emails WHERE status = 'pendente'")
+        proximo = cursor.fetchone()[0]
+        
+        conn.close()
+        return proximo
+    except Exception as e:
+        print(f"Erro ao consultar fila de e-mails: {e}")
+        return None
+
+def reservar_emails_fila(limite=1, agora=None, dono=None):
+    """
+    Passa para 'enviando' até N pendentes vencidos (os mais antigos) e os retorna.
+    Leva junto os demais pendentes dos grupos reservados, mesmo antes do fim da
+    janela: o resumo já vai sair, e eles entram nele.
+    Roda no escritor: dois workers nunca reservam o mesmo e-mail.
+    A reserva guarda o instante e o dono (processo), para liberar_emails_presos.
+    """
+    def gravar(cursor):
+        instante = agora_epoch() if agora is None else agora
+        
+        cursor.execute("""
+            UPDATE fila_emails
+            SET status = 'enviando', tentativas = tentativas + 1, reservado_em = ?, reservado_por = ?
+            WHERE id IN (
+                SELECT id FROM fila_emails
+                WHERE status = 'pendente' AND proxima_tentativa_epoch <= ?
+                ORDER BY proxima_tentativa_epoch
                 LIMIT ?
-            """, (usuario, limite))
-        else:
+            )
+            RETURNING *
+        """, (instante, dono, instante, limite))
+        emails = [dict(row) for row in cursor.fetchall()]
+        
+        grupos = {email['grupo'] for email in emails if email['grupo'] is not None}
+        if grupos:
             cursor.execute("""
-                SELECT * FROM logs_sistema 
-                ORDER BY data_hora DESC 
-                LIMIT ?
-            """, (limite,))
+                UPDATE fila_emails
+                SET status = 'enviando', tentativas = tentativas + 1, reservado_em = ?, reservado_por = ?
+                WHERE status = 'pendente' AND grupo IN (SELECT value FROM json_each(?))
+                RETURNING *
+            """, (instante, dono, json.dumps(sorted(grupos))))
+            emails.extend(dict(row) for row in cursor.fetchall())
+        
+        return sorted(emails, key=lambda email: email['id'])
+    
+    return executar_escrita(gravar)
+
+def concluir_email_fila(email, sucesso, erro=None, proxima_tentativa_epoch=None, adiar=False):
+    """
+    Grava o resultado de uma tentativa de envio:
+    - sucesso: 'enviado', marca interacoes.email_enviado e registra em emails_enviados;
+    - com proxima_tentativa_epoch: volta para 'pendente' até esse instante
+      (com adiar=True, sem gastar a tentativa: o envio nem chegou a ser feito
+      ou o servidor estava fora);
+    - senão: 'falhou' (registrada em emails_enviados).
+    Num resumo, email['membros'] traz os e-mails da fila que ele junta: todos
+    recebem o mesmo resultado e emails_enviados registra o resumo uma vez.
+    Retorna o novo status.
+    """
+    if sucesso:
+        status = 'enviado'
+    elif proxima_tentativa_epoch is not None:
+        status = 'pendente'
+    else:
+        status = 'falhou'
+    
+    membros = email.get('membros') or [email]
+    ids_json = json.dumps([membro['id'] for membro in membros])
+    interacoes_json = json.dumps([membro['interacao_id'] for membro in membros if membro.get('interacao_id')])
+    
+    def gravar(cursor):
+        agora = agora_brasilia_str()
+        
+        # Enviados guardam o instante do envio em proxima_tentativa_epoch (usado na poda)
+        cursor.execute("""
+            UPDATE fila_emails
+            SET status = ?, ultimo_erro = ?, proxima_tentativa_epoch = ?, data_envio = ?,
+                tentativas = tentativas - ?
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (status, erro, proxima_tentativa_epoch or agora_epoch(), agora if sucesso else None,
+              1 if adiar else 0, ids_json))
+        
+        if sucesso and interacoes_json != '[]':
+            cursor.execute("""
+                UPDATE interacoes SET email_enviado = 1
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (interacoes_json,))
+        
+        if status != 'pendente':
+            registrar_email_db(cursor, email['destinatario'], email['assunto'], email['corpo'],
+                               email['chamado_id'], email['tipo'], sucesso, erro)
+        return status
+    
+    return executar_escrita(gravar)
+
+def liberar_emails_presos(prazo):
+    """
+    Volta para 'pendente' os e-mails 'enviando' reservados há mais de prazo
+    segundos: o worker que os reservou (deste ou de outro processo) parou no
+    meio do envio. Reservas dentro do prazo são de workers vivos e ficam.
+    """
+    def gravar(cursor):
+        cursor.execute("""
+            UPDATE fila_emails SET status = 'pendente', reservado_em = NULL, reservado_por = NULL
+            WHERE status = 'enviando' AND COALESCE(reservado_em, 0) < ?
+        """, (agora_epoch() - prazo,))
+        return cursor.rowcount
+    
+    try:
+        return executar_escrita(gravar)
+    except Exception as e:
+        print(f"Erro ao liberar e-mails da fila: {e}")
+        return 0
+
+def podar_fila_emails_db(cursor, dias):
+    """Remove da fila os e-mails enviados há mais de N dias (faixa no índice de status)."""
+    cursor.execute("""
+        DELETE FROM fila_emails
+        WHERE status = 'enviado' AND proxima_tentativa_epoch < ?
+    """, (agora_epoch() - dias * 86400,))
+    return cursor.rowcount
+
+def contar_fila_emails():
+    """Quantidade de e-mails por status e idade (segundos) do pendente mais antigo."""
+    contagem = {"pendente": 0, "enviando": 0, "enviado": 0, "falhou": 0, "idade_pendente": 0}
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT status, COUNT(*) FROM fila_emails GROUP BY status")
+        for status, quantidade in cursor.fetchall():
+            contagem[status] = quantidade
+        
+        cursor.execute("SELECT MIN(data_criacao_epoch) FROM fila_emails WHERE status = 'pendente'")
+        mais_antigo = cursor.fetchone()[0]
+        if mais_antigo:
+            contagem["idade_pendente"] = max(0, agora_epoch() - mais_antigo)
         
-        logs = [dict(row) for row in cursor.fetchall()]
         conn.close()
-        return logs
+    except Exception as e:
+        print(f"Erro ao contar fila de e-mails: {e}")
+    return contagem
+
+def buscar_emails_falhos(limite=50):
+    """E-mails que esgotaram as tentativas, mais recentes primeiro."""
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, destinatario, assunto, chamado_id, tipo, tentativas, ultimo_erro, data_criacao
+            FROM fila_emails
+            WHERE status = 'falhou'
+            ORDER BY proxima_tentativa_epoch DESC
+            LIMIT ?
+        """, (limite,))
+        
+        emails = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return emails
     except:
         return []
 
+def reenfileirar_emails_falhos():
+    """Devolve para a fila os e-mails que falharam (ex: depois de corrigir o SMTP). Retorna a quantidade."""
+    def gravar(cursor):
+        cursor.execute("""
+            UPDATE fila_emails
+            SET status = 'pendente', tentativas = 0, proxima_tentativa_epoch = ?
+            WHERE status = 'falhou'
+        """, (agora_epoch(),))
+        return cursor.rowcount
+    
+    try:
+        return executar_escrita(gravar)
+    except Exception as e:
+        print(f"Erro ao reenfileirar e-mails: {e}")
+        return 0
+
+# ========== CONSULTAS LENTAS ==========
+
+def buscar_consultas_lentas(limite=100):
+    """Consultas lentas mais recentes gravadas pela instrumentação (as da fila também entram)."""
+    db_instrumentacao.descarregar_consultas_lentas()
+    try:
+        conn = conectar_relatorio()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, impressao, sql, duracao_ms, linhas, chamador, data_hora
+            FROM consultas_lentas
+            ORDER BY data_hora_epoch DESC, id DESC
+            LIMIT ?
+        """, (limite,))
+        
+        consultas = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return consultas
+    except Exception as e:
+        print(f"Erro ao buscar consultas lentas: {e}")
+        return []
+
+def limpar_consultas_lentas():
+    """Apaga o registro de consultas lentas. Retorna a quantidade removida."""
+    def gravar(cursor):
+        cursor.execute("DELETE FROM consultas_lentas")
+        return cursor.rowcount
+    
+    try:
+        db_instrumentacao.descarregar_consultas_lentas()
+        return executar_escrita(gravar)
+    except Exception as e:
+        print(f"Erro ao limpar consultas lentas: {e}")
+        return 0
+
+# ========== CARGA EM LOTE ==========
+
+def carregar_detalhes_chamados(chamado_ids):
+    """
+    Carrega de uma vez os detalhes de uma página de chamados:
+    descrição, interações (com seus anexos), anexos e mensagem de conclusão.
+    
+    Usa sempre 5 consultas, independente da quantidade de chamados
+    (os IDs vão como um único parâmetro JSON, sem limite de variáveis).
+    
+    Retorna {chamado_id: {'descricao', 'interacoes', 'anexos', 'mensagem_conclusao'}},
+    onde cada interação traz a lista 'anexos'.
+    """
+    ids = [int(chamado_id) for chamado_id in chamado_ids]
+    if not ids:
+        return {}
+    
+    detalhes = {
+        chamado_id: {'descricao': "", 'interacoes': [], 'anexos': [], 'mensagem_conclusao': None}
+        for chamado_id in ids
+    }
+    
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+        ids_json = json.dumps(ids)
+        
+        # Descrições
+        cursor.execute("""
+            SELECT id, descricao FROM chamados
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (ids_json,))
+        for row in cursor.fetchall():
+            detalhes[row['id']]['descricao'] = row['descricao']
+        
+        # Interações
+        interacoes_por_id = {}
+        cursor.execute("""
+            SELECT * FROM interacoes
+            WHERE chamado_id IN (SELECT value FROM json_each(?))
+            ORDER BY chamado_id, data_epoch ASC, id ASC
+        """, (ids_json,))
+        for row in cursor.fetchall():
+            interacao = dict(row)
+            interacao['anexos'] = []
+            interacoes_por_id[interacao['id']] = interacao
+            detalhes[interacao['chamado_id']]['interacoes'].append(interacao)
+        
+        # Anexos das interações
+        cursor.execute("""
+            SELECT ai.*
+            FROM anexos_interacao ai
+            JOIN interacoes i ON i.id = ai.interacao_id
+            WHERE i.chamado_id IN (SELECT value FROM json_each(?))
+            ORDER BY ai.id
+        """, (ids_json,))
+        for row in cursor.fetchall():
+            interacao = interacoes_por_id.get(row['interacao_id'])
+            if interacao is not None:
+                interacao['anexos'].append(dict(row))
+        
+        # Anexos do chamado
+        cursor.execute("""
+            SELECT * FROM anexos
+            WHERE chamado_id IN (SELECT value FROM json_each(?))
+            ORDER BY id
+        """, (ids_json,))
+        for row in cursor.fetchall():
+            detalhes[row['chamado_id']]['anexos'].append(dict(row))
+        
+        # Última mensagem de conclusão de cada chamado
+        cursor.execute("""
+            SELECT m.id, m.chamado_id, m.mensagem, m.atendente, m.data_envio,
+                   (SELECT GROUP_CONCAT(a.nome_arquivo)
+                    FROM anexos_conclusao a
+                    WHERE a.mensagem_id = m.id) as arquivos
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY chamado_id ORDER BY data_envio_epoch DESC, id DESC
+                ) as ordem
+                FROM mensagens_conclusao
+                WHERE chamado_id IN (SELECT value FROM json_each(?))
+            ) m
+            WHERE m.ordem = 1
+        """, (ids_json,))
+        for row in cursor.fetchall():
+            detalhes[row['chamado_id']]['mensagem_conclusao'] = dict(row)
+        
+        conn.close()
+        return detalhes
+    except Exception as e:
+        print(f"Erro ao carregar detalhes dos chamados: {e}")
+        return detalhes
+
+# ========== ESTATÍSTICAS ==========
+
+@em_cache("chamados", em_erro={"total": 0, "por_status": {}})
+def buscar_contadores_status(usuario=None, usar_contadores=True):
+    """
+    Quantidade de chamados por status em UMA consulta (todos ou de um usuário).
+    usar_contadores=True lê resumo_chamados_usuario (mantida por triggers),
+    com custo independente do tamanho de chamados; False agrupa em chamados
+    pelo índice de cobertura (usuario, status).
+    Retorna {'total': n, 'por_status': {status: n}}
+    """
+    conn = conectar_relatorio()
+    cursor = conn.cursor()
+    
+    if usar_contadores:
+        sql = "SELECT status, SUM(total) as qtd FROM resumo_chamados_usuario"
+    else:
+        sql = "SELECT status, COUNT(*) as qtd FROM chamados"
+    
+    if usuario:
+        cursor.execute(f"{sql} WHERE usuario = ? GROUP BY status", (usuario,))
+    else:
+        cursor.execute(f"{sql} GROUP BY status")
+    
+    por_status = {row['status']: row['qtd'] for row in cursor.fetchall() if row['qtd']}
+    conn.close()
+    
+    return {"total": sum(por_status.values()), "por_status": por_status}
+
+def buscar_estatisticas_usuario(usuario, perfil):
+    """Busca estatísticas (admin: todos os chamados; demais: só os do usuário)."""
+    contadores = buscar_contadores_status(None if perfil == "admin" else usuario)
+    por_status = contadores["por_status"]
+    
+    return {
+        "total": contadores["total"],
+        "novos": por_status.get("Novo", 0),
+        "em_atendimento": por_status.get("Em atendimento", 0),
+        "aguardando": por_status.get("Aguardando Finalização", 0),
+        "concluidos": por_status.get("Finalizado", 0),
+        "finalizados": por_status.get("Finalizado", 0),
+        "por_status": por_status
+    }
+
+# Colunas comuns aos resumos por empresa e por usuário.
+# HAVING/ORDER BY usam SUM(r.total) explícito: em HAVING, "total" seria a
+# coluna da tabela (de uma linha qualquer do grupo), não o alias
+COLUNAS_RESUMO = """
+    SUM(r.total) as total,
+    SUM(CASE WHEN r.status = 'Novo' THEN r.total ELSE 0 END) as novos,
+    SUM(CASE WHEN r.status = 'Em atendimento' THEN r.total ELSE 0 END) as em_atendimento,
+    SUM(CASE WHEN r.status = 'Aguardando Finalização' THEN r.total ELSE 0 END) as aguardando,
+    SUM(CASE WHEN r.status = 'Finalizado' THEN r.total ELSE 0 END) as finalizados,
+    SUM(r.soma_tempo) as soma_tempo,
+    SUM(r.soma_tempo) * 1.0 / NULLIF(SUM(r.qtd_com_tempo), 0) as tempo_medio,
+    SUM(r.soma_retornos) as retornos
+"""
+
+@em_cache("chamados", "usuarios", em_erro=[])
+def buscar_resumo_por_empresa():
+    """Totais por empresa, lidos de resumo_chamados_empresa (mantida por triggers)."""
+    conn = conectar_relatorio()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT r.empresa, {COLUNAS_RESUMO}
+        FROM resumo_chamados_empresa r
+        GROUP BY r.empresa
+        HAVING SUM(r.total) > 0
+        ORDER BY SUM(r.total) DESC
+    """)
+    empresas = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return empresas
+
+@em_cache("chamados", "usuarios", em_erro=[])
+def buscar_resumo_por_usuario():
+    """Totais por usuário, lidos de resumo_chamados_usuario (mantida por triggers)."""
+    conn = conectar_relatorio()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT r.usuario, u.nome_completo, u.empresa, {COLUNAS_RESUMO}
+        FROM resumo_chamados_usuario r
+        LEFT JOIN usuarios u ON u.usuario = r.usuario
+        GROUP BY r.usuario
+        HAVING SUM(r.total) > 0
+        ORDER BY SUM(r.total) DESC
+    """)
+    usuarios = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return usuarios
+
+def conferir_resumos():
+    """
+    Compara os totais por empresa e por usuário do dashboard com a contagem
+    direta em chamados. Retorna a lista de divergências (vazia = resumos OK).
+    """
+    conn = conectar_relatorio()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COALESCE(u.empresa, 'Sem empresa') as empresa, COUNT(*) as total
+        FROM chamados c
+        LEFT JOIN usuarios u ON u.usuario = c.usuario
+        GROUP BY 1
+    """)
+    esperado_empresas = {row['empresa']: row['total'] for row in cursor.fetchall()}
+    cursor.execute("SELECT usuario, COUNT(*) as total FROM chamados GROUP BY usuario")
+    esperado_usuarios = {row['usuario']: row['total'] for row in cursor.fetchall()}
+    conn.close()
+    
+    divergencias = []
+    for rotulo, esperado, resumo, chave in (
+        ("Empresa", esperado_empresas, buscar_resumo_por_empresa.sem_cache(), "empresa"),
+        ("Usuário", esperado_usuarios, buscar_resumo_por_usuario.sem_cache(), "usuario"),
+    ):
+        obtido = {linha[chave]: linha['total'] for linha in resumo}
+        for nome in sorted(set(esperado) | set(obtido), key=str):
+            if esperado.get(nome, 0) != obtido.get(nome, 0):
+                divergencias.append(
+                    f"{rotulo} {nome}: {obtido.get(nome, 0)} no resumo, {esperado.get(nome, 0)} em chamados"
+                )
+    
+    return divergencias
+
+def reconstruir_resumos():
+    """Recalcula os resumos de chamados a partir dos dados existentes."""
+    def gravar(cursor):
+        reconstruir_resumos_chamados(cursor)
+        registrar_log_db(cursor, "SISTEMA", "admin", "Resumos de chamados reconstruídos")
+        return True, "Resumos reconstruídos"
+    
+    try:
+        return executar_escrita(gravar)
+    except Exception as e:
+        return False, f"Erro: {str(e)}"
+
+def reconstruir_busca():
+    """Reindexa a busca de texto a partir dos chamados, interações e conclusões."""
+    def gravar(cursor):
+        reconstruir_indices_busca(cursor)
+        registrar_log_db(cursor, "SISTEMA", "admin", "Índice de busca reconstruído")
+        return True, "Índice de busca reconstruído"
+    
+    try:
+        return executar_escrita(gravar)
+    except Exception as e:
+        return False, f"Erro: {str(e)}"
+
+def limpar_logs_antigos(dias=30):
+    """Remove logs com mais de N dias (faixa no índice de data_hora_epoch). Retorna a quantidade."""
+    def gravar(cursor):
+        cursor.execute(
+            "DELETE FROM logs_sistema WHERE data_hora_epoch < ?",
+            (agora_epoch() - dias * 86400,)
+        )
+        return cursor.rowcount
+    
+    try:
+        auditoria.descarregar_logs()
+        return executar_escrita(gravar)
+    except Exception as e:
+        print(f"Erro ao limpar logs: {e}")
+        return 0
+
+def buscar_logs_sistema(limite=100, usuario=None):
+    """Busca logs do sistema."""
+    # Logs ainda na fila também devem aparecer
+    auditoria.descarregar_logs()
+    return consultar_logs_sistema(limite, usuario)
+
+@em_cache("logs_sistema", em_erro=[])
+def consultar_logs_sistema(limite=100, usuario=None):
+    """Logs mais recentes (em cache até o próximo log gravado)."""
+    conn = conectar_relatorio()
+    cursor = conn.cursor()
+    
+    if usuario:
+        cursor.execute("""
+            SELECT * FROM logs_sistema 
+            WHERE usuario = ?
+            ORDER BY data_hora_epoch DESC 
+            LIMIT ?
+        """, (usuario, limite))
+    else:
+        cursor.execute("""
+            SELECT * FROM logs_sistema 
+            ORDER BY data_hora_epoch DESC 
+            LIMIT ?
+        """, (limite,))
+    
+    logs = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return logs
+
 def buscar_downloads_usuario(usuario, limite=50):
     """Busca downloads de um usuário."""
     try:
@@ -1007,7 +1810,7 @@ def buscar_downloads_usuario(usuario, limite=50):
         cursor.execute("""
             SELECT * FROM downloads 
             WHERE usuario = ?
-            ORDER BY data_download DESC 
+            ORDER BY data_download_epoch DESC 
             LIMIT ?
         """, (usuario, limite))
         downloads = [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,258 @@
+# app/db_cache.py
+"""
+Cache de Consultas - resultados de leitura compartilhados entre as sessões
+
+Funções de leitura decoradas com @em_cache("tabela", ...) guardam o resultado
+junto com as versões das tabelas de que ele depende. O resultado é guardado
+serializado (pickle): cada acerto devolve uma cópia nova, que a sessão pode
+alterar à vontade, e o tamanho em bytes do cache é exato.
+
+Invalidação: triggers incrementam versoes_tabelas a cada escrita, venha ela
+de qualquer conexão ou processo (migração 10). Um vigia lê PRAGMA data_version
+a cada consulta ao cache, o que custa microssegundos, e só relê versoes_tabelas
+quando outra conexão gravou algo. Um resultado cujas versões diferem das
+atuais é descartado.
+
+Dentro de um snapshot de relatório, as versões de referência são as lidas no
+próprio snapshot, para que o cache só devolva resultados do mesmo instante.
+"""
+
+import copy
+import functools
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from config.db_config import (
+    DB_PATH, CACHE_CONSULTAS_ATIVO, CACHE_CONSULTAS_MAX_ENTRADAS, CACHE_CONSULTAS_MAX_BYTES
+)
+
+_SQL_VERSOES = "SELECT tabela, versao FROM versoes_tabelas"
+
+class CacheConsultasLRU:
+    """Cache LRU de resultados serializados, limitado por entradas e por bytes."""
+
+    def __init__(self, max_entradas, max_bytes):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        self.invalidados = 0
+
+    def obter(self, chave, versoes):
+        """Retorna (dados, calculado_em) se houver resultado com essas versões."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+
+            if item[0] != versoes:
+                # Alguma tabela mudou desde o cálculo
+                del self._itens[chave]
+                self.bytes_usados -= len(item[1])
+                self.invalidados += 1
+                self.falhas += 1
+                return None
+
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1], item[2]
+
+    def guardar(self, chave, versoes, dados, calculado_em):
+        if len(dados) > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self.bytes_usados -= len(anterior[1])
+
+            self._itens[chave] = (versoes, dados, calculado_em)
+            self.bytes_usados += len(dados)
+
+            while len(self._itens) > self.max_entradas or self.bytes_usados > self.max_bytes:
+                _, removido = self._itens.popitem(last=False)
+                self.bytes_usados -= len(removido[1])
+                self.despejos += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes_usados = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "entradas": len(self._itens),
+                "max_entradas": self.max_entradas,
+                "bytes_usados": self.bytes_usados,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "despejos": self.despejos,
+                "invalidados": self.invalidados,
+                "taxa_acerto": round(self.acertos / consultas, 3) if consultas else 0.0
+            }
+
+class VigiaVersoes:
+    """
+    Versões atuais das tabelas, relidas só quando PRAGMA data_version indica
+    que outra conexão gravou no banco.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._conn = None
+        self._data_version = None
+        self._versoes = {}
+        self._lock = threading.Lock()
+        self.releituras = 0
+
+    def versoes(self):
+        """Dicionário {tabela: versão} ou None se o banco ainda não tiver o controle de versões."""
+        with self._lock:
+            try:
+                if self._conn is None:
+                    uri = f"{Path(self.caminho).absolute().as_uri()}?mode=ro"
+                    self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                    self._data_version = None
+
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    self._versoes = dict(self._conn.execute(_SQL_VERSOES).fetchall())
+                    self._data_version = data_version
+                    self.releituras += 1
+
+                return self._versoes
+            except sqlite3.Error:
+                self._fechar()
+                return None
+
+    def _fechar(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+        self._data_version = None
+
+    def fechar(self):
+        with self._lock:
+            self._fechar()
+
+# em_cache sem em_erro: a exceção da função chega a quem chamou
+_PROPAGAR = object()
+
+_cache = CacheConsultasLRU(CACHE_CONSULTAS_MAX_ENTRADAS, CACHE_CONSULTAS_MAX_BYTES)
+_vigia = VigiaVersoes(DB_PATH)
+_snapshot = threading.local()
+
+def _versoes_referencia():
+    """Versões do snapshot em andamento (se houver) ou as atuais do banco."""
+    if getattr(_snapshot, "ativo", False):
+        return _snapshot.versoes
+    return _vigia.versoes()
+
+@contextmanager
+def versoes_do_snapshot(conn):
+    """No bloco, o cache usa as versões lidas na conexão do snapshot."""
+    try:
+        versoes = dict(conn.execute(_SQL_VERSOES).fetchall())
+    except sqlite3.Error:
+        versoes = None
+
+    anterior = (getattr(_snapshot, "ativo", False), getattr(_snapshot, "versoes", None))
+    _snapshot.ativo, _snapshot.versoes = True, versoes
+    try:
+        yield
+    finally:
+        _snapshot.ativo, _snapshot.versoes = anterior
+
+def em_cache(*tabelas, ajustar=None, em_erro=_PROPAGAR):
+    """
+    Decorador de funções de leitura: cache por função + argumentos, invalidado
+    quando qualquer uma das tabelas informadas muda.
+    ajustar(resultado, segundos) corrige um resultado vindo do cache pelo tempo
+    decorrido desde o cálculo (ex: cronômetros em andamento).
+    em_erro: valor devolvido (uma cópia) quando a função levanta exceção. A
+    falha nunca é guardada: a próxima chamada consulta o banco de novo.
+    """
+    def decorador(funcao):
+        nome = f"{funcao.__module__}.{funcao.__qualname__}"
+
+        def falhou(erro):
+            if em_erro is _PROPAGAR:
+                raise erro
+            print(f"Erro em {funcao.__name__}: {erro}")
+            return copy.deepcopy(em_erro)
+
+        @functools.wraps(funcao)
+        def sem_cache(*args, **kwargs):
+            try:
+                return funcao(*args, **kwargs)
+            except Exception as e:
+                return falhou(e)
+
+        @functools.wraps(funcao)
+        def consultar(*args, **kwargs):
+            if not CACHE_CONSULTAS_ATIVO:
+                return sem_cache(*args, **kwargs)
+
+            try:
+                chave = (nome, args, tuple(sorted(kwargs.items())))
+                hash(chave)
+            except TypeError:
+                return sem_cache(*args, **kwargs)
+
+            referencia = _versoes_referencia()
+            versoes = tuple(referencia.get(tabela) for tabela in tabelas) if referencia else None
+            if versoes is None or None in versoes:
+                return sem_cache(*args, **kwargs)
+
+            item = _cache.obter(chave, versoes)
+            if item is not None:
+                dados, calculado_em = item
+                resultado = pickle.loads(dados)
+                if ajustar:
+                    resultado = ajustar(resultado, int(time.time()) - calculado_em)
+                return resultado
+
+            # Versões lidas ANTES da consulta: escrita concorrente só gera falha depois
+            calculado_em = int(time.time())
+            try:
+                resultado = funcao(*args, **kwargs)
+            except Exception as e:
+                return falhou(e)
+            try:
+                _cache.guardar(chave, versoes, pickle.dumps(resultado, pickle.HIGHEST_PROTOCOL), calculado_em)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                pass
+            return resultado
+
+        consultar.sem_cache = sem_cache
+        return consultar
+
+    return decorador
+
+def estatisticas_cache():
+    """Contadores do cache (acertos, falhas, despejos...) para ajuste dos limites."""
+    estatisticas = _cache.estatisticas()
+    estatisticas["ativo"] = CACHE_CONSULTAS_ATIVO
+    estatisticas["releituras_versoes"] = _vigia.releituras
+    return estatisticas
+
+def limpar_cache():
+    """Esvazia o cache e reabre o vigia (ex: após restaurar um backup)."""
+    _cache.limpar()
+    _vigia.fechar()
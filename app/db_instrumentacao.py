@@ -0,0 +1,366 @@
+# app/db_instrumentacao.py
+"""
+Instrumentação das consultas - tempo, linhas e origem de cada SQL
+
+As conexões do pool são criadas com ConexaoInstrumentada (factory do
+sqlite3.connect): todo execute/executemany, em qualquer cursor, é medido do
+execute até a leitura das linhas (fetchone/fetchall/fetchmany) e agregado pela
+impressão digital do SQL (literais e listas de ? trocados por marcadores), com
+o módulo.função que o executou.
+
+Por impressão digital ficam em memória: chamadas, tempo total, máximo,
+histograma de durações (p50/p95), linhas, erros e chamadores. Erros são
+contados mesmo quando a função que chamou os engole e retorna vazio.
+
+Execuções acima de CONSULTA_LENTA_MS vão para uma fila gravada em lote na
+tabela consultas_lentas (migração 12), por uma thread própria que envia o
+lote à thread escritora (escritor.py).
+"""
+
+import atexit
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+
+from config.db_config import (
+    INSTRUMENTACAO_ATIVA, CONSULTA_LENTA_MS, CONSULTAS_LENTAS_RETENCAO_DIAS
+)
+from utils import agora_brasilia_str, agora_epoch
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é "acima de 5 s"
+FAIXAS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Intervalo (segundos) entre gravações da fila de consultas lentas
+_INTERVALO_GRAVACAO = 2.0
+
+_SQL_INSERIR_LENTA = """
+    INSERT INTO consultas_lentas (impressao, sql, duracao_ms, linhas, chamador, data_hora)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# Frames destes módulos não são o "chamador" de uma consulta
+_MODULOS_INTERNOS = {__name__, "db_pool", "sqlite3"}
+
+# ========== IMPRESSÃO DIGITAL ==========
+
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def impressao_digital(sql):
+    """SQL normalizado: literais viram ?, listas (?, ?, ...) viram (?+), espaços colapsados."""
+    texto = _RE_TEXTO.sub("?", sql)
+    texto = _RE_NUMERO.sub("?", texto)
+    texto = _RE_ESPACOS.sub(" ", texto).strip()
+    return _RE_LISTA.sub("(?+)", texto)
+
+def chamador():
+    """módulo.função que executou a consulta (funções internas como 'gravar' contam como a de fora)."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get("__name__") in _MODULOS_INTERNOS:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    nome = frame.f_code.co_qualname.split(".<locals>")[0]
+    return f"{frame.f_globals.get('__name__', '?')}.{nome}"
+
+# ========== ESTATÍSTICAS EM MEMÓRIA ==========
+
+class EstatisticaConsulta:
+    """Agregado de uma impressão digital."""
+
+    __slots__ = ("sql", "chamadas", "tempo_total", "tempo_max", "linhas", "erros",
+                 "ultimo_erro", "histograma", "chamadores")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.chamadas = 0
+        self.tempo_total = 0.0
+        self.tempo_max = 0.0
+        self.linhas = 0
+        self.erros = 0
+        self.ultimo_erro = None
+        self.histograma = [0] * (len(FAIXAS_MS) + 1)
+        self.chamadores = {}
+
+    def percentil(self, fracao):
+        """Limite superior (ms) da faixa do histograma que contém o percentil."""
+        alvo = self.chamadas * fracao
+        acumulado = 0
+        for indice, quantidade in enumerate(self.histograma):
+            acumulado += quantidade
+            if quantidade and acumulado >= alvo:
+                return FAIXAS_MS[indice] if indice < len(FAIXAS_MS) else self.tempo_max
+        return 0.0
+
+_estatisticas = {}
+_lock = threading.Lock()
+
+def registrar_execucao(sql, duracao_ms, linhas, origem, erro=None):
+    """Soma uma execução às estatísticas (e à fila de lentas, se passou do limite)."""
+    impressao = impressao_digital(sql)
+
+    with _lock:
+        estatistica = _estatisticas.get(impressao)
+        if estatistica is None:
+            estatistica = _estatisticas[impressao] = EstatisticaConsulta(sql)
+
+        estatistica.chamadas += 1
+        estatistica.tempo_total += duracao_ms
+        estatistica.linhas += linhas
+        if duracao_ms > estatistica.tempo_max:
+            estatistica.tempo_max = duracao_ms
+        estatistica.histograma[bisect_left(FAIXAS_MS, duracao_ms)] += 1
+        estatistica.chamadores[origem] = estatistica.chamadores.get(origem, 0) + 1
+        if erro is not None:
+            estatistica.erros += 1
+            estatistica.ultimo_erro = str(erro)
+
+    if duracao_ms >= CONSULTA_LENTA_MS and not impressao.startswith("INSERT INTO consultas_lentas"):
+        _enfileirar_lenta(impressao, sql, duracao_ms, linhas, origem)
+
+def somar_leitura(impressao, duracao_ms, linhas):
+    """Leituras de linhas depois da execução já registrada (fetchone repetido)."""
+    with _lock:
+        estatistica = _estatisticas.get(impressao)
+        if estatistica is not None:
+            estatistica.tempo_total += duracao_ms
+            estatistica.linhas += linhas
+
+def estatisticas_consultas(ordenar="tempo_total", limite=50):
+    """
+    Consultas mais caras, ordenadas por 'tempo_total', 'p95' ou 'chamadas'.
+    Cada item: impressao, sql, chamadas, tempo_total_ms, media_ms, p50_ms,
+    p95_ms, max_ms, linhas, erros, ultimo_erro, chamadores.
+    """
+    with _lock:
+        itens = [
+            {
+                "impressao": impressao,
+                "sql": estatistica.sql,
+                "chamadas": estatistica.chamadas,
+                "tempo_total_ms": round(estatistica.tempo_total, 3),
+                "media_ms": round(estatistica.tempo_total / estatistica.chamadas, 3),
+                "p50_ms": estatistica.percentil(0.5),
+                "p95_ms": estatistica.percentil(0.95),
+                "max_ms": round(estatistica.tempo_max, 3),
+                "linhas": estatistica.linhas,
+                "erros": estatistica.erros,
+                "ultimo_erro": estatistica.ultimo_erro,
+                "chamadores": dict(sorted(estatistica.chamadores.items(), key=lambda item: -item[1])),
+            }
+            for impressao, estatistica in _estatisticas.items()
+        ]
+
+    chave = {"p95": "p95_ms", "chamadas": "chamadas"}.get(ordenar, "tempo_total_ms")
+    itens.sort(key=lambda item: item[chave], reverse=True)
+    return itens[:limite] if limite else itens
+
+def resumo_instrumentacao():
+    """Totais gerais: consultas distintas, execuções, tempo, erros e lentas na fila."""
+    with _lock:
+        execucoes = sum(e.chamadas for e in _estatisticas.values())
+        return {
+            "ativa": INSTRUMENTACAO_ATIVA,
+            "limite_lenta_ms": CONSULTA_LENTA_MS,
+            "consultas": len(_estatisticas),
+            "execucoes": execucoes,
+            "tempo_total_ms": round(sum(e.tempo_total for e in _estatisticas.values()), 3),
+            "erros": sum(e.erros for e in _estatisticas.values()),
+            "lentas_pendentes": len(_lentas),
+        }
+
+def zerar_estatisticas():
+    """Recomeça as estatísticas em memória (ex: antes de reproduzir um problema)."""
+    with _lock:
+        _estatisticas.clear()
+
+# ========== CONEXÃO E CURSOR INSTRUMENTADOS ==========
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """
+    Cursor que mede cada execute/executemany. A execução fica "aberta" até a
+    primeira leitura de linhas (ou o próximo execute): o tempo registrado inclui
+    percorrer o resultado, que é onde o SQLite faz a maior parte do trabalho.
+    """
+
+    _aberta = None       # [sql, ms até agora, origem] da execução ainda sem leitura
+    _registrada = None   # impressão da última execução já registrada (fetchone repetido)
+
+    def execute(self, sql, parametros=()):
+        self._fechar_execucao()
+        origem = chamador()
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, parametros)
+        except Exception as e:
+            registrar_execucao(sql, (time.perf_counter() - inicio) * 1000, 0, origem, e)
+            raise
+        duracao = (time.perf_counter() - inicio) * 1000
+
+        if self.description is None:
+            # Sem resultado (INSERT/UPDATE/DELETE/DDL): já terminou
+            registrar_execucao(sql, duracao, max(self.rowcount, 0), origem)
+        else:
+            self._aberta = [sql, duracao, origem]
+        return self
+
+    def executemany(self, sql, parametros):
+        self._fechar_execucao()
+        origem = chamador()
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, parametros)
+        except Exception as e:
+            registrar_execucao(sql, (time.perf_counter() - inicio) * 1000, 0, origem, e)
+            raise
+        registrar_execucao(sql, (time.perf_counter() - inicio) * 1000, max(self.rowcount, 0), origem)
+        return self
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = super().fetchone()
+        self._leitura((time.perf_counter() - inicio) * 1000, 0 if linha is None else 1)
+        return linha
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        linhas = super().fetchmany(self.arraysize if size is None else size)
+        self._leitura((time.perf_counter() - inicio) * 1000, len(linhas))
+        return linhas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = super().fetchall()
+        self._leitura((time.perf_counter() - inicio) * 1000, len(linhas))
+        return linhas
+
+    def close(self):
+        self._fechar_execucao()
+        super().close()
+
+    def _leitura(self, duracao, linhas):
+        aberta = self._aberta
+        if aberta is not None:
+            self._aberta = None
+            registrar_execucao(aberta[0], aberta[1] + duracao, linhas, aberta[2])
+            self._registrada = impressao_digital(aberta[0])
+        elif self._registrada is not None:
+            somar_leitura(self._registrada, duracao, linhas)
+
+    def _fechar_execucao(self):
+        """Execução nunca lida (ou iterada com for): registra o tempo do execute."""
+        aberta = self._aberta
+        self._registrada = None
+        if aberta is not None:
+            self._aberta = None
+            registrar_execucao(aberta[0], aberta[1], 0, aberta[2])
+
+    def __del__(self):
+        try:
+            self._fechar_execucao()
+        except Exception:
+            pass
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os de conn.execute) são instrumentados."""
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+def fabrica_conexao():
+    """Factory para sqlite3.connect: instrumentada se INSTRUMENTACAO_ATIVA."""
+    return ConexaoInstrumentada if INSTRUMENTACAO_ATIVA else sqlite3.Connection
+
+# ========== CONSULTAS LENTAS ==========
+
+_lentas = deque(maxlen=10_000)
+_condicao = threading.Condition()
+_gravacao_lock = threading.Lock()
+_gravador_lock = threading.Lock()
+_gravador = None
+_encerrando = False
+_encerramento_registrado = False
+
+def _enfileirar_lenta(impressao, sql, duracao_ms, linhas, origem):
+    with _condicao:
+        _lentas.append((impressao, sql, round(duracao_ms, 3), linhas, origem, agora_brasilia_str()))
+    _iniciar_gravador()
+
+def descarregar_consultas_lentas():
+    """Grava a fila de consultas lentas e remove as mais antigas que a retenção. Retorna a quantidade."""
+    from escritor import executar_escrita
+
+    with _gravacao_lock:
+        with _condicao:
+            lote = list(_lentas)
+            _lentas.clear()
+
+        if not lote:
+            return 0
+
+        def gravar(cursor):
+            cursor.executemany(_SQL_INSERIR_LENTA, lote)
+            cursor.execute(
+                "DELETE FROM consultas_lentas WHERE data_hora_epoch < ?",
+                (agora_epoch() - CONSULTAS_LENTAS_RETENCAO_DIAS * 86400,)
+            )
+
+        try:
+            executar_escrita(gravar)
+            return len(lote)
+        except Exception as e:
+            print(f"Erro ao gravar consultas lentas: {e}")
+            return 0
+
+def _loop_gravador():
+    while True:
+        with _condicao:
+            _condicao.wait(timeout=_INTERVALO_GRAVACAO)
+            encerrar = _encerrando
+
+        descarregar_consultas_lentas()
+
+        if encerrar:
+            return
+
+def _iniciar_gravador():
+    global _gravador, _encerramento_registrado
+    if _gravador is not None and _gravador.is_alive():
+        return
+
+    with _gravador_lock:
+        # atexit roda do último registrado para o primeiro: registrar aqui, com o
+        # escritor já carregado (db_pool importa este módulo antes dele), faz a
+        # última gravação acontecer antes de encerrar_escritor
+        if not _encerramento_registrado:
+            import escritor  # noqa: F401
+            atexit.register(encerrar_instrumentacao)
+            _encerramento_registrado = True
+
+        if _gravador is None or not _gravador.is_alive():
+            _gravador = threading.Thread(target=_loop_gravador, name="consultas-lentas", daemon=True)
+            _gravador.start()
+
+def encerrar_instrumentacao():
+    """Grava as consultas lentas pendentes (chamado no encerramento)."""
+    global _encerrando
+    with _condicao:
+        _encerrando = True
+        _condicao.notify_all()
+
+    if _gravador is not None and _gravador.is_alive():
+        _gravador.join(timeout=5)
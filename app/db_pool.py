@@ -0,0 +1,340 @@
+# app/db_pool.py
+"""
+Pool de Conexões SQLite
+Mantém conexões de longa duração: os PRAGMAs são aplicados uma única vez
+por conexão e o cache de statements preparados continua aquecido entre chamadas.
+
+Há um pool de leitura/escrita (fluxo dos chamados) e um pool somente leitura
+(mode=ro + PRAGMA query_only) para dashboard e relatórios, com snapshots
+consistentes do WAL e política de checkpoint.
+"""
+
+import os
+import sqlite3
+import threading
+import atexit
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from config.db_config import (
+    DB_PATH, DB_POOL_TAMANHO, DB_CACHE_STATEMENTS, DB_OTIMIZAR_INTERVALO,
+    DB_WAL_AUTOCHECKPOINT, DB_WAL_LIMITE_BYTES, obter_perfil_performance
+)
+from db_instrumentacao import fabrica_conexao
+
+_VALORES_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_VALORES_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+class ConexaoPool:
+    """
+    Conexão emprestada do pool.
+    Se comporta como sqlite3.Connection, mas close() devolve a conexão ao pool.
+    """
+
+    __slots__ = ("_pool", "_conn")
+
+    def __init__(self, pool, conn):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+
+    def _conexao(self):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return self._conn
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao(), nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._conexao(), nome, valor)
+
+    def close(self):
+        """Devolve a conexão ao pool (transação pendente é desfeita, como no close() original)."""
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, "_conn", None)
+            self._pool.devolver(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        try:
+            if tipo is None:
+                self._conexao().commit()
+            else:
+                self._conexao().rollback()
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # Rede de segurança para funções que saem por exceção antes do close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConexaoCompartilhada:
+    """
+    Conexão de um snapshot em andamento, entregue às funções de relatório.
+    close() não faz nada: a transação de leitura é encerrada pelo snapshot.
+    """
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._conn, nome, valor)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        return False
+
+class PoolConexoes:
+    """Pool limitado de conexões ociosas para um arquivo de banco."""
+
+    def __init__(self, caminho, tamanho=DB_POOL_TAMANHO, perfil=None, cache_statements=DB_CACHE_STATEMENTS,
+                 otimizar_intervalo=DB_OTIMIZAR_INTERVALO, somente_leitura=False):
+        self.caminho = caminho
+        self.somente_leitura = somente_leitura
+        self.tamanho = tamanho
+        self.perfil = perfil or obter_perfil_performance()
+        self.cache_statements = cache_statements
+        self.otimizar_intervalo = otimizar_intervalo
+        self._ociosas = []
+        self._otimizada_em = {}
+        self._lock = threading.Lock()
+        self._fechado = False
+        self.conexoes_abertas = 0
+
+    def _abrir(self):
+        """Abre uma nova conexão já configurada."""
+        pasta = os.path.dirname(self.caminho)
+        if pasta and not os.path.exists(pasta):
+            os.makedirs(pasta, exist_ok=True)
+
+        busy_timeout = int(self.perfil.get("busy_timeout", 5000))
+
+        if self.somente_leitura:
+            # mode=ro: o arquivo não pode ser alterado por esta conexão (nem criado)
+            alvo, uri = f"{Path(self.caminho).absolute().as_uri()}?mode=ro", True
+        else:
+            alvo, uri = self.caminho, False
+
+        conn = sqlite3.connect(
+            alvo,
+            timeout=busy_timeout / 1000,
+            check_same_thread=False,
+            cached_statements=self.cache_statements,
+            uri=uri,
+            factory=fabrica_conexao()
+        )
+        conn.row_factory = sqlite3.Row
+        aplicar_pragmas(conn, self.perfil, self.somente_leitura)
+
+        with self._lock:
+            self.conexoes_abertas += 1
+            self._otimizada_em[conn] = time.monotonic()
+
+        return conn
+
+    def obter(self):
+        """Empresta uma conexão do pool (abre uma nova se não houver ociosa)."""
+        with self._lock:
+            conn = self._ociosas.pop() if self._ociosas else None
+
+        if conn is None:
+            conn = self._abrir()
+
+        return ConexaoPool(self, conn)
+
+    def devolver(self, conn):
+        """Recebe a conexão de volta. Excedentes são fechadas."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self._descartar(conn)
+            return
+
+        # Conexões de longa duração: atualizar estatísticas periodicamente
+        if time.monotonic() - self._otimizada_em.get(conn, 0) >= self.otimizar_intervalo:
+            self._otimizar(conn)
+
+        with self._lock:
+            if not self._fechado and len(self._ociosas) < self.tamanho:
+                self._ociosas.append(conn)
+                return
+
+        self._descartar(conn)
+
+    def _otimizar(self, conn):
+        """PRAGMA optimize: roda ANALYZE só nas tabelas usadas por esta conexão que precisam."""
+        if self.somente_leitura:
+            return
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        self._otimizada_em[conn] = time.monotonic()
+
+    def _descartar(self, conn):
+        self._otimizar(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self.conexoes_abertas -= 1
+            self._otimizada_em.pop(conn, None)
+
+    def fechar(self):
+        """Fecha todas as conexões ociosas (as emprestadas são fechadas ao voltar)."""
+        with self._lock:
+            self._fechado = True
+            ociosas, self._ociosas = self._ociosas, []
+
+        for conn in ociosas:
+            self._descartar(conn)
+
+def aplicar_pragmas(conn, perfil, somente_leitura=False):
+    """Aplica os PRAGMAs de integridade e o perfil de performance."""
+    synchronous = str(perfil.get("synchronous", "NORMAL")).upper()
+    if synchronous not in _VALORES_SYNCHRONOUS:
+        synchronous = "NORMAL"
+
+    temp_store = str(perfil.get("temp_store", "DEFAULT")).upper()
+    if temp_store not in _VALORES_TEMP_STORE:
+        temp_store = "DEFAULT"
+
+    if somente_leitura:
+        # O modo WAL é do arquivo (definido pelas conexões de escrita)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")  # Melhor para concorrência
+        conn.execute(f"PRAGMA wal_autocheckpoint = {DB_WAL_AUTOCHECKPOINT}")
+        conn.execute(f"PRAGMA journal_size_limit = {DB_WAL_LIMITE_BYTES}")
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    conn.execute(f"PRAGMA cache_size = {int(perfil.get('cache_size', -2000))}")
+    conn.execute(f"PRAGMA mmap_size = {int(perfil.get('mmap_size', 0))}")
+    conn.execute(f"PRAGMA temp_store = {temp_store}")
+    conn.execute(f"PRAGMA busy_timeout = {int(perfil.get('busy_timeout', 5000))}")
+
+# ========== POOLS POR ARQUIVO ==========
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def obter_pool(caminho=None, somente_leitura=False):
+    """Retorna o pool do arquivo informado (um por processo e modo)."""
+    chave = (caminho or DB_PATH, somente_leitura)
+
+    pool = _pools.get(chave)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(chave)
+            if pool is None:
+                pool = PoolConexoes(chave[0], somente_leitura=somente_leitura)
+                _pools[chave] = pool
+    return pool
+
+def fechar_pools():
+    """Fecha todos os pools (usado no encerramento e após restaurar backup)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.fechar()
+
+# ========== SNAPSHOTS DE LEITURA ==========
+
+_snapshot = threading.local()
+
+def conectar_leitura(caminho=None):
+    """
+    Conexão somente leitura para relatórios.
+    Dentro de snapshot_leitura() devolve a conexão do snapshot (mesmo instante
+    do banco para todas as consultas); fora dele, uma conexão do pool de leitura.
+    """
+    conn = getattr(_snapshot, "conn", None)
+    if conn is not None:
+        return ConexaoCompartilhada(conn)
+    return obter_pool(caminho, somente_leitura=True).obter()
+
+@contextmanager
+def snapshot_leitura(caminho=None):
+    """
+    Abre UMA transação de leitura (deferred) numa conexão somente leitura:
+    todas as consultas de conectar_leitura() no bloco veem o mesmo snapshot
+    do WAL. Aninhado, reaproveita o snapshot de fora.
+    """
+    if getattr(_snapshot, "conn", None) is not None:
+        yield ConexaoCompartilhada(_snapshot.conn)
+        return
+
+    conn = obter_pool(caminho, somente_leitura=True).obter()
+    try:
+        conn.execute("BEGIN DEFERRED")
+        # O snapshot é fixado na primeira leitura, não no BEGIN
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        _snapshot.conn = conn
+        yield ConexaoCompartilhada(conn)
+    finally:
+        _snapshot.conn = None
+        conn.close()  # rollback da transação de leitura ao devolver ao pool
+        aplicar_politica_wal(caminho)
+
+# ========== CHECKPOINT DO WAL ==========
+
+def tamanho_wal(caminho=None):
+    """Tamanho atual do arquivo -wal em bytes (0 se não existir)."""
+    try:
+        return os.path.getsize(f"{caminho or DB_PATH}-wal")
+    except OSError:
+        return 0
+
+def checkpoint_wal(caminho=None, modo="PASSIVE"):
+    """
+    Executa PRAGMA wal_checkpoint. PASSIVE não espera leitores nem escritores;
+    TRUNCATE espera (busy_timeout) e zera o arquivo -wal.
+    Retorna {'ocupado', 'paginas_wal', 'paginas_copiadas'}.
+    """
+    modo = modo.upper() if modo.upper() in ("PASSIVE", "FULL", "RESTART", "TRUNCATE") else "PASSIVE"
+    conn = obter_pool(caminho).obter()
+    try:
+        ocupado, paginas_wal, paginas_copiadas = conn.execute(f"PRAGMA wal_checkpoint({modo})").fetchone()
+    finally:
+        conn.close()
+    return {"ocupado": ocupado, "paginas_wal": paginas_wal, "paginas_copiadas": paginas_copiadas}
+
+def aplicar_politica_wal(caminho=None):
+    """
+    Política de checkpoint, chamada ao fim de cada snapshot de leitura:
+    leitores longos impedem o autocheckpoint de reiniciar o WAL; se o -wal
+    passou de DB_WAL_LIMITE_BYTES, um checkpoint PASSIVE copia o que já pode
+    ser copiado (sem bloquear ninguém) e o próximo reinício do WAL o trunca
+    para journal_size_limit.
+    """
+    if tamanho_wal(caminho) <= DB_WAL_LIMITE_BYTES:
+        return None
+    try:
+        return checkpoint_wal(caminho, "PASSIVE")
+    except sqlite3.Error:
+        return None
+
+atexit.register(fechar_pools)
@@ -4,7 +4,6 @@ Serviço de envio de e-mails
 """
 
 import smtplib
-import ssl
 import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -20,11 +19,13 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from config.email_config import (
-    SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_USE_TLS,
+    SMTP_HOST, SMTP_PORT, SMTP_USER,
     EMAIL_FROM, EMAIL_FROM_ADDRESS, EMAIL_ENABLED,
     EMAIL_MAX_RETRIES, EMAIL_RETRY_DELAY,
     verificar_configuracao_email
 )
+from email_system.sessoes_smtp import obter_pool_smtp
+from email_system.limite_envio import DisjuntorAberto, obter_limite_envio, obter_disjuntor
 
 def registrar_email_no_banco(destinatario, assunto, corpo, chamado_id, tipo, sucesso, erro=None):
     """Registra o e-mail no banco de dados."""
@@ -34,9 +35,130 @@ def registrar_email_no_banco(destinatario, assunto, corpo, chamado_id, tipo, suc
     except Exception as e:
         print(f"⚠️ Erro ao registrar e-mail no banco: {e}")
 
+def validar_envio(destinatario):
+    """Configuração e destinatário válidos para envio. Retorna (ok, mensagem)."""
+    config_ok, config_msg = verificar_configuracao_email()
+    if not config_ok:
+        return False, config_msg
+    
+    if not destinatario or '@' not in destinatario:
+        return False, "Destinatário inválido"
+    
+    return True, None
+
+def montar_mensagem(destinatario, assunto, corpo_html, anexos=None):
+    """Monta a mensagem MIME (corpo HTML e anexos)."""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = assunto
+    msg['From'] = EMAIL_FROM
+    msg['To'] = destinatario
+    
+    # Adicionar corpo HTML
+    parte_html = MIMEText(corpo_html, 'html', 'utf-8')
+    msg.attach(parte_html)
+    
+    # Adicionar anexos se houver
+    if anexos:
+        for caminho_anexo in anexos:
+            if os.path.exists(caminho_anexo):
+                with open(caminho_anexo, 'rb') as arquivo:
+                    parte = MIMEBase('application', 'octet-stream')
+                    parte.set_payload(arquivo.read())
+                    encoders.encode_base64(parte)
+                    nome_arquivo = os.path.basename(caminho_anexo)
+                    parte.add_header('Content-Disposition', f'attachment; filename="{nome_arquivo}"')
+                    msg.attach(parte)
+    
+    return msg
+
+def enviar_lote(mensagens):
+    """
+    Envia várias mensagens numa só sessão SMTP do pool (um QUIT só, quando a
+    sessão for encerrada pelo pool). mensagens: [(destinatario, assunto, corpo_html, anexos)].
+    Retorna a lista de erros na mesma ordem (None = enviada).
+    
+    Uma sessão reaproveitada que cai no meio (o servidor fechou a conexão ociosa)
+    é trocada por uma nova e a mensagem é reenviada na hora; sem conseguir
+    conectar, as mensagens restantes recebem o mesmo erro.
+    
+    Cada mensagem espera a vez no limite de taxa e o resultado vai para o
+    disjuntor (limite_envio.py); com ele aberto, as mensagens não tentadas
+    recebem DisjuntorAberto.
+    """
+    pool = obter_pool_smtp()
+    limite = obter_limite_envio()
+    disjuntor = obter_disjuntor()
+    erros = []
+    sessao = None
+    
+    if not disjuntor.permitir():
+        return [disjuntor_aberto(disjuntor)] * len(mensagens)
+    
+    try:
+        for indice, (destinatario, assunto, corpo_html, anexos) in enumerate(mensagens):
+            texto = montar_mensagem(destinatario, assunto, corpo_html, anexos).as_string()
+            erro = None
+            
+            limite.aguardar()
+            if indice and disjuntor.aberto():
+                erros.extend([disjuntor_aberto(disjuntor)] * (len(mensagens) - indice))
+                return erros
+            
+            while True:
+                if sessao is None:
+                    try:
+                        sessao = pool.obter()
+                    except Exception as e:
+                        disjuntor.registrar(e)
+                        erros.extend([e] * (len(mensagens) - indice))
+                        return erros
+                
+                try:
+                    sessao.enviar(EMAIL_FROM_ADDRESS, destinatario, texto)
+                    erro = None
+                    break
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                    # O servidor respondeu: a sessão continua boa, o erro é desta mensagem
+                    erro = e
+                    try:
+                        sessao.servidor.rset()
+                    except Exception:
+                        pool.descartar(sessao)
+                        sessao = None
+                    break
+                except Exception as e:
+                    erro = e
+                    reutilizada = sessao.reutilizada
+                    pool.descartar(sessao)
+                    sessao = None
+                    if not reutilizada:
+                        break
+            
+            disjuntor.registrar(erro)
+            erros.append(erro)
+    finally:
+        if sessao is not None:
+            pool.devolver(sessao)
+    
+    return erros
+
+def disjuntor_aberto(disjuntor):
+    """Erro das mensagens não tentadas com o disjuntor aberto."""
+    return DisjuntorAberto(f"Disjuntor do SMTP aberto (próxima tentativa em {disjuntor.segundos_para_sonda():.0f}s)")
+
+def enviar_email_uma_vez(destinatario, assunto, corpo_html, anexos=None):
+    """
+    Uma tentativa de envio (sessão do pool), sem retry nem registro no banco.
+    Exceções do smtplib (e de rede) sobem para quem chamou decidir se tenta de novo.
+    """
+    erro = enviar_lote([(destinatario, assunto, corpo_html, anexos)])[0]
+    if erro is not None:
+        raise erro
+
 def enviar_email(destinatario, assunto, corpo_html, anexos=None, chamado_id=None, tipo=None):
     """
-    Envia e-mail via SMTP.
+    Envia e-mail via SMTP, aguardando o resultado (com retry).
+    As notificações dos chamados não usam esta função: vão para a fila (fila_emails.py).
     """
     
     print(f"\n{'='*50}")
@@ -55,19 +177,12 @@ def enviar_email(destinatario, assunto, corpo_html, anexos=None, chamado_id=None
         registrar_email_no_banco(destinatario, assunto, corpo_html[:500] if corpo_html else "", chamado_id, tipo, True, "Simulado")
         return True, msg
     
-    # Verificar configuração
-    config_ok, config_msg = verificar_configuracao_email()
-    if not config_ok:
-        print(f"   ❌ Configuração inválida: {config_msg}")
-        registrar_email_no_banco(destinatario, assunto, corpo_html[:500] if corpo_html else "", chamado_id, tipo, False, config_msg)
-        return False, config_msg
-    
-    # Validar destinatário
-    if not destinatario or '@' not in destinatario:
-        msg = "Destinatário inválido"
-        print(f"   ❌ {msg}")
-        registrar_email_no_banco(destinatario or "N/A", assunto, corpo_html[:500] if corpo_html else "", chamado_id, tipo, False, msg)
-        return False, msg
+    # Verificar configuração e destinatário
+    valido, erro = validar_envio(destinatario)
+    if not valido:
+        print(f"   ❌ {erro}")
+        registrar_email_no_banco(destinatario or "N/A", assunto, corpo_html[:500] if corpo_html else "", chamado_id, tipo, False, erro)
+        return False, erro
     
     # Tentar enviar com retry
     ultima_excecao = None
@@ -75,47 +190,9 @@ def enviar_email(destinatario, assunto, corpo_html, anexos=None, chamado_id=None
     for tentativa in range(EMAIL_MAX_RETRIES):
         try:
             print(f"   🔄 Tentativa {tentativa + 1} de {EMAIL_MAX_RETRIES}...")
+            print(f"   📡 Enviando por {SMTP_HOST}:{SMTP_PORT} como {SMTP_USER}...")
             
-            # Criar mensagem
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = assunto
-            msg['From'] = EMAIL_FROM
-            msg['To'] = destinatario
-            
-            # Adicionar corpo HTML
-            parte_html = MIMEText(corpo_html, 'html', 'utf-8')
-            msg.attach(parte_html)
-            
-            # Adicionar anexos se houver
-            if anexos:
-                for caminho_anexo in anexos:
-                    if os.path.exists(caminho_anexo):
-                        with open(caminho_anexo, 'rb') as arquivo:
-                            parte = MIMEBase('application', 'octet-stream')
-                            parte.set_payload(arquivo.read())
-                            encoders.encode_base64(parte)
-                            nome_arquivo = os.path.basename(caminho_anexo)
-                            parte.add_header('Content-Disposition', f'attachment; filename="{nome_arquivo}"')
-                            msg.attach(parte)
-            
-            # Conectar e enviar
-            print(f"   📡 Conectando a {SMTP_HOST}:{SMTP_PORT}...")
-            
-            if SMTP_USE_TLS:
-                servidor = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
-                servidor.ehlo()
-                servidor.starttls()
-                servidor.ehlo()
-            else:
-                contexto = ssl.create_default_context()
-                servidor = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=contexto, timeout=30)
-            
-            print(f"   🔐 Autenticando como {SMTP_USER}...")
-            servidor.login(SMTP_USER, SMTP_PASSWORD)
-            
-            print(f"   📤 Enviando e-mail...")
-            servidor.sendmail(EMAIL_FROM_ADDRESS, destinatario, msg.as_string())
-            servidor.quit()
+            enviar_email_uma_vez(destinatario, assunto, corpo_html, anexos)
             
             print(f"   ✅ E-MAIL ENVIADO COM SUCESSO!")
             print(f"{'='*50}\n")
@@ -124,6 +201,13 @@ def enviar_email(destinatario, assunto, corpo_html, anexos=None, chamado_id=None
             
             return True, "E-mail enviado com sucesso!"
             
+        except DisjuntorAberto as e:
+            # O servidor vem falhando: não adianta esperar e tentar de novo agora
+            msg = f"Envio suspenso: {e}"
+            print(f"   ⛔ {msg}")
+            registrar_email_no_banco(destinatario, assunto, corpo_html[:500] if corpo_html else "", chamado_id, tipo, False, msg)
+            return False, msg
+            
         except smtplib.SMTPAuthenticationError as e:
             ultima_excecao = e
             msg = f"Erro de autenticação SMTP: {e}"
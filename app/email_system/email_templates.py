@@ -1,112 +1,124 @@
 # app/email_system/email_templates.py
 """
 Templates de E-mail do Sistema Helpdesk
+
+Cada e-mail é um template (HTML base + conteúdo) compilado uma vez, no
+primeiro uso, e guardado: as partes fixas - o HTML base com o CSS, já
+minificados com EMAIL_MINIFICAR_HTML - ficam prontas, e renderizar só
+intercala os campos do chamado ({campo}) entre elas.
 """
 
+import re
+import string
+from functools import lru_cache
+
+from config.email_config import EMAIL_MINIFICAR_HTML
 from utils import formatar_data_br, agora_brasilia
 
-def template_base(titulo, conteudo):
-    """Template base HTML para todos os e-mails."""
-    return f"""
+# ========== TEXTOS DOS TEMPLATES ==========
+
+CSS_EMAIL = """
+    body {
+        font-family: 'Segoe UI', Arial, sans-serif;
+        line-height: 1.6;
+        color: #333;
+        max-width: 600px;
+        margin: 0 auto;
+        padding: 20px;
+    }
+    .header {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        padding: 30px;
+        text-align: center;
+        border-radius: 10px 10px 0 0;
+    }
+    .header h1 {
+        margin: 0;
+        font-size: 24px;
+    }
+    .header p {
+        margin: 10px 0 0 0;
+        opacity: 0.9;
+    }
+    .content {
+        background: #ffffff;
+        padding: 30px;
+        border: 1px solid #ddd;
+        border-top: none;
+    }
+    .chamado-info {
+        background: #f8f9fa;
+        padding: 20px;
+        border-radius: 8px;
+        margin: 20px 0;
+        border-left: 4px solid #667eea;
+    }
+    .chamado-info p {
+        margin: 8px 0;
+    }
+    .mensagem-box {
+        background: #fff3e0;
+        padding: 15px;
+        border-radius: 8px;
+        margin: 20px 0;
+        border-left: 4px solid #ff9800;
+    }
+    .btn {
+        display: inline-block;
+        padding: 12px 30px;
+        background: #667eea;
+        color: white !important;
+        text-decoration: none;
+        border-radius: 5px;
+        margin: 20px 0;
+        font-weight: bold;
+    }
+    .footer {
+        text-align: center;
+        padding: 20px;
+        color: #666;
+        font-size: 12px;
+        border-top: 1px solid #ddd;
+        margin-top: 20px;
+        background: #f8f9fa;
+        border-radius: 0 0 10px 10px;
+    }
+    .status {
+        display: inline-block;
+        padding: 5px 15px;
+        border-radius: 20px;
+        font-size: 12px;
+        font-weight: bold;
+    }
+    .status-novo {
+        background: #ffebee;
+        color: #c62828;
+    }
+    .status-atendimento {
+        background: #fff3e0;
+        color: #e65100;
+    }
+    .status-concluido {
+        background: #e8f5e9;
+        color: #2e7d32;
+    }
+    .status-aguardando {
+        background: #e3f2fd;
+        color: #1565c0;
+    }
+    .logo-text {
+        font-size: 28px;
+        margin-bottom: 5px;
+    }"""
+
+# {estilo} recebe o CSS na compilação; {titulo} e {conteudo}, o texto de cada e-mail
+HTML_BASE = """
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="utf-8">
-        <style>
-            body {{
-                font-family: 'Segoe UI', Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                text-align: center;
-                border-radius: 10px 10px 0 0;
-            }}
-            .header h1 {{
-                margin: 0;
-                font-size: 24px;
-            }}
-            .header p {{
-                margin: 10px 0 0 0;
-                opacity: 0.9;
-            }}
-            .content {{
-                background: #ffffff;
-                padding: 30px;
-                border: 1px solid #ddd;
-                border-top: none;
-            }}
-            .chamado-info {{
-                background: #f8f9fa;
-                padding: 20px;
-                border-radius: 8px;
-                margin: 20px 0;
-                border-left: 4px solid #667eea;
-            }}
-            .chamado-info p {{
-                margin: 8px 0;
-            }}
-            .mensagem-box {{
-                background: #fff3e0;
-                padding: 15px;
-                border-radius: 8px;
-                margin: 20px 0;
-                border-left: 4px solid #ff9800;
-            }}
-            .btn {{
-                display: inline-block;
-                padding: 12px 30px;
-                background: #667eea;
-                color: white !important;
-                text-decoration: none;
-                border-radius: 5px;
-                margin: 20px 0;
-                font-weight: bold;
-            }}
-            .footer {{
-                text-align: center;
-                padding: 20px;
-                color: #666;
-                font-size: 12px;
-                border-top: 1px solid #ddd;
-                margin-top: 20px;
-                background: #f8f9fa;
-                border-radius: 0 0 10px 10px;
-            }}
-            .status {{
-                display: inline-block;
-                padding: 5px 15px;
-                border-radius: 20px;
-                font-size: 12px;
-                font-weight: bold;
-            }}
-            .status-novo {{
-                background: #ffebee;
-                color: #c62828;
-            }}
-            .status-atendimento {{
-                background: #fff3e0;
-                color: #e65100;
-            }}
-            .status-concluido {{
-                background: #e8f5e9;
-                color: #2e7d32;
-            }}
-            .status-aguardando {{
-                background: #e3f2fd;
-                color: #1565c0;
-            }}
-            .logo-text {{
-                font-size: 28px;
-                margin-bottom: 5px;
-            }}
-        </style>
+        <style>{estilo}</style>
     </head>
     <body>
         <div class="header">
@@ -126,227 +138,439 @@ def template_base(titulo, conteudo):
     </html>
     """
 
-def email_novo_chamado_admin(chamado):
-    """E-mail para admin quando novo chamado é aberto."""
-    data_formatada = formatar_data_br(chamado.get('data_abertura', ''))
-    
-    conteudo = f"""
+# nome: (título, conteúdo). Os campos vêm do dicionário montado em cada email_*.
+TEMPLATES = {
+    'novo_chamado_admin': ("Novo Chamado Recebido", """
         <h2>📢 Novo Chamado Aberto</h2>
         <p>Um novo chamado foi registrado no sistema e aguarda atendimento.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
-            <p><strong>Prioridade:</strong> <span class="status status-novo">{chamado['prioridade']}</span></p>
-            <p><strong>Cliente:</strong> {chamado['usuario']}</p>
-            <p><strong>Empresa:</strong> {chamado.get('empresa', 'Não informada')}</p>
-            <p><strong>Data:</strong> {data_formatada}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
+            <p><strong>Prioridade:</strong> <span class="status status-novo">{prioridade}</span></p>
+            <p><strong>Cliente:</strong> {usuario}</p>
+            <p><strong>Empresa:</strong> {empresa}</p>
+            <p><strong>Data:</strong> {data}</p>
         </div>
-        
+
         <div class="mensagem-box">
             <strong>Descrição:</strong>
-            <p>{chamado['descricao']}</p>
+            <p>{descricao}</p>
         </div>
-        
+
         <p>⚠️ <strong>Acesse o sistema para iniciar o atendimento.</strong></p>
-    """
-    
-    return template_base("Novo Chamado Recebido", conteudo)
+    """),
 
-def email_novo_chamado_cliente(chamado):
-    """E-mail de confirmação para cliente quando abre chamado."""
-    data_formatada = formatar_data_br(chamado.get('data_abertura', ''))
-    
-    conteudo = f"""
+    'novo_chamado_cliente': ("Chamado Registrado", """
         <h2>✅ Chamado Registrado com Sucesso</h2>
-        <p>Olá <strong>{chamado['usuario']}</strong>,</p>
+        <p>Olá <strong>{usuario}</strong>,</p>
         <p>Seu chamado foi registrado e em breve será atendido por nossa equipe.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Número do Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
-            <p><strong>Prioridade:</strong> <span class="status status-novo">{chamado['prioridade']}</span></p>
+            <p><strong>Número do Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
+            <p><strong>Prioridade:</strong> <span class="status status-novo">{prioridade}</span></p>
             <p><strong>Status:</strong> <span class="status status-novo">Novo</span></p>
-            <p><strong>Data de Abertura:</strong> {data_formatada}</p>
+            <p><strong>Data de Abertura:</strong> {data}</p>
         </div>
-        
+
         <div class="mensagem-box">
             <strong>Sua mensagem:</strong>
-            <p>{chamado['descricao']}</p>
+            <p>{descricao}</p>
         </div>
-        
-        <p>📌 <strong>Guarde o número #{chamado['id']} para referências futuras.</strong></p>
+
+        <p>📌 <strong>Guarde o número #{id} para referências futuras.</strong></p>
         <p>Você receberá atualizações por e-mail sobre o andamento do chamado.</p>
-    """
-    
-    return template_base("Chamado Registrado", conteudo)
+    """),
 
-def email_chamado_concluido(chamado, mensagem_conclusao=None):
-    """E-mail para cliente quando chamado é concluído pelo admin."""
-    conteudo = f"""
+    'chamado_concluido': ("Chamado Concluído", """
         <h2>✅ Chamado Concluído</h2>
-        <p>Olá <strong>{chamado['usuario']}</strong>,</p>
+        <p>Olá <strong>{usuario}</strong>,</p>
         <p>Seu chamado foi concluído por nossa equipe.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
             <p><strong>Status:</strong> <span class="status status-aguardando">Aguardando Finalização</span></p>
-            <p><strong>Atendente:</strong> {chamado.get('atendente', 'N/A')}</p>
-            <p><strong>Tempo de Atendimento:</strong> {chamado.get('tempo_formatado', 'N/A')}</p>
+            <p><strong>Atendente:</strong> {atendente}</p>
+            <p><strong>Tempo de Atendimento:</strong> {tempo_formatado}</p>
         </div>
-        
-        {f'''
-        <div class="mensagem-box">
-            <strong>Mensagem do Atendente:</strong>
-            <p>{mensagem_conclusao}</p>
-        </div>
-        ''' if mensagem_conclusao else ''}
-        
-        <p>Se o problema não foi resolvido ou você precisa de mais informações, 
+
+        {mensagem_conclusao}
+
+        <p>Se o problema não foi resolvido ou você precisa de mais informações,
         você pode <strong>retornar o chamado</strong> através do sistema.</p>
-        
+
         <p>Caso o problema esteja resolvido, por favor <strong>finalize o chamado</strong> no sistema. 😊</p>
-    """
-    
-    return template_base("Chamado Concluído", conteudo)
+    """),
 
-def email_chamado_retornado_admin(chamado, mensagem_retorno):
-    """E-mail para admin quando cliente retorna chamado."""
-    conteudo = f"""
+    'chamado_retornado_admin': ("Chamado Retornado", """
         <h2>🔄 Chamado Retornado pelo Cliente</h2>
         <p>O cliente retornou um chamado que estava aguardando finalização.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
-            <p><strong>Cliente:</strong> {chamado['usuario']}</p>
-            <p><strong>Empresa:</strong> {chamado.get('empresa', 'N/A')}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
+            <p><strong>Cliente:</strong> {usuario}</p>
+            <p><strong>Empresa:</strong> {empresa}</p>
             <p><strong>Status:</strong> <span class="status status-atendimento">Em Atendimento</span></p>
-            <p><strong>Retornos:</strong> {chamado.get('retornos', 1)}x</p>
+            <p><strong>Retornos:</strong> {retornos}x</p>
         </div>
-        
+
         <div class="mensagem-box">
             <strong>Motivo do Retorno:</strong>
-            <p>{mensagem_retorno}</p>
+            <p>{mensagem}</p>
         </div>
-        
+
         <p>⚠️ <strong>O chamado foi reaberto e aguarda novo atendimento.</strong></p>
-    """
-    
-    return template_base("Chamado Retornado", conteudo)
+    """),
 
-def email_chamado_retornado_cliente(chamado):
-    """E-mail de confirmação para cliente quando retorna chamado."""
-    conteudo = f"""
+    'chamado_retornado_cliente': ("Chamado Retornado", """
         <h2>🔄 Chamado Retornado com Sucesso</h2>
-        <p>Olá <strong>{chamado['usuario']}</strong>,</p>
+        <p>Olá <strong>{usuario}</strong>,</p>
         <p>Seu chamado foi reaberto e nossa equipe irá analisá-lo novamente.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
             <p><strong>Status:</strong> <span class="status status-atendimento">Em Atendimento</span></p>
         </div>
-        
+
         <p>Aguarde o contato da nossa equipe.</p>
-    """
-    
-    return template_base("Chamado Retornado", conteudo)
+    """),
 
-def email_interacao_cliente(chamado, interacao, autor):
-    """E-mail para cliente quando há nova interação do atendente."""
-    autor_nome = "Atendente" if autor == "atendente" else "Sistema"
-    data_formatada = formatar_data_br(interacao.get('data', ''))
-    
-    conteudo = f"""
-        <h2>💬 Nova Mensagem no Chamado #{chamado['id']}</h2>
-        <p>Olá <strong>{chamado['usuario']}</strong>,</p>
+    'interacao_cliente': ("Nova Mensagem no Chamado", """
+        <h2>💬 Nova Mensagem no Chamado #{id}</h2>
+        <p>Olá <strong>{usuario}</strong>,</p>
         <p>Há uma nova mensagem no seu chamado.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
-            <p><strong>Status:</strong> {chamado.get('status', 'N/A')}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
+            <p><strong>Status:</strong> {status}</p>
         </div>
-        
+
         <div class="mensagem-box">
-            <strong>{autor_nome} escreveu:</strong>
-            <p>{interacao.get('mensagem', '')}</p>
-            <small style="color: #666;">Em: {data_formatada}</small>
+            <strong>{autor} escreveu:</strong>
+            <p>{mensagem}</p>
+            <small style="color: #666;">Em: {data}</small>
         </div>
-        
+
         <p>Acesse o sistema para visualizar e responder.</p>
-    """
-    
-    return template_base("Nova Mensagem no Chamado", conteudo)
+    """),
+
+    'interacao_admin': ("Nova Resposta do Cliente", """
+        <h2>💬 Cliente Respondeu no Chamado #{id}</h2>
 
-def email_interacao_admin(chamado, interacao):
-    """E-mail para admin quando cliente interage."""
-    data_formatada = formatar_data_br(interacao.get('data', ''))
-    
-    conteudo = f"""
-        <h2>💬 Cliente Respondeu no Chamado #{chamado['id']}</h2>
-        
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
-            <p><strong>Cliente:</strong> {chamado['usuario']}</p>
-            <p><strong>Empresa:</strong> {chamado.get('empresa', 'N/A')}</p>
-            <p><strong>Status:</strong> {chamado.get('status', 'N/A')}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
+            <p><strong>Cliente:</strong> {usuario}</p>
+            <p><strong>Empresa:</strong> {empresa}</p>
+            <p><strong>Status:</strong> {status}</p>
         </div>
-        
+
         <div class="mensagem-box">
             <strong>Mensagem do cliente:</strong>
-            <p>{interacao.get('mensagem', '')}</p>
-            <small style="color: #666;">Em: {data_formatada}</small>
+            <p>{mensagem}</p>
+            <small style="color: #666;">Em: {data}</small>
         </div>
-        
+
         <p>⚠️ <strong>Acesse o sistema para visualizar e responder.</strong></p>
-    """
-    
-    return template_base("Nova Resposta do Cliente", conteudo)
+    """),
 
-def email_chamado_finalizado(chamado):
-    """E-mail para admin quando cliente finaliza o chamado."""
-    conteudo = f"""
+    'chamado_finalizado': ("Chamado Finalizado", """
         <h2>✅ Chamado Finalizado pelo Cliente</h2>
         <p>O cliente confirmou que o problema foi resolvido.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
-            <p><strong>Cliente:</strong> {chamado['usuario']}</p>
-            <p><strong>Empresa:</strong> {chamado.get('empresa', 'N/A')}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
+            <p><strong>Cliente:</strong> {usuario}</p>
+            <p><strong>Empresa:</strong> {empresa}</p>
             <p><strong>Status:</strong> <span class="status status-concluido">Finalizado</span></p>
-            <p><strong>Tempo Total:</strong> {chamado.get('tempo_formatado', 'N/A')}</p>
+            <p><strong>Tempo Total:</strong> {tempo_formatado}</p>
         </div>
-        
+
         <p>🎉 <strong>Bom trabalho!</strong></p>
-    """
-    
-    return template_base("Chamado Finalizado", conteudo)
+    """),
 
-def email_retorno_admin_cliente(chamado, mensagem):
-    """E-mail para cliente quando admin retorna com uma pergunta."""
-    conteudo = f"""
+    'retorno_admin_cliente': ("Aguardando sua Resposta", """
         <h2>📨 Precisamos de mais informações</h2>
-        <p>Olá <strong>{chamado['usuario']}</strong>,</p>
+        <p>Olá <strong>{usuario}</strong>,</p>
         <p>O atendente enviou uma mensagem sobre seu chamado.</p>
-        
+
         <div class="chamado-info">
-            <p><strong>Chamado:</strong> #{chamado['id']}</p>
-            <p><strong>Assunto:</strong> {chamado['assunto']}</p>
-            <p><strong>Atendente:</strong> {chamado.get('atendente', 'N/A')}</p>
+            <p><strong>Chamado:</strong> #{id}</p>
+            <p><strong>Assunto:</strong> {assunto}</p>
+            <p><strong>Atendente:</strong> {atendente}</p>
             <p><strong>Status:</strong> <span class="status status-aguardando">Aguardando Cliente</span></p>
         </div>
-        
+
         <div class="mensagem-box">
             <strong>Mensagem do Atendente:</strong>
             <p>{mensagem}</p>
         </div>
-        
+
         <p>⚠️ <strong>Por favor, acesse o sistema para responder.</strong></p>
+    """),
+
+    'resumo': ("Resumo de Atualizações", """
+        <h2>🗂️ Resumo de Atualizações</h2>
+        <p>Houve <strong>{quantidade} atualizações</strong> desde a última notificação.</p>
+
+        {blocos}
+
+        <p>Acesse o sistema para visualizar e responder.</p>
+    """),
+}
+
+# Trechos sem o HTML base (partes opcionais e repetidas dentro de um e-mail)
+TRECHOS = {
+    'mensagem_conclusao': """
+        <div class="mensagem-box">
+            <strong>Mensagem do Atendente:</strong>
+            <p>{mensagem}</p>
+        </div>
+        """,
+
+    'bloco_resumo': """
+        <div class="chamado-info">
+            <h3>{titulo}</h3>
+            {itens}
+        </div>
+        """,
+
+    'item_resumo': """
+                <p><strong>{titulo}</strong> <small style="color: #666;">{data}</small>{resumo}</p>
+            """,
+}
+
+# ========== MOTOR DE TEMPLATES ==========
+
+def minificar_css(css):
+    """Remove comentários e espaços desnecessários do CSS."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+def compactar_html(trecho):
+    """Tira a indentação e as linhas vazias de um trecho fixo (espaços vizinhos aos campos ficam)."""
+    trecho = re.sub(r"\n\s+", "\n", trecho)
+    return re.sub(r"[ \t]+\n", "\n", trecho)
+
+class TemplateEmail:
+    """
+    Template pré-compilado: o texto com {campos} é quebrado uma vez em partes
+    fixas e nomes de campos. Renderizar só junta as partes com os valores.
+    fixos: campos preenchidos na compilação (ex: o CSS), que viram parte fixa.
     """
     
-    return template_base("Aguardando sua Resposta", conteudo)
+    __slots__ = ("nome", "partes", "campos")
+    
+    def __init__(self, nome, texto, fixos=None, minificar=EMAIL_MINIFICAR_HTML):
+        self.nome = nome
+        fixos = fixos or {}
+        
+        partes, campos, atual = [], [], []
+        for literal, campo, _, _ in string.Formatter().parse(texto):
+            atual.append(compactar_html(literal) if minificar else literal)
+            if campo is None:
+                continue
+            if campo in fixos:
+                atual.append(fixos[campo])
+                continue
+            partes.append("".join(atual))
+            campos.append(campo)
+            atual = []
+        partes.append("".join(atual))
+        
+        self.partes = tuple(partes)
+        self.campos = tuple(campos)
+    
+    def renderizar(self, valores):
+        """HTML com os valores (dict campo -> valor) nos lugares dos campos."""
+        saida = [self.partes[0]]
+        for campo, parte in zip(self.campos, self.partes[1:]):
+            saida.append(str(valores[campo]))
+            saida.append(parte)
+        return "".join(saida)
+    
+    def renderizar_lote(self, lista_valores):
+        """O mesmo template para vários registros numa chamada."""
+        return [self.renderizar(valores) for valores in lista_valores]
+
+def texto_template(nome):
+    """Texto completo (sem compilar) de um template de e-mail ou trecho."""
+    if nome in TRECHOS:
+        return TRECHOS[nome]
+    if nome == 'base':
+        return HTML_BASE
+    
+    titulo, conteudo = TEMPLATES[nome]
+    return HTML_BASE.replace("{titulo}", titulo).replace("{conteudo}", conteudo)
+
+@lru_cache(maxsize=None)
+def obter_template(nome, minificar=EMAIL_MINIFICAR_HTML):
+    """Template compilado (uma vez por processo): e-mail de TEMPLATES, trecho de TRECHOS ou 'base'."""
+    estilo = minificar_css(CSS_EMAIL) if minificar else CSS_EMAIL
+    return TemplateEmail(nome, texto_template(nome), fixos={'estilo': estilo}, minificar=minificar)
+
+def renderizar(nome, valores):
+    """Renderiza o template `nome` com os valores."""
+    return obter_template(nome).renderizar(valores)
+
+def renderizar_lote(nome, lista_valores):
+    """Renderiza o template `nome` para vários registros (resumos, envios em massa)."""
+    return obter_template(nome).renderizar_lote(lista_valores)
+
+def emails_em_lote(funcao, chamados, *args):
+    """
+    Um e-mail por chamado numa chamada (envios em massa), ex:
+    emails_em_lote(email_chamado_finalizado, chamados).
+    """
+    return [funcao(chamado, *args) for chamado in chamados]
+
+def template_base(titulo, conteudo):
+    """Template base HTML para todos os e-mails."""
+    return renderizar('base', {'titulo': titulo, 'conteudo': conteudo})
+
+# ========== E-MAILS ==========
+
+def email_novo_chamado_admin(chamado):
+    """E-mail para admin quando novo chamado é aberto."""
+    return renderizar('novo_chamado_admin', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'prioridade': chamado['prioridade'],
+        'usuario': chamado['usuario'],
+        'empresa': chamado.get('empresa', 'Não informada'),
+        'data': formatar_data_br(chamado.get('data_abertura', '')),
+        'descricao': chamado['descricao'],
+    })
+
+def email_novo_chamado_cliente(chamado):
+    """E-mail de confirmação para cliente quando abre chamado."""
+    return renderizar('novo_chamado_cliente', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'prioridade': chamado['prioridade'],
+        'usuario': chamado['usuario'],
+        'data': formatar_data_br(chamado.get('data_abertura', '')),
+        'descricao': chamado['descricao'],
+    })
+
+def email_chamado_concluido(chamado, mensagem_conclusao=None):
+    """E-mail para cliente quando chamado é concluído pelo admin."""
+    return renderizar('chamado_concluido', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'usuario': chamado['usuario'],
+        'atendente': chamado.get('atendente', 'N/A'),
+        'tempo_formatado': chamado.get('tempo_formatado', 'N/A'),
+        'mensagem_conclusao': renderizar('mensagem_conclusao', {'mensagem': mensagem_conclusao}) if mensagem_conclusao else '',
+    })
+
+def email_chamado_retornado_admin(chamado, mensagem_retorno):
+    """E-mail para admin quando cliente retorna chamado."""
+    return renderizar('chamado_retornado_admin', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'usuario': chamado['usuario'],
+        'empresa': chamado.get('empresa', 'N/A'),
+        'retornos': chamado.get('retornos', 1),
+        'mensagem': mensagem_retorno,
+    })
+
+def email_chamado_retornado_cliente(chamado):
+    """E-mail de confirmação para cliente quando retorna chamado."""
+    return renderizar('chamado_retornado_cliente', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'usuario': chamado['usuario'],
+    })
+
+def email_interacao_cliente(chamado, interacao, autor):
+    """E-mail para cliente quando há nova interação do atendente."""
+    return renderizar('interacao_cliente', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'usuario': chamado['usuario'],
+        'status': chamado.get('status', 'N/A'),
+        'autor': "Atendente" if autor == "atendente" else "Sistema",
+        'mensagem': interacao.get('mensagem', ''),
+        'data': formatar_data_br(interacao.get('data', '')),
+    })
+
+def email_interacao_admin(chamado, interacao):
+    """E-mail para admin quando cliente interage."""
+    return renderizar('interacao_admin', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'usuario': chamado['usuario'],
+        'empresa': chamado.get('empresa', 'N/A'),
+        'status': chamado.get('status', 'N/A'),
+        'mensagem': interacao.get('mensagem', ''),
+        'data': formatar_data_br(interacao.get('data', '')),
+    })
+
+def email_chamado_finalizado(chamado):
+    """E-mail para admin quando cliente finaliza o chamado."""
+    return renderizar('chamado_finalizado', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'usuario': chamado['usuario'],
+        'empresa': chamado.get('empresa', 'N/A'),
+        'tempo_formatado': chamado.get('tempo_formatado', 'N/A'),
+    })
+
+def email_retorno_admin_cliente(chamado, mensagem):
+    """E-mail para cliente quando admin retorna com uma pergunta."""
+    return renderizar('retorno_admin_cliente', {
+        'id': chamado['id'],
+        'assunto': chamado['assunto'],
+        'usuario': chamado['usuario'],
+        'atendente': chamado.get('atendente', 'N/A'),
+        'mensagem': mensagem,
+    })
+
+# Título de cada tipo de notificação na lista do e-mail de resumo
+TITULOS_RESUMO = {
+    'novo_chamado_admin': "📢 Novo chamado aberto",
+    'novo_chamado_cliente': "✅ Chamado registrado",
+    'interacao_cliente': "💬 Cliente respondeu",
+    'interacao_atendente': "💬 Nova mensagem",
+    'chamado_concluido': "✅ Concluído - aguardando sua confirmação",
+    'chamado_retornado_admin': "🔄 Retornado pelo cliente",
+    'chamado_retornado_cliente': "🔄 Retornado com sucesso",
+    'chamado_finalizado': "✅ Finalizado pelo cliente",
+    'retorno_admin': "📨 Aguardando sua resposta",
+}
+
+def email_resumo(eventos):
+    """
+    E-mail de resumo: várias notificações de um destinatário num só e-mail,
+    agrupadas por chamado. eventos: linhas da fila (chamado_id, tipo, assunto,
+    resumo, data_criacao), na ordem em que aconteceram.
+    """
+    por_chamado = {}
+    for evento in eventos:
+        por_chamado.setdefault(evento.get('chamado_id'), []).append(evento)
+    
+    blocos = renderizar_lote('bloco_resumo', (
+        {
+            'titulo': f"Chamado #{chamado_id}" if chamado_id else "Outras notificações",
+            'itens': ''.join(renderizar_lote('item_resumo', (
+                {
+                    'titulo': TITULOS_RESUMO.get(evento.get('tipo'), evento.get('assunto', '')),
+                    'data': formatar_data_br(evento.get('data_criacao', '')),
+                    'resumo': f"<br>{evento['resumo']}" if evento.get('resumo') else "",
+                }
+                for evento in lista
+            ))),
+        }
+        for chamado_id, lista in por_chamado.items()
+    ))
+    
+    return renderizar('resumo', {'quantidade': len(eventos), 'blocos': ''.join(blocos)})
@@ -0,0 +1,342 @@
+# app/email_system/fila_emails.py
+"""
+Fila persistente de e-mails (tabela fila_emails)
+
+As notificações não abrem mais uma thread por e-mail: são gravadas na fila
+na mesma transação da ação que as gerou (um chamado aberto sem e-mail, ou um
+e-mail de chamado que não existe, não acontecem) e sobrevivem a um reinício
+do processo.
+
+EMAIL_WORKERS threads fixas enviam a fila: cada uma reserva até EMAIL_LOTE
+e-mails vencidos (no escritor, sem disputa), faz UMA tentativa de cada, numa
+só sessão SMTP do pool (sessoes_smtp.py), e grava os resultados. Falhas
+temporárias voltam para a fila com espera exponencial e jitter; erros
+definitivos (destinatário recusado, configuração inválida) ou tentativas
+esgotadas vão para 'falhou', de onde podem ser reenfileirados no Force Fix.
+A reserva guarda o processo e o instante: só volta para a fila depois de
+EMAIL_RESERVA_PRAZO (worker que parou no meio do envio, em qualquer processo).
+
+Com o disjuntor do SMTP aberto (limite_envio.py) os workers não reservam
+nada, e os e-mails que pegaram a queda voltam para a fila sem gastar
+tentativa: ficam adiados até o servidor voltar, em vez de irem para 'falhou'.
+
+Resumos: a notificação entra num grupo (destinatário, ou destinatário e
+chamado, conforme EMAIL_RESUMO_MODO) e espera até EMAIL_RESUMO_JANELA
+segundos contados da primeira pendente do grupo. O grupo sai num só e-mail,
+com os eventos listados por chamado. Chamados com prioridade em
+EMAIL_RESUMO_IMEDIATO saem na hora e levam junto o que o grupo já tinha.
+"""
+
+import atexit
+import os
+import random
+import smtplib
+import socket
+import threading
+import time
+from collections import deque
+
+from config.email_config import (
+    EMAIL_ENABLED, EMAIL_RETRY_DELAY, EMAIL_WORKERS, EMAIL_LOTE, EMAIL_FILA_MAX_TENTATIVAS,
+    EMAIL_BACKOFF_MAX, EMAIL_FILA_INTERVALO, EMAIL_FILA_RETENCAO_DIAS, EMAIL_RESERVA_PRAZO,
+    EMAIL_RESUMO_JANELA, EMAIL_RESUMO_MODO, EMAIL_RESUMO_IMEDIATO
+)
+from escritor import executar_escrita, enviar_escrita, apos_commit
+from email_system.email_service import validar_envio, enviar_lote
+from email_system.sessoes_smtp import fechar_sessoes_ociosas
+from email_system.limite_envio import DisjuntorAberto, falha_do_servidor, obter_disjuntor
+from email_system.email_templates import email_resumo
+
+# Erros que não melhoram tentando de novo
+ERROS_DEFINITIVOS = (smtplib.SMTPRecipientsRefused,)
+
+# Intervalo (segundos) entre podas dos e-mails já enviados
+_INTERVALO_PODA = 3600
+
+# Dono das reservas feitas por este processo (fila_emails.reservado_por)
+DONO_RESERVAS = f"{socket.gethostname()}:{os.getpid()}"
+
+_condicao = threading.Condition()
+_avisos = 0
+_workers = []
+_workers_lock = threading.Lock()
+_encerrando = False
+_ultima_poda = 0.0
+_ultima_liberacao = 0.0
+
+# Métricas do processo (Force Fix): envios, falhas e duração das tentativas
+estatisticas = {"enviados": 0, "falhas": 0, "mortos": 0, "tempo_envio": 0.0, "resumos": 0, "agrupados": 0, "adiados": 0}
+_enviados_recentes = deque(maxlen=10_000)
+
+# ========== ENFILEIRAR ==========
+
+def enfileirar_email(destinatario, assunto, corpo_html, chamado_id=None, tipo=None, interacao_id=None, cursor=None,
+                     prioridade=None, resumo=None):
+    """
+    Grava o e-mail na fila. Com cursor, na transação do chamador (os workers
+    são avisados depois do COMMIT); sem cursor, numa transação própria.
+    prioridade (do chamado) decide se espera a janela do resumo; resumo é o
+    texto do evento na lista do e-mail de resumo.
+    Retorna o id na fila.
+    """
+    from database import inserir_email_fila
+
+    grupo = grupo_resumo(destinatario, chamado_id)
+    janela = 0 if prioridade in EMAIL_RESUMO_IMEDIATO else EMAIL_RESUMO_JANELA
+
+    def gravar(cursor):
+        email_id = inserir_email_fila(cursor, destinatario, assunto, corpo_html, chamado_id, tipo, interacao_id,
+                                      grupo=grupo, janela=janela, resumo=resumo)
+        apos_commit(avisar_workers)
+        return email_id
+
+    iniciar_workers()
+    if cursor is not None:
+        return gravar(cursor)
+    return executar_escrita(gravar)
+
+def grupo_resumo(destinatario, chamado_id, modo=EMAIL_RESUMO_MODO, janela=EMAIL_RESUMO_JANELA):
+    """Grupo do resumo do e-mail (None com o agrupamento desligado)."""
+    if not janela:
+        return None
+    if modo == "destinatario":
+        return destinatario.strip().lower()
+    return f"{destinatario.strip().lower()}#{chamado_id or ''}"
+
+def avisar_workers():
+    """Acorda um worker para olhar a fila (e-mail novo ou reenfileirado)."""
+    global _avisos
+    with _condicao:
+        _avisos += 1
+        _condicao.notify()
+
+def reenviar_falhos():
+    """Devolve os e-mails que falharam para a fila. Retorna a quantidade."""
+    from database import reenfileirar_emails_falhos
+
+    quantidade = reenfileirar_emails_falhos()
+    if quantidade:
+        iniciar_workers()
+        with _condicao:
+            _condicao.notify_all()
+    return quantidade
+
+# ========== ENVIO ==========
+
+def atraso_retentativa(tentativas):
+    """
+    Segundos até a próxima tentativa: EMAIL_RETRY_DELAY dobrando a cada falha,
+    limitado a EMAIL_BACKOFF_MAX, com jitter (metade fixa, metade aleatória)
+    para os e-mails de uma mesma queda não voltarem todos juntos.
+    """
+    atraso = min(EMAIL_BACKOFF_MAX, EMAIL_RETRY_DELAY * 2 ** max(0, tentativas - 1))
+    return atraso / 2 + random.uniform(0, atraso / 2)
+
+def agrupar_resumos(emails):
+    """
+    Junta os e-mails reservados do mesmo grupo num e-mail de resumo. Retorna
+    os envios: o próprio e-mail quando está sozinho, ou o resumo, com os
+    e-mails da fila que ele junta em 'membros'.
+    """
+    grupos = {}
+    for email in emails:
+        chave = email.get('grupo') or ("id", email['id'])
+        grupos.setdefault(chave, []).append(email)
+
+    envios = []
+    for membros in grupos.values():
+        if len(membros) == 1:
+            envios.append(membros[0])
+            continue
+
+        chamados = {membro['chamado_id'] for membro in membros}
+        chamado_id = next(iter(chamados)) if len(chamados) == 1 else None
+        if chamado_id:
+            assunto = f"[Chamado #{chamado_id}] {len(membros)} atualizações"
+        else:
+            assunto = f"[Helpdesk] {len(membros)} atualizações em {len(chamados)} chamados"
+
+        envios.append({
+            **membros[0],
+            'assunto': assunto,
+            'corpo': email_resumo(membros),
+            'chamado_id': chamado_id,
+            'tipo': 'resumo',
+            'tentativas': max(membro['tentativas'] for membro in membros),
+            'membros': membros,
+        })
+    return envios
+
+def processar_emails(emails):
+    """
+    Uma tentativa para cada e-mail reservado (os do mesmo grupo juntos num
+    resumo), todos na mesma sessão SMTP. Retorna os novos status, por envio.
+    """
+    from database import concluir_email_fila
+
+    envios = agrupar_resumos(emails)
+    status = []
+    enviar = []
+    for indice, envio in enumerate(envios):
+        status.append(None)
+        if not EMAIL_ENABLED:
+            status[indice] = _registrar_tentativa(envio, None, "Simulado")
+            continue
+
+        valido, erro = validar_envio(envio['destinatario'])
+        if not valido:
+            estatisticas["mortos"] += 1
+            status[indice] = concluir_email_fila(envio, False, erro)
+            continue
+
+        enviar.append(indice)
+
+    if enviar:
+        inicio = time.perf_counter()
+        erros = enviar_lote([(envios[i]['destinatario'], envios[i]['assunto'], envios[i]['corpo'], None) for i in enviar])
+        estatisticas["tempo_envio"] += time.perf_counter() - inicio
+
+        for indice, erro in zip(enviar, erros):
+            status[indice] = _registrar_tentativa(envios[indice], erro)
+
+    return status
+
+def _registrar_tentativa(email, erro, observacao=None):
+    """Grava o resultado da tentativa: enviado, de volta à fila (com espera) ou falhou."""
+    from database import concluir_email_fila
+
+    if erro is None:
+        estatisticas["enviados"] += 1
+        if email.get('membros'):
+            estatisticas["resumos"] += 1
+            estatisticas["agrupados"] += len(email['membros'])
+        _enviados_recentes.append(time.monotonic())
+        return concluir_email_fila(email, True, observacao)
+
+    mensagem = f"{type(erro).__name__}: {erro}"
+    disjuntor = obter_disjuntor()
+
+    if isinstance(erro, DisjuntorAberto) or (falha_do_servidor(erro) and disjuntor.aberto()):
+        # Servidor fora: adiado até a sonda do disjuntor, sem contar como tentativa
+        estatisticas["adiados"] += 1
+        proxima = int(time.time() + max(disjuntor.segundos_para_sonda(), EMAIL_RETRY_DELAY))
+        return concluir_email_fila(email, False, mensagem, proxima_tentativa_epoch=proxima, adiar=True)
+
+    estatisticas["falhas"] += 1
+
+    if isinstance(erro, ERROS_DEFINITIVOS) or email['tentativas'] >= EMAIL_FILA_MAX_TENTATIVAS:
+        estatisticas["mortos"] += 1
+        print(f"❌ E-mail {email['id']} para {email['destinatario']} falhou: {mensagem}")
+        return concluir_email_fila(email, False, mensagem)
+
+    proxima = int(time.time() + atraso_retentativa(email['tentativas']))
+    return concluir_email_fila(email, False, mensagem, proxima_tentativa_epoch=proxima)
+
+def _proximos_emails():
+    """Reserva os próximos e-mails vencidos (até EMAIL_LOTE). Retorna (emails, segundos_para_esperar)."""
+    from database import proximo_envio_fila, reservar_emails_fila
+
+    # Disjuntor aberto: nada é reservado até a hora da sonda
+    espera = obter_disjuntor().segundos_para_sonda()
+    if espera > 0:
+        return [], min(espera, EMAIL_FILA_INTERVALO)
+
+    # Leitura pelo índice antes de ocupar o escritor com a reserva
+    proximo = proximo_envio_fila()
+    if proximo is None:
+        return [], EMAIL_FILA_INTERVALO
+
+    espera = proximo - time.time()
+    if espera > 0:
+        return [], min(espera, EMAIL_FILA_INTERVALO)
+
+    return reservar_emails_fila(EMAIL_LOTE, dono=DONO_RESERVAS), 0
+
+def _podar_periodicamente():
+    global _ultima_poda
+    from database import podar_fila_emails_db
+
+    agora = time.monotonic()
+    if _ultima_poda and agora - _ultima_poda < _INTERVALO_PODA:
+        return
+    _ultima_poda = agora
+
+    try:
+        enviar_escrita(podar_fila_emails_db, EMAIL_FILA_RETENCAO_DIAS)
+    except Exception as e:
+        print(f"Erro ao agendar poda da fila de e-mails: {e}")
+
+def _liberar_periodicamente():
+    """Devolve à fila as reservas vencidas (de workers que pararam em qualquer processo)."""
+    global _ultima_liberacao
+    from database import liberar_emails_presos
+
+    agora = time.monotonic()
+    if _ultima_liberacao and agora - _ultima_liberacao < EMAIL_RESERVA_PRAZO:
+        return
+    _ultima_liberacao = agora
+
+    liberar_emails_presos(EMAIL_RESERVA_PRAZO)
+
+def _loop_worker():
+    visto = _avisos
+    while not _encerrando:
+        try:
+            _liberar_periodicamente()
+            emails, espera = _proximos_emails()
+            if emails:
+                processar_emails(emails)
+                continue
+            _podar_periodicamente()
+            fechar_sessoes_ociosas()
+        except Exception as e:
+            print(f"Erro no envio da fila de e-mails: {e}")
+            espera = EMAIL_FILA_INTERVALO
+
+        with _condicao:
+            _condicao.wait_for(lambda: _encerrando or _avisos != visto, timeout=espera)
+            visto = _avisos
+
+# ========== WORKERS ==========
+
+def iniciar_workers():
+    """Sobe os EMAIL_WORKERS workers (uma vez por processo)."""
+    if len(_workers) >= EMAIL_WORKERS and all(w.is_alive() for w in _workers):
+        return
+
+    with _workers_lock:
+        vivos = [w for w in _workers if w.is_alive()]
+        for numero in range(len(vivos), EMAIL_WORKERS):
+            worker = threading.Thread(target=_loop_worker, name=f"fila-emails-{numero + 1}", daemon=True)
+            worker.start()
+            vivos.append(worker)
+        _workers[:] = vivos
+
+def metricas_fila():
+    """
+    Profundidade da fila (por status, idade do pendente mais antigo) e vazão
+    do processo: enviados no último minuto, falhas, tempo médio por tentativa.
+    """
+    from database import contar_fila_emails
+
+    agora = time.monotonic()
+    tentativas = estatisticas["enviados"] + estatisticas["falhas"]
+    return {
+        **contar_fila_emails(),
+        **estatisticas,
+        "enviados_ultimo_minuto": sum(1 for instante in _enviados_recentes if agora - instante <= 60),
+        "tempo_medio_ms": round(estatisticas["tempo_envio"] / tentativas * 1000, 1) if tentativas else 0.0,
+        "workers": sum(1 for w in _workers if w.is_alive()),
+    }
+
+def encerrar_workers(timeout=5):
+    """Para os workers (o e-mail em envio termina; o resto fica na fila para o próximo processo)."""
+    global _encerrando
+    with _condicao:
+        _encerrando = True
+        _condicao.notify_all()
+
+    for worker in list(_workers):
+        worker.join(timeout=timeout)
+
+atexit.register(encerrar_workers)
@@ -0,0 +1,214 @@
+# app/email_system/limite_envio.py
+"""
+Limite de envio e disjuntor do SMTP
+
+O provedor limita quantas mensagens a caixa envia por minuto (Office 365: 30)
+e, fora do ar ou lento, cada tentativa prende um worker por até 30 s de timeout.
+- LimiteTaxa: balde de fichas (EMAIL_TAXA_POR_MINUTO, rajada de
+  EMAIL_TAXA_RAJADA); quem passa do ritmo espera a próxima ficha em vez de
+  levar um erro de throttling do servidor.
+- Disjuntor: depois de EMAIL_DISJUNTOR_FALHAS falhas seguidas do servidor
+  (conexão, timeout, autenticação, 4xx temporário) abre e ninguém tenta enviar;
+  depois de EMAIL_DISJUNTOR_ESPERA s deixa UMA sonda passar: se ela enviar,
+  fecha; se falhar, reabre com o dobro da espera (até EMAIL_DISJUNTOR_ESPERA_MAX).
+  Erros de uma mensagem só (destinatário recusado, 5xx de conteúdo) não contam.
+
+Os dois valem para o processo inteiro (todos os workers e o teste do Force Fix).
+"""
+
+import smtplib
+import threading
+import time
+
+from config.email_config import (
+    EMAIL_TAXA_POR_MINUTO, EMAIL_TAXA_RAJADA,
+    EMAIL_DISJUNTOR_FALHAS, EMAIL_DISJUNTOR_ESPERA, EMAIL_DISJUNTOR_ESPERA_MAX
+)
+
+# Respostas de "tente mais tarde" (serviço indisponível, limite do provedor, caixa ocupada)
+CODIGOS_TEMPORARIOS = (421, 432, 450, 451, 452, 454)
+
+# Sonda sem resultado depois disso (s) é considerada perdida e outra pode sair
+_SONDA_EXPIRA = 90
+
+class DisjuntorAberto(Exception):
+    """Envio não tentado: o disjuntor está aberto (o servidor vem falhando)."""
+
+def falha_do_servidor(erro):
+    """O erro é do servidor ou da conexão (conta para o disjuntor), e não da mensagem?"""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(erro, (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError, smtplib.SMTPHeloError)):
+        return True
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return erro.smtp_code in CODIGOS_TEMPORARIOS
+    return isinstance(erro, OSError)
+
+class LimiteTaxa:
+    """
+    Balde de fichas: `por_minuto` fichas por minuto, no máximo `rajada`
+    guardadas. A ficha é reservada na hora (o saldo pode ficar negativo), então
+    threads concorrentes esperam em fila, cada uma pela sua vez.
+    """
+
+    def __init__(self, por_minuto=EMAIL_TAXA_POR_MINUTO, rajada=EMAIL_TAXA_RAJADA):
+        self.por_segundo = por_minuto / 60
+        self.rajada = max(1, rajada)
+        self._fichas = float(self.rajada)
+        self._atualizado = time.monotonic()
+        self._lock = threading.Lock()
+        self.estatisticas = {"liberadas": 0, "esperas": 0, "tempo_espera": 0.0}
+
+    def aguardar(self):
+        """Bloqueia até a vez desta mensagem. Retorna os segundos esperados."""
+        if self.por_segundo <= 0:
+            return 0.0
+
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._atualizado) * self.por_segundo)
+            self._atualizado = agora
+            self._fichas -= 1
+            espera = -self._fichas / self.por_segundo if self._fichas < 0 else 0.0
+
+            self.estatisticas["liberadas"] += 1
+            if espera:
+                self.estatisticas["esperas"] += 1
+                self.estatisticas["tempo_espera"] += espera
+
+        if espera:
+            time.sleep(espera)
+        return espera
+
+    def fichas(self):
+        """Fichas disponíveis agora (negativo: mensagens já na espera)."""
+        with self._lock:
+            return min(self.rajada, self._fichas + (time.monotonic() - self._atualizado) * self.por_segundo)
+
+class Disjuntor:
+    """Estados: 'fechado' (envia), 'aberto' (não envia) e 'meio_aberto' (uma sonda)."""
+
+    def __init__(self, falhas=EMAIL_DISJUNTOR_FALHAS, espera=EMAIL_DISJUNTOR_ESPERA,
+                 espera_max=EMAIL_DISJUNTOR_ESPERA_MAX):
+        self.limite_falhas = max(1, falhas)
+        self.espera_inicial = espera
+        self.espera_max = max(espera, espera_max)
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+        self.espera = espera
+        self.ultimo_erro = None
+        self._sonda_desde = None
+        self._reabre_em = 0.0
+        self._lock = threading.Lock()
+        self.estatisticas = {"aberturas": 0, "sondas": 0, "bloqueados": 0}
+
+    def permitir(self):
+        """Pode tentar enviar agora? No meio-aberto, só quem recebe True é a sonda."""
+        with self._lock:
+            agora = time.monotonic()
+            if self.estado == "fechado":
+                return True
+
+            if self.estado == "aberto" and agora >= self._reabre_em:
+                self.estado = "meio_aberto"
+                self._sonda_desde = None
+
+            if self.estado == "meio_aberto" and (
+                self._sonda_desde is None or agora - self._sonda_desde > _SONDA_EXPIRA
+            ):
+                self._sonda_desde = agora
+                self.estatisticas["sondas"] += 1
+                return True
+
+            self.estatisticas["bloqueados"] += 1
+            return False
+
+    def aberto(self):
+        """Fora do estado normal (aberto ou com sonda em andamento)."""
+        return self.estado != "fechado"
+
+    def segundos_para_sonda(self):
+        """Quanto falta para alguém poder tentar de novo (0 = já pode)."""
+        with self._lock:
+            if self.estado == "fechado":
+                return 0.0
+            if self.estado == "aberto":
+                return max(0.0, self._reabre_em - time.monotonic())
+            # Meio-aberto: livre se ninguém está sondando; senão, aguardar o resultado
+            return 0.0 if self._sonda_desde is None else 1.0
+
+    def registrar(self, erro):
+        """Resultado de um envio (erro None = enviado)."""
+        if erro is None or not falha_do_servidor(erro):
+            self._sucesso()
+        else:
+            self._falha(erro)
+
+    def fechar(self):
+        """Volta ao normal (ex: depois de corrigir a configuração do SMTP)."""
+        with self._lock:
+            self._fechar()
+
+    def situacao(self):
+        """Estado para o Force Fix."""
+        return {
+            "estado": self.estado,
+            "falhas_seguidas": self.falhas_seguidas,
+            "espera": self.espera,
+            "proxima_sonda": round(self.segundos_para_sonda(), 1),
+            "ultimo_erro": self.ultimo_erro,
+            **self.estatisticas,
+        }
+
+    def _sucesso(self):
+        with self._lock:
+            self.falhas_seguidas = 0
+            if self.estado != "fechado":
+                self._fechar()
+
+    def _falha(self, erro):
+        with self._lock:
+            self.ultimo_erro = f"{type(erro).__name__}: {erro}"
+            if self.estado == "meio_aberto":
+                # A sonda falhou: reabre com o dobro da espera
+                self.espera = min(self.espera_max, self.espera * 2)
+                self._abrir()
+            elif self.estado == "fechado":
+                self.falhas_seguidas += 1
+                if self.falhas_seguidas >= self.limite_falhas:
+                    self._abrir()
+
+    def _abrir(self):
+        self.estado = "aberto"
+        self._sonda_desde = None
+        self._reabre_em = time.monotonic() + self.espera
+        self.estatisticas["aberturas"] += 1
+        print(f"⛔ Disjuntor do SMTP aberto por {self.espera:.0f}s: {self.ultimo_erro}")
+
+    def _fechar(self):
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+        self.espera = self.espera_inicial
+        self._sonda_desde = None
+
+_limite = None
+_disjuntor = None
+_instancias_lock = threading.Lock()
+
+def obter_limite_envio():
+    """Limite de taxa do processo (criado no primeiro uso)."""
+    global _limite
+    if _limite is None:
+        with _instancias_lock:
+            if _limite is None:
+                _limite = LimiteTaxa()
+    return _limite
+
+def obter_disjuntor():
+    """Disjuntor do processo (criado no primeiro uso)."""
+    global _disjuntor
+    if _disjuntor is None:
+        with _instancias_lock:
+            if _disjuntor is None:
+                _disjuntor = Disjuntor()
+    return _disjuntor
@@ -0,0 +1,184 @@
+# app/email_system/sessoes_smtp.py
+"""
+Pool de sessões SMTP
+
+Abrir uma sessão custa TCP + EHLO + STARTTLS + EHLO + AUTH: vários round trips
+e um handshake TLS por e-mail. O pool mantém sessões já autenticadas entre
+envios (várias mensagens por sessão, um QUIT só no fim):
+- sessão parada há mais de EMAIL_SMTP_VERIFICAR_APOS s é testada com NOOP
+  antes do uso; se não responder, é descartada e outra é aberta;
+- sessão parada há mais de EMAIL_SMTP_OCIOSO s é encerrada (os servidores
+  derrubam conexões ociosas de qualquer forma);
+- depois de EMAIL_SMTP_MAX_MENSAGENS mensagens a sessão é renovada.
+"""
+
+import atexit
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+
+from config.email_config import (
+    SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_USE_TLS,
+    EMAIL_SMTP_SESSOES, EMAIL_SMTP_VERIFICAR_APOS, EMAIL_SMTP_OCIOSO, EMAIL_SMTP_MAX_MENSAGENS
+)
+
+def conectar_smtp():
+    """Abre a conexão SMTP já autenticada."""
+    if SMTP_USE_TLS:
+        servidor = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        servidor.ehlo()
+        servidor.starttls()
+        servidor.ehlo()
+    else:
+        contexto = ssl.create_default_context()
+        servidor = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=contexto, timeout=30)
+
+    servidor.login(SMTP_USER, SMTP_PASSWORD)
+    return servidor
+
+class SessaoSMTP:
+    """Conexão autenticada e seu uso (para decidir NOOP, encerramento e renovação)."""
+
+    __slots__ = ("servidor", "usada_em", "mensagens", "reutilizada")
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self.usada_em = time.monotonic()
+        self.mensagens = 0
+        self.reutilizada = False
+
+    def enviar(self, remetente, destinatario, mensagem):
+        """Envia uma mensagem já montada (texto MIME)."""
+        self.servidor.sendmail(remetente, destinatario, mensagem)
+        self.mensagens += 1
+
+class PoolSMTP:
+    """
+    Sessões livres em pilha (a última devolvida, mais "quente", sai primeiro).
+    Não limita quantas estão em uso: quem limita os envios simultâneos são os
+    workers da fila; o pool guarda no máximo `tamanho` sessões livres.
+    """
+
+    def __init__(self, conectar=conectar_smtp, tamanho=EMAIL_SMTP_SESSOES,
+                 verificar_apos=EMAIL_SMTP_VERIFICAR_APOS, ocioso=EMAIL_SMTP_OCIOSO,
+                 max_mensagens=EMAIL_SMTP_MAX_MENSAGENS):
+        self.conectar = conectar
+        self.tamanho = tamanho
+        self.verificar_apos = verificar_apos
+        self.ocioso = ocioso
+        self.max_mensagens = max_mensagens
+        self._livres = deque()
+        self._lock = threading.Lock()
+        self.estatisticas = {"abertas": 0, "reutilizadas": 0, "noops": 0, "descartadas": 0, "encerradas": 0}
+
+    def obter(self):
+        """Sessão pronta para enviar: uma livre (verificada se estava parada) ou uma nova."""
+        while True:
+            with self._lock:
+                sessao = self._livres.pop() if self._livres else None
+
+            if sessao is None:
+                break
+
+            parada = time.monotonic() - sessao.usada_em
+            if parada > self.ocioso:
+                self._encerrar(sessao)
+                continue
+            if parada >= self.verificar_apos and not self._responde(sessao):
+                self.descartar(sessao)
+                continue
+
+            sessao.reutilizada = True
+            self.estatisticas["reutilizadas"] += 1
+            return sessao
+
+        sessao = SessaoSMTP(self.conectar())
+        self.estatisticas["abertas"] += 1
+        return sessao
+
+    def devolver(self, sessao):
+        """Sessão volta para o pool (ou é encerrada, se já enviou demais ou o pool está cheio)."""
+        sessao.usada_em = time.monotonic()
+
+        if sessao.mensagens < self.max_mensagens:
+            with self._lock:
+                if len(self._livres) < self.tamanho:
+                    self._livres.append(sessao)
+                    return
+
+        self._encerrar(sessao)
+
+    def descartar(self, sessao):
+        """Sessão quebrada: fecha o socket sem conversar com o servidor."""
+        self.estatisticas["descartadas"] += 1
+        try:
+            sessao.servidor.close()
+        except Exception:
+            pass
+
+    def fechar_ociosas(self):
+        """Encerra as sessões paradas há mais de `ocioso` segundos. Retorna quantas."""
+        limite = time.monotonic() - self.ocioso
+        with self._lock:
+            ociosas = [s for s in self._livres if s.usada_em < limite]
+            for sessao in ociosas:
+                self._livres.remove(sessao)
+
+        for sessao in ociosas:
+            self._encerrar(sessao)
+        return len(ociosas)
+
+    def fechar_todas(self):
+        """Encerra todas as sessões livres (QUIT)."""
+        with self._lock:
+            livres = list(self._livres)
+            self._livres.clear()
+
+        for sessao in livres:
+            self._encerrar(sessao)
+
+    def sessoes_livres(self):
+        with self._lock:
+            return len(self._livres)
+
+    def _responde(self, sessao):
+        self.estatisticas["noops"] += 1
+        try:
+            return sessao.servidor.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _encerrar(self, sessao):
+        self.estatisticas["encerradas"] += 1
+        try:
+            sessao.servidor.quit()
+        except Exception:
+            try:
+                sessao.servidor.close()
+            except Exception:
+                pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obter_pool_smtp():
+    """Pool de sessões do processo (criado no primeiro uso)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolSMTP()
+    return _pool
+
+def fechar_sessoes_ociosas():
+    """Encerra as sessões ociosas do pool do processo (chamado pelos workers da fila)."""
+    if _pool is not None:
+        _pool.fechar_ociosas()
+
+def _fechar_pool():
+    if _pool is not None:
+        _pool.fechar_todas()
+
+atexit.register(_fechar_pool)
@@ -0,0 +1,199 @@
+# app/escritor.py
+"""
+Escritor único - todas as escritas passam por UMA thread
+
+As sessões do Streamlit (e threads em segundo plano, como o envio de e-mails)
+não escrevem mais em conexões próprias: enfileiram uma tarefa, uma função que
+recebe o cursor, e aguardam o resultado num Future. A thread escritora é a
+única que escreve. Ela pega tudo o que estiver na fila (até ESCRITOR_LOTE
+tarefas) e grava numa só transação (group commit, um fsync para o lote).
+
+Cada tarefa roda num SAVEPOINT próprio: se uma falhar, só a parte dela é
+desfeita e o Future recebe a exceção; as demais seguem no mesmo COMMIT.
+Os Futures são resolvidos só depois do COMMIT; apos_commit() agenda avisos
+(ex: acordar quem consome uma fila) para o mesmo momento.
+"""
+
+import threading
+import atexit
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+
+from config.db_config import ESCRITOR_LOTE, ESCRITOR_TIMEOUT
+from db_pool import obter_pool
+
+_fila = deque()
+_condicao = threading.Condition()
+_escritor_lock = threading.Lock()
+_escritor = None
+_encerrando = False
+
+# Cursor da transação em andamento (tarefas aninhadas reutilizam)
+_cursor_atual = None
+
+# Funções agendadas por apos_commit() na transação em andamento
+_apos_commit = []
+
+# Estatísticas do escritor (diagnóstico e benchmark)
+estatisticas = {"tarefas": 0, "transacoes": 0, "falhas": 0, "maior_lote": 0}
+
+def enviar_escrita(tarefa, *args, **kwargs):
+    """
+    Enfileira tarefa(cursor, *args, **kwargs) para a thread escritora.
+    Retorna um Future com o retorno da tarefa (ou a exceção dela).
+    """
+    futuro = Future()
+
+    # Chamada de dentro de outra tarefa: executa na transação em andamento
+    if threading.current_thread() is _escritor and _cursor_atual is not None:
+        try:
+            futuro.set_result(tarefa(_cursor_atual, *args, **kwargs))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+    with _condicao:
+        if _encerrando:
+            raise RuntimeError("Escritor encerrado")
+        _fila.append((tarefa, args, kwargs, futuro))
+        _condicao.notify()
+
+    _iniciar_escritor()
+    return futuro
+
+def executar_escrita(tarefa, *args, **kwargs):
+    """
+    Enfileira a tarefa e aguarda o resultado (propaga a exceção da tarefa).
+    Se ela não começou em ESCRITOR_TIMEOUT segundos, sai da fila e nunca será
+    gravada (TimeoutError); se já começou, o resultado é aguardado: um erro
+    não pode ser informado para uma escrita que ainda vai acontecer.
+    """
+    futuro = enviar_escrita(tarefa, *args, **kwargs)
+    try:
+        return futuro.result(timeout=ESCRITOR_TIMEOUT)
+    except FuturesTimeoutError:
+        if futuro.cancel():
+            raise
+        return futuro.result()
+
+def apos_commit(funcao):
+    """
+    Agenda funcao() para depois do COMMIT da transação em andamento (descartada
+    se a tarefa que a agendou falhar). Fora de uma tarefa, roda na hora.
+    """
+    if threading.current_thread() is _escritor and _cursor_atual is not None:
+        _apos_commit.append(funcao)
+    else:
+        funcao()
+
+def tarefas_pendentes():
+    """Quantidade de tarefas aguardando a thread escritora."""
+    with _condicao:
+        return len(_fila)
+
+def _gravar_lote(lote):
+    """Executa o lote numa transação, uma tarefa por SAVEPOINT."""
+    global _cursor_atual
+    concluidas = []
+
+    # Tarefas canceladas por timeout em executar_escrita não são gravadas
+    lote = [item for item in lote if item[3].set_running_or_notify_cancel()]
+    if not lote:
+        return
+
+    try:
+        conn = obter_pool().obter()
+    except Exception as e:
+        for _, _, _, futuro in lote:
+            futuro.set_exception(e)
+        estatisticas["falhas"] += len(lote)
+        return
+
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.cursor()
+        _cursor_atual = cursor
+
+        for tarefa, args, kwargs, futuro in lote:
+            cursor.execute("SAVEPOINT tarefa")
+            agendadas = len(_apos_commit)
+            try:
+                resultado = tarefa(cursor, *args, **kwargs)
+                cursor.execute("RELEASE tarefa")
+                concluidas.append((futuro, resultado))
+            except Exception as e:
+                del _apos_commit[agendadas:]
+                cursor.execute("ROLLBACK TO tarefa")
+                cursor.execute("RELEASE tarefa")
+                futuro.set_exception(e)
+                estatisticas["falhas"] += 1
+
+        conn.commit()
+    except Exception as e:
+        # Falha da transação inteira (BEGIN/COMMIT): nenhuma tarefa foi gravada
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        for futuro, _ in concluidas:
+            futuro.set_exception(e)
+        for _, _, _, futuro in lote:
+            if not futuro.done():
+                futuro.set_exception(e)
+        estatisticas["falhas"] += len(concluidas)
+        concluidas = []
+        _apos_commit.clear()
+    finally:
+        _cursor_atual = None
+        conn.close()
+
+    agendadas = _apos_commit[:]
+    _apos_commit.clear()
+
+    estatisticas["tarefas"] += len(lote)
+    estatisticas["transacoes"] += 1
+    estatisticas["maior_lote"] = max(estatisticas["maior_lote"], len(lote))
+
+    for futuro, resultado in concluidas:
+        futuro.set_result(resultado)
+
+    for funcao in agendadas:
+        try:
+            funcao()
+        except Exception as e:
+            print(f"Erro após commit: {e}")
+
+def _loop_escritor():
+    while True:
+        with _condicao:
+            _condicao.wait_for(lambda: _encerrando or _fila)
+            lote = [_fila.popleft() for _ in range(min(len(_fila), ESCRITOR_LOTE))]
+            encerrar = _encerrando and not _fila
+
+        if lote:
+            _gravar_lote(lote)
+
+        if encerrar:
+            return
+
+def _iniciar_escritor():
+    global _escritor
+    if _escritor is not None and _escritor.is_alive():
+        return
+
+    with _escritor_lock:
+        if _escritor is None or not _escritor.is_alive():
+            _escritor = threading.Thread(target=_loop_escritor, name="escritor-banco", daemon=True)
+            _escritor.start()
+
+def encerrar_escritor(timeout=5):
+    """Grava o que restou na fila e para a thread escritora (chamado no encerramento)."""
+    global _encerrando
+    with _condicao:
+        _encerrando = True
+        _condicao.notify_all()
+
+    if _escritor is not None and _escritor.is_alive():
+        _escritor.join(timeout=timeout)
+
+atexit.register(encerrar_escritor)
@@ -2,6 +2,10 @@
 """
 Script de inicialização do banco de dados
 Execute uma vez para criar todas as tabelas
+
+Uso:
+    python init_db.py                          # cria/atualiza as tabelas
+    python init_db.py --reconstruir-resumos    # recalcula os resumos do dashboard
 """
 
 import os
@@ -12,7 +16,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
-from database import criar_tabelas
+from database import criar_tabelas, reconstruir_resumos
 
 if __name__ == "__main__":
     print("="*50)
@@ -40,4 +44,9 @@ if __name__ == "__main__":
     else:
         print("\n❌ Erro ao inicializar banco de dados")
     
+    if resultado and "--reconstruir-resumos" in sys.argv:
+        print("\n📊 Reconstruindo resumos do dashboard...")
+        sucesso, msg = reconstruir_resumos()
+        print(f"   {'✅' if sucesso else '❌'} {msg}")
+    
     print("\n" + "="*50)
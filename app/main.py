@@ -10,10 +10,11 @@ from PIL import Image
 import os
 
 # Imports locais
-from database import criar_tabelas, conectar, atualizar_ultimo_acesso
+from database import garantir_schema, conectar, atualizar_ultimo_acesso
 from auth import login, tela_cadastro_usuario
 from chamados import tela_chamados
 from dashboard import tela_dashboard
+from email_system.fila_emails import iniciar_workers
 from utils import agora_brasilia, agora_brasilia_hora
 
 # Configuração da página
@@ -141,8 +142,11 @@ def main():
     # Injetar CSS customizado
     st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
     
-    # Criar tabelas no primeiro acesso
-    criar_tabelas()
+    # Aplicar migrações pendentes (em regime normal: só checa PRAGMA user_version)
+    garantir_schema()
+    
+    # Workers da fila de e-mails (retomam o que ficou pendente antes de um reinício)
+    iniciar_workers()
     
     # Inicializar variáveis de sessão
     if 'usuario' not in st.session_state:
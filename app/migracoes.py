@@ -0,0 +1,892 @@
+# app/migracoes.py
+"""
+Migrações do Schema do Banco de Dados
+Versionadas via PRAGMA user_version: cada passo roda uma única vez,
+em ordem, dentro da sua própria transação.
+
+REGRA: toda migração deve ser idempotente (IF NOT EXISTS, checar colunas
+antes do ALTER TABLE), pois "Recriar Tabelas Faltantes" no Force Fix
+reaplica todas elas.
+"""
+
+import sqlite3
+import threading
+
+from utils import hash_senha, agora_brasilia_str
+
+# ========== UTILITÁRIOS ==========
+
+def versao_schema(conn):
+    """Retorna a versão atual do schema (PRAGMA user_version)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def colunas_tabela(cursor, tabela):
+    """Retorna o conjunto de colunas existentes em uma tabela (inclusive as geradas)."""
+    cursor.execute(f"PRAGMA table_xinfo({tabela})")
+    return {row[1] for row in cursor.fetchall()}
+
+def adicionar_colunas_faltantes(cursor, tabela, colunas):
+    """Adiciona as colunas que ainda não existem. Retorna as adicionadas."""
+    existentes = colunas_tabela(cursor, tabela)
+    adicionadas = []
+    
+    for col_nome, col_tipo in colunas:
+        if col_nome not in existentes:
+            cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {col_nome} {col_tipo}")
+            adicionadas.append(f"{tabela}.{col_nome}")
+    
+    return adicionadas
+
+# ========== MIGRAÇÕES ==========
+
+def migracao_001_tabelas_iniciais(cursor):
+    """Cria TODAS as tabelas necessárias para persistência completa."""
+    
+    # ========== TABELA DE USUÁRIOS ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT UNIQUE NOT NULL,
+            senha_hash TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            perfil TEXT NOT NULL,
+            nome_completo TEXT,
+            empresa TEXT,
+            email TEXT UNIQUE,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ultimo_acesso TIMESTAMP,
+            ativo INTEGER DEFAULT 1
+        )
+    """)
+    
+    # ========== TABELA DE CHAMADOS ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chamados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assunto TEXT NOT NULL,
+            prioridade TEXT NOT NULL,
+            descricao TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Novo',
+            usuario TEXT NOT NULL,
+            data_abertura TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            atendente TEXT,
+            data_inicio_atendimento TIMESTAMP,
+            data_fim_atendimento TIMESTAMP,
+            tempo_atendimento_segundos INTEGER DEFAULT 0,
+            status_atendimento TEXT DEFAULT 'nao_iniciado',
+            ultima_retomada TIMESTAMP,
+            retornos INTEGER DEFAULT 0,
+            data_ultima_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # ========== TABELA DE ANEXOS (arquivos enviados na abertura) ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS anexos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chamado_id INTEGER NOT NULL,
+            nome_arquivo TEXT NOT NULL,
+            caminho_arquivo TEXT NOT NULL,
+            tamanho_bytes INTEGER,
+            tipo_arquivo TEXT,
+            data_upload TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # ========== TABELA DE INTERAÇÕES (conversas no chamado) ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS interacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chamado_id INTEGER NOT NULL,
+            autor TEXT NOT NULL,
+            mensagem TEXT NOT NULL,
+            tipo TEXT DEFAULT 'mensagem',
+            data TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            enviar_email INTEGER DEFAULT 1,
+            email_enviado INTEGER DEFAULT 0,
+            FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # ========== TABELA DE ANEXOS DE INTERAÇÃO ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS anexos_interacao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interacao_id INTEGER NOT NULL,
+            nome_arquivo TEXT NOT NULL,
+            caminho_arquivo TEXT NOT NULL,
+            tamanho_bytes INTEGER,
+            tipo_arquivo TEXT,
+            data_upload TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (interacao_id) REFERENCES interacoes(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # ========== TABELA DE MENSAGENS DE CONCLUSÃO ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mensagens_conclusao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chamado_id INTEGER NOT NULL,
+            mensagem TEXT NOT NULL,
+            atendente TEXT NOT NULL,
+            data_envio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # ========== TABELA DE ANEXOS DE CONCLUSÃO ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS anexos_conclusao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mensagem_id INTEGER NOT NULL,
+            nome_arquivo TEXT NOT NULL,
+            caminho_arquivo TEXT NOT NULL,
+            tamanho_bytes INTEGER,
+            FOREIGN KEY (mensagem_id) REFERENCES mensagens_conclusao(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # ========== TABELA DE LOGS DO SISTEMA ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS logs_sistema (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            acao TEXT NOT NULL,
+            usuario TEXT,
+            detalhes TEXT,
+            ip_address TEXT,
+            data_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # ========== TABELA DE DOWNLOADS ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS downloads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT NOT NULL,
+            arquivo_nome TEXT NOT NULL,
+            arquivo_caminho TEXT NOT NULL,
+            chamado_id INTEGER,
+            data_download TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE SET NULL
+        )
+    """)
+    
+    # ========== TABELA DE SESSÕES ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sessoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT NOT NULL,
+            token TEXT UNIQUE NOT NULL,
+            data_inicio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            data_ultimo_acesso TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ip_address TEXT,
+            ativo INTEGER DEFAULT 1
+        )
+    """)
+    
+    # ========== TABELA DE EMAILS ENVIADOS ==========
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS emails_enviados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            destinatario TEXT NOT NULL,
+            assunto TEXT NOT NULL,
+            corpo TEXT,
+            chamado_id INTEGER,
+            tipo TEXT,
+            sucesso INTEGER DEFAULT 0,
+            erro TEXT,
+            data_envio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chamado_id) REFERENCES chamados(id) ON DELETE SET NULL
+        )
+    """)
+    
+    # ========== CRIAR ÍNDICES PARA PERFORMANCE ==========
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chamados_usuario ON chamados(usuario)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chamados_status ON chamados(status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_interacoes_chamado ON interacoes(chamado_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anexos_chamado ON anexos(chamado_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_usuario ON logs_sistema(usuario)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_data ON logs_sistema(data_hora)")
+    
+    # ========== CRIAR USUÁRIO ADMIN PADRÃO ==========
+    cursor.execute("SELECT COUNT(*) FROM usuarios WHERE usuario = 'admin'")
+    if cursor.fetchone()[0] == 0:
+        senha_hash, salt = hash_senha("admin123")
+        cursor.execute("""
+            INSERT INTO usuarios 
+            (usuario, senha_hash, salt, perfil, nome_completo, empresa, email, data_cadastro)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ("admin", senha_hash, salt, "admin", "Administrador", "MP Solutions", "admin@mp.com", agora_brasilia_str()))
+
+def migracao_002_colunas_faltantes(cursor):
+    """
+    Adiciona colunas criadas depois da primeira versão do sistema
+    (antes feito manualmente pelo botão "Adicionar Colunas Faltantes" do Force Fix).
+    """
+    colunas_esperadas = {
+        'chamados': [
+            # ALTER TABLE não aceita DEFAULT não constante (CURRENT_TIMESTAMP);
+            # o valor das linhas antigas é preenchido na migração 3
+            ('data_ultima_atualizacao', 'TIMESTAMP'),
+            ('tempo_atendimento_segundos', 'INTEGER DEFAULT 0'),
+            ('status_atendimento', "TEXT DEFAULT 'nao_iniciado'"),
+            ('ultima_retomada', 'TIMESTAMP'),
+            ('retornos', 'INTEGER DEFAULT 0')
+        ],
+        'usuarios': [
+            ('ultimo_acesso', 'TIMESTAMP'),
+            ('ativo', 'INTEGER DEFAULT 1')
+        ],
+        'anexos': [
+            ('tamanho_bytes', 'INTEGER'),
+            ('tipo_arquivo', 'TEXT')
+        ]
+    }
+    
+    adicionadas = []
+    for tabela, colunas in colunas_esperadas.items():
+        adicionadas.extend(adicionar_colunas_faltantes(cursor, tabela, colunas))
+    
+    return adicionadas
+
+def migracao_003_paginacao_chamados(cursor):
+    """Prepara a paginação por chave da lista de chamados."""
+    
+    # Chamados antigos sem data de atualização: usar a data de abertura
+    # (ou agora em Brasília, como as demais datas - nunca CURRENT_TIMESTAMP, que é UTC)
+    cursor.execute("""
+        UPDATE chamados
+        SET data_ultima_atualizacao = COALESCE(data_abertura, datetime('now', '-3 hours'))
+        WHERE data_ultima_atualizacao IS NULL
+    """)
+    
+    # Ordenação por última atualização (o id entra implicitamente no índice)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chamados_atualizacao ON chamados(data_ultima_atualizacao)")
+
+def migracao_004_contadores_status(cursor):
+    """Contadores de chamados por usuário e status, mantidos por triggers."""
+    
+    # Índice de cobertura: contagem por status (geral ou por usuário) sem ler a tabela
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chamados_usuario_status ON chamados(usuario, status)")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumo_chamados_usuario (
+            usuario TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (usuario, status)
+        ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_chamados_insert
+        AFTER INSERT ON chamados
+        BEGIN
+            INSERT INTO resumo_chamados_usuario (usuario, status, total)
+            VALUES (NEW.usuario, NEW.status, 1)
+            ON CONFLICT (usuario, status) DO UPDATE SET total = total + 1;
+        END
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_chamados_delete
+        AFTER DELETE ON chamados
+        BEGIN
+            UPDATE resumo_chamados_usuario SET total = total - 1
+            WHERE usuario = OLD.usuario AND status = OLD.status;
+        END
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_chamados_update
+        AFTER UPDATE OF status, usuario ON chamados
+        WHEN OLD.status IS NOT NEW.status OR OLD.usuario IS NOT NEW.usuario
+        BEGIN
+            UPDATE resumo_chamados_usuario SET total = total - 1
+            WHERE usuario = OLD.usuario AND status = OLD.status;
+            INSERT INTO resumo_chamados_usuario (usuario, status, total)
+            VALUES (NEW.usuario, NEW.status, 1)
+            ON CONFLICT (usuario, status) DO UPDATE SET total = total + 1;
+        END
+    """)
+    
+    # Carga inicial (e reparo, quando reaplicada)
+    cursor.execute("DELETE FROM resumo_chamados_usuario")
+    cursor.execute("""
+        INSERT INTO resumo_chamados_usuario (usuario, status, total)
+        SELECT usuario, status, COUNT(*) FROM chamados GROUP BY usuario, status
+    """)
+
+def reconstruir_resumos_chamados(cursor):
+    """
+    Recalcula do zero as tabelas de resumo (por usuário e por empresa).
+    Usada na migração e pelo Force Fix para cobrir dados antigos ou divergentes.
+    """
+    cursor.execute("DELETE FROM resumo_chamados_usuario")
+    cursor.execute("""
+        INSERT INTO resumo_chamados_usuario
+            (usuario, status, total, soma_tempo, qtd_com_tempo, soma_retornos)
+        SELECT 
+            usuario, status, COUNT(*),
+            SUM(CASE WHEN tempo_atendimento_segundos > 0 THEN tempo_atendimento_segundos ELSE 0 END),
+            SUM(tempo_atendimento_segundos > 0),
+            SUM(COALESCE(retornos, 0))
+        FROM chamados
+        GROUP BY usuario, status
+    """)
+    
+    cursor.execute("DELETE FROM resumo_chamados_empresa")
+    cursor.execute("""
+        INSERT INTO resumo_chamados_empresa
+            (empresa, status, total, soma_tempo, qtd_com_tempo, soma_retornos)
+        SELECT 
+            COALESCE(u.empresa, 'Sem empresa'), r.status, SUM(r.total),
+            SUM(r.soma_tempo), SUM(r.qtd_com_tempo), SUM(r.soma_retornos)
+        FROM resumo_chamados_usuario r
+        LEFT JOIN usuarios u ON u.usuario = r.usuario
+        GROUP BY COALESCE(u.empresa, 'Sem empresa'), r.status
+    """)
+
+def migracao_005_resumos_empresa_usuario(cursor):
+    """
+    Resumos por usuário e por empresa (quantidade, tempo e retornos por status),
+    mantidos por triggers a cada INSERT/UPDATE/DELETE em chamados.
+    """
+    adicionar_colunas_faltantes(cursor, "resumo_chamados_usuario", [
+        ('soma_tempo', 'INTEGER NOT NULL DEFAULT 0'),
+        ('qtd_com_tempo', 'INTEGER NOT NULL DEFAULT 0'),
+        ('soma_retornos', 'INTEGER NOT NULL DEFAULT 0'),
+    ])
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumo_chamados_empresa (
+            empresa TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            soma_tempo INTEGER NOT NULL DEFAULT 0,
+            qtd_com_tempo INTEGER NOT NULL DEFAULT 0,
+            soma_retornos INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (empresa, status)
+        ) WITHOUT ROWID
+    """)
+    
+    # Os triggers da migração 4 passam a manter também tempo, retornos e empresa
+    for trigger in ("trg_resumo_chamados_insert", "trg_resumo_chamados_delete", "trg_resumo_chamados_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    
+    # Contribuição de uma linha de chamados (NEW ou OLD) para os resumos
+    def somar(linha, sinal):
+        return f"""
+            INSERT INTO resumo_chamados_usuario
+                (usuario, status, total, soma_tempo, qtd_com_tempo, soma_retornos)
+            VALUES (
+                {linha}.usuario, {linha}.status, {sinal}1,
+                {sinal}(CASE WHEN {linha}.tempo_atendimento_segundos > 0 THEN {linha}.tempo_atendimento_segundos ELSE 0 END),
+                {sinal}({linha}.tempo_atendimento_segundos > 0),
+                {sinal}COALESCE({linha}.retornos, 0)
+            )
+            ON CONFLICT (usuario, status) DO UPDATE SET
+                total = total + excluded.total,
+                soma_tempo = soma_tempo + excluded.soma_tempo,
+                qtd_com_tempo = qtd_com_tempo + excluded.qtd_com_tempo,
+                soma_retornos = soma_retornos + excluded.soma_retornos;
+            
+            INSERT INTO resumo_chamados_empresa
+                (empresa, status, total, soma_tempo, qtd_com_tempo, soma_retornos)
+            VALUES (
+                COALESCE((SELECT empresa FROM usuarios WHERE usuario = {linha}.usuario), 'Sem empresa'),
+                {linha}.status, {sinal}1,
+                {sinal}(CASE WHEN {linha}.tempo_atendimento_segundos > 0 THEN {linha}.tempo_atendimento_segundos ELSE 0 END),
+                {sinal}({linha}.tempo_atendimento_segundos > 0),
+                {sinal}COALESCE({linha}.retornos, 0)
+            )
+            ON CONFLICT (empresa, status) DO UPDATE SET
+                total = total + excluded.total,
+                soma_tempo = soma_tempo + excluded.soma_tempo,
+                qtd_com_tempo = qtd_com_tempo + excluded.qtd_com_tempo,
+                soma_retornos = soma_retornos + excluded.soma_retornos;
+        """
+    
+    cursor.execute(f"""
+        CREATE TRIGGER trg_resumo_chamados_insert
+        AFTER INSERT ON chamados
+        BEGIN
+            {somar("NEW", "+")}
+        END
+    """)
+    
+    cursor.execute(f"""
+        CREATE TRIGGER trg_resumo_chamados_delete
+        AFTER DELETE ON chamados
+        BEGIN
+            {somar("OLD", "-")}
+        END
+    """)
+    
+    cursor.execute(f"""
+        CREATE TRIGGER trg_resumo_chamados_update
+        AFTER UPDATE OF status, usuario, tempo_atendimento_segundos, retornos ON chamados
+        WHEN OLD.status IS NOT NEW.status
+          OR OLD.usuario IS NOT NEW.usuario
+          OR OLD.tempo_atendimento_segundos IS NOT NEW.tempo_atendimento_segundos
+          OR OLD.retornos IS NOT NEW.retornos
+        BEGIN
+            {somar("OLD", "-")}
+            {somar("NEW", "+")}
+        END
+    """)
+    
+    # Usuário trocou de empresa: move os totais dele entre as empresas
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_usuario_empresa
+        AFTER UPDATE OF empresa ON usuarios
+        WHEN COALESCE(OLD.empresa, 'Sem empresa') IS NOT COALESCE(NEW.empresa, 'Sem empresa')
+        BEGIN
+            UPDATE resumo_chamados_empresa SET
+                total = resumo_chamados_empresa.total - r.total,
+                soma_tempo = resumo_chamados_empresa.soma_tempo - r.soma_tempo,
+                qtd_com_tempo = resumo_chamados_empresa.qtd_com_tempo - r.qtd_com_tempo,
+                soma_retornos = resumo_chamados_empresa.soma_retornos - r.soma_retornos
+            FROM resumo_chamados_usuario r
+            WHERE r.usuario = NEW.usuario
+              AND resumo_chamados_empresa.empresa = COALESCE(OLD.empresa, 'Sem empresa')
+              AND resumo_chamados_empresa.status = r.status;
+            
+            INSERT INTO resumo_chamados_empresa
+                (empresa, status, total, soma_tempo, qtd_com_tempo, soma_retornos)
+            SELECT COALESCE(NEW.empresa, 'Sem empresa'), status, total, soma_tempo, qtd_com_tempo, soma_retornos
+            FROM resumo_chamados_usuario
+            WHERE usuario = NEW.usuario
+            ON CONFLICT (empresa, status) DO UPDATE SET
+                total = total + excluded.total,
+                soma_tempo = soma_tempo + excluded.soma_tempo,
+                qtd_com_tempo = qtd_com_tempo + excluded.qtd_com_tempo,
+                soma_retornos = soma_retornos + excluded.soma_retornos;
+        END
+    """)
+    
+    reconstruir_resumos_chamados(cursor)
+
+def migracao_006_cronometro_sql(cursor):
+    """Índices do ranking de tempo de atendimento (tempo calculado no SQL)."""
+    
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chamados_tempo ON chamados(tempo_atendimento_segundos)")
+    
+    # Parcial: só os chamados com cronômetro rodando (poucos)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chamados_em_andamento ON chamados(status_atendimento)
+        WHERE status_atendimento = 'em_andamento'
+    """)
+
+def migracao_007_indices_compostos(cursor):
+    """Índices compostos das consultas do catálogo (analise_consultas.py)."""
+    
+    indices = [
+        # Lista de chamados: filtro + ordenação por atualização sem árvore temporária
+        "idx_chamados_status_atualizacao ON chamados(status, data_ultima_atualizacao)",
+        "idx_chamados_usuario_atualizacao ON chamados(usuario, data_ultima_atualizacao)",
+        # Substitui idx_chamados_usuario_status (prefixo) e continua cobrindo as contagens
+        "idx_chamados_usuario_status_atualizacao ON chamados(usuario, status, data_ultima_atualizacao)",
+        # Detalhes do chamado
+        "idx_interacoes_chamado_data ON interacoes(chamado_id, data, id)",
+        "idx_anexos_interacao_interacao ON anexos_interacao(interacao_id)",
+        "idx_mensagens_conclusao_chamado ON mensagens_conclusao(chamado_id, data_envio, id)",
+        "idx_anexos_conclusao_mensagem ON anexos_conclusao(mensagem_id)",
+        # Históricos ordenados por data
+        "idx_logs_usuario_data ON logs_sistema(usuario, data_hora)",
+        "idx_downloads_usuario_data ON downloads(usuario, data_download)",
+        "idx_emails_enviados_data ON emails_enviados(data_envio)",
+    ]
+    for indice in indices:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {indice}")
+    
+    # Índices que viraram prefixo dos compostos acima
+    for indice in ("idx_chamados_usuario_status", "idx_interacoes_chamado", "idx_logs_usuario"):
+        cursor.execute(f"DROP INDEX IF EXISTS {indice}")
+    
+    # Estatísticas para o planejador escolher entre os índices
+    cursor.execute("ANALYZE")
+
+# Índices de texto: (tabela FTS, tabela de conteúdo, colunas indexadas)
+INDICES_BUSCA = [
+    ("busca_chamados", "chamados", ["assunto", "descricao"]),
+    ("busca_interacoes", "interacoes", ["mensagem"]),
+    ("busca_conclusoes", "mensagens_conclusao", ["mensagem"]),
+]
+
+def reconstruir_indices_busca(cursor):
+    """Reindexa todo o texto a partir das tabelas de conteúdo."""
+    for tabela_fts, _, _ in INDICES_BUSCA:
+        cursor.execute(f"INSERT INTO {tabela_fts}({tabela_fts}) VALUES ('rebuild')")
+
+def migracao_008_busca_texto(cursor):
+    """
+    Busca de texto (FTS5) em chamados, interações e mensagens de conclusão.
+    Tabelas de conteúdo externo: o texto fica só na tabela original e o
+    índice é mantido por triggers.
+    """
+    for tabela_fts, tabela, colunas in INDICES_BUSCA:
+        lista = ", ".join(colunas)
+        novos = ", ".join(f"NEW.{coluna}" for coluna in colunas)
+        antigos = ", ".join(f"OLD.{coluna}" for coluna in colunas)
+        
+        # remove_diacritics 2: "configuração" casa com "configuracao"
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {tabela_fts} USING fts5(
+                {lista},
+                content='{tabela}',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        
+        # Vocabulário (termos e quantidade de documentos): expansão de prefixos
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabela_fts}_vocab USING fts5vocab({tabela_fts}, 'row')")
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela_fts}_insert
+            AFTER INSERT ON {tabela}
+            BEGIN
+                INSERT INTO {tabela_fts}(rowid, {lista}) VALUES (NEW.id, {novos});
+            END
+        """)
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela_fts}_delete
+            AFTER DELETE ON {tabela}
+            BEGIN
+                INSERT INTO {tabela_fts}({tabela_fts}, rowid, {lista}) VALUES ('delete', OLD.id, {antigos});
+            END
+        """)
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela_fts}_update
+            AFTER UPDATE OF {lista} ON {tabela}
+            BEGIN
+                INSERT INTO {tabela_fts}({tabela_fts}, rowid, {lista}) VALUES ('delete', OLD.id, {antigos});
+                INSERT INTO {tabela_fts}(rowid, {lista}) VALUES (NEW.id, {novos});
+            END
+        """)
+    
+    reconstruir_indices_busca(cursor)
+
+# Colunas de data em texto (horário de Brasília) que ganham uma versão epoch
+COLUNAS_EPOCH = {
+    "chamados": ["data_abertura", "data_ultima_atualizacao", "data_inicio_atendimento",
+                 "data_fim_atendimento", "ultima_retomada"],
+    "interacoes": ["data"],
+    "mensagens_conclusao": ["data_envio"],
+    "logs_sistema": ["data_hora"],
+    "emails_enviados": ["data_envio"],
+    "downloads": ["data_download"],
+}
+
+def migracao_009_datas_epoch(cursor):
+    """
+    Colunas <data>_epoch (segundos Unix, UTC) geradas a partir do texto.
+    VIRTUAL: calculadas na leitura, sem backfill nem risco de divergir do
+    texto; os índices guardam o valor calculado.
+    """
+    adicionadas = []
+    for tabela, colunas in COLUNAS_EPOCH.items():
+        # O texto está em Brasília (UTC-3): +3 horas dá o instante em UTC
+        adicionadas += adicionar_colunas_faltantes(cursor, tabela, [
+            (f"{coluna}_epoch",
+             f"INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', {coluna}, '+3 hours') AS INTEGER)) VIRTUAL")
+            for coluna in colunas
+        ])
+    
+    # Ordenação e faixas de data pelos inteiros (substituem os índices em texto)
+    indices = [
+        "idx_chamados_atualizacao_epoch ON chamados(data_ultima_atualizacao_epoch)",
+        "idx_chamados_abertura_epoch ON chamados(data_abertura_epoch)",
+        "idx_chamados_status_atualizacao_epoch ON chamados(status, data_ultima_atualizacao_epoch)",
+        "idx_chamados_usuario_atualizacao_epoch ON chamados(usuario, data_ultima_atualizacao_epoch)",
+        "idx_chamados_usuario_status_atualizacao_epoch ON chamados(usuario, status, data_ultima_atualizacao_epoch)",
+        "idx_interacoes_chamado_data_epoch ON interacoes(chamado_id, data_epoch, id)",
+        "idx_mensagens_conclusao_chamado_epoch ON mensagens_conclusao(chamado_id, data_envio_epoch, id)",
+        "idx_logs_data_epoch ON logs_sistema(data_hora_epoch)",
+        "idx_logs_usuario_data_epoch ON logs_sistema(usuario, data_hora_epoch)",
+        "idx_emails_enviados_data_epoch ON emails_enviados(data_envio_epoch)",
+        "idx_downloads_usuario_data_epoch ON downloads(usuario, data_download_epoch)",
+    ]
+    for indice in indices:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {indice}")
+    
+    substituidos = (
+        "idx_chamados_atualizacao", "idx_chamados_status_atualizacao", "idx_chamados_usuario_atualizacao",
+        "idx_chamados_usuario_status_atualizacao", "idx_interacoes_chamado_data",
+        "idx_mensagens_conclusao_chamado", "idx_logs_data", "idx_logs_usuario_data",
+        "idx_emails_enviados_data", "idx_downloads_usuario_data",
+    )
+    for indice in substituidos:
+        cursor.execute(f"DROP INDEX IF EXISTS {indice}")
+    
+    return adicionadas
+
+# Tabelas cujas alterações invalidam o cache de consultas (db_cache.py)
+TABELAS_VERSIONADAS = [
+    "usuarios", "chamados", "interacoes", "mensagens_conclusao", "anexos",
+    "logs_sistema", "emails_enviados", "downloads",
+]
+
+def migracao_010_versoes_tabelas(cursor):
+    """
+    Contador de versão por tabela, incrementado por triggers em toda escrita
+    (de qualquer conexão ou processo). O cache de consultas compara as versões
+    das tabelas de que cada resultado depende.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS versoes_tabelas (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    
+    for tabela in TABELAS_VERSIONADAS:
+        cursor.execute("INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES (?, 0)", (tabela,))
+        
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela}_{evento.lower()}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = '{tabela}';
+                END
+            """)
+
+def migracao_011_feed_alteracoes(cursor):
+    """
+    Feed de alterações: uma linha por mudança em chamados, interações e anexos,
+    gravada por triggers. seq é AUTOINCREMENT (nunca reutilizado, nem após a
+    poda), então "o que mudou desde seq N" é uma faixa no índice. usuario é o
+    dono do chamado, para filtrar pelo que cada cliente pode ver.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS feed_alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entidade TEXT NOT NULL,
+            entidade_id INTEGER NOT NULL,
+            chamado_id INTEGER NOT NULL,
+            usuario TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            data_epoch INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feed_alteracoes_usuario_seq ON feed_alteracoes(usuario, seq)")
+    
+    agora = "CAST(strftime('%s', 'now') AS INTEGER)"
+    dono = "COALESCE((SELECT usuario FROM chamados WHERE id = {ref}.chamado_id), '')"
+    
+    # (nome, evento, tabela, entidade, id, chamado, dono, tipo)
+    triggers = [
+        ("trg_feed_chamados_insert", "INSERT", "chamados", "chamado",
+         "NEW.id", "NEW.id", "NEW.usuario", "'novo'"),
+        ("trg_feed_chamados_update", "UPDATE", "chamados", "chamado",
+         "NEW.id", "NEW.id", "NEW.usuario",
+         "CASE WHEN OLD.status IS NOT NEW.status THEN 'status' ELSE 'atualizado' END"),
+        ("trg_feed_chamados_delete", "DELETE", "chamados", "chamado",
+         "OLD.id", "OLD.id", "OLD.usuario", "'excluido'"),
+        ("trg_feed_interacoes_insert", "INSERT", "interacoes", "interacao",
+         "NEW.id", "NEW.chamado_id", dono.format(ref="NEW"), "'novo'"),
+        ("trg_feed_anexos_insert", "INSERT", "anexos", "anexo",
+         "NEW.id", "NEW.chamado_id", dono.format(ref="NEW"), "'novo'"),
+        ("trg_feed_anexos_delete", "DELETE", "anexos", "anexo",
+         "OLD.id", "OLD.chamado_id", dono.format(ref="OLD"), "'excluido'"),
+    ]
+    for nome, evento, tabela, entidade, entidade_id, chamado_id, usuario, tipo in triggers:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nome}
+            AFTER {evento} ON {tabela}
+            BEGIN
+                INSERT INTO feed_alteracoes (entidade, entidade_id, chamado_id, usuario, tipo, data_epoch)
+                VALUES ('{entidade}', {entidade_id}, {chamado_id}, {usuario}, {tipo}, {agora});
+            END
+        """)
+
+def migracao_012_consultas_lentas(cursor):
+    """Consultas que passaram de CONSULTA_LENTA_MS, gravadas pela instrumentação (db_instrumentacao.py)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS consultas_lentas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            impressao TEXT NOT NULL,
+            sql TEXT NOT NULL,
+            duracao_ms REAL NOT NULL,
+            linhas INTEGER DEFAULT 0,
+            chamador TEXT,
+            data_hora TIMESTAMP NOT NULL,
+            data_hora_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', data_hora, '+3 hours') AS INTEGER)) VIRTUAL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_consultas_lentas_data_epoch ON consultas_lentas(data_hora_epoch)")
+
+def migracao_013_fila_emails(cursor):
+    """
+    Fila persistente de e-mails: as notificações são gravadas na mesma
+    transação da ação que as gerou e enviadas por threads (email_system/fila_emails.py).
+    status: pendente -> enviando -> enviado, ou falhou (esgotou as tentativas).
+    chamado_id/interacao_id sem chave estrangeira: excluir um chamado não varre a fila.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fila_emails (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            destinatario TEXT NOT NULL,
+            assunto TEXT NOT NULL,
+            corpo TEXT NOT NULL,
+            chamado_id INTEGER,
+            interacao_id INTEGER,
+            tipo TEXT,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            proxima_tentativa_epoch INTEGER NOT NULL,
+            ultimo_erro TEXT,
+            data_criacao TIMESTAMP NOT NULL,
+            data_envio TIMESTAMP,
+            data_criacao_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', data_criacao, '+3 hours') AS INTEGER)) VIRTUAL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fila_emails_status_proxima ON fila_emails(status, proxima_tentativa_epoch)")
+
+def migracao_014_resumos_emails(cursor):
+    """
+    Agrupamento das notificações em resumos: e-mails pendentes com o mesmo
+    grupo (destinatário, ou destinatário e chamado) saem juntos num só e-mail.
+    resumo: texto curto do evento (mensagem) para a lista do e-mail de resumo.
+    """
+    adicionadas = adicionar_colunas_faltantes(cursor, "fila_emails", [
+        ("grupo", "TEXT"),
+        ("resumo", "TEXT"),
+    ])
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fila_emails_grupo_status ON fila_emails(grupo, status)")
+    return adicionadas
+
+def migracao_015_versao_ultimo_acesso(cursor):
+    """
+    Login grava usuarios.ultimo_acesso e, pelo trigger da migração 10, invalidava
+    no cache tudo que depende de usuarios (lista de chamados, resumos). A versão
+    de usuarios passa a ignorar mudanças só em ultimo_acesso, que ganham a
+    própria versão (usuarios_acesso), usada apenas por quem mostra o campo.
+    """
+    # Colunas lidas agora: coluna nova em usuarios exige recriar o trigger
+    colunas = [row[1] for row in cursor.execute("PRAGMA table_info(usuarios)").fetchall()]
+    mudou = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in colunas if col != "ultimo_acesso")
+    
+    cursor.execute("INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES ('usuarios_acesso', 0)")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_versao_usuarios_update")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_versao_usuarios_update
+        AFTER UPDATE ON usuarios
+        WHEN {mudou}
+        BEGIN
+            UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = 'usuarios';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_versao_usuarios_acesso
+        AFTER UPDATE OF ultimo_acesso ON usuarios
+        WHEN OLD.ultimo_acesso IS NOT NEW.ultimo_acesso
+        BEGIN
+            UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = 'usuarios_acesso';
+        END
+    """)
+
+def migracao_016_reserva_emails(cursor):
+    """
+    Dono e instante da reserva de cada e-mail 'enviando': com vários processos,
+    só uma reserva vencida (worker que parou no meio do envio) volta para a
+    fila; as dos workers vivos dos outros processos ficam onde estão.
+    """
+    return adicionar_colunas_faltantes(cursor, "fila_emails", [
+        ("reservado_em", "INTEGER"),
+        ("reservado_por", "TEXT"),
+    ])
+
+def migracao_017_datas_padrao_brasilia(cursor):
+    """
+    As colunas de data das tabelas antigas têm DEFAULT CURRENT_TIMESTAMP (UTC),
+    mas as colunas _epoch (migração 9) leem o texto como horário de Brasília.
+    Uma linha gravada sem a data ficaria 3 horas no futuro. O app sempre
+    informa a data; para gravações de fora dele, um trigger troca o padrão
+    UTC pelo horário de Brasília ('now' é o mesmo instante em todo o comando,
+    então o valor igual a datetime('now') é o que veio do DEFAULT).
+    Também traz para agora as datas que já estão no futuro.
+    """
+    for tabela, colunas in COLUNAS_EPOCH.items():
+        padroes = {row[1]: row[4] for row in cursor.execute(f"PRAGMA table_info({tabela})").fetchall()}
+        for coluna in colunas:
+            cursor.execute(f"""
+                UPDATE {tabela} SET {coluna} = datetime('now', '-3 hours')
+                WHERE {coluna} > datetime('now', '-3 hours')
+            """)
+            
+            if (padroes.get(coluna) or "").upper() != "CURRENT_TIMESTAMP":
+                continue
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_brasilia_{tabela}_{coluna}
+                AFTER INSERT ON {tabela}
+                WHEN NEW.{coluna} = datetime('now')
+                BEGIN
+                    UPDATE {tabela} SET {coluna} = datetime('now', '-3 hours') WHERE rowid = NEW.rowid;
+                END
+            """)
+
+# Lista ORDENADA de migrações: (versão, descrição, função)
+# Nunca altere uma migração já publicada - adicione uma nova no final.
+MIGRACOES = [
+    (1, "Tabelas, índices e usuário admin", migracao_001_tabelas_iniciais),
+    (2, "Colunas adicionadas após a versão inicial", migracao_002_colunas_faltantes),
+    (3, "Paginação da lista de chamados", migracao_003_paginacao_chamados),
+    (4, "Contadores de chamados por status", migracao_004_contadores_status),
+    (5, "Resumos de chamados por empresa e por usuário", migracao_005_resumos_empresa_usuario),
+    (6, "Cronômetro calculado no SQL", migracao_006_cronometro_sql),
+    (7, "Índices compostos das consultas da aplicação", migracao_007_indices_compostos),
+    (8, "Busca de texto em chamados, interações e conclusões", migracao_008_busca_texto),
+    (9, "Datas em epoch (inteiro) para filtros e ordenação", migracao_009_datas_epoch),
+    (10, "Versões das tabelas para o cache de consultas", migracao_010_versoes_tabelas),
+    (11, "Feed de alterações de chamados, interações e anexos", migracao_011_feed_alteracoes),
+    (12, "Registro de consultas lentas", migracao_012_consultas_lentas),
+    (13, "Fila persistente de e-mails", migracao_013_fila_emails),
+    (14, "Resumos de notificações por destinatário", migracao_014_resumos_emails),
+    (15, "Login não invalida o cache de usuarios", migracao_015_versao_ultimo_acesso),
+    (16, "Dono e instante da reserva na fila de e-mails", migracao_016_reserva_emails),
+    (17, "Datas padrão em horário de Brasília", migracao_017_datas_padrao_brasilia),
+]
+
+SCHEMA_VERSAO = MIGRACOES[-1][0]
+
+# ========== EXECUÇÃO ==========
+
+_migracao_lock = threading.Lock()
+
+def aplicar_migracoes(conn, forcar=False):
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação.
+    Com forcar=True reaplica todas (reparo de tabelas/colunas apagadas).
+    Retorna lista de (versão, descrição, detalhes) aplicadas.
+    """
+    aplicadas = []
+    
+    with _migracao_lock:
+        for versao, descricao, funcao in MIGRACOES:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # Reler dentro da transação: outro processo pode ter migrado antes
+                versao_atual = versao_schema(conn)
+                if versao_atual >= versao and not forcar:
+                    conn.rollback()
+                    continue
+                
+                detalhes = funcao(cursor)
+                
+                if versao > versao_atual:
+                    cursor.execute(f"PRAGMA user_version = {int(versao)}")
+                
+                conn.commit()
+                aplicadas.append((versao, descricao, detalhes))
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+    
+    return aplicadas
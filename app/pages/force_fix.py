@@ -17,11 +17,12 @@ def fix_database():
     st.warning("⚠️ **ATENÇÃO:** Esta ferramenta é destinada apenas para administradores. Use com cuidado!")
     
     # Abas de funcionalidades
-    tab_diagnostico, tab_correcoes, tab_backup, tab_email = st.tabs([
+    tab_diagnostico, tab_correcoes, tab_backup, tab_email, tab_consultas = st.tabs([
         "🔍 Diagnóstico",
         "🛠️ Correções",
         "💾 Backup/Restore",
-        "📧 Teste de E-mail"
+        "📧 Teste de E-mail",
+        "⏱️ Consultas"
     ])
     
     # ========== TAB: DIAGNÓSTICO ==========
@@ -45,6 +46,11 @@ def fix_database():
                         count = cursor.fetchone()[0]
                         st.write(f"  ✅ `{tabela}`: {count} registros")
                     
+                    # Versão do schema
+                    from migracoes import SCHEMA_VERSAO, versao_schema
+                    st.write("")
+                    st.write(f"**🧬 Versão do schema:** {versao_schema(conn)} (esperada: {SCHEMA_VERSAO})")
+                    
                     # Verificar integridade
                     st.write("")
                     st.write("**🔒 Verificação de Integridade:**")
@@ -70,11 +76,63 @@ def fix_database():
                         tamanho = os.path.getsize("data/database.db")
                         st.write(f"  {tamanho / 1024:.2f} KB")
                     
+                    from db_pool import tamanho_wal
+                    st.write(f"  WAL (-wal): {tamanho_wal() / 1024:.2f} KB")
+                    
                     conn.close()
                     st.success("✅ Diagnóstico concluído!")
                     
                 except Exception as e:
                     st.error(f"❌ Erro no diagnóstico: {e}")
+        
+        st.divider()
+        
+        st.write("**🧭 Planos das Consultas**")
+        st.caption("Roda EXPLAIN QUERY PLAN nas consultas da aplicação e aponta varreduras completas e ordenações em árvore temporária.")
+        if st.button("Analisar Consultas", key="btn_analisar_consultas"):
+            try:
+                from analise_consultas import analisar_consultas
+                resultados = analisar_consultas()
+                com_alerta = [r for r in resultados if r['alertas'] or r.get('erro')]
+                
+                if com_alerta:
+                    st.warning(f"⚠️ {len(com_alerta)} de {len(resultados)} consultas com alerta")
+                    for resultado in com_alerta:
+                        with st.expander(f"⚠️ {resultado['nome']} ({resultado['origem']})"):
+                            if resultado.get('erro'):
+                                st.error(resultado['erro'])
+                            st.code("\n".join(resultado['plano']) or "-")
+                            for alerta in resultado['alertas']:
+                                st.write(f"  🔸 `{alerta}`")
+                else:
+                    st.success(f"✅ {len(resultados)} consultas analisadas, nenhuma com varredura completa ou árvore temporária")
+            except Exception as e:
+                st.error(f"Erro: {e}")
+        
+        st.divider()
+        
+        st.write("**🗃️ Cache de Consultas**")
+        try:
+            from db_cache import estatisticas_cache, limpar_cache
+            cache = estatisticas_cache()
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Taxa de acerto", f"{cache['taxa_acerto']:.1%}")
+            col2.metric("Entradas", f"{cache['entradas']} / {cache['max_entradas']}")
+            col3.metric("Memória", f"{cache['bytes_usados'] / 1024:.0f} / {cache['max_bytes'] / 1024:.0f} KB")
+            col4.metric("Despejos", cache['despejos'])
+            st.caption(
+                f"Acertos: {cache['acertos']} | Falhas: {cache['falhas']} | "
+                f"Invalidados por escrita: {cache['invalidados']} | "
+                f"Releituras de versões: {cache['releituras_versoes']}"
+                + ("" if cache['ativo'] else " | ⚠️ Cache desativado (CACHE_CONSULTAS_ATIVO)")
+            )
+            
+            if st.button("Limpar Cache", key="btn_limpar_cache"):
+                limpar_cache()
+                st.success("✅ Cache esvaziado!")
+        except Exception as e:
+            st.error(f"Erro: {e}")
     
     # ========== TAB: CORREÇÕES ==========
     with tab_correcoes:
@@ -87,7 +145,7 @@ def fix_database():
             if st.button("Executar", key="btn_recriar_tabelas"):
                 try:
                     from database import criar_tabelas
-                    resultado = criar_tabelas()
+                    resultado = criar_tabelas(forcar=True)
                     if resultado:
                         st.success("✅ Tabelas verificadas/criadas!")
                     else:
@@ -99,63 +157,128 @@ def fix_database():
             st.write("**🧹 Limpar Tabela de Logs**")
             if st.button("Executar", key="btn_limpar_logs"):
                 try:
-                    conn = sqlite3.connect("data/database.db")
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM logs_sistema WHERE data_hora < datetime('now', '-30 days')")
-                    excluidos = cursor.rowcount
-                    conn.commit()
-                    conn.close()
+                    from database import limpar_logs_antigos
+                    excluidos = limpar_logs_antigos(30)
                     st.success(f"✅ {excluidos} logs antigos removidos!")
                 except Exception as e:
                     st.error(f"Erro: {e}")
         
         st.divider()
         
-        st.write("**🔧 Adicionar Colunas Faltantes**")
-        if st.button("Verificar e Adicionar Colunas", key="btn_add_colunas"):
+        st.write("**🔧 Aplicar Migrações Pendentes**")
+        try:
+            from database import conectar
+            from migracoes import SCHEMA_VERSAO, versao_schema
+            conn = conectar()
+            versao_banco = versao_schema(conn)
+            conn.close()
+            st.caption(f"Versão do schema: {versao_banco} (esperada: {SCHEMA_VERSAO})")
+        except Exception as e:
+            st.caption(f"Não foi possível ler a versão do schema: {e}")
+        
+        if st.button("Verificar e Aplicar Migrações", key="btn_add_colunas"):
             try:
-                conn = sqlite3.connect("data/database.db")
-                cursor = conn.cursor()
+                from database import conectar
+                from migracoes import aplicar_migracoes
                 
-                # Lista de colunas que devem existir
-                colunas_esperadas = {
-                    'chamados': [
-                        ('data_ultima_atualizacao', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
-                        ('tempo_atendimento_segundos', 'INTEGER DEFAULT 0'),
-                        ('status_atendimento', "TEXT DEFAULT 'nao_iniciado'"),
-                        ('ultima_retomada', 'TIMESTAMP'),
-                        ('retornos', 'INTEGER DEFAULT 0')
-                    ],
-                    'usuarios': [
-                        ('ultimo_acesso', 'TIMESTAMP'),
-                        ('ativo', 'INTEGER DEFAULT 1')
-                    ],
-                    'anexos': [
-                        ('tamanho_bytes', 'INTEGER'),
-                        ('tipo_arquivo', 'TEXT')
-                    ]
-                }
+                conn = conectar()
+                try:
+                    aplicadas = aplicar_migracoes(conn)
+                finally:
+                    conn.close()
                 
-                for tabela, colunas in colunas_esperadas.items():
-                    for col_nome, col_tipo in colunas:
-                        try:
-                            cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {col_nome} {col_tipo}")
-                            st.write(f"  ✅ Adicionada: {tabela}.{col_nome}")
-                        except sqlite3.OperationalError as e:
-                            if "duplicate column" in str(e).lower():
-                                st.write(f"  ✓ Já existe: {tabela}.{col_nome}")
-                            else:
-                                st.write(f"  ⚠️ {tabela}.{col_nome}: {e}")
+                if aplicadas:
+                    for versao, descricao, detalhes in aplicadas:
+                        st.write(f"  ✅ v{versao}: {descricao}")
+                        for item in detalhes or []:
+                            st.write(f"    ➕ Adicionada: {item}")
+                else:
+                    st.write("  ✓ Nenhuma migração pendente")
                 
-                conn.commit()
-                conn.close()
-                st.success("✅ Verificação de colunas concluída!")
+                st.success("✅ Verificação de migrações concluída!")
                 
             except Exception as e:
                 st.error(f"Erro: {e}")
         
         st.divider()
         
+        st.write("**📊 Reconstruir Resumos do Dashboard**")
+        st.caption("Recalcula os totais por empresa e por usuário a partir dos chamados existentes.")
+        if st.button("Reconstruir Resumos", key="btn_reconstruir_resumos"):
+            try:
+                from database import reconstruir_resumos
+                sucesso, msg = reconstruir_resumos()
+                if sucesso:
+                    st.success(f"✅ {msg}!")
+                else:
+                    st.error(msg)
+            except Exception as e:
+                st.error(f"Erro: {e}")
+        
+        st.divider()
+        
+        st.write("**🧮 Conferir Resumos do Dashboard**")
+        st.caption("Compara os totais das abas Por Empresa e Por Usuário com a contagem direta dos chamados.")
+        if st.button("Conferir Resumos", key="btn_conferir_resumos"):
+            try:
+                from database import conferir_resumos
+                divergencias = conferir_resumos()
+                if divergencias:
+                    st.error(f"❌ {len(divergencias)} divergência(s):")
+                    for divergencia in divergencias:
+                        st.write(f"  • {divergencia}")
+                else:
+                    st.success("✅ Resumos conferem com os chamados!")
+            except Exception as e:
+                st.error(f"Erro: {e}")
+        
+        st.divider()
+        
+        st.write("**🔍 Reconstruir Índice de Busca**")
+        st.caption("Reindexa o texto de chamados, interações e mensagens de conclusão.")
+        if st.button("Reconstruir Índice", key="btn_reconstruir_busca"):
+            try:
+                from database import reconstruir_busca
+                sucesso, msg = reconstruir_busca()
+                if sucesso:
+                    st.success(f"✅ {msg}!")
+                else:
+                    st.error(msg)
+            except Exception as e:
+                st.error(f"Erro: {e}")
+        
+        st.divider()
+        
+        st.write("**📈 Atualizar Estatísticas do Planejador**")
+        st.caption("Roda ANALYZE para que as consultas escolham os melhores índices.")
+        if st.button("Executar ANALYZE", key="btn_analyze"):
+            try:
+                from analise_consultas import atualizar_estatisticas
+                sucesso, msg = atualizar_estatisticas()
+                if sucesso:
+                    st.success(f"✅ {msg}!")
+                else:
+                    st.error(msg)
+            except Exception as e:
+                st.error(f"Erro: {e}")
+        
+        st.divider()
+        
+        st.write("**🗜️ Checkpoint do WAL**")
+        st.caption("Copia o WAL para o banco e zera o arquivo -wal (aguarda leitores em andamento).")
+        if st.button("Executar Checkpoint", key="btn_checkpoint_wal"):
+            try:
+                from db_pool import checkpoint_wal, tamanho_wal
+                resultado = checkpoint_wal(modo="TRUNCATE")
+                if resultado["ocupado"]:
+                    st.warning(f"⚠️ Banco ocupado: {resultado['paginas_copiadas']} de {resultado['paginas_wal']} páginas copiadas")
+                else:
+                    st.success(f"✅ Checkpoint concluído! WAL: {tamanho_wal() / 1024:.2f} KB")
+            except Exception as e:
+                st.error(f"Erro: {e}")
+        
+        st.divider()
+        
         st.write("**⚡ Otimizar Banco de Dados**")
         if st.button("Executar VACUUM", key="btn_vacuum"):
             try:
@@ -220,6 +343,12 @@ def fix_database():
                                 os.makedirs("backups")
                             shutil.copy2("data/database.db", f"backups/pre_restore_{timestamp}.db")
                             
+                            # Fechar conexões do pool antes de sobrescrever o arquivo
+                            from db_pool import fechar_pools
+                            from db_cache import limpar_cache
+                            fechar_pools()
+                            limpar_cache()
+                            
                             # Restaurar
                             with open("data/database.db", 'wb') as f:
                                 f.write(arquivo_backup.read())
@@ -323,3 +452,164 @@ def fix_database():
                 
         except Exception as e:
             st.error(f"Erro ao carregar configurações de e-mail: {e}")
+        
+        st.divider()
+        
+        st.write("**📬 Fila de Envio**")
+        try:
+            import pandas as pd
+            from email_system.fila_emails import metricas_fila, reenviar_falhos, avisar_workers
+            from email_system.sessoes_smtp import obter_pool_smtp
+            from email_system.limite_envio import obter_disjuntor, obter_limite_envio
+            from config.email_config import (
+                EMAIL_RESUMO_JANELA, EMAIL_RESUMO_MODO, EMAIL_RESUMO_IMEDIATO,
+                EMAIL_TAXA_POR_MINUTO, EMAIL_TAXA_RAJADA
+            )
+            from database import buscar_emails_falhos
+            
+            fila = metricas_fila()
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Pendentes", fila['pendente'])
+            col2.metric("Enviando", fila['enviando'])
+            col3.metric("Falharam", fila['falhou'])
+            col4.metric("Enviados/min", fila['enviados_ultimo_minuto'])
+            st.caption(
+                f"Pendente mais antigo: {fila['idade_pendente']}s | "
+                f"Enviados (processo): {fila['enviados']} | Tentativas com falha: {fila['falhas']} | "
+                f"Tempo médio por tentativa: {fila['tempo_medio_ms']} ms | Workers ativos: {fila['workers']}"
+            )
+            st.caption(
+                f"Resumos enviados: {fila['resumos']} (juntando {fila['agrupados']} notificações) | "
+                f"Janela: {EMAIL_RESUMO_JANELA}s por {'destinatário' if EMAIL_RESUMO_MODO == 'destinatario' else 'destinatário e chamado'} | "
+                f"Imediatas: {', '.join(EMAIL_RESUMO_IMEDIATO) or 'nenhuma'}"
+            )
+            
+            pool_smtp = obter_pool_smtp()
+            sessoes = pool_smtp.estatisticas
+            st.caption(
+                f"Sessões SMTP livres: {pool_smtp.sessoes_livres()} | Abertas: {sessoes['abertas']} | "
+                f"Reutilizadas: {sessoes['reutilizadas']} | NOOPs: {sessoes['noops']} | "
+                f"Descartadas: {sessoes['descartadas']} | Encerradas: {sessoes['encerradas']}"
+            )
+            
+            disjuntor = obter_disjuntor()
+            situacao = disjuntor.situacao()
+            limite = obter_limite_envio()
+            estados = {"fechado": "🟢 Fechado", "meio_aberto": "🟡 Sondando", "aberto": "🔴 Aberto"}
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Disjuntor SMTP", estados.get(situacao['estado'], situacao['estado']))
+            col2.metric("Falhas seguidas", f"{situacao['falhas_seguidas']}/{disjuntor.limite_falhas}")
+            col3.metric("Próxima sonda", f"{situacao['proxima_sonda']:.0f}s" if situacao['estado'] != "fechado" else "-")
+            col4.metric("Adiados (processo)", fila['adiados'])
+            st.caption(
+                f"Aberturas: {situacao['aberturas']} | Sondas: {situacao['sondas']} | "
+                f"Envios barrados: {situacao['bloqueados']} | Espera atual: {situacao['espera']:.0f}s | "
+                f"Limite: {EMAIL_TAXA_POR_MINUTO:g}/min (rajada {EMAIL_TAXA_RAJADA}), fichas: {limite.fichas():.1f}, "
+                f"esperas: {limite.estatisticas['esperas']} ({limite.estatisticas['tempo_espera']:.1f}s)"
+            )
+            
+            if situacao['estado'] != "fechado":
+                st.warning(f"⛔ Envios suspensos pelo disjuntor. Último erro: {situacao['ultimo_erro']}")
+                if st.button("🔌 Fechar disjuntor", key="btn_fechar_disjuntor"):
+                    disjuntor.fechar()
+                    avisar_workers()
+                    st.rerun()
+            
+            if fila['falhou']:
+                with st.expander(f"❌ {fila['falhou']} e-mail(s) que esgotaram as tentativas"):
+                    falhos = buscar_emails_falhos()
+                    df_falhos = pd.DataFrame(falhos)[['data_criacao', 'destinatario', 'assunto', 'tentativas', 'ultimo_erro']]
+                    df_falhos.columns = ['Criado em', 'Destinatário', 'Assunto', 'Tentativas', 'Último erro']
+                    st.dataframe(df_falhos, use_container_width=True, hide_index=True)
+                
+                if st.button("🔁 Reenviar e-mails que falharam", key="btn_reenviar_falhos"):
+                    quantidade = reenviar_falhos()
+                    st.success(f"✅ {quantidade} e-mail(s) de volta na fila!")
+        except Exception as e:
+            st.error(f"Erro ao carregar a fila de e-mails: {e}")
+    
+    # ========== TAB: CONSULTAS ==========
+    with tab_consultas:
+        st.write("### ⏱️ Tempo das Consultas")
+        st.caption("Tempo de cada SQL desde o início do processo, agrupado pela impressão digital (literais trocados por ?).")
+        
+        try:
+            import pandas as pd
+            from db_instrumentacao import resumo_instrumentacao, estatisticas_consultas, zerar_estatisticas
+            
+            resumo = resumo_instrumentacao()
+            if not resumo['ativa']:
+                st.info("💡 Instrumentação desativada. Defina `INSTRUMENTACAO_ATIVA = true` nos secrets para medir as consultas.")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Consultas distintas", resumo['consultas'])
+            col2.metric("Execuções", resumo['execucoes'])
+            col3.metric("Tempo total", f"{resumo['tempo_total_ms'] / 1000:.2f} s")
+            col4.metric("Erros", resumo['erros'])
+            
+            ordenacoes = {"Tempo total": "tempo_total", "p95": "p95", "Chamadas": "chamadas"}
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                ordem = st.selectbox("Ordenar por", list(ordenacoes), key="ordem_consultas")
+            with col2:
+                limite = st.number_input("Mostrar", min_value=5, max_value=500, value=30, step=5, key="limite_consultas")
+            
+            consultas = estatisticas_consultas(ordenacoes[ordem], int(limite))
+            if consultas:
+                df = pd.DataFrame([
+                    {
+                        "SQL": c['impressao'],
+                        "Chamadas": c['chamadas'],
+                        "Total (ms)": c['tempo_total_ms'],
+                        "Média (ms)": c['media_ms'],
+                        "p50 (ms)": c['p50_ms'],
+                        "p95 (ms)": c['p95_ms'],
+                        "Máx (ms)": c['max_ms'],
+                        "Linhas": c['linhas'],
+                        "Erros": c['erros'],
+                        "Chamador": next(iter(c['chamadores']), "-"),
+                    }
+                    for c in consultas
+                ])
+                st.dataframe(df, use_container_width=True, hide_index=True)
+                st.caption("p50/p95: limite superior da faixa do histograma. Chamador: a função que mais executou a consulta.")
+                
+                com_erro = [c for c in consultas if c['erros']]
+                for c in com_erro:
+                    with st.expander(f"❌ {c['erros']} erro(s): {c['impressao'][:80]}"):
+                        st.code(c['impressao'], language="sql")
+                        st.write(f"**Último erro:** {c['ultimo_erro']}")
+                        st.write("**Chamadores:** " + ", ".join(f"`{nome}` ({n})" for nome, n in c['chamadores'].items()))
+            else:
+                st.info("Nenhuma consulta registrada ainda")
+            
+            if st.button("Zerar Estatísticas", key="btn_zerar_consultas"):
+                zerar_estatisticas()
+                st.success("✅ Estatísticas zeradas!")
+        except Exception as e:
+            st.error(f"Erro: {e}")
+        
+        st.divider()
+        
+        try:
+            from database import buscar_consultas_lentas, limpar_consultas_lentas
+            from config.db_config import CONSULTA_LENTA_MS, CONSULTAS_LENTAS_RETENCAO_DIAS
+            
+            st.write("**🐢 Consultas Lentas**")
+            st.caption(f"Execuções a partir de {CONSULTA_LENTA_MS:g} ms, mantidas por {CONSULTAS_LENTAS_RETENCAO_DIAS} dias.")
+            
+            lentas = buscar_consultas_lentas(limite=200)
+            if lentas:
+                df_lentas = pd.DataFrame(lentas)[['data_hora', 'duracao_ms', 'linhas', 'chamador', 'impressao']]
+                df_lentas.columns = ['Data/Hora', 'Duração (ms)', 'Linhas', 'Chamador', 'SQL']
+                st.dataframe(df_lentas, use_container_width=True, hide_index=True)
+                
+                if st.button("Limpar Registro", key="btn_limpar_lentas"):
+                    removidas = limpar_consultas_lentas()
+                    st.success(f"✅ {removidas} registro(s) removido(s)!")
+            else:
+                st.info("Nenhuma consulta lenta registrada")
+        except Exception as e:
+            st.error(f"Erro: {e}")
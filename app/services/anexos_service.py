@@ -0,0 +1,133 @@
+# app/services/anexos_service.py
+"""
+Serviço de Anexos - Entrega sob demanda dos arquivos enviados
+A tela lista apenas os metadados; o conteúdo só é lido do disco quando o
+usuário pede o download, passando por um cache LRU compartilhado e limitado.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Adicionar paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from config.email_config import get_config_value
+
+# Limite total de memória do cache de arquivos servidos (todas as sessões)
+ANEXOS_CACHE_MAX_BYTES = int(get_config_value("ANEXOS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Arquivos acima deste tamanho nunca são carregados em memória pela aplicação
+ANEXO_MAX_BYTES = int(get_config_value("ANEXO_MAX_BYTES", str(20 * 1024 * 1024)))
+
+class CacheArquivosLRU:
+    """Cache LRU de conteúdo de arquivos, limitado pelo total de bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def obter(self, chave):
+        with self._lock:
+            dados = self._itens.get(chave)
+            if dados is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return dados
+
+    def guardar(self, chave, dados):
+        if len(dados) > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self.bytes_usados -= len(anterior)
+
+            self._itens[chave] = dados
+            self.bytes_usados += len(dados)
+
+            while self.bytes_usados > self.max_bytes:
+                _, removido = self._itens.popitem(last=False)
+                self.bytes_usados -= len(removido)
+                self.despejos += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "arquivos": len(self._itens),
+                "bytes_usados": self.bytes_usados,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "despejos": self.despejos
+            }
+
+_cache_arquivos = CacheArquivosLRU(ANEXOS_CACHE_MAX_BYTES)
+
+def metadados_anexo(anexo):
+    """
+    Retorna os metadados de um anexo sem ler o conteúdo.
+    {'nome', 'caminho', 'existe', 'tamanho'}
+    """
+    caminho = anexo['caminho_arquivo']
+    try:
+        tamanho = os.path.getsize(caminho)
+        existe = True
+    except OSError:
+        tamanho = anexo.get('tamanho_bytes') or 0
+        existe = False
+
+    return {
+        'nome': anexo['nome_arquivo'],
+        'caminho': caminho,
+        'existe': existe,
+        'tamanho': tamanho
+    }
+
+def ler_anexo(caminho):
+    """
+    Lê o conteúdo de um anexo (sob demanda), usando o cache LRU compartilhado.
+    Retorna (dados, mensagem_erro).
+    """
+    try:
+        info = os.stat(caminho)
+    except OSError:
+        return None, "Arquivo não encontrado"
+
+    if info.st_size > ANEXO_MAX_BYTES:
+        return None, f"Arquivo maior que o limite de {ANEXO_MAX_BYTES // (1024 * 1024)} MB"
+
+    # Arquivo alterado no disco gera nova chave
+    chave = (caminho, info.st_mtime_ns, info.st_size)
+
+    dados = _cache_arquivos.obter(chave)
+    if dados is None:
+        with open(caminho, 'rb') as f:
+            dados = f.read()
+        _cache_arquivos.guardar(chave, dados)
+
+    return dados, None
+
+def estatisticas_cache_anexos():
+    """Estatísticas do cache de arquivos (para diagnóstico)."""
+    return _cache_arquivos.estatisticas()
+
+def formatar_tamanho(tamanho_bytes):
+    """Formata tamanho em bytes para exibição."""
+    if not tamanho_bytes:
+        return "0 KB"
+    if tamanho_bytes < 1024 * 1024:
+        return f"{tamanho_bytes / 1024:.1f} KB"
+    return f"{tamanho_bytes / (1024 * 1024):.1f} MB"
@@ -1,11 +1,14 @@
 # app/services/chamados_service.py
 """
 Serviço de Chamados - Gerencia notificações e interações
+
+Os notificar_* montam os e-mails e os gravam na fila (email_system/fila_emails.py).
+Com cursor, rodam dentro da transação da ação (ex: notificar=... nas funções
+do database); sem cursor, numa transação própria.
 """
 
 import sys
 import os
-import threading
 
 # Adicionar paths
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,12 +17,12 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from database import (
-    conectar, 
     registrar_log,
     adicionar_interacao_chamado
 )
+from escritor import executar_escrita
 from config.email_config import EMAIL_ADMIN, EMAIL_ENABLED
-from email_system.email_service import enviar_email
+from email_system.fila_emails import enfileirar_email
 from email_system.email_templates import (
     email_novo_chamado_admin,
     email_novo_chamado_cliente,
@@ -33,16 +36,47 @@ from email_system.email_templates import (
 )
 from utils import formatar_tempo, agora_brasilia_str
 
-def enviar_email_async(destinatario, assunto, corpo_html, chamado_id=None, tipo=None):
+def enviar_email_async(destinatario, assunto, corpo_html, chamado_id=None, tipo=None, interacao_id=None, cursor=None,
+                       prioridade=None, resumo=None):
+    """
+    Coloca o e-mail na fila de envio (não bloqueia a interface do Streamlit).
+    Com cursor, o e-mail entra na transação em andamento.
+    prioridade e resumo: prioridade do chamado (as urgentes não esperam a
+    janela do resumo) e texto do evento no e-mail de resumo.
+    """
+    return enfileirar_email(destinatario, assunto, corpo_html, chamado_id, tipo, interacao_id, cursor,
+                            prioridade=prioridade, resumo=resumo)
+
+def na_transacao(gravar, cursor=None):
     """
-    Envia e-mail de forma assíncrona (em thread separada).
-    Útil para não bloquear a interface do Streamlit.
+    Executa gravar(cursor) na transação informada ou numa nova (escritor).
+    Na transação informada roda num SAVEPOINT: se a notificação falhar, só os
+    e-mails dela são desfeitos e a ação que a disparou é gravada mesmo assim.
     """
-    def enviar():
-        enviar_email(destinatario, assunto, corpo_html, chamado_id=chamado_id, tipo=tipo)
+    if cursor is None:
+        return executar_escrita(gravar)
+    
+    cursor.execute("SAVEPOINT notificacao")
+    try:
+        resultado = gravar(cursor)
+    except Exception:
+        cursor.execute("ROLLBACK TO notificacao")
+        cursor.execute("RELEASE notificacao")
+        raise
+    cursor.execute("RELEASE notificacao")
+    return resultado
+
+def buscar_chamado_notificacao(cursor, chamado_id):
+    """Chamado com e-mail e empresa do cliente (None se não existe)."""
+    cursor.execute("""
+        SELECT c.*, u.email as email_cliente, u.empresa
+        FROM chamados c
+        JOIN usuarios u ON c.usuario = u.usuario
+        WHERE c.id = ?
+    """, (chamado_id,))
     
-    thread = threading.Thread(target=enviar, daemon=True)
-    thread.start()
+    resultado = cursor.fetchone()
+    return dict(resultado) if resultado else None
 
 def criar_interacao(chamado_id, autor, mensagem, tipo='mensagem', enviar_email_flag=True):
     """
@@ -53,43 +87,28 @@ def criar_interacao(chamado_id, autor, mensagem, tipo='mensagem', enviar_email_f
         autor: 'cliente' ou 'atendente'
         mensagem: Texto da mensagem
         tipo: Tipo da interação (abertura, mensagem, retorno, conclusao)
-        enviar_email_flag: Se deve disparar e-mail
+        enviar_email_flag: Se deve disparar e-mail (gravado na fila na mesma transação)
     """
+    notificar = None
+    if enviar_email_flag:
+        def notificar(cursor, interacao_id):
+            processar_envio_email_interacao(interacao_id, chamado_id, autor, mensagem, tipo, cursor=cursor)
+    
     try:
-        sucesso, resultado = adicionar_interacao_chamado(chamado_id, autor, mensagem, tipo)
-        
-        if sucesso and enviar_email_flag:
-            # Processar envio de e-mail em background
-            processar_envio_email_interacao(resultado, chamado_id, autor, mensagem, tipo)
-        
-        return sucesso, resultado
+        return adicionar_interacao_chamado(chamado_id, autor, mensagem, tipo, notificar=notificar)
     except Exception as e:
         print(f"Erro ao criar interação: {e}")
         return False, str(e)
 
-def processar_envio_email_interacao(interacao_id, chamado_id, autor, mensagem, tipo):
+def processar_envio_email_interacao(interacao_id, chamado_id, autor, mensagem, tipo, cursor=None):
     """
     Processa envio de e-mail para uma interação.
     """
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        # Buscar dados do chamado
-        cursor.execute("""
-            SELECT c.*, u.email as email_cliente, u.empresa
-            FROM chamados c
-            JOIN usuarios u ON c.usuario = u.usuario
-            WHERE c.id = ?
-        """, (chamado_id,))
-        
-        resultado = cursor.fetchone()
-        conn.close()
-        
-        if not resultado:
+    def gravar(cursor):
+        chamado = buscar_chamado_notificacao(cursor, chamado_id)
+        if not chamado:
             return
         
-        chamado = dict(resultado)
         interacao = {
             'id': interacao_id,
             'mensagem': mensagem,
@@ -106,7 +125,11 @@ def processar_envio_email_interacao(interacao_id, chamado_id, autor, mensagem, t
                     f"[Chamado #{chamado_id}] Cliente respondeu",
                     corpo_html,
                     chamado_id=chamado_id,
-                    tipo='interacao_cliente'
+                    tipo='interacao_cliente',
+                    interacao_id=interacao_id,
+                    cursor=cursor,
+                    prioridade=chamado['prioridade'],
+                    resumo=mensagem
                 )
         else:
             # Atendente escreveu -> notificar cliente
@@ -117,37 +140,35 @@ def processar_envio_email_interacao(interacao_id, chamado_id, autor, mensagem, t
                     f"[Chamado #{chamado_id}] Nova mensagem",
                     corpo_html,
                     chamado_id=chamado_id,
-                    tipo='interacao_atendente'
+                    tipo='interacao_atendente',
+                    interacao_id=interacao_id,
+                    cursor=cursor,
+                    prioridade=chamado['prioridade'],
+                    resumo=mensagem
                 )
     
+    try:
+        na_transacao(gravar, cursor)
     except Exception as e:
         print(f"Erro ao processar e-mail de interação: {e}")
 
-def notificar_novo_chamado(chamado_id):
+def notificar_atendimento_iniciado(chamado_id, atendente, cursor=None, interacao_id=None):
+    """
+    Notifica o cliente do início do atendimento.
+    A interação já é registrada na transição (iniciar_atendimento_admin).
+    """
+    processar_envio_email_interacao(interacao_id, chamado_id, 'atendente', f"Atendimento iniciado por {atendente}", 'inicio', cursor=cursor)
+
+def notificar_novo_chamado(chamado_id, cursor=None):
     """
     Notifica admin e cliente sobre novo chamado.
     """
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        # Buscar dados do chamado
-        cursor.execute("""
-            SELECT c.*, u.email as email_cliente, u.empresa
-            FROM chamados c
-            JOIN usuarios u ON c.usuario = u.usuario
-            WHERE c.id = ?
-        """, (chamado_id,))
-        
-        resultado = cursor.fetchone()
-        conn.close()
-        
-        if not resultado:
+    def gravar(cursor):
+        chamado = buscar_chamado_notificacao(cursor, chamado_id)
+        if not chamado:
             print(f"⚠️ Chamado #{chamado_id} não encontrado")
             return
         
-        chamado = dict(resultado)
-        
         print(f"📧 Notificando sobre chamado #{chamado_id}")
         print(f"   Admin: {EMAIL_ADMIN}")
         print(f"   Cliente: {chamado.get('email_cliente', 'N/A')}")
@@ -160,7 +181,10 @@ def notificar_novo_chamado(chamado_id):
                 f"[Novo Chamado #{chamado['id']}] {chamado['assunto']}",
                 corpo_admin,
                 chamado_id=chamado_id,
-                tipo='novo_chamado_admin'
+                tipo='novo_chamado_admin',
+                cursor=cursor,
+                prioridade=chamado['prioridade'],
+                resumo=chamado['assunto']
             )
         
         # E-mail para cliente
@@ -171,38 +195,28 @@ def notificar_novo_chamado(chamado_id):
                 f"[Chamado #{chamado['id']}] Registrado com sucesso",
                 corpo_cliente,
                 chamado_id=chamado_id,
-                tipo='novo_chamado_cliente'
+                tipo='novo_chamado_cliente',
+                cursor=cursor,
+                prioridade=chamado['prioridade'],
+                resumo=chamado['assunto']
             )
     
+    try:
+        na_transacao(gravar, cursor)
     except Exception as e:
         print(f"❌ Erro ao notificar novo chamado: {e}")
         import traceback
         traceback.print_exc()
 
-def notificar_chamado_concluido(chamado_id, mensagem_conclusao=None):
+def notificar_chamado_concluido(chamado_id, mensagem_conclusao=None, cursor=None):
     """
     Notifica cliente sobre conclusão do chamado pelo admin.
     """
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        # Buscar dados do chamado
-        cursor.execute("""
-            SELECT c.*, u.email as email_cliente
-            FROM chamados c
-            JOIN usuarios u ON c.usuario = u.usuario
-            WHERE c.id = ?
-        """, (chamado_id,))
-        
-        resultado = cursor.fetchone()
-        conn.close()
-        
-        if not resultado:
+    def gravar(cursor):
+        chamado = buscar_chamado_notificacao(cursor, chamado_id)
+        if not chamado:
             return
         
-        chamado = dict(resultado)
-        
         # Formatar tempo
         if chamado.get('tempo_atendimento_segundos'):
             chamado['tempo_formatado'] = formatar_tempo(chamado['tempo_atendimento_segundos'])
@@ -215,36 +229,26 @@ def notificar_chamado_concluido(chamado_id, mensagem_conclusao=None):
                 f"[Chamado #{chamado['id']}] Concluído - Aguardando sua confirmação",
                 corpo,
                 chamado_id=chamado_id,
-                tipo='chamado_concluido'
+                tipo='chamado_concluido',
+                cursor=cursor,
+                prioridade=chamado['prioridade'],
+                resumo=mensagem_conclusao
             )
     
+    try:
+        na_transacao(gravar, cursor)
     except Exception as e:
         print(f"Erro ao notificar conclusão: {e}")
 
-def notificar_chamado_retornado(chamado_id, mensagem_retorno):
+def notificar_chamado_retornado(chamado_id, mensagem_retorno, cursor=None):
     """
     Notifica admin sobre chamado retornado pelo cliente.
     """
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        # Buscar dados do chamado
-        cursor.execute("""
-            SELECT c.*, u.email as email_cliente, u.empresa
-            FROM chamados c
-            JOIN usuarios u ON c.usuario = u.usuario
-            WHERE c.id = ?
-        """, (chamado_id,))
-        
-        resultado = cursor.fetchone()
-        conn.close()
-        
-        if not resultado:
+    def gravar(cursor):
+        chamado = buscar_chamado_notificacao(cursor, chamado_id)
+        if not chamado:
             return
         
-        chamado = dict(resultado)
-        
         # E-mail para admin
         if EMAIL_ADMIN:
             corpo_admin = email_chamado_retornado_admin(chamado, mensagem_retorno)
@@ -253,7 +257,10 @@ def notificar_chamado_retornado(chamado_id, mensagem_retorno):
                 f"[Chamado #{chamado['id']}] Retornado pelo cliente",
                 corpo_admin,
                 chamado_id=chamado_id,
-                tipo='chamado_retornado_admin'
+                tipo='chamado_retornado_admin',
+                cursor=cursor,
+                prioridade=chamado['prioridade'],
+                resumo=mensagem_retorno
             )
         
         # E-mail de confirmação para cliente
@@ -264,35 +271,25 @@ def notificar_chamado_retornado(chamado_id, mensagem_retorno):
                 f"[Chamado #{chamado['id']}] Retornado com sucesso",
                 corpo_cliente,
                 chamado_id=chamado_id,
-                tipo='chamado_retornado_cliente'
+                tipo='chamado_retornado_cliente',
+                cursor=cursor,
+                prioridade=chamado['prioridade']
             )
     
+    try:
+        na_transacao(gravar, cursor)
     except Exception as e:
         print(f"Erro ao notificar retorno: {e}")
 
-def notificar_chamado_finalizado(chamado_id):
+def notificar_chamado_finalizado(chamado_id, cursor=None):
     """
     Notifica admin quando cliente finaliza o chamado.
     """
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT c.*, u.email as email_cliente, u.empresa
-            FROM chamados c
-            JOIN usuarios u ON c.usuario = u.usuario
-            WHERE c.id = ?
-        """, (chamado_id,))
-        
-        resultado = cursor.fetchone()
-        conn.close()
-        
-        if not resultado:
+    def gravar(cursor):
+        chamado = buscar_chamado_notificacao(cursor, chamado_id)
+        if not chamado:
             return
         
-        chamado = dict(resultado)
-        
         if chamado.get('tempo_atendimento_segundos'):
             chamado['tempo_formatado'] = formatar_tempo(chamado['tempo_atendimento_segundos'])
         
@@ -304,35 +301,25 @@ def notificar_chamado_finalizado(chamado_id):
                 f"[Chamado #{chamado['id']}] Finalizado pelo cliente ✅",
                 corpo,
                 chamado_id=chamado_id,
-                tipo='chamado_finalizado'
+                tipo='chamado_finalizado',
+                cursor=cursor,
+                prioridade=chamado['prioridade']
             )
     
+    try:
+        na_transacao(gravar, cursor)
     except Exception as e:
         print(f"Erro ao notificar finalização: {e}")
 
-def notificar_retorno_admin(chamado_id, mensagem):
+def notificar_retorno_admin(chamado_id, mensagem, cursor=None, interacao_id=None):
     """
     Notifica cliente quando admin retorna com pergunta.
     """
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT c.*, u.email as email_cliente
-            FROM chamados c
-            JOIN usuarios u ON c.usuario = u.usuario
-            WHERE c.id = ?
-        """, (chamado_id,))
-        
-        resultado = cursor.fetchone()
-        conn.close()
-        
-        if not resultado:
+    def gravar(cursor):
+        chamado = buscar_chamado_notificacao(cursor, chamado_id)
+        if not chamado:
             return
         
-        chamado = dict(resultado)
-        
         if chamado.get('email_cliente'):
             corpo = email_retorno_admin_cliente(chamado, mensagem)
             enviar_email_async(
@@ -340,8 +327,14 @@ def notificar_retorno_admin(chamado_id, mensagem):
                 f"[Chamado #{chamado['id']}] Aguardando sua resposta",
                 corpo,
                 chamado_id=chamado_id,
-                tipo='retorno_admin'
+                tipo='retorno_admin',
+                interacao_id=interacao_id,
+                cursor=cursor,
+                prioridade=chamado['prioridade'],
+                resumo=mensagem
             )
     
+    try:
+        na_transacao(gravar, cursor)
     except Exception as e:
         print(f"Erro ao notificar retorno admin: {e}")
@@ -7,6 +7,7 @@ SEMPRE usa horário de Brasília (UTC-3)
 import hashlib
 import secrets
 import os
+import time
 from datetime import datetime, timezone, timedelta
 import re
 
@@ -29,6 +30,12 @@ def agora_brasilia_str():
     """
     return agora_brasilia().strftime("%Y-%m-%d %H:%M:%S")
 
+def agora_epoch():
+    """
+    Instante atual em segundos Unix (UTC) - compara com as colunas *_epoch.
+    """
+    return int(time.time())
+
 def agora_brasilia_hora():
     """
     Retorna hora atual de Brasília no formato HH:MM:SS
@@ -94,36 +101,33 @@ def formatar_tempo(segundos):
     
     return f"{horas:02d}:{minutos:02d}:{segs:02d}"
 
-def formatar_data_br(data_str):
-    """Formata data para padrão brasileiro DD/MM/YYYY HH:MM."""
-    if not data_str:
+def _formatar_data(data, com_segundos):
+    """
+    Formata para DD/MM/YYYY HH:MM[:SS] só na exibição. Aceita o texto do banco
+    ('YYYY-MM-DD HH:MM:SS', recortado sem strptime), epoch (int) ou datetime.
+    """
+    if data is None or data == "":
         return ""
     
-    try:
-        # Limpar microsegundos e espaços
-        data_str = str(data_str).strip()
-        if '.' in data_str:
-            data_str = data_str.split('.')[0]
-        
-        data = datetime.strptime(data_str, "%Y-%m-%d %H:%M:%S")
-        return data.strftime("%d/%m/%Y %H:%M")
-    except:
-        return str(data_str)
+    if isinstance(data, (int, float)):
+        data = datetime.fromtimestamp(data, BRASILIA_TZ)
+    
+    if isinstance(data, datetime):
+        return data.strftime("%d/%m/%Y %H:%M:%S" if com_segundos else "%d/%m/%Y %H:%M")
+    
+    texto = str(data).strip()
+    if len(texto) >= 19 and texto[4] == '-' and texto[7] == '-' and texto[10] in ' T':
+        return f"{texto[8:10]}/{texto[5:7]}/{texto[0:4]} {texto[11:19] if com_segundos else texto[11:16]}"
+    
+    return texto
+
+def formatar_data_br(data):
+    """Formata data para padrão brasileiro DD/MM/YYYY HH:MM."""
+    return _formatar_data(data, com_segundos=False)
 
-def formatar_data_hora_br(data_str):
+def formatar_data_hora_br(data):
     """Formata data para padrão brasileiro com segundos DD/MM/YYYY HH:MM:SS."""
-    if not data_str:
-        return ""
-    
-    try:
-        data_str = str(data_str).strip()
-        if '.' in data_str:
-            data_str = data_str.split('.')[0]
-        
-        data = datetime.strptime(data_str, "%Y-%m-%d %H:%M:%S")
-        return data.strftime("%d/%m/%Y %H:%M:%S")
-    except:
-        return str(data_str)
+    return _formatar_data(data, com_segundos=True)
 
 def parse_datetime_safe(data_str):
     """Converte string para datetime de forma segura."""
@@ -193,17 +197,10 @@ def sanitizar_texto(texto):
 # ========== UTILITÁRIOS ==========
 
 def registrar_log(acao, usuario, detalhes=""):
-    """Registra ação do usuário no log."""
+    """Registra ação do usuário no log (gravação em lote, ver auditoria.py)."""
     try:
-        from database import conectar
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO logs_sistema (acao, usuario, detalhes, data_hora)
-            VALUES (?, ?, ?, ?)
-        """, (acao, usuario, detalhes, agora_brasilia_str()))
-        conn.commit()
-        conn.close()
+        from auditoria import registrar_log as registrar_log_auditoria
+        registrar_log_auditoria(acao, usuario, detalhes)
     except:
         pass  # Silenciosamente falha se tabela não existir
 